@@ -0,0 +1,263 @@
+"""
+Synthetic memory-bandwidth workloads used as controllable background contention.
+
+Each workload targets a bandwidth (GB/s, 0 = uncapped) and a duty cycle, runs
+in the background between start() and stop(), and reports the bandwidth it
+actually achieved so victim latency can be plotted against background load.
+
+Spec format (see parse_background_spec): kind:target_gbps:duty[:size_mb]
+    cpu_stream:4:1.0       TVM STREAM triad on the CPU (needs its own RPC session)
+    gpu_copy:8:0.5:64      OpenCL copy kernel (clblast_bw_test/cl_bw_gen)
+
+GpuMatmulWorkload and NpuWorkload run the real GPU / NPU kernels paced to a
+duty cycle instead of a bandwidth; slo_search.py uses them as co-runners.
+"""
+
+import os
+import re
+import time
+import subprocess
+import threading
+import logging
+
+import numpy as np
+import tvm
+
+from tvm_kernels import MODULE_DIR, build_stream_triad
+
+logger = logging.getLogger(__name__)
+
+CL_BW_GEN_PATH = "/data/local/tmp/cl_bw_gen"
+CLBLAST_PATH = "/data/local/tmp/clblast_bw_test"
+# Element types of clblast_bw_test (fp16 needs cl_khr_fp16)
+GPU_PRECISIONS = ("fp32", "fp16")
+# Command queue priority hints of clblast_bw_test (cl_khr_priority_hints)
+GPU_PRIORITIES = ("high", "med", "low")
+
+
+def _bw_stats(samples):
+    samples = np.array(samples) if samples else np.zeros(1)
+    return {
+        'mean': float(np.mean(samples)),
+        'min': float(np.min(samples)),
+        'max': float(np.max(samples)),
+        'std': float(np.std(samples)),
+    }
+
+
+def parse_gpu_config(gpu_config):
+    """(kernel_idx, m, k, n, precision) of a CLBlast config kernel_idx,m,k,n[,precision]."""
+    fields = gpu_config.split(',')
+    precision = fields.pop() if len(fields) == 5 else "fp32"
+    if len(fields) != 4 or precision not in GPU_PRECISIONS:
+        raise ValueError(f"GPU config '{gpu_config}' is not kernel_idx,m,k,n[,{'|'.join(GPU_PRECISIONS)}]")
+    kernel_idx, m, k, n = map(int, fields)
+    return kernel_idx, m, k, n, precision
+
+
+def parse_gpu_tenant(spec):
+    """clblast_bw_test --tenant argument of a GPU tenant kernel_idx,m,k,n[,precision][@priority]."""
+    config, _, priority = spec.partition('@')
+    if priority and priority not in GPU_PRIORITIES:
+        raise ValueError(f"GPU tenant '{spec}': priority must be one of {', '.join(GPU_PRIORITIES)}")
+    kernel_idx, m, k, n, precision = parse_gpu_config(config)
+    return f"{kernel_idx}:{m}:{n}:{k}:{priority or 'default'}:{precision}"
+
+
+class CpuStreamWorkload:
+    """STREAM triad on the device CPU, paced from the host through a dedicated RPC session."""
+
+    kind = "cpu_stream"
+
+    def __init__(self, remote, target_gbps=0.0, duty=1.0, size_mb=64,
+                 mode=0, nthreads=1, number=10):
+        self.remote = remote
+        self.target_gbps = target_gbps
+        self.duty = duty
+        self.size_mb = size_mb
+        self.mode = mode
+        self.nthreads = nthreads
+        self.number = number
+        self.num_elems = size_mb * 1024 * 1024 // 4
+        self._prepared = False
+        self._thread = None
+        self._stop = threading.Event()
+        self._samples = []
+
+    def reload(self, remote):
+        """Switch to a renewed session (SessionManager.request_session); None drops the old one's handles."""
+        self.remote = remote
+        self.args, self.time_f = [], None
+        self._prepared = False
+
+    def prepare(self):
+        if self._prepared:
+            return
+        os.makedirs(MODULE_DIR, exist_ok=True)
+        lib_path = os.path.join(MODULE_DIR, f"stream_triad_{self.num_elems}.so")
+        if not os.path.exists(lib_path):
+            logger.info(f"[BG] Building STREAM triad module: {lib_path}")
+            build_stream_triad(self.num_elems, lib_path)
+        self.remote.upload(lib_path)
+        remote_mod = self.remote.load_module(os.path.basename(lib_path))
+
+        dev = self.remote.cpu()
+        # Contents do not matter for a bandwidth generator, so skip the RPC transfer
+        self.args = [tvm.runtime.empty((self.num_elems,), "float32", dev) for _ in range(3)]
+        self.time_f = remote_mod.time_evaluator("stream_triad", dev, number=self.number, repeat=1)
+        self.remote.get_function('runtime.config_threadpool')(self.mode, self.nthreads)
+        self._prepared = True
+
+    def _loop(self):
+        bytes_per_burst = 12.0 * self.num_elems * self.number
+        while not self._stop.is_set():
+            t0 = time.perf_counter()
+            busy_s = self.time_f(*self.args).mean * self.number
+
+            idle_s = busy_s * (1.0 - self.duty) / self.duty
+            if self.target_gbps > 0:
+                idle_s = max(idle_s, bytes_per_burst / (self.target_gbps * 1e9) - busy_s)
+            if idle_s > 0:
+                self._stop.wait(idle_s)
+            self._samples.append(bytes_per_burst / (time.perf_counter() - t0) / 1e9)
+
+    def start(self):
+        self.prepare()
+        self._stop.clear()
+        self._samples = []
+        self._thread = threading.Thread(target=self._loop, daemon=True)
+        self._thread.start()
+        logger.info(f"[BG] {self.kind} started (target={self.target_gbps} GB/s, duty={self.duty})")
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        stats = _bw_stats(self._samples)
+        logger.info(f"[BG] {self.kind} achieved {stats['mean']:.2f} GB/s")
+        return {'kind': self.kind, 'target_gbps': self.target_gbps, 'duty': self.duty,
+                'achieved_gbps': stats, 'samples': self._samples}
+
+
+class GpuCopyWorkload:
+    """OpenCL copy kernel (cl_bw_gen) running on the device GPU until stopped."""
+
+    kind = "gpu_copy"
+
+    def __init__(self, target_gbps=0.0, duty=1.0, size_mb=64, period_ms=20):
+        self.target_gbps = target_gbps
+        self.duty = duty
+        self.size_mb = size_mb
+        self.period_ms = period_ms
+        self._proc = None
+
+    def prepare(self):
+        pass
+
+    def start(self):
+        cmd = f"{CL_BW_GEN_PATH} {self.size_mb} {self.target_gbps} {self.duty} 0 {self.period_ms}"
+        self._proc = subprocess.Popen(["adb", "shell", cmd], stdout=subprocess.PIPE,
+                                      stderr=subprocess.PIPE, text=True)
+        logger.info(f"[BG] {self.kind} started: {cmd}")
+
+    def stop(self):
+        # Killing the local adb client does not reliably kill the device process
+        subprocess.run(["adb", "shell", "pkill -f cl_bw_gen"],
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        stdout, stderr = self._proc.communicate(timeout=30)
+
+        samples = [float(m.group(1)) for m in re.finditer(r'Achieved bandwidth:\s+([\d.]+)\s+GB/s', stdout)]
+        if not samples:
+            logger.warning(f"[BG] {self.kind} reported no bandwidth samples, stderr:\n{stderr}")
+        stats = _bw_stats(samples)
+        logger.info(f"[BG] {self.kind} achieved {stats['mean']:.2f} GB/s")
+        return {'kind': self.kind, 'target_gbps': self.target_gbps, 'duty': self.duty,
+                'achieved_gbps': stats, 'samples': samples}
+
+
+class GpuMatmulWorkload:
+    """CLBlast matmul (clblast_bw_test paced mode) busy for `duty` of the time until stopped."""
+
+    kind = "gpu_matmul"
+
+    def __init__(self, gpu_config, duty=1.0, max_runs=100000000):
+        self.gpu_config = gpu_config
+        self.duty = duty
+        self.max_runs = max_runs
+        self._proc = None
+        self._cmd = None
+
+    def prepare(self):
+        pass
+
+    def start(self):
+        kernel_idx, m, k, n, precision = parse_gpu_config(self.gpu_config)
+        self._cmd = f"{CLBLAST_PATH} {kernel_idx} {self.max_runs} {m} {n} {k} {self.duty}"
+        if precision != "fp32":
+            self._cmd += f" copy {precision}"
+        self._proc = subprocess.Popen(["adb", "shell", self._cmd], stdout=subprocess.PIPE,
+                                      stderr=subprocess.PIPE, text=True)
+        logger.info(f"[BG] {self.kind} started: {self._cmd}")
+
+    def stop(self):
+        # Match the full command line so a foreground clblast_bw_test keeps running
+        subprocess.run(["adb", "shell", f"pkill -f '{self._cmd}'"],
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        stdout, stderr = self._proc.communicate(timeout=30)
+
+        samples = [float(m.group(1)) for m in re.finditer(r'GPU Latency:\s+([\d.]+)\s+ms', stdout)]
+        if not samples:
+            logger.warning(f"[BG] {self.kind} reported no latency samples, stderr:\n{stderr}")
+        stats = _bw_stats(samples)
+        logger.info(f"[BG] {self.kind} ran {len(samples)} kernels (mean {stats['mean']:.3f} ms)")
+        return {'kind': self.kind, 'gpu_config': self.gpu_config, 'duty': self.duty,
+                'latency': stats, 'samples': samples}
+
+
+class NpuWorkload:
+    """Inferences on an opened NpuServer, busy for `duty` of the time until stopped."""
+
+    kind = "npu"
+
+    def __init__(self, npu_server, duty=1.0):
+        self.npu_server = npu_server
+        self.duty = duty
+
+    def prepare(self):
+        pass
+
+    def start(self):
+        self.npu_server.start(self.duty)
+        logger.info(f"[BG] {self.kind} started (duty={self.duty})")
+
+    def stop(self):
+        samples = self.npu_server.stop()
+        stats = _bw_stats(samples)
+        logger.info(f"[BG] {self.kind} ran {len(samples)} inferences (mean {stats['mean']:.3f} ms)")
+        return {'kind': self.kind, 'duty': self.duty, 'latency': stats, 'samples': samples}
+
+
+def parse_background_spec(spec, remote_factory=None):
+    """
+    Create a background workload from `kind:target_gbps:duty[:size_mb]`.
+
+    remote_factory is called to obtain an RPC session for CPU workloads. It has
+    to be a separate session from the foreground one, because calls on one RPC
+    session are serialized.
+    """
+    fields = spec.split(':')
+    if len(fields) not in (3, 4):
+        raise ValueError(f"Invalid background spec '{spec}', expected kind:target_gbps:duty[:size_mb]")
+    kind = fields[0]
+    target_gbps = float(fields[1])
+    duty = float(fields[2])
+    size_mb = int(fields[3]) if len(fields) == 4 else 64
+    if not 0.0 < duty <= 1.0:
+        raise ValueError(f"Duty cycle must be in (0, 1], got {duty}")
+
+    if kind == CpuStreamWorkload.kind:
+        if remote_factory is None:
+            raise ValueError("cpu_stream background needs an RPC session")
+        return CpuStreamWorkload(remote_factory(), target_gbps, duty, size_mb)
+    if kind == GpuCopyWorkload.kind:
+        return GpuCopyWorkload(target_gbps, duty, size_mb)
+    raise ValueError(f"Unknown background workload kind: {kind}")
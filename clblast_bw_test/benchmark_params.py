@@ -1,6 +1,11 @@
 #!/usr/bin/env python3
 """
 Benchmark all parameter sets and rank them by average latency.
+
+With --tenant, every set also runs next to other GPU streams (clblast_bw_test
+--tenant, each on its own command queue) and the sets are ranked by their
+average latency under that load, to find the one that is most robust to a
+background GEMM.
 """
 
 import subprocess
@@ -9,9 +14,16 @@ import sys
 import time
 import argparse
 
-def run_benchmark(param_idx, num_runs=10, m=1024, n=1024, k=1024):
+def run_benchmark(param_idx, num_runs=10, m=1024, n=1024, k=1024, precision="fp32", tenants=(), priority=None):
     """Run clblast_bw_test for a specific parameter set."""
-    cmd = f'adb shell "/data/local/tmp/clblast_bw_test {param_idx} {num_runs} {m} {k} {n}"'
+    cmd = f'adb shell "/data/local/tmp/clblast_bw_test {param_idx} {num_runs} {m} {k} {n}'
+    if precision != "fp32":
+        cmd += f' batch copy {precision}'
+    if priority:
+        cmd += f' --priority {priority}'
+    for tenant in tenants:
+        cmd += f' --tenant {tenant}'
+    cmd += '"'
     
     try:
         result = subprocess.run(cmd, shell=True, capture_output=True, text=True, timeout=60)
@@ -42,6 +54,11 @@ def main():
     parser.add_argument('-n', '--n', type=int, default=1024, help='Matrix dimension N (default: 1024)')
     parser.add_argument('-r', '--runs', type=int, default=10, help='Number of runs per parameter set (default: 10)')
     parser.add_argument('-s', '--sleep', type=float, default=1.0, help='Sleep time between runs in seconds (default: 1.0)')
+    parser.add_argument('-p', '--precision', choices=['fp32', 'fp16'], default='fp32', help='Element type (default: fp32)')
+    parser.add_argument('-t', '--tenant', action='append', default=[],
+                        help='Background GPU stream <index>:<m>:<n>:<k>[:<priority>[:<precision>]] (repeatable); '
+                             'sets are then ranked by their latency next to it')
+    parser.add_argument('--priority', choices=['high', 'med', 'low'], help='Priority hint of the benchmarked queue')
     
     args = parser.parse_args()
     
@@ -49,6 +66,9 @@ def main():
     print("=" * 60)
     print(f"Matrix dimensions: M={args.m}, K={args.k}, N={args.n}")
     print(f"Runs per parameter set: {args.runs}")
+    print(f"Precision: {args.precision}")
+    if args.tenant:
+        print(f"Tenants: {', '.join(args.tenant)} (priority {args.priority or 'default'})")
     print(f"Sleep between runs: {args.sleep}s")
     print("=" * 60)
     
@@ -57,11 +77,21 @@ def main():
     # Run benchmarks for parameter sets 0-6
     for idx in range(7):
         print(f"\nRunning parameter set {idx}...")
-        avg_latency = run_benchmark(idx, num_runs=args.runs, m=args.m, k=args.k, n=args.n)
-        
-        if avg_latency is not None:
+        avg_latency = run_benchmark(idx, num_runs=args.runs, m=args.m, k=args.k, n=args.n, precision=args.precision)
+        shared_latency = None
+        if args.tenant and avg_latency is not None:
+            time.sleep(args.sleep)
+            shared_latency = run_benchmark(idx, num_runs=args.runs, m=args.m, k=args.k, n=args.n,
+                                           precision=args.precision, tenants=args.tenant, priority=args.priority)
+
+        if avg_latency is not None and not args.tenant:
             results.append((idx, avg_latency))
             print(f"  → Average latency: {avg_latency:.5f} ms")
+        elif shared_latency is not None:
+            # Ranked by the latency next to the tenants; the slowdown shows how much they hurt
+            results.append((idx, shared_latency))
+            print(f"  → Average latency: {avg_latency:.5f} ms alone, {shared_latency:.5f} ms with tenants "
+                  f"({shared_latency / avg_latency - 1:+.1%})")
         else:
             print(f"  → Failed to get result")
         
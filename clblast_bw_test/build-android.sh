@@ -19,4 +19,5 @@ cmake -GNinja -Bbuild-android \
 cmake --build build-android
 
 adb push ./build-android/clblast_bw_test /data/local/tmp
+adb push ./build-android/cl_bw_gen /data/local/tmp
 adb shell "/data/local/tmp/clblast_bw_test 4 100 1024 1024 1024"
@@ -0,0 +1,169 @@
+#include <CL/cl.h>
+#include <chrono>
+#include <cstring>
+#include <iostream>
+#include <string>
+#include <thread>
+#include <vector>
+
+// Memory-bound copy kernel used as a controllable DRAM contention generator.
+// Each work item moves one float4 (16 bytes read + 16 bytes written).
+static const char *copy_kernel_source = R"(
+__kernel void stream_copy(__global const float4* restrict src,
+                          __global float4* restrict dst) {
+  const size_t gid = get_global_id(0);
+  dst[gid] = src[gid];
+}
+)";
+
+#define CHECK_CL_ERROR(err, msg)                                               \
+  if (err != CL_SUCCESS) {                                                     \
+    std::cerr << "Error: " << msg << " (code: " << err << ")" << std::endl;    \
+    return err;                                                                \
+  }
+
+using Clock = std::chrono::steady_clock;
+
+static double seconds_since(Clock::time_point t) {
+  return std::chrono::duration<double>(Clock::now() - t).count();
+}
+
+// Runs copy kernels in periods of `period_ms`. Within a period the kernels run
+// back to back until either `duty * period` has elapsed or the byte budget for
+// `target_gbps` is used up, then the generator idles until the next period.
+// target_gbps <= 0 means no bandwidth cap (only the duty cycle applies).
+// duration_s <= 0 means run until killed.
+cl_int run_bw_gen(size_t size_mb, double target_gbps, double duty,
+                  double duration_s, double period_ms) {
+  cl_int err;
+  cl_platform_id platform;
+  cl_device_id device;
+
+  err = clGetPlatformIDs(1, &platform, nullptr);
+  CHECK_CL_ERROR(err, "Failed to get platform");
+  err = clGetDeviceIDs(platform, CL_DEVICE_TYPE_GPU, 1, &device, nullptr);
+  CHECK_CL_ERROR(err, "Failed to get GPU device");
+
+  cl_context context = clCreateContext(nullptr, 1, &device, nullptr, nullptr, &err);
+  CHECK_CL_ERROR(err, "Failed to create context");
+
+  #ifdef CL_VERSION_2_0
+    cl_command_queue queue = clCreateCommandQueueWithProperties(context, device, nullptr, &err);
+  #else
+    cl_command_queue queue = clCreateCommandQueue(context, device, 0, &err);
+  #endif
+  CHECK_CL_ERROR(err, "Failed to create command queue");
+
+  size_t src_len = strlen(copy_kernel_source);
+  cl_program program = clCreateProgramWithSource(context, 1, &copy_kernel_source, &src_len, &err);
+  CHECK_CL_ERROR(err, "Failed to create program");
+  err = clBuildProgram(program, 1, &device, nullptr, nullptr, nullptr);
+  CHECK_CL_ERROR(err, "Failed to build program");
+  cl_kernel kernel = clCreateKernel(program, "stream_copy", &err);
+  CHECK_CL_ERROR(err, "Failed to create kernel");
+
+  const size_t buf_bytes = size_mb * 1024 * 1024;
+  const size_t num_vec4 = buf_bytes / (4 * sizeof(float));
+  const double bytes_per_launch = 2.0 * num_vec4 * 4 * sizeof(float);
+
+  cl_mem src = clCreateBuffer(context, CL_MEM_READ_ONLY, buf_bytes, nullptr, &err);
+  CHECK_CL_ERROR(err, "Failed to create src buffer");
+  cl_mem dst = clCreateBuffer(context, CL_MEM_WRITE_ONLY, buf_bytes, nullptr, &err);
+  CHECK_CL_ERROR(err, "Failed to create dst buffer");
+
+  std::vector<float> init(buf_bytes / sizeof(float), 1.0f);
+  err = clEnqueueWriteBuffer(queue, src, CL_TRUE, 0, buf_bytes, init.data(), 0, nullptr, nullptr);
+  CHECK_CL_ERROR(err, "Failed to write src buffer");
+
+  err = clSetKernelArg(kernel, 0, sizeof(cl_mem), &src);
+  CHECK_CL_ERROR(err, "Failed to set arg 0");
+  err = clSetKernelArg(kernel, 1, sizeof(cl_mem), &dst);
+  CHECK_CL_ERROR(err, "Failed to set arg 1");
+
+  std::cout << "Copy generator: buffer=" << size_mb << " MB, target=" << target_gbps
+            << " GB/s, duty=" << duty << ", period=" << period_ms << " ms" << std::endl;
+
+  const double period_s = period_ms / 1e3;
+  const double active_s = duty * period_s;
+  const double budget_bytes = target_gbps > 0 ? target_gbps * 1e9 * period_s : -1.0;
+
+  Clock::time_point start = Clock::now();
+  Clock::time_point report_start = start;
+  double report_bytes = 0.0;
+  double report_busy_s = 0.0;
+
+  while (duration_s <= 0 || seconds_since(start) < duration_s) {
+    Clock::time_point period_start = Clock::now();
+    double period_bytes = 0.0;
+    while (seconds_since(period_start) < active_s &&
+           (budget_bytes < 0 || period_bytes < budget_bytes)) {
+      err = clEnqueueNDRangeKernel(queue, kernel, 1, nullptr, &num_vec4, nullptr, 0, nullptr, nullptr);
+      CHECK_CL_ERROR(err, "Failed to enqueue kernel");
+      err = clFinish(queue);
+      CHECK_CL_ERROR(err, "Failed to finish queue");
+      period_bytes += bytes_per_launch;
+    }
+    report_busy_s += seconds_since(period_start);
+    report_bytes += period_bytes;
+
+    double remaining_s = period_s - seconds_since(period_start);
+    if (remaining_s > 0) {
+      std::this_thread::sleep_for(std::chrono::duration<double>(remaining_s));
+    }
+
+    double report_elapsed_s = seconds_since(report_start);
+    if (report_elapsed_s >= 1.0) {
+      std::cout << "Achieved bandwidth: " << report_bytes / report_elapsed_s / 1e9
+                << " GB/s (busy " << report_busy_s / report_elapsed_s << ")" << std::endl;
+      report_start = Clock::now();
+      report_bytes = 0.0;
+      report_busy_s = 0.0;
+    }
+  }
+
+  clReleaseMemObject(src);
+  clReleaseMemObject(dst);
+  clReleaseKernel(kernel);
+  clReleaseProgram(program);
+  clReleaseCommandQueue(queue);
+  clReleaseContext(context);
+
+  return CL_SUCCESS;
+}
+
+int main(int argc, char *argv[]) {
+  if (argc < 4 || argc > 6) {
+    std::cerr << "Usage: " << argv[0] << " <size_mb> <target_gbps> <duty> [<duration_s>] [<period_ms>]" << std::endl;
+    std::cerr << "  size_mb: size of each copy buffer in MB (should exceed the LLC)" << std::endl;
+    std::cerr << "  target_gbps: bandwidth cap in GB/s (0 = uncapped)" << std::endl;
+    std::cerr << "  duty: fraction of each period spent copying (0-1]" << std::endl;
+    std::cerr << "  duration_s: run time in seconds (default: 0 = until killed)" << std::endl;
+    std::cerr << "  period_ms: duty-cycle period in ms (default: 20)" << std::endl;
+    return 1;
+  }
+
+  size_t size_mb = std::stoul(argv[1]);
+  double target_gbps = std::stod(argv[2]);
+  double duty = std::stod(argv[3]);
+  double duration_s = argc > 4 ? std::stod(argv[4]) : 0.0;
+  double period_ms = argc > 5 ? std::stod(argv[5]) : 20.0;
+
+  if (size_mb == 0) {
+    std::cerr << "Error: size_mb must be a positive integer" << std::endl;
+    return 1;
+  }
+  if (duty <= 0.0 || duty > 1.0) {
+    std::cerr << "Error: duty must be in (0, 1]" << std::endl;
+    return 1;
+  }
+  if (period_ms <= 0.0) {
+    std::cerr << "Error: period_ms must be positive" << std::endl;
+    return 1;
+  }
+
+  cl_int err = run_bw_gen(size_mb, target_gbps, duty, duration_s, period_ms);
+  if (err != CL_SUCCESS) {
+    return 1;
+  }
+  return 0;
+}
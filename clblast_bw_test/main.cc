@@ -1,7 +1,19 @@
 #include "kernel_source.h"
 #include <CL/cl.h>
+#include <CL/cl_ext.h>
+#include <algorithm>
+#include <atomic>
+#include <chrono>
+#include <cmath>
+#include <cstdint>
 #include <cstring>
+#include <cstdlib>
 #include <iostream>
+#include <numeric>
+#include <random>
+#include <sstream>
+#include <string>
+#include <thread>
 #include <vector>
 
 std::vector<std::vector<int>> params = {
@@ -25,53 +37,484 @@ std::vector<std::vector<unsigned long>> dims = {
     return err;                                                                \
   }
 
-cl_int test_clblast_bw(int index, int M, int N, int K, int num_runs) {
+// Windowed mode: keep at most `depth` kernels in flight.
+//   depth >= num_runs: batch, every run is queued before waiting (the original behaviour)
+//   depth == 1:        serial, each run is enqueued and waited for before the next
+//   otherwise:         pipelined with depth D
+// Every run reports its device time (profiling START -> END) and its host-observed
+// time (before enqueue -> completion seen by the host), which also includes launch
+// overhead and the driver's CPU-side work.
+cl_int run_windowed(cl_command_queue queue, cl_kernel kernel, const size_t *global_work_size,
+                    const size_t *local_work_size, int num_runs, int depth) {
+  using HostClock = std::chrono::steady_clock;
   cl_int err;
-  cl_platform_id platform;
-  cl_device_id device;
-  cl_context context;
-  cl_command_queue queue;
-  cl_program program;
-  cl_kernel kernel;
+  std::vector<cl_event> kernel_events(num_runs);
+  std::vector<HostClock::time_point> enqueue_times(num_runs);
+  std::vector<double> latencies_ms(num_runs);
+  std::vector<double> host_ms(num_runs);
 
-  // Get platform
-  err = clGetPlatformIDs(1, &platform, nullptr);
-  CHECK_CL_ERROR(err, "Failed to get platform");
+  auto complete = [&](int run) -> cl_int {
+    cl_int err = clWaitForEvents(1, &kernel_events[run]);
+    CHECK_CL_ERROR(err, "Failed to wait for kernel event");
+    host_ms[run] = std::chrono::duration<double, std::milli>(HostClock::now() - enqueue_times[run]).count();
 
-  // Get device
-  err = clGetDeviceIDs(platform, CL_DEVICE_TYPE_GPU, 1, &device, nullptr);
-  if (err != CL_SUCCESS) {
-    // Fallback to CPU if GPU not available
-    err = clGetDeviceIDs(platform, CL_DEVICE_TYPE_CPU, 1, &device, nullptr);
-    CHECK_CL_ERROR(err, "Failed to get device");
+    cl_ulong start_time, end_time;
+    err = clGetEventProfilingInfo(kernel_events[run], CL_PROFILING_COMMAND_START,
+                                  sizeof(cl_ulong), &start_time, nullptr);
+    CHECK_CL_ERROR(err, "Failed to get start time");
+    err = clGetEventProfilingInfo(kernel_events[run], CL_PROFILING_COMMAND_END,
+                                  sizeof(cl_ulong), &end_time, nullptr);
+    CHECK_CL_ERROR(err, "Failed to get end time");
+    latencies_ms[run] = (end_time - start_time) / 1e6;  // Convert nanoseconds to milliseconds
+    clReleaseEvent(kernel_events[run]);
+    return CL_SUCCESS;
+  };
+
+  HostClock::time_point wall_start = HostClock::now();
+  int completed = 0;
+  for (int run = 0; run < num_runs; run++) {
+    if (run - completed >= depth) {
+      err = complete(completed++);
+      if (err != CL_SUCCESS) return err;
+    }
+    enqueue_times[run] = HostClock::now();
+    err = clEnqueueNDRangeKernel(queue, kernel, 2, nullptr, global_work_size,
+                                 local_work_size, 0, nullptr, &kernel_events[run]);
+    CHECK_CL_ERROR(err, "Failed to enqueue kernel");
+    if (depth < num_runs) clFlush(queue);
+  }
+  if (depth >= num_runs) {
+    std::cout << "All kernels queued. Waiting for completion..." << std::endl;
   }
+  while (completed < num_runs) {
+    err = complete(completed++);
+    if (err != CL_SUCCESS) return err;
+  }
+  double wall_ms = std::chrono::duration<double, std::milli>(HostClock::now() - wall_start).count();
 
-  // Create context
-  context = clCreateContext(nullptr, 1, &device, nullptr, nullptr, &err);
-  CHECK_CL_ERROR(err, "Failed to create context");
+  for (int run = 0; run < num_runs; run++) {
+    std::cout << "Run " << (run + 1) << "/" << num_runs
+              << " - GPU Latency: " << latencies_ms[run] << " ms ("
+              << latencies_ms[run] * 1e3 << " us) Host: " << host_ms[run] << " ms" << std::endl;
+  }
 
-  // Create command queue with profiling enabled
-  // Try OpenCL 2.0+ API first, fallback to 1.2 API
-  #ifdef CL_VERSION_2_0
-    cl_queue_properties queue_props[] = {CL_QUEUE_PROPERTIES, CL_QUEUE_PROFILING_ENABLE, 0};
-    queue = clCreateCommandQueueWithProperties(context, device, queue_props, &err);
-  #else
-    queue = clCreateCommandQueue(context, device, CL_QUEUE_PROFILING_ENABLE, &err);
-  #endif
-  CHECK_CL_ERROR(err, "Failed to create command queue");
+  // Calculate and display statistics
+  if (num_runs > 1) {
+    double sum = 0.0;
+    double host_sum = 0.0;
+    double min_latency = latencies_ms[0];
+    double max_latency = latencies_ms[0];
+    for (int run = 0; run < num_runs; run++) {
+      sum += latencies_ms[run];
+      host_sum += host_ms[run];
+      if (latencies_ms[run] < min_latency) min_latency = latencies_ms[run];
+      if (latencies_ms[run] > max_latency) max_latency = latencies_ms[run];
+    }
+    double avg_latency = sum / num_runs;
+
+    std::cout << "\nStatistics over " << num_runs << " runs (depth " << std::min(depth, num_runs) << "):" << std::endl;
+    std::cout << "  Average: " << avg_latency << " ms" << std::endl;
+    std::cout << "  Min:     " << min_latency << " ms" << std::endl;
+    std::cout << "  Max:     " << max_latency << " ms" << std::endl;
+    std::cout << "  Host average:  " << host_sum / num_runs << " ms" << std::endl;
+    std::cout << "  Host wall/run: " << wall_ms / num_runs << " ms" << std::endl;
+  }
+
+  return CL_SUCCESS;
+}
+
+// Paced mode: run one kernel at a time and idle after each one so the GPU is
+// busy for `duty` of the time. Latencies are printed as soon as each run ends,
+// so the process can be used as a background load and killed at any point.
+cl_int run_paced(cl_command_queue queue, cl_kernel kernel, const size_t *global_work_size,
+                 const size_t *local_work_size, int num_runs, double duty) {
+  cl_int err;
+  for (int run = 0; run < num_runs; run++) {
+    cl_event event;
+    err = clEnqueueNDRangeKernel(queue, kernel, 2, nullptr, global_work_size,
+                                 local_work_size, 0, nullptr, &event);
+    CHECK_CL_ERROR(err, "Failed to enqueue kernel");
+    err = clWaitForEvents(1, &event);
+    CHECK_CL_ERROR(err, "Failed to wait for kernel event");
+
+    cl_ulong start_time, end_time;
+    err = clGetEventProfilingInfo(event, CL_PROFILING_COMMAND_START,
+                                  sizeof(cl_ulong), &start_time, nullptr);
+    CHECK_CL_ERROR(err, "Failed to get start time");
+    err = clGetEventProfilingInfo(event, CL_PROFILING_COMMAND_END,
+                                  sizeof(cl_ulong), &end_time, nullptr);
+    CHECK_CL_ERROR(err, "Failed to get end time");
+    clReleaseEvent(event);
+
+    double gpu_latency_ms = (end_time - start_time) / 1e6;
+    std::cout << "Run " << (run + 1) << "/" << num_runs
+              << " - GPU Latency: " << gpu_latency_ms << " ms ("
+              << gpu_latency_ms * 1e3 << " us)" << std::endl;
+
+    double idle_ms = gpu_latency_ms * (1.0 - duty) / duty;
+    if (idle_ms > 0) {
+      std::this_thread::sleep_for(std::chrono::duration<double, std::milli>(idle_ms));
+    }
+  }
+  return CL_SUCCESS;
+}
+
+// Open-loop mode: kernels are enqueued at fixed-rate or Poisson arrival times
+// regardless of whether earlier ones finished, like requests in a server.
+// Queueing delay (enqueue -> start) and service time (start -> end) are both
+// taken from the profiling events, so they share the device clock.
+cl_int run_open_loop(cl_command_queue queue, cl_kernel kernel, const size_t *global_work_size,
+                     const size_t *local_work_size, int num_runs, double rate_hz, bool poisson) {
+  cl_int err;
+  std::mt19937_64 rng(12345);
+  std::exponential_distribution<double> poisson_gap_s(rate_hz);
+  std::vector<cl_event> kernel_events(num_runs);
+
+  auto next_arrival = std::chrono::steady_clock::now();
+  for (int run = 0; run < num_runs; run++) {
+    std::this_thread::sleep_until(next_arrival);
+    err = clEnqueueNDRangeKernel(queue, kernel, 2, nullptr, global_work_size,
+                                 local_work_size, 0, nullptr, &kernel_events[run]);
+    CHECK_CL_ERROR(err, "Failed to enqueue kernel");
+    clFlush(queue);
+    double gap_s = poisson ? poisson_gap_s(rng) : 1.0 / rate_hz;
+    next_arrival += std::chrono::duration_cast<std::chrono::steady_clock::duration>(
+        std::chrono::duration<double>(gap_s));
+  }
+
+  err = clWaitForEvents(num_runs, kernel_events.data());
+  CHECK_CL_ERROR(err, "Failed to wait for kernel events");
+
+  double queue_sum_ms = 0.0;
+  double service_sum_ms = 0.0;
+  for (int run = 0; run < num_runs; run++) {
+    cl_ulong queued_time, start_time, end_time;
+    err = clGetEventProfilingInfo(kernel_events[run], CL_PROFILING_COMMAND_QUEUED,
+                                  sizeof(cl_ulong), &queued_time, nullptr);
+    CHECK_CL_ERROR(err, "Failed to get queued time");
+    err = clGetEventProfilingInfo(kernel_events[run], CL_PROFILING_COMMAND_START,
+                                  sizeof(cl_ulong), &start_time, nullptr);
+    CHECK_CL_ERROR(err, "Failed to get start time");
+    err = clGetEventProfilingInfo(kernel_events[run], CL_PROFILING_COMMAND_END,
+                                  sizeof(cl_ulong), &end_time, nullptr);
+    CHECK_CL_ERROR(err, "Failed to get end time");
+    clReleaseEvent(kernel_events[run]);
+
+    double gpu_latency_ms = (end_time - start_time) / 1e6;
+    double queue_ms = (start_time - queued_time) / 1e6;
+    queue_sum_ms += queue_ms;
+    service_sum_ms += gpu_latency_ms;
+    std::cout << "Run " << (run + 1) << "/" << num_runs
+              << " - GPU Latency: " << gpu_latency_ms << " ms ("
+              << gpu_latency_ms * 1e3 << " us) Queue: " << queue_ms << " ms" << std::endl;
+  }
+
+  std::cout << "\nOpen loop at " << rate_hz << " Hz (" << (poisson ? "poisson" : "fixed")
+            << "), " << num_runs << " runs:" << std::endl;
+  std::cout << "  Average service: " << service_sum_ms / num_runs << " ms" << std::endl;
+  std::cout << "  Average queue:   " << queue_sum_ms / num_runs << " ms" << std::endl;
+  return CL_SUCCESS;
+}
+
+// Element type of A, B and C. fp16 builds the kernel with PRECISION=16 (cl_khr_fp16):
+// half the bytes per element, and on Adreno about twice the arithmetic rate.
+// alpha and beta stay float kernel arguments in both (real_arg in kernel.cl).
+enum class Precision { kFp32, kFp16 };
+
+const char *precision_name(Precision precision) { return precision == Precision::kFp16 ? "fp16" : "fp32"; }
+
+size_t element_size(Precision precision) { return precision == Precision::kFp16 ? sizeof(cl_half) : sizeof(float); }
+
+// IEEE 754 binary16 conversions for the handoff fill and checksum (no rounding of
+// subnormals; the inputs are small integers)
+cl_half float_to_half(float value) {
+  uint32_t bits;
+  std::memcpy(&bits, &value, sizeof(bits));
+  uint32_t sign = (bits >> 16) & 0x8000u;
+  int32_t exponent = static_cast<int32_t>((bits >> 23) & 0xffu) - 127 + 15;
+  uint32_t mantissa = bits & 0x7fffffu;
+  if (exponent <= 0) return static_cast<cl_half>(sign);
+  if (exponent >= 31) return static_cast<cl_half>(sign | 0x7c00u);
+  // Round to nearest; a carry out of the mantissa correctly bumps the exponent
+  return static_cast<cl_half>(sign | ((static_cast<uint32_t>(exponent) << 10) + ((mantissa + 0x1000u) >> 13)));
+}
+
+float half_to_float(cl_half value) {
+  int exponent = (value >> 10) & 0x1f;
+  float magnitude = exponent == 0 ? std::ldexp(static_cast<float>(value & 0x3ff), -24)
+                    : exponent == 31 ? INFINITY
+                                     : std::ldexp(static_cast<float>((value & 0x3ff) | 0x400), exponent - 25);
+  return (value & 0x8000) ? -magnitude : magnitude;
+}
+
+bool device_has_extension(cl_device_id device, const std::string &name) {
+  size_t size = 0;
+  clGetDeviceInfo(device, CL_DEVICE_EXTENSIONS, 0, nullptr, &size);
+  std::string extensions(size, '\0');
+  clGetDeviceInfo(device, CL_DEVICE_EXTENSIONS, size, &extensions[0], nullptr);
+  std::istringstream names(extensions);
+  std::string extension;
+  while (names >> extension) {
+    if (extension == name) return true;
+  }
+  return false;
+}
+
+// Buffer strategies for the CPU -> GPU -> CPU handoff of A, B and C.
+//   copy:       device buffers filled / drained with blocking clEnqueueWrite/ReadBuffer
+//               (staging vector plus a second copy by the driver)
+//   alloc_host: CL_MEM_ALLOC_HOST_PTR buffers, mapped so the host writes and reads
+//               the memory the GPU uses (zero copy on unified memory)
+//   use_host:   CL_MEM_USE_HOST_PTR over page-aligned host memory, also mapped
+//   svm:        coarse-grained shared virtual memory (OpenCL 2.0), SVM map/unmap
+// The timed handoff is what a pipeline does per request: the producer writes the
+// inputs and makes them visible to the GPU (upload), and the consumer makes the
+// output visible to the host and reads it (download).
+enum class BufferMode { kCopy, kAllocHostPtr, kUseHostPtr, kSvm };
+
+const char *buffer_mode_name(BufferMode mode) {
+  switch (mode) {
+    case BufferMode::kAllocHostPtr: return "alloc_host";
+    case BufferMode::kUseHostPtr: return "use_host";
+    case BufferMode::kSvm: return "svm";
+    default: return "copy";
+  }
+}
+
+bool parse_buffer_mode(const std::string &name, BufferMode *mode) {
+  for (BufferMode m : {BufferMode::kCopy, BufferMode::kAllocHostPtr, BufferMode::kUseHostPtr, BufferMode::kSvm}) {
+    if (name == buffer_mode_name(m)) {
+      *mode = m;
+      return true;
+    }
+  }
+  return false;
+}
+
+struct HandoffBuffer {
+  BufferMode mode;
+  size_t size;
+  cl_mem mem = nullptr;
+  void *svm = nullptr;
+  void *host = nullptr;  // use_host backing memory
+  std::vector<uint8_t> staging;  // copy mode host side
+};
+
+constexpr size_t kPageSize = 4096;
+constexpr int kHandoffReps = 10;
+
+cl_int create_handoff_buffer(cl_context context, cl_device_id device, BufferMode mode, cl_mem_flags access,
+                             size_t size, HandoffBuffer *buf) {
+  cl_int err = CL_SUCCESS;
+  buf->mode = mode;
+  buf->size = size;
+  switch (mode) {
+    case BufferMode::kCopy:
+      buf->staging.resize(size);
+      buf->mem = clCreateBuffer(context, access, size, nullptr, &err);
+      break;
+    case BufferMode::kAllocHostPtr:
+      buf->mem = clCreateBuffer(context, access | CL_MEM_ALLOC_HOST_PTR, size, nullptr, &err);
+      break;
+    case BufferMode::kUseHostPtr: {
+      // Page alignment and a whole number of pages let the driver use the memory without a shadow copy
+      size_t padded = (size + kPageSize - 1) / kPageSize * kPageSize;
+      buf->host = std::aligned_alloc(kPageSize, padded);
+      if (buf->host == nullptr) return CL_OUT_OF_HOST_MEMORY;
+      buf->mem = clCreateBuffer(context, access | CL_MEM_USE_HOST_PTR, padded, buf->host, &err);
+      break;
+    }
+    case BufferMode::kSvm: {
+#ifdef CL_VERSION_2_0
+      cl_device_svm_capabilities caps = 0;
+      clGetDeviceInfo(device, CL_DEVICE_SVM_CAPABILITIES, sizeof(caps), &caps, nullptr);
+      if (!(caps & CL_DEVICE_SVM_COARSE_GRAIN_BUFFER)) {
+        std::cerr << "Error: device does not support coarse-grained SVM buffers" << std::endl;
+        return CL_INVALID_OPERATION;
+      }
+      buf->svm = clSVMAlloc(context, CL_MEM_READ_WRITE, size, 0);
+      if (buf->svm == nullptr) return CL_MEM_OBJECT_ALLOCATION_FAILURE;
+#else
+      std::cerr << "Error: svm buffers need OpenCL 2.0 headers" << std::endl;
+      return CL_INVALID_OPERATION;
+#endif
+      break;
+    }
+  }
+  return err;
+}
+
+void release_handoff_buffer(cl_context context, HandoffBuffer *buf) {
+  if (buf->mem != nullptr) clReleaseMemObject(buf->mem);
+#ifdef CL_VERSION_2_0
+  if (buf->svm != nullptr) clSVMFree(context, buf->svm);
+#endif
+  std::free(buf->host);
+}
+
+cl_int set_buffer_arg(cl_kernel kernel, cl_uint index, const HandoffBuffer &buf) {
+#ifdef CL_VERSION_2_0
+  if (buf.mode == BufferMode::kSvm) return clSetKernelArgSVMPointer(kernel, index, buf.svm);
+#endif
+  return clSetKernelArg(kernel, index, sizeof(cl_mem), &buf.mem);
+}
+
+// Host access to the buffer's memory: map (write: invalidate, the old contents are
+// not needed), run `access` on the host pointer, unmap and wait until the GPU may
+// use the memory again. Copy mode instead moves the staging vector with a blocking
+// write (after access) or read (before access).
+template <typename Access>
+cl_int host_access(cl_command_queue queue, HandoffBuffer *buf, bool write, Access access) {
+  cl_int err = CL_SUCCESS;
+  void *ptr = nullptr;
+  if (buf->mode == BufferMode::kCopy) {
+    if (!write) {
+      err = clEnqueueReadBuffer(queue, buf->mem, CL_TRUE, 0, buf->size, buf->staging.data(), 0, nullptr, nullptr);
+      CHECK_CL_ERROR(err, "Failed to read buffer");
+    }
+    access(buf->staging.data());
+    if (write) {
+      err = clEnqueueWriteBuffer(queue, buf->mem, CL_TRUE, 0, buf->size, buf->staging.data(), 0, nullptr, nullptr);
+      CHECK_CL_ERROR(err, "Failed to write buffer");
+    }
+    return CL_SUCCESS;
+  }
+  cl_map_flags flags = write ? CL_MAP_WRITE_INVALIDATE_REGION : CL_MAP_READ;
+#ifdef CL_VERSION_2_0
+  if (buf->mode == BufferMode::kSvm) {
+    err = clEnqueueSVMMap(queue, CL_TRUE, flags, buf->svm, buf->size, 0, nullptr, nullptr);
+    CHECK_CL_ERROR(err, "Failed to map SVM buffer");
+    access(buf->svm);
+    err = clEnqueueSVMUnmap(queue, buf->svm, 0, nullptr, nullptr);
+    CHECK_CL_ERROR(err, "Failed to unmap SVM buffer");
+    return clFinish(queue);
+  }
+#endif
+  ptr = clEnqueueMapBuffer(queue, buf->mem, CL_TRUE, flags, 0, buf->size, 0, nullptr, nullptr, &err);
+  CHECK_CL_ERROR(err, "Failed to map buffer");
+  access(ptr);
+  err = clEnqueueUnmapMemObject(queue, buf->mem, ptr, 0, nullptr, nullptr);
+  CHECK_CL_ERROR(err, "Failed to unmap buffer");
+  return clFinish(queue);
+}
+
+// Upload: the producer writes `value` into every input, then hands them to the GPU.
+cl_int upload(cl_command_queue queue, std::vector<HandoffBuffer *> inputs, const std::vector<float> &values,
+              Precision precision) {
+  for (size_t i = 0; i < inputs.size(); i++) {
+    size_t count = inputs[i]->size / element_size(precision);
+    cl_int err = host_access(queue, inputs[i], true, [&](void *data) {
+      if (precision == Precision::kFp16) {
+        std::fill(static_cast<cl_half *>(data), static_cast<cl_half *>(data) + count, float_to_half(values[i]));
+      } else {
+        std::fill(static_cast<float *>(data), static_cast<float *>(data) + count, values[i]);
+      }
+    });
+    if (err != CL_SUCCESS) return err;
+  }
+  return CL_SUCCESS;
+}
+
+// Download: the consumer gets the output back and reads all of it.
+cl_int download(cl_command_queue queue, HandoffBuffer *output, Precision precision, double *checksum) {
+  size_t count = output->size / element_size(precision);
+  return host_access(queue, output, false, [&](void *data) {
+    if (precision == Precision::kFp16) {
+      const cl_half *values = static_cast<const cl_half *>(data);
+      *checksum = std::accumulate(values, values + count, 0.0,
+                                  [](double sum, cl_half value) { return sum + half_to_float(value); });
+    } else {
+      *checksum = std::accumulate(static_cast<const float *>(data), static_cast<const float *>(data) + count, 0.0);
+    }
+  });
+}
+
+// Time `reps` repetitions of a handoff step on the host clock (avg, min in ms).
+template <typename Step>
+cl_int time_handoff(int reps, double *avg_ms, double *min_ms, Step step) {
+  using HostClock = std::chrono::steady_clock;
+  double sum = 0.0;
+  *min_ms = 0.0;
+  for (int rep = 0; rep < reps; rep++) {
+    HostClock::time_point start = HostClock::now();
+    cl_int err = step();
+    if (err != CL_SUCCESS) return err;
+    double ms = std::chrono::duration<double, std::milli>(HostClock::now() - start).count();
+    sum += ms;
+    *min_ms = rep == 0 ? ms : std::min(*min_ms, ms);
+  }
+  *avg_ms = sum / reps;
+  return CL_SUCCESS;
+}
+
+// Priority hint of a command queue (cl_khr_priority_hints). kDefault leaves the
+// property out, so the driver schedules the queue like any other.
+enum class QueuePriority { kDefault, kHigh, kMed, kLow };
 
+const char *priority_name(QueuePriority priority) {
+  switch (priority) {
+    case QueuePriority::kHigh: return "high";
+    case QueuePriority::kMed: return "med";
+    case QueuePriority::kLow: return "low";
+    default: return "default";
+  }
+}
+
+bool parse_priority(const std::string &name, QueuePriority *priority) {
+  for (QueuePriority p : {QueuePriority::kDefault, QueuePriority::kHigh, QueuePriority::kMed, QueuePriority::kLow}) {
+    if (name == priority_name(p)) {
+      *priority = p;
+      return true;
+    }
+  }
+  return false;
+}
+
+// Profiling command queue with the priority hint, if the device supports hints
+// (otherwise the hint is dropped with a warning and the queue is created anyway).
+cl_command_queue create_queue(cl_context context, cl_device_id device, QueuePriority priority, cl_int *err) {
+#ifdef CL_VERSION_2_0
+  std::vector<cl_queue_properties> queue_props = {CL_QUEUE_PROPERTIES, CL_QUEUE_PROFILING_ENABLE};
+  if (priority != QueuePriority::kDefault) {
+#ifdef CL_QUEUE_PRIORITY_KHR
+    if (device_has_extension(device, "cl_khr_priority_hints")) {
+      queue_props.push_back(CL_QUEUE_PRIORITY_KHR);
+      queue_props.push_back(priority == QueuePriority::kHigh  ? CL_QUEUE_PRIORITY_HIGH_KHR
+                            : priority == QueuePriority::kMed ? CL_QUEUE_PRIORITY_MED_KHR
+                                                              : CL_QUEUE_PRIORITY_LOW_KHR);
+    } else {
+      std::cerr << "Warning: device has no cl_khr_priority_hints, priority " << priority_name(priority)
+                << " ignored" << std::endl;
+    }
+#else
+    std::cerr << "Warning: OpenCL headers without cl_khr_priority_hints, priority ignored" << std::endl;
+#endif
+  }
+  queue_props.push_back(0);
+  return clCreateCommandQueueWithProperties(context, device, queue_props.data(), err);
+#else
+  if (priority != QueuePriority::kDefault) {
+    std::cerr << "Warning: priority hints need OpenCL 2.0 headers, priority ignored" << std::endl;
+  }
+  return clCreateCommandQueue(context, device, CL_QUEUE_PROFILING_ENABLE, err);
+#endif
+}
+
+// Build orchestra_main with parameter set `index` at the given precision.
+cl_int build_gemm_kernel(cl_context context, cl_device_id device, int index, Precision precision,
+                         cl_program *program, cl_kernel *kernel) {
+  cl_int err;
   // Kernel source is included from header
   const char *kernel_str = kernel_source;
   size_t kernel_len = strlen(kernel_source);
 
   // Create program
-  program =
-      clCreateProgramWithSource(context, 1, &kernel_str, &kernel_len, &err);
+  *program = clCreateProgramWithSource(context, 1, &kernel_str, &kernel_len, &err);
   CHECK_CL_ERROR(err, "Failed to create program");
 
-  // Build program with PRECISION=32 (single precision)
-
-  std::string build_options = "-DGEMMK=" + std::to_string(params[index][0]) + " " +
+  // Build program with PRECISION=32 (single) or 16 (half precision)
+  std::string build_options = std::string("-DPRECISION=") + (precision == Precision::kFp16 ? "16" : "32") + " " +
+                              "-DGEMMK=" + std::to_string(params[index][0]) + " " +
                               "-DMWG=" + std::to_string(params[index][1]) + " " +
                               "-DNWG=" + std::to_string(params[index][2]) + " " +
                               "-DKWG=" + std::to_string(params[index][3]) + " " +
@@ -87,53 +530,29 @@ cl_int test_clblast_bw(int index, int M, int N, int K, int num_runs) {
                               "-DSA=" + std::to_string(params[index][13]) + " " +
                               "-DSB=" + std::to_string(params[index][14]) + " " +
                               "-DKREG=" + std::to_string(params[index][15]);
-  err = clBuildProgram(program, 1, &device, build_options.c_str(), nullptr,
+  err = clBuildProgram(*program, 1, &device, build_options.c_str(), nullptr,
                        nullptr);
   if (err != CL_SUCCESS) {
     size_t log_size;
-    clGetProgramBuildInfo(program, device, CL_PROGRAM_BUILD_LOG, 0, nullptr,
+    clGetProgramBuildInfo(*program, device, CL_PROGRAM_BUILD_LOG, 0, nullptr,
                           &log_size);
     std::vector<char> log(log_size);
-    clGetProgramBuildInfo(program, device, CL_PROGRAM_BUILD_LOG, log_size,
+    clGetProgramBuildInfo(*program, device, CL_PROGRAM_BUILD_LOG, log_size,
                           log.data(), nullptr);
     std::cerr << "Build log:\n" << log.data() << std::endl;
     CHECK_CL_ERROR(err, "Failed to build program");
   }
 
   // Create kernel
-  kernel = clCreateKernel(program, "orchestra_main", &err);
+  *kernel = clCreateKernel(*program, "orchestra_main", &err);
   CHECK_CL_ERROR(err, "Failed to create kernel");
+  return CL_SUCCESS;
+}
 
-  // Matrix dimensions from command-line arguments
-  const size_t size_A = M * K * sizeof(float);
-  const size_t size_B = K * N * sizeof(float);
-  const size_t size_C = M * N * sizeof(float);
-
-  // Create test data
-  std::vector<float> A(M * K, 1.0f);
-  std::vector<float> B(K * N, 2.0f);
-  std::vector<float> C(M * N, 0.0f);
-
-  // Create buffers
-  cl_mem buf_A =
-      clCreateBuffer(context, CL_MEM_READ_ONLY, size_A, nullptr, &err);
-  CHECK_CL_ERROR(err, "Failed to create buffer A");
-  cl_mem buf_B =
-      clCreateBuffer(context, CL_MEM_READ_ONLY, size_B, nullptr, &err);
-  CHECK_CL_ERROR(err, "Failed to create buffer B");
-  cl_mem buf_C =
-      clCreateBuffer(context, CL_MEM_WRITE_ONLY, size_C, nullptr, &err);
-  CHECK_CL_ERROR(err, "Failed to create buffer C");
-
-  // Write data to buffers
-  err = clEnqueueWriteBuffer(queue, buf_A, CL_TRUE, 0, size_A, A.data(), 0,
-                             nullptr, nullptr);
-  CHECK_CL_ERROR(err, "Failed to write buffer A");
-  err = clEnqueueWriteBuffer(queue, buf_B, CL_TRUE, 0, size_B, B.data(), 0,
-                             nullptr, nullptr);
-  CHECK_CL_ERROR(err, "Failed to write buffer B");
-
-  // Set kernel arguments
+// Arguments of orchestra_main: C = A * B (alpha 1, beta 0) on the given buffers.
+cl_int set_gemm_args(cl_kernel kernel, int M, int N, int K, const HandoffBuffer &buf_A, const HandoffBuffer &buf_B,
+                     const HandoffBuffer &buf_C) {
+  cl_int err;
   int kSizeM = M;
   int kSizeN = N;
   int kSizeK = K;
@@ -152,16 +571,215 @@ cl_int test_clblast_bw(int index, int M, int N, int K, int num_runs) {
   CHECK_CL_ERROR(err, "Failed to set arg 3");
   err = clSetKernelArg(kernel, 4, sizeof(float), &beta);
   CHECK_CL_ERROR(err, "Failed to set arg 4");
-  err = clSetKernelArg(kernel, 5, sizeof(cl_mem), &buf_A);
+  err = set_buffer_arg(kernel, 5, buf_A);
   CHECK_CL_ERROR(err, "Failed to set arg 5");
-  err = clSetKernelArg(kernel, 6, sizeof(cl_mem), &buf_B);
+  err = set_buffer_arg(kernel, 6, buf_B);
   CHECK_CL_ERROR(err, "Failed to set arg 6");
-  err = clSetKernelArg(kernel, 7, sizeof(cl_mem), &buf_C);
+  err = set_buffer_arg(kernel, 7, buf_C);
   CHECK_CL_ERROR(err, "Failed to set arg 7");
   err = clSetKernelArg(kernel, 8, sizeof(int), &b_offset);
   CHECK_CL_ERROR(err, "Failed to set arg 8");
   err = clSetKernelArg(kernel, 9, sizeof(int), &c_offset);
   CHECK_CL_ERROR(err, "Failed to set arg 9");
+  return CL_SUCCESS;
+}
+
+// Another tenant of the GPU (e.g. a background inference stream): its own queue with
+// its own priority hint, parameter set, shape and precision. It runs one GEMM after
+// another from a host thread while the measured queue runs, and reports its own
+// latency distribution.
+struct Tenant {
+  int index = 0;
+  int M = 0, N = 0, K = 0;
+  QueuePriority priority = QueuePriority::kDefault;
+  Precision precision = Precision::kFp32;
+  cl_command_queue queue = nullptr;
+  cl_program program = nullptr;
+  cl_kernel kernel = nullptr;
+  HandoffBuffer buf_A, buf_B, buf_C;
+  std::vector<double> latencies_ms;
+  cl_int status = CL_SUCCESS;
+  std::thread thread;
+};
+
+// <index>:<m>:<n>:<k>[:<priority>[:<precision>]]
+bool parse_tenant(const std::string &spec, Tenant *tenant) {
+  std::vector<std::string> fields;
+  std::istringstream stream(spec);
+  for (std::string field; std::getline(stream, field, ':');) fields.push_back(field);
+  if (fields.size() < 4 || fields.size() > 6) return false;
+  try {
+    tenant->index = std::stoi(fields[0]);
+    tenant->M = std::stoi(fields[1]);
+    tenant->N = std::stoi(fields[2]);
+    tenant->K = std::stoi(fields[3]);
+  } catch (const std::exception &) {
+    return false;
+  }
+  if (tenant->index < 0 || tenant->index > 6 || tenant->M <= 0 || tenant->N <= 0 || tenant->K <= 0) return false;
+  if (fields.size() > 4 && !parse_priority(fields[4], &tenant->priority)) return false;
+  if (fields.size() > 5) {
+    if (fields[5] != "fp32" && fields[5] != "fp16") return false;
+    tenant->precision = fields[5] == "fp16" ? Precision::kFp16 : Precision::kFp32;
+  }
+  return true;
+}
+
+cl_int setup_tenant(cl_context context, cl_device_id device, Tenant *tenant) {
+  cl_int err;
+  if (tenant->precision == Precision::kFp16 && !device_has_extension(device, "cl_khr_fp16")) {
+    std::cerr << "Error: device does not support cl_khr_fp16" << std::endl;
+    return CL_INVALID_DEVICE;
+  }
+  tenant->queue = create_queue(context, device, tenant->priority, &err);
+  CHECK_CL_ERROR(err, "Failed to create tenant command queue");
+  err = build_gemm_kernel(context, device, tenant->index, tenant->precision, &tenant->program, &tenant->kernel);
+  if (err != CL_SUCCESS) return err;
+  size_t elem = element_size(tenant->precision);
+  err = create_handoff_buffer(context, device, BufferMode::kCopy, CL_MEM_READ_ONLY,
+                              static_cast<size_t>(tenant->M) * tenant->K * elem, &tenant->buf_A);
+  CHECK_CL_ERROR(err, "Failed to create tenant buffer A");
+  err = create_handoff_buffer(context, device, BufferMode::kCopy, CL_MEM_READ_ONLY,
+                              static_cast<size_t>(tenant->K) * tenant->N * elem, &tenant->buf_B);
+  CHECK_CL_ERROR(err, "Failed to create tenant buffer B");
+  err = create_handoff_buffer(context, device, BufferMode::kCopy, CL_MEM_WRITE_ONLY,
+                              static_cast<size_t>(tenant->M) * tenant->N * elem, &tenant->buf_C);
+  CHECK_CL_ERROR(err, "Failed to create tenant buffer C");
+  err = upload(tenant->queue, {&tenant->buf_A, &tenant->buf_B}, {1.0f, 2.0f}, tenant->precision);
+  CHECK_CL_ERROR(err, "Failed to upload tenant inputs");
+  return set_gemm_args(tenant->kernel, tenant->M, tenant->N, tenant->K, tenant->buf_A, tenant->buf_B,
+                       tenant->buf_C);
+}
+
+// Back to back GEMMs (one in flight) until `stop`; device time of each from its profiling event.
+void run_tenant(Tenant *tenant, const std::atomic<bool> &stop) {
+  size_t global_work_size[2] = {static_cast<size_t>(dims[tenant->index][2]),
+                                static_cast<size_t>(dims[tenant->index][3])};
+  size_t local_work_size[2] = {static_cast<size_t>(dims[tenant->index][0]),
+                               static_cast<size_t>(dims[tenant->index][1])};
+  while (!stop) {
+    cl_event event;
+    cl_int err = clEnqueueNDRangeKernel(tenant->queue, tenant->kernel, 2, nullptr, global_work_size,
+                                        local_work_size, 0, nullptr, &event);
+    if (err != CL_SUCCESS) {
+      tenant->status = err;
+      return;
+    }
+    err = clWaitForEvents(1, &event);
+    cl_ulong start_time = 0, end_time = 0;
+    if (err == CL_SUCCESS) {
+      err = clGetEventProfilingInfo(event, CL_PROFILING_COMMAND_START, sizeof(cl_ulong), &start_time, nullptr);
+    }
+    if (err == CL_SUCCESS) {
+      err = clGetEventProfilingInfo(event, CL_PROFILING_COMMAND_END, sizeof(cl_ulong), &end_time, nullptr);
+    }
+    clReleaseEvent(event);
+    if (err != CL_SUCCESS) {
+      tenant->status = err;
+      return;
+    }
+    tenant->latencies_ms.push_back((end_time - start_time) / 1e6);
+  }
+}
+
+double percentile(std::vector<double> values, double q) {
+  std::sort(values.begin(), values.end());
+  return values[std::min(values.size() - 1, static_cast<size_t>(q * values.size()))];
+}
+
+// "Tenant <t> latency" lines (not "GPU Latency": those are the measured queue's runs)
+// and a summary per tenant.
+void report_tenants(const std::vector<Tenant> &tenants) {
+  for (size_t t = 0; t < tenants.size(); t++) {
+    const Tenant &tenant = tenants[t];
+    for (double latency : tenant.latencies_ms) {
+      std::cout << "Tenant " << t + 1 << " latency: " << latency << " ms" << std::endl;
+    }
+  }
+  for (size_t t = 0; t < tenants.size(); t++) {
+    const Tenant &tenant = tenants[t];
+    std::cout << "Tenant " << t + 1 << " (set " << tenant.index << ", M=" << tenant.M << ", N=" << tenant.N
+              << ", K=" << tenant.K << ", " << precision_name(tenant.precision) << ", priority "
+              << priority_name(tenant.priority) << "): " << tenant.latencies_ms.size() << " runs";
+    if (!tenant.latencies_ms.empty()) {
+      double sum = std::accumulate(tenant.latencies_ms.begin(), tenant.latencies_ms.end(), 0.0);
+      std::cout << ", average " << sum / tenant.latencies_ms.size() << " ms, p50 "
+                << percentile(tenant.latencies_ms, 0.5) << " ms, p99 " << percentile(tenant.latencies_ms, 0.99)
+                << " ms";
+    }
+    std::cout << std::endl;
+  }
+}
+
+void release_tenant(cl_context context, Tenant *tenant) {
+  release_handoff_buffer(context, &tenant->buf_A);
+  release_handoff_buffer(context, &tenant->buf_B);
+  release_handoff_buffer(context, &tenant->buf_C);
+  if (tenant->kernel != nullptr) clReleaseKernel(tenant->kernel);
+  if (tenant->program != nullptr) clReleaseProgram(tenant->program);
+  if (tenant->queue != nullptr) clReleaseCommandQueue(tenant->queue);
+}
+
+cl_int test_clblast_bw(int index, int M, int N, int K, int num_runs, int depth, double duty,
+                       double rate_hz, bool poisson, BufferMode buffer_mode, Precision precision,
+                       QueuePriority priority, std::vector<Tenant> &tenants) {
+  cl_int err;
+  cl_platform_id platform;
+  cl_device_id device;
+  cl_context context;
+  cl_command_queue queue;
+  cl_program program;
+  cl_kernel kernel;
+
+  // Get platform
+  err = clGetPlatformIDs(1, &platform, nullptr);
+  CHECK_CL_ERROR(err, "Failed to get platform");
+
+  // Get device
+  err = clGetDeviceIDs(platform, CL_DEVICE_TYPE_GPU, 1, &device, nullptr);
+  if (err != CL_SUCCESS) {
+    // Fallback to CPU if GPU not available
+    err = clGetDeviceIDs(platform, CL_DEVICE_TYPE_CPU, 1, &device, nullptr);
+    CHECK_CL_ERROR(err, "Failed to get device");
+  }
+
+  // Create context
+  context = clCreateContext(nullptr, 1, &device, nullptr, nullptr, &err);
+  CHECK_CL_ERROR(err, "Failed to create context");
+
+  if (precision == Precision::kFp16 && !device_has_extension(device, "cl_khr_fp16")) {
+    std::cerr << "Error: device does not support cl_khr_fp16" << std::endl;
+    return CL_INVALID_DEVICE;
+  }
+
+  queue = create_queue(context, device, priority, &err);
+  CHECK_CL_ERROR(err, "Failed to create command queue");
+
+  err = build_gemm_kernel(context, device, index, precision, &program, &kernel);
+  if (err != CL_SUCCESS) return err;
+
+  // Matrix dimensions from command-line arguments
+  const size_t size_A = static_cast<size_t>(M) * K * element_size(precision);
+  const size_t size_B = static_cast<size_t>(K) * N * element_size(precision);
+  const size_t size_C = static_cast<size_t>(M) * N * element_size(precision);
+
+  // Create buffers
+  HandoffBuffer buf_A, buf_B, buf_C;
+  err = create_handoff_buffer(context, device, buffer_mode, CL_MEM_READ_ONLY, size_A, &buf_A);
+  CHECK_CL_ERROR(err, "Failed to create buffer A");
+  err = create_handoff_buffer(context, device, buffer_mode, CL_MEM_READ_ONLY, size_B, &buf_B);
+  CHECK_CL_ERROR(err, "Failed to create buffer B");
+  err = create_handoff_buffer(context, device, buffer_mode, CL_MEM_WRITE_ONLY, size_C, &buf_C);
+  CHECK_CL_ERROR(err, "Failed to create buffer C");
+
+  // Hand the inputs (A = 1, B = 2) to the GPU, timed over a few repetitions
+  double upload_ms, upload_min_ms;
+  err = time_handoff(kHandoffReps, &upload_ms, &upload_min_ms,
+                     [&]() { return upload(queue, {&buf_A, &buf_B}, {1.0f, 2.0f}, precision); });
+  CHECK_CL_ERROR(err, "Failed to upload inputs");
+
+  err = set_gemm_args(kernel, M, N, K, buf_A, buf_B, buf_C);
+  if (err != CL_SUCCESS) return err;
 
   // Set work group size
   size_t global_work_size[2] = {static_cast<size_t>(dims[index][2]),
@@ -169,75 +787,60 @@ cl_int test_clblast_bw(int index, int M, int N, int K, int num_runs) {
   size_t local_work_size[2] = {static_cast<size_t>(dims[index][0]),
                                static_cast<size_t>(dims[index][1])};
 
-  std::cout << "Queuing kernel orchestra_main " << num_runs << " time(s) with dimensions M=" << M
-            << ", N=" << N << ", K=" << K << std::endl;
-
-  // Queue all kernels asynchronously
-  std::vector<cl_event> kernel_events(num_runs);
-  for (int run = 0; run < num_runs; run++) {
-    // Enqueue kernel with event (no wait)
-    err = clEnqueueNDRangeKernel(queue, kernel, 2, nullptr, global_work_size,
-                                 local_work_size, 0, nullptr, &kernel_events[run]);
-    CHECK_CL_ERROR(err, "Failed to enqueue kernel");
+  for (Tenant &tenant : tenants) {
+    err = setup_tenant(context, device, &tenant);
+    if (err != CL_SUCCESS) return err;
   }
-
-  std::cout << "All kernels queued. Waiting for completion..." << std::endl;
-
-  // Wait for all kernels to complete
-  err = clWaitForEvents(num_runs, kernel_events.data());
-  CHECK_CL_ERROR(err, "Failed to wait for kernel events");
-
-  // Collect timing from all events
-  std::vector<double> latencies_ms;
-  for (int run = 0; run < num_runs; run++) {
-    // Get GPU timing
-    cl_ulong start_time, end_time;
-    err = clGetEventProfilingInfo(kernel_events[run], CL_PROFILING_COMMAND_START,
-                                  sizeof(cl_ulong), &start_time, nullptr);
-    CHECK_CL_ERROR(err, "Failed to get start time");
-    err = clGetEventProfilingInfo(kernel_events[run], CL_PROFILING_COMMAND_END,
-                                  sizeof(cl_ulong), &end_time, nullptr);
-    CHECK_CL_ERROR(err, "Failed to get end time");
-    
-    double gpu_latency_ms = (end_time - start_time) / 1e6; // Convert nanoseconds to milliseconds
-    double gpu_latency_us = (end_time - start_time) / 1e3; // Convert nanoseconds to microseconds
-    latencies_ms.push_back(gpu_latency_ms);
-    
-    std::cout << "Run " << (run + 1) << "/" << num_runs 
-              << " - GPU Latency: " << gpu_latency_ms << " ms (" 
-              << gpu_latency_us << " us)" << std::endl;
-    
-    // Release event
-    clReleaseEvent(kernel_events[run]);
+  // Tenants are already running when the measured queue starts, and stop after it
+  std::atomic<bool> stop_tenants{false};
+  for (Tenant &tenant : tenants) {
+    tenant.thread = std::thread(run_tenant, &tenant, std::cref(stop_tenants));
   }
 
-  // Calculate and display statistics
-  if (num_runs > 1) {
-    double sum = 0.0;
-    double min_latency = latencies_ms[0];
-    double max_latency = latencies_ms[0];
-    for (double latency : latencies_ms) {
-      sum += latency;
-      if (latency < min_latency) min_latency = latency;
-      if (latency > max_latency) max_latency = latency;
-    }
-    double avg_latency = sum / num_runs;
-    
-    std::cout << "\nStatistics over " << num_runs << " runs:" << std::endl;
-    std::cout << "  Average: " << avg_latency << " ms" << std::endl;
-    std::cout << "  Min:     " << min_latency << " ms" << std::endl;
-    std::cout << "  Max:     " << max_latency << " ms" << std::endl;
+  if (rate_hz > 0) {
+    std::cout << "Issuing kernel orchestra_main " << num_runs << " time(s) at " << rate_hz
+              << " Hz with dimensions M=" << M << ", N=" << N << ", K=" << K << std::endl;
+    err = run_open_loop(queue, kernel, global_work_size, local_work_size, num_runs, rate_hz, poisson);
+  } else if (duty > 0) {
+    std::cout << "Running kernel orchestra_main " << num_runs << " time(s) at duty " << duty
+              << " with dimensions M=" << M << ", N=" << N << ", K=" << K << std::endl;
+    err = run_paced(queue, kernel, global_work_size, local_work_size, num_runs, duty);
+  } else {
+    std::cout << "Queuing kernel orchestra_main " << num_runs << " time(s) (depth " << std::min(depth, num_runs)
+              << ") with dimensions M=" << M << ", N=" << N << ", K=" << K << std::endl;
+    err = run_windowed(queue, kernel, global_work_size, local_work_size, num_runs, depth);
+  }
+  stop_tenants = true;
+  for (Tenant &tenant : tenants) {
+    tenant.thread.join();
+  }
+  if (err != CL_SUCCESS) {
+    return err;
+  }
+  for (Tenant &tenant : tenants) {
+    CHECK_CL_ERROR(tenant.status, "Tenant kernel failed");
+  }
+  if (!tenants.empty()) {
+    report_tenants(tenants);
   }
 
-  // Read results
-  err = clEnqueueReadBuffer(queue, buf_C, CL_TRUE, 0, size_C, C.data(), 0,
-                            nullptr, nullptr);
-  CHECK_CL_ERROR(err, "Failed to read buffer C");
+  // Read results back to the host, timed like the upload
+  double download_ms, download_min_ms, checksum = 0.0;
+  err = time_handoff(kHandoffReps, &download_ms, &download_min_ms,
+                     [&]() { return download(queue, &buf_C, precision, &checksum); });
+  CHECK_CL_ERROR(err, "Failed to download output");
+  std::cout << "Transfer (" << buffer_mode_name(buffer_mode) << "): upload " << upload_ms << " ms (min "
+            << upload_min_ms << " ms), download " << download_ms << " ms (min " << download_min_ms
+            << " ms) over " << kHandoffReps << " handoffs of " << (size_A + size_B) / 1e6 << " MB in, "
+            << size_C / 1e6 << " MB out (checksum " << checksum << ")" << std::endl;
 
   // Cleanup
-  clReleaseMemObject(buf_A);
-  clReleaseMemObject(buf_B);
-  clReleaseMemObject(buf_C);
+  release_handoff_buffer(context, &buf_A);
+  release_handoff_buffer(context, &buf_B);
+  release_handoff_buffer(context, &buf_C);
+  for (Tenant &tenant : tenants) {
+    release_tenant(context, &tenant);
+  }
   clReleaseKernel(kernel);
   clReleaseProgram(program);
   clReleaseCommandQueue(queue);
@@ -247,14 +850,54 @@ cl_int test_clblast_bw(int index, int M, int N, int K, int num_runs) {
 }
 
 int main(int argc, char* argv[]) {
+  // Options (--priority, --tenant) may appear anywhere; the rest are positional
+  QueuePriority priority = QueuePriority::kDefault;
+  std::vector<Tenant> tenants;
+  std::vector<char *> positional = {argv[0]};
+  for (int i = 1; i < argc; i++) {
+    std::string arg = argv[i];
+    if (arg.rfind("--", 0) != 0) {
+      positional.push_back(argv[i]);
+    } else if (arg == "--priority" && i + 1 < argc) {
+      if (!parse_priority(argv[++i], &priority)) {
+        std::cerr << "Error: priority must be default, high, med or low" << std::endl;
+        return 1;
+      }
+    } else if (arg == "--tenant" && i + 1 < argc) {
+      tenants.emplace_back();
+      if (!parse_tenant(argv[++i], &tenants.back())) {
+        std::cerr << "Error: tenant must be <index 0-6>:<m>:<n>:<k>[:<priority>[:fp32|fp16]]" << std::endl;
+        return 1;
+      }
+    } else {
+      std::cerr << "Error: unknown option " << arg << std::endl;
+      return 1;
+    }
+  }
+  argc = static_cast<int>(positional.size());
+  argv = positional.data();
+
   // Parse command-line arguments: index, [num_runs], [m, n, k]
-  if (argc != 2 && argc != 3 && argc != 5 && argc != 6) {
-    std::cerr << "Usage: " << argv[0] << " <index> [<num_runs>] [<m> <n> <k>]" << std::endl;
+  if (argc != 2 && argc != 3 && argc != 5 && argc != 6 && argc != 7 && argc != 8 && argc != 9) {
+    std::cerr << "Usage: " << argv[0] << " <index> [<num_runs>] [<m> <n> <k>] [<mode> [<buffers> [<precision>]]]"
+              << " [--priority <priority>] [--tenant <spec>]..." << std::endl;
     std::cerr << "  index: 0-6 to select parameter and dimension set" << std::endl;
     std::cerr << "  num_runs: number of times to run the kernel (default: 1)" << std::endl;
     std::cerr << "  m: matrix M dimension (default: 1024)" << std::endl;
     std::cerr << "  n: matrix N dimension (default: 1024)" << std::endl;
     std::cerr << "  k: matrix K dimension (default: 1024)" << std::endl;
+    std::cerr << "  mode (default: batch):" << std::endl;
+    std::cerr << "    batch: queue all runs, then wait" << std::endl;
+    std::cerr << "    serial: enqueue and wait for one run at a time" << std::endl;
+    std::cerr << "    pipeline:<depth>: keep at most <depth> runs in flight" << std::endl;
+    std::cerr << "    <duty>: one run at a time, busy for this fraction of the time (0-1]" << std::endl;
+    std::cerr << "    fixed:<hz> / poisson:<hz>: issue runs open loop at this request rate" << std::endl;
+    std::cerr << "  buffers (default: copy): copy | alloc_host | use_host | svm" << std::endl;
+    std::cerr << "  precision (default: fp32): fp32 | fp16 (needs cl_khr_fp16)" << std::endl;
+    std::cerr << "  --priority: default | high | med | low, hint of the measured queue (cl_khr_priority_hints)"
+              << std::endl;
+    std::cerr << "  --tenant <index>:<m>:<n>:<k>[:<priority>[:<precision>]]: another queue running GEMMs back to"
+              << " back next to the measured one (repeatable)" << std::endl;
     return 1;
   }
 
@@ -269,6 +912,12 @@ int main(int argc, char* argv[]) {
   int M = 1024;
   int N = 1024;
   int K = 1024;
+  int depth = 0;  // kernels in flight, 0 = batch (all runs)
+  double duty = 0.0;  // > 0 = paced
+  double rate_hz = 0.0;  // > 0 = open loop
+  bool poisson = false;
+  BufferMode buffer_mode = BufferMode::kCopy;
+  Precision precision = Precision::kFp32;
 
   // Parse arguments based on count
   if (argc == 3) {
@@ -279,12 +928,51 @@ int main(int argc, char* argv[]) {
     M = std::stoi(argv[2]);
     N = std::stoi(argv[3]);
     K = std::stoi(argv[4]);
-  } else if (argc == 6) {
-    // index, num_runs, m, n, k
+  } else if (argc >= 6) {
+    // index, num_runs, m, n, k, [mode, [buffers, [precision]]]
     num_runs = std::stoi(argv[2]);
     M = std::stoi(argv[3]);
     N = std::stoi(argv[4]);
     K = std::stoi(argv[5]);
+    if (argc == 9) {
+      std::string name = argv[8];
+      if (name != "fp32" && name != "fp16") {
+        std::cerr << "Error: precision must be fp32 or fp16" << std::endl;
+        return 1;
+      }
+      precision = name == "fp16" ? Precision::kFp16 : Precision::kFp32;
+    }
+    if (argc >= 8 && !parse_buffer_mode(argv[7], &buffer_mode)) {
+      std::cerr << "Error: buffers must be copy, alloc_host, use_host or svm" << std::endl;
+      return 1;
+    }
+    if (argc >= 7) {
+      std::string pacing = argv[6];
+      if (pacing == "batch") {
+        depth = 0;
+      } else if (pacing == "serial") {
+        depth = 1;
+      } else if (pacing.rfind("pipeline:", 0) == 0) {
+        depth = std::stoi(pacing.substr(9));
+        if (depth <= 0) {
+          std::cerr << "Error: pipeline depth must be positive" << std::endl;
+          return 1;
+        }
+      } else if (pacing.rfind("fixed:", 0) == 0 || pacing.rfind("poisson:", 0) == 0) {
+        poisson = pacing[0] == 'p';
+        rate_hz = std::stod(pacing.substr(pacing.find(':') + 1));
+        if (rate_hz <= 0.0) {
+          std::cerr << "Error: rate must be positive" << std::endl;
+          return 1;
+        }
+      } else {
+        duty = std::stod(pacing);
+        if (duty <= 0.0 || duty > 1.0) {
+          std::cerr << "Error: duty must be in (0, 1]" << std::endl;
+          return 1;
+        }
+      }
+    }
   }
 
   if (num_runs <= 0) {
@@ -299,7 +987,14 @@ int main(int argc, char* argv[]) {
 
   std::cout << "Using parameter set " << index << std::endl;
   std::cout << "Matrix dimensions: M=" << M << ", N=" << N << ", K=" << K << std::endl;
-  cl_int err = test_clblast_bw(index, M, N, K, num_runs);
+  if (depth == 0) depth = num_runs;
+  std::cout << "Buffers: " << buffer_mode_name(buffer_mode) << std::endl;
+  std::cout << "Precision: " << precision_name(precision) << std::endl;
+  if (priority != QueuePriority::kDefault || !tenants.empty()) {
+    std::cout << "Priority: " << priority_name(priority) << ", " << tenants.size() << " tenant(s)" << std::endl;
+  }
+  cl_int err = test_clblast_bw(index, M, N, K, num_runs, depth, duty, rate_hz, poisson, buffer_mode, precision,
+                               priority, tenants);
   if (err != CL_SUCCESS) {
     return 1;
   }
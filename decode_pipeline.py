@@ -0,0 +1,645 @@
+"""
+Layer-pipelined LLM decode across the CPU, GPU and NPU: emulated from measured latencies, or run live.
+
+Every projection of a decoder stack (DECODE_STACKS) is assigned to an
+accelerator. `search` and `run` emulate an assignment as a discrete-event
+simulation: each accelerator serves one projection at a time, with service
+times drawn from run_contention.py's standalone or contended samples and a
+handoff cost whenever consecutive projections change accelerator. `live`
+executes it with several requests in flight (LivePipeline).
+
+Usage:
+    python decode_pipeline.py profile result/ -o profile.json
+    python decode_pipeline.py search internvl_1b --profile profile.json --requests 1 4
+    python decode_pipeline.py run internvl_1b "qkv=npu,up=gpu,down=cpu" --profile result/
+    python decode_pipeline.py live internvl_1b "qkv=npu,up=gpu,down=cpu" --profile result/ --requests 2
+
+Host check (GPU stages as CPU builds, NPU stages on the fake qnn_runner):
+    python decode_pipeline.py live internvl_1b "qkv=npu,up=gpu,down=cpu" --local --tokens 2 --requests 2
+"""
+
+import os
+import re
+import time
+import glob
+import json
+import heapq
+import argparse
+import datetime
+import tempfile
+import itertools
+import threading
+import subprocess
+import logging
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import tvm
+from tvm import rpc
+
+from npu_server import NpuServer
+from npu_validate import QNN_ROOT
+from tvm_kernels import ANDROID_CPU_TARGET, MODULE_DIR, build_matmul
+from workloads import ANDROID_GPU_TARGET
+
+logger = logging.getLogger(__name__)
+
+ACCELS = ("cpu", "gpu", "npu")
+
+# Projections of one decoder layer (name, MxKxN) and the number of layers
+DECODE_STACKS = {
+    # InternVL3.5-1B language model (Qwen3-0.6B)
+    'internvl_1b': {'layers': 28, 'stages': [("qkv", "1x1024x4096"), ("up", "1x1024x3072"), ("down", "1x3072x1024")]},
+    # Qwen2-VL-2B language model
+    'qwen2vl_2b': {'layers': 28, 'stages': [("qkv", "1x1536x2048"), ("up", "1x1536x8960"), ("down", "1x8960x1536")]},
+}
+
+
+def _valid(result, accel, suffix):
+    latencies = result.get(f"{accel}_latency{suffix}") or []
+    invalid = set(result.get(f"{accel}_invalid{suffix}", []))
+    return [x for i, x in enumerate(latencies) if i not in invalid]
+
+
+def _stat_samples(stat):
+    """Pseudo samples (min, mean -/+ std/2, max) of a run with summary stats only (qnn-net-run)."""
+    if not stat:
+        return []
+    std = stat.get('std', 0.0)
+    return [stat['min'], stat['mean'] - std / 2, stat['mean'], stat['mean'] + std / 2, stat['max']]
+
+
+def result_shapes(result):
+    """{accel: MxKxN} of the matmuls a run_contention.py result measured (model workloads are skipped)."""
+    shapes = {}
+    cpu = re.search(r"(\d+x\d+x\d+)", Path(result['cpu_kernel_path']).stem)
+    if cpu and not result['cpu_kernel_path'].startswith("model:"):
+        shapes['cpu'] = cpu.group(1)
+    gpu = result['gpu_kernel_config'].split(',')
+    # kernel_idx,m,k,n[,precision]: fp16 runs are left out, their samples are not those of the fp32 kernel
+    if len(gpu) == 4 or (len(gpu) == 5 and gpu[4] == "fp32"):
+        shapes['gpu'] = "x".join(gpu[1:4])
+    npu = re.fullmatch(r"matmul_(\d+x\d+x\d+)", result['npu_kernel_path'])
+    if npu:
+        shapes['npu'] = npu.group(1)
+    return shapes
+
+
+def build_profile(paths):
+    """{shape: {accel: {'standalone': [ms], 'contended': [ms]}}} from run_contention.py result files/directories."""
+    files = []
+    for path in paths:
+        files += sorted(glob.glob(os.path.join(path, "*.json"))) if os.path.isdir(path) else [path]
+    profile = {}
+    for path in files:
+        with open(path) as f:
+            result = json.load(f)
+        if "cpu_kernel_path" not in result:
+            continue
+        for accel, shape in result_shapes(result).items():
+            entry = profile.setdefault(shape, {}).setdefault(accel, {'standalone': [], 'contended': []})
+            for phase, suffix in (("standalone", "_standalone"), ("contended", "")):
+                samples = _valid(result, accel, suffix) or _stat_samples(result.get(f"{accel}_stat{suffix}"))
+                entry[phase].extend(samples)
+    return profile
+
+
+def load_profile(paths):
+    """A profile JSON (decode_pipeline.py profile) or run_contention.py results to build one from."""
+    if len(paths) == 1 and os.path.isfile(paths[0]):
+        with open(paths[0]) as f:
+            data = json.load(f)
+        if "cpu_kernel_path" not in data:
+            return data
+    return build_profile(paths)
+
+
+def stage_list(stack, assignment):
+    """[(stage name, shape, accel)] of one token; assignment is one {stage: accel} per layer group."""
+    layers = DECODE_STACKS[stack]['layers']
+    groups = len(assignment)
+    return [(f"L{layer}.{name}", shape, assignment[layer * groups // layers][name])
+            for layer in range(layers) for name, shape in DECODE_STACKS[stack]['stages']]
+
+
+def handoff_ms(shape, handoff_us, handoff_gbps):
+    """Cost of passing a projection's output (M x N float32) to another accelerator."""
+    m, _, n = map(int, shape.split('x'))
+    return handoff_us * 1e-3 + m * n * 4 / (handoff_gbps * 1e9) * 1e3
+
+
+def simulate(stages, profile, num_requests=1, tokens=32, handoff_us=100.0, handoff_gbps=8.0, seed=0):
+    """
+    Decode `tokens` tokens for each of `num_requests` concurrent requests.
+
+    Returns per-token latencies (ms), throughput (tokens/s), makespan and
+    per-accelerator utilization.
+    """
+    rng = np.random.default_rng(seed)
+    samples = {}
+    for _, shape, accel in stages:
+        entry = profile[shape][accel]
+        # Fall back to the other phase when a run only measured one of them
+        samples[(shape, accel, False)] = np.array(entry['standalone'] or entry['contended'])
+        samples[(shape, accel, True)] = np.array(entry['contended'] or entry['standalone'])
+
+    busy = {accel: False for accel in ACCELS}
+    busy_ms = {accel: 0.0 for accel in ACCELS}
+    waiting = {accel: [] for accel in ACCELS}  # heap of (ready time, seq, request, stage)
+    events = []  # heap of (time, seq, kind, payload)
+    seq = itertools.count()
+    token_start = [0.0] * num_requests
+    done_tokens = [0] * num_requests
+    latencies = []
+    handoffs = 0
+
+    def ready(t, request, stage):
+        heapq.heappush(events, (t, next(seq), 'ready', (request, stage)))
+
+    def try_start(accel, t):
+        if busy[accel] or not waiting[accel]:
+            return
+        _, _, request, stage = heapq.heappop(waiting[accel])
+        contended = any(busy[other] for other in ACCELS if other != accel)
+        duration = float(rng.choice(samples[(stages[stage][1], accel, contended)]))
+        busy[accel] = True
+        busy_ms[accel] += duration
+        heapq.heappush(events, (t + duration, next(seq), 'done', (request, stage)))
+
+    for request in range(num_requests):
+        ready(0.0, request, 0)
+    t = 0.0
+    while events:
+        t, _, kind, (request, stage) = heapq.heappop(events)
+        accel = stages[stage][2]
+        if kind == 'ready':
+            heapq.heappush(waiting[accel], (t, next(seq), request, stage))
+            try_start(accel, t)
+            continue
+        busy[accel] = False
+        following = stage + 1
+        if following == len(stages):
+            latencies.append(t - token_start[request])
+            done_tokens[request] += 1
+            token_start[request] = t
+            following = 0 if done_tokens[request] < tokens else None
+        if following is not None:
+            delay = 0.0
+            if stages[following][2] != accel:
+                delay = handoff_ms(stages[stage][1], handoff_us, handoff_gbps)
+                handoffs += 1
+            ready(t + delay, request, following)
+        try_start(accel, t)
+
+    makespan = t
+    return {
+        'token_latency': latencies,
+        'token_p50_ms': float(np.percentile(latencies, 50)),
+        'token_p99_ms': float(np.percentile(latencies, 99)),
+        'throughput_tps': len(latencies) / makespan * 1e3,
+        'makespan_ms': makespan,
+        'utilization': {accel: busy_ms[accel] / makespan for accel in ACCELS},
+        'handoffs_per_token': handoffs / len(latencies),
+    }
+
+
+def format_assignment(assignment):
+    return ";".join(",".join(f"{name}={accel}" for name, accel in group.items()) for group in assignment)
+
+
+def parse_assignment(spec, stack):
+    """'qkv=npu,up=gpu,down=cpu' (one group) or several groups separated by ';'."""
+    names = [name for name, _ in DECODE_STACKS[stack]['stages']]
+    assignment = []
+    for group in spec.split(";"):
+        pairs = dict(item.split("=") for item in group.split(","))
+        if sorted(pairs) != sorted(names) or not set(pairs.values()) <= set(ACCELS):
+            raise ValueError(f"Assignment group '{group}' must map each of {names} to one of {ACCELS}")
+        assignment.append({name: pairs[name] for name in names})
+    return assignment
+
+
+def enumerate_assignments(stack, profile, groups=1, max_assignments=1000, seed=0):
+    """Assignments whose every (shape, accel) was measured; a random subset if there are too many."""
+    stages = DECODE_STACKS[stack]['stages']
+    choices = [[accel for accel in ACCELS if accel in profile.get(shape, {})] for _, shape in stages]
+    for (name, shape), options in zip(stages, choices):
+        if not options:
+            raise ValueError(f"No measurements of {name} ({shape}) on any accelerator")
+    per_group = [dict(zip([name for name, _ in stages], combo)) for combo in itertools.product(*choices)]
+    total = len(per_group) ** groups
+    if total <= max_assignments:
+        return [list(combo) for combo in itertools.product(per_group, repeat=groups)]
+    logger.info(f"[PIPE] {total} assignments, evaluating {max_assignments} random ones")
+    rng = np.random.default_rng(seed)
+    # Keep the single-accelerator placements as reference points
+    assignments = [[group] * groups for group in per_group if len(set(group.values())) == 1]
+    while len(assignments) < max_assignments:
+        assignments.append([per_group[i] for i in rng.integers(len(per_group), size=groups)])
+    return assignments
+
+
+def evaluate(stack, assignments, profile, requests, **sim_args):
+    """Simulate every assignment at every request count; rows sorted by throughput at the highest count."""
+    rows = []
+    for assignment in assignments:
+        stages = stage_list(stack, assignment)
+        row = {'assignment': format_assignment(assignment), 'runs': {}}
+        for num_requests in requests:
+            row['runs'][num_requests] = simulate(stages, profile, num_requests, **sim_args)
+        rows.append(row)
+    rows.sort(key=lambda r: r['runs'][max(requests)]['throughput_tps'], reverse=True)
+    return rows
+
+
+def projection_library(shape, accel, target=ANDROID_CPU_TARGET, gpu_target=ANDROID_GPU_TARGET):
+    """matmul library of one projection in MODULE_DIR (OpenCL build for GPU stages), built on first use."""
+    m, k, n = map(int, shape.split('x'))
+    device = "opencl" if accel == "gpu" and gpu_target else "cpu"
+    host = "android" if "android" in target else "host"
+    lib_path = os.path.join(MODULE_DIR, f"decode_{shape}_{device}_{host}.so")
+    if not os.path.exists(lib_path):
+        os.makedirs(MODULE_DIR, exist_ok=True)
+        logger.info(f"[PIPE] Building {shape} ({device}): {lib_path}")
+        build_matmul(m, k, n, lib_path, target=target, gpu_target=gpu_target if device == "opencl" else None)
+    return lib_path
+
+
+def fit_activation(x, m, k):
+    """The M x K input of the next projection: the first M*K outputs of the previous one (tiled if too few)."""
+    flat = np.asarray(x).reshape(-1)
+    return (flat[:m * k] if flat.size >= m * k else np.resize(flat, m * k)).reshape(m, k)
+
+
+def _adb(args, label="NPU"):
+    result = subprocess.run(["adb"] + args, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"[{label}] adb {' '.join(args)} failed, stderr:\n{result.stderr}")
+
+
+class NpuStage:
+    """
+    NPU projections of one shape on a qnn_runner (npu_server.NpuServer): the
+    activation is written as a float32 input file and run with the runner's
+    dump command, whose output file is read back. On the device the files
+    are moved with adb; with device=False the runner is a host process.
+    """
+
+    def __init__(self, server, work_dir, device=True):
+        self.server = server
+        self.work_dir = work_dir
+        self.device = device
+        self.host_dir = tempfile.mkdtemp(prefix="pipe_npu_") if device else work_dir
+
+    def push(self, x, tag):
+        """Stage x as the input of request `tag`; returns its path for run()."""
+        path = os.path.join(self.host_dir, f"in_{tag}.raw")
+        np.ascontiguousarray(x, dtype="float32").tofile(path)
+        if not self.device:
+            return path
+        remote = f"{self.work_dir}/pipe_in_{tag}.raw"
+        _adb(["push", path, remote], self.server.label)
+        return remote
+
+    def run(self, input_path, tag):
+        """One inference of the model on input_path; returns the output directory for pull()."""
+        out_dir = f"{self.work_dir}/pipe_out_{tag}"
+        self.server.dump(out_dir, input_path)
+        return out_dir
+
+    def pull(self, out_dir, tag):
+        path = f"{out_dir}/output_0.raw"
+        if self.device:
+            local = os.path.join(self.host_dir, f"out_{tag}.raw")
+            _adb(["pull", path, local], self.server.label)
+            path = local
+        return np.fromfile(path, dtype="float32")
+
+
+class LivePipeline:
+    """
+    Executes the projections of an assignment token by token, for several
+    requests at once. Every accelerator runs one projection at a time (a lock
+    per RPC session and one for the NPU), so while one request is on the NPU
+    another can use the GPU.
+
+    GPU stages run TVM's OpenCL build of the projection: a stand-in for the
+    CLBlast GEMM that run_contention.py measures, which cannot take an
+    activation from another runtime. NPU stages run the matmul_<shape> QNN
+    model on qnn_runner (NpuStage). Its weights are not the pipeline's, so
+    the host reference takes the NPU outputs as they were measured.
+    """
+
+    def __init__(self, stages, cpu_remote, gpu_remote, npu_stages=None, target=ANDROID_CPU_TARGET,
+                 gpu_target=ANDROID_GPU_TARGET, seed=0):
+        """
+        stages: stage_list() of the assignment.
+        npu_stages: {shape: NpuStage} for the NPU stages.
+        gpu_target: None runs GPU stages as CPU builds on gpu_remote (host check).
+        """
+        self.stages = stages
+        self.rng = np.random.default_rng(seed)
+        # One weight matrix per (shape, accel), shared by all layers: each is larger than the caches,
+        # so every layer still streams its weights from DRAM
+        self.units = {}
+        self._buffers = {}  # (request, shape, accel) -> (input, output) tensors
+        for _, shape, accel in stages:
+            if (shape, accel) in self.units:
+                continue
+            m, k, n = map(int, shape.split('x'))
+            if accel == "npu":
+                if shape not in (npu_stages or {}):
+                    raise ValueError(f"No NPU runner for the {shape} stages")
+                self.units[(shape, accel)] = {'stage': npu_stages[shape]}
+                continue
+            remote = cpu_remote if accel == "cpu" else gpu_remote
+            lib_path = projection_library(shape, accel, target, gpu_target)
+            remote.upload(lib_path)
+            dev = remote.cl(0) if accel == "gpu" and gpu_target else remote.cpu()
+            w = (self.rng.standard_normal((k, n)) / np.sqrt(k)).astype("float32")
+            self.units[(shape, accel)] = {'w': w, 'dev': dev, 'b': tvm.runtime.tensor(w, dev),
+                                          'func': remote.load_module(os.path.basename(lib_path))["matmul"]}
+
+    def _request_buffers(self, request, key):
+        if (request,) + key not in self._buffers:
+            m, k, n = map(int, key[0].split('x'))
+            dev = self.units[key]['dev']
+            self._buffers[(request,) + key] = (tvm.runtime.empty((m, k), "float32", dev),
+                                               tvm.runtime.empty((m, n), "float32", dev))
+        return self._buffers[(request,) + key]
+
+    def _decode_request(self, request, x, tokens, locks):
+        latencies, busy = [], dict.fromkeys(ACCELS, 0.0)
+        moved_ms, handoffs, npu_outputs = 0.0, 0, []
+        act, prev = x, None  # act: a host array, or the output tensor of unit `prev`
+
+        def to_host(act):
+            if not isinstance(act, tvm.runtime.Tensor):
+                return act
+            with locks[prev[1]]:
+                return act.numpy()
+
+        for _ in range(tokens):
+            token_start = time.perf_counter()
+            for _, shape, accel in self.stages:
+                m, k, _ = map(int, shape.split('x'))
+                key = (shape, accel)
+                unit = self.units[key]
+                if prev is not None and prev[1] != accel:
+                    handoffs += 1
+                if accel == "npu":
+                    start = time.perf_counter()
+                    input_path = unit['stage'].push(fit_activation(to_host(act), m, k), request)
+                    moved_ms += (time.perf_counter() - start) * 1e3
+                    with locks[accel]:
+                        start = time.perf_counter()
+                        out_dir = unit['stage'].run(input_path, request)
+                        busy[accel] += (time.perf_counter() - start) * 1e3
+                    start = time.perf_counter()
+                    act = unit['stage'].pull(out_dir, request)
+                    moved_ms += (time.perf_counter() - start) * 1e3
+                    npu_outputs.append(act)
+                else:
+                    a, c = self._request_buffers(request, key)
+                    same_session = prev is not None and prev != key and prev[1] == accel
+                    host = None
+                    if not (same_session and np.prod(act.shape) >= m * k):
+                        start = time.perf_counter()
+                        host = fit_activation(to_host(act), m, k)
+                        moved_ms += (time.perf_counter() - start) * 1e3
+                    with locks[accel]:
+                        start = time.perf_counter()
+                        if host is None:
+                            # Same session: hand over a view of the previous output, no copy
+                            a = act._create_view((m, k))
+                        else:
+                            a.copyfrom(host)
+                        ran = time.perf_counter()
+                        unit['func'](a, unit['b'], c)
+                        unit['dev'].sync()
+                        busy[accel] += (time.perf_counter() - ran) * 1e3
+                    moved_ms += (ran - start) * 1e3
+                    act = c
+                prev = key
+            latencies.append((time.perf_counter() - token_start) * 1e3)
+        return to_host(act), npu_outputs, latencies, busy, moved_ms, handoffs
+
+    def decode(self, xs, tokens):
+        """
+        Decode `tokens` tokens for every request concurrently, request i
+        starting from the host activation xs[i] and each token from the
+        previous one's output. Returns the outputs and NPU outputs per
+        request, the per-token latencies of all requests, busy time per
+        accelerator, time spent moving activations and the handoff count.
+        """
+        locks = {accel: threading.Lock() for accel in ACCELS}
+        with ThreadPoolExecutor(max_workers=len(xs)) as pool:
+            runs = list(pool.map(lambda i: self._decode_request(i, xs[i], tokens, locks), range(len(xs))))
+        busy = {accel: sum(run[3][accel] for run in runs) for accel in ACCELS}
+        return ([run[0] for run in runs], [run[1] for run in runs], [lat for run in runs for lat in run[2]],
+                busy, sum(run[4] for run in runs), sum(run[5] for run in runs))
+
+    def reference(self, x, tokens, npu_outputs=()):
+        """Host result of decoding x, given the outputs its NPU stages produced."""
+        act, npu = x, iter(npu_outputs)
+        for _ in range(tokens):
+            for _, shape, accel in self.stages:
+                m, k, _ = map(int, shape.split('x'))
+                act = next(npu) if accel == "npu" else fit_activation(act, m, k) @ self.units[(shape, accel)]['w']
+        return act
+
+
+def run_live(pipeline, tokens, requests=1, seed=0):
+    """Decode on the accelerators, check the outputs against the host and return the run's statistics."""
+    m, k, _ = map(int, pipeline.stages[0][1].split('x'))
+    rng = np.random.default_rng(seed)
+    xs = [rng.standard_normal((m, k)).astype("float32") for _ in range(requests)]
+    pipeline.decode(xs, 1)  # warm-up: first launches compile the OpenCL kernels
+    start = time.perf_counter()
+    outs, npu_outputs, latencies, busy, moved_ms, handoffs = pipeline.decode(xs, tokens)
+    wall_ms = (time.perf_counter() - start) * 1e3
+    error = 0.0
+    for x, out, npu in zip(xs, outs, npu_outputs):
+        expected = pipeline.reference(x, tokens, npu)
+        error = max(error, float(np.linalg.norm(out.reshape(-1) - expected.reshape(-1)) / np.linalg.norm(expected)))
+    if error > 1e-3:
+        raise RuntimeError(f"[PIPE] Live output differs from the host reference (relative error {error:.2e})")
+    logger.info(f"[PIPE] Output verified (relative error {error:.1e})")
+    return {
+        'requests': requests,
+        'token_latency': latencies,
+        'token_p50_ms': float(np.percentile(latencies, 50)),
+        'token_p99_ms': float(np.percentile(latencies, 99)),
+        'throughput_tps': len(latencies) / wall_ms * 1e3,
+        'utilization': {accel: busy[accel] / wall_ms for accel in ACCELS},
+        'handoffs_per_token': handoffs / len(latencies),
+        'handoff_ms_per_token': moved_ms / len(latencies),
+        'relative_error': error,
+    }
+
+
+def log_rows(rows, requests, top=None):
+    header = f"{'assignment':<40}" + "".join(f"{f'r={r} p50 ms':>14}{f'r={r} p99 ms':>14}{f'r={r} tok/s':>13}"
+                                             for r in requests)
+    lines = [header]
+    for row in rows[:top]:
+        lines.append(f"{row['assignment']:<40}" + "".join(
+            f"{row['runs'][r]['token_p50_ms']:>14.2f}{row['runs'][r]['token_p99_ms']:>14.2f}"
+            f"{row['runs'][r]['throughput_tps']:>13.1f}" for r in requests))
+    logger.info("\n".join(lines))
+
+
+def open_npu_stages(stages, profile, local, runner_path=None):
+    """{shape: NpuStage} of the NPU stages, each on an opened qnn_runner."""
+    npu_stages = {}
+    for shape in sorted({shape for _, shape, accel in stages if accel == "npu"}):
+        if local:
+            # The fake backend takes the standalone NPU latency of the profile (1 ms without one)
+            entry = profile.get(shape, {}).get("npu", {})
+            samples = entry.get('standalone') or entry.get('contended') or [1.0]
+            server = NpuServer.local_fake(runner_path, float(np.median(samples)) * 1e3, label=f"NPU {shape}")
+            stage = NpuStage(server, tempfile.mkdtemp(prefix="pipe_npu_"), device=False)
+        else:
+            run_dir = f"{QNN_ROOT}/matmul_{shape}"
+            kwargs = {'runner_path': runner_path} if runner_path else {}
+            stage = NpuStage(NpuServer.on_device(run_dir, label=f"NPU {shape}", **kwargs), run_dir)
+        stage.server.open()
+        npu_stages[shape] = stage
+    return npu_stages
+
+
+def run_live_command(args):
+    profile = load_profile(args.profile) if args.profile else {}
+    assignment = parse_assignment(args.assignment, args.stack)
+    stages = stage_list(args.stack, assignment)
+    if args.local:
+        # A standalone server serves one session at a time: one server per session
+        servers = [rpc.Server(host="127.0.0.1", port=9095, port_end=9199) for _ in range(2)]
+        cpu_remote, gpu_remote = (rpc.connect("127.0.0.1", server.port) for server in servers)
+        target, gpu_target = "llvm", None
+    else:
+        host, port = args.tracker.split(":")
+        tracker = rpc.connect_tracker(host, int(port))
+        cpu_remote = tracker.request(args.key, session_timeout=1800, priority=1)
+        gpu_remote = None
+        if any(accel == "gpu" for _, _, accel in stages):
+            logger.info("Requesting another RPC session for the GPU stages...")
+            gpu_remote = tracker.request(args.key, session_timeout=1800, priority=1)
+        target, gpu_target = ANDROID_CPU_TARGET, ANDROID_GPU_TARGET
+
+    logger.info(f"[PIPE] Running {format_assignment(assignment)} of {args.stack} live, "
+                f"{args.requests} request(s) of {args.tokens} tokens")
+    npu_stages = open_npu_stages(stages, profile, args.local, args.npu_runner)
+    try:
+        pipeline = LivePipeline(stages, cpu_remote, gpu_remote, npu_stages, target, gpu_target, args.seed)
+        live = run_live(pipeline, args.tokens, args.requests, args.seed)
+    finally:
+        for stage in npu_stages.values():
+            stage.server.close()
+    logger.info(f"[PIPE] Live: p50 {live['token_p50_ms']:.2f} ms, p99 {live['token_p99_ms']:.2f} ms, "
+                f"{live['throughput_tps']:.1f} tok/s, {live['handoffs_per_token']:.0f} handoffs "
+                f"({live['handoff_ms_per_token']:.2f} ms) per token")
+    emulated = None
+    if all(accel in profile.get(shape, {}) for _, shape, accel in stages):
+        emulated = simulate(stages, profile, args.requests, args.tokens, args.handoff_us, args.handoff_gbps,
+                            args.seed)
+        logger.info(f"[PIPE] Emulated: p50 {emulated['token_p50_ms']:.2f} ms, p99 {emulated['token_p99_ms']:.2f} ms, "
+                    f"{emulated['throughput_tps']:.1f} tok/s")
+
+    os.makedirs(args.result_dir, exist_ok=True)
+    path = os.path.join(args.result_dir,
+                        f"pipeline_live_{args.stack}_{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+    with open(path, "w") as f:
+        json.dump({'stack': args.stack, 'layers': DECODE_STACKS[args.stack]['layers'],
+                   'stages': DECODE_STACKS[args.stack]['stages'], 'assignment': format_assignment(assignment),
+                   'requests': args.requests, 'tokens': args.tokens, 'local': args.local, 'live': live,
+                   'emulated': emulated}, f, indent=2)
+    logger.info(f"[PIPE] Saved {path}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Emulate or run layer-pipelined decode over CPU/GPU/NPU.",
+                                     epilog=__doc__[__doc__.index("Usage:"):],
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest="command", required=True)
+    profile_p = sub.add_parser("profile", help="Build a latency profile from run_contention.py results")
+    profile_p.add_argument("results", nargs="+", help="Result files or directories")
+    profile_p.add_argument("-o", "--output", default="profile.json")
+    for name, help_text in (("search", "Rank all assignments of a stack"), ("run", "Emulate one assignment")):
+        p = sub.add_parser(name, help=help_text)
+        p.add_argument("stack", choices=list(DECODE_STACKS))
+        if name == "run":
+            p.add_argument("assignment", help="e.g. 'qkv=npu,up=gpu,down=cpu'; groups of layers separated by ';'")
+        else:
+            p.add_argument("--groups", type=int, default=1,
+                           help="Contiguous layer groups that are assigned independently (layer pipelining)")
+            p.add_argument("--max_assignments", type=int, default=1000)
+            p.add_argument("--top", type=int, default=20, help="Assignments shown in the log")
+        p.add_argument("--profile", nargs="+", required=True, help="Profile JSON, or run_contention.py results")
+        p.add_argument("--requests", type=int, nargs="+", default=[1, 4], help="Concurrent decode requests")
+        p.add_argument("--tokens", type=int, default=32, help="Tokens decoded per request")
+        p.add_argument("--handoff_us", type=float, default=100.0, help="Fixed cost of moving an activation")
+        p.add_argument("--handoff_gbps", type=float, default=8.0, help="Bandwidth of moving an activation")
+        p.add_argument("--seed", type=int, default=0)
+        p.add_argument("--result_dir", default="result")
+    live_p = sub.add_parser("live", help="Execute one assignment: CPU and GPU (TVM OpenCL, a stand-in for CLBlast) "
+                                         "over RPC, NPU on qnn_runner")
+    live_p.add_argument("stack", choices=list(DECODE_STACKS))
+    live_p.add_argument("assignment", help="e.g. 'qkv=npu,up=gpu,down=cpu'; groups of layers separated by ';'")
+    live_p.add_argument("--profile", nargs="+", help="Profile JSON or run_contention.py results "
+                                                     "(for the emulator's estimate)")
+    live_p.add_argument("--tokens", type=int, default=8, help="Tokens decoded per request")
+    live_p.add_argument("--requests", type=int, default=1, help="Requests decoded concurrently")
+    live_p.add_argument("--local", action="store_true",
+                        help="Run against a local RPC server and a fake qnn_runner on the host (GPU stages as CPU builds)")
+    live_p.add_argument("--npu_runner", help="qnn_runner binary (default: the device's /data/local/tmp/qnn/qnn_runner, "
+                                             "with --local qnn_runner/build-host/qnn_runner)")
+    live_p.add_argument("--tracker", default="127.0.0.1:9190")
+    live_p.add_argument("--key", default="android64")
+    live_p.add_argument("--handoff_us", type=float, default=100.0, help="Handoff cost of the emulator's estimate")
+    live_p.add_argument("--handoff_gbps", type=float, default=8.0, help="Handoff bandwidth of the emulator's estimate")
+    live_p.add_argument("--seed", type=int, default=0)
+    live_p.add_argument("--result_dir", default="result")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='[%(asctime)s.%(msecs)03d] %(message)s', datefmt='%H:%M:%S')
+    if args.command == "profile":
+        profile = build_profile(args.results)
+        with open(args.output, "w") as f:
+            json.dump(profile, f, indent=2)
+        for shape, accels in sorted(profile.items()):
+            logger.info(f"[PIPE] {shape}: " + ", ".join(
+                f"{accel} {np.median(e['standalone'] or e['contended']):.3f}/{np.median(e['contended'] or e['standalone']):.3f} ms"
+                for accel, e in sorted(accels.items())))
+        logger.info(f"[PIPE] Saved profile to {args.output}")
+        return
+    if args.command == "live":
+        if args.local and not args.npu_runner:
+            args.npu_runner = os.path.join(os.path.dirname(os.path.abspath(__file__)), "qnn_runner", "build-host",
+                                           "qnn_runner")
+        run_live_command(args)
+        return
+
+    profile = load_profile(args.profile)
+    if args.command == "run":
+        assignments = [parse_assignment(args.assignment, args.stack)]
+    else:
+        assignments = enumerate_assignments(args.stack, profile, args.groups, args.max_assignments, args.seed)
+    logger.info(f"[PIPE] Emulating {len(assignments)} assignment(s) of {args.stack} "
+                f"({DECODE_STACKS[args.stack]['layers']} layers), {args.tokens} tokens per request")
+    rows = evaluate(args.stack, assignments, profile, args.requests, tokens=args.tokens,
+                    handoff_us=args.handoff_us, handoff_gbps=args.handoff_gbps, seed=args.seed)
+    log_rows(rows, args.requests, None if args.command == "run" else args.top)
+
+    os.makedirs(args.result_dir, exist_ok=True)
+    path = os.path.join(args.result_dir, f"pipeline_{args.stack}_{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+    with open(path, "w") as f:
+        json.dump({'stack': args.stack, 'layers': DECODE_STACKS[args.stack]['layers'],
+                   'stages': DECODE_STACKS[args.stack]['stages'], 'requests': args.requests, 'tokens': args.tokens,
+                   'handoff_us': args.handoff_us, 'handoff_gbps': args.handoff_gbps, 'rows': rows}, f, indent=2)
+    logger.info(f"[PIPE] Saved {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,277 @@
+"""
+Background frequency / temperature monitor with drift detection.
+
+DeviceMonitor reads the CPU, GPU and (if a path is given) NPU clocks and
+some thermal zones every `interval` seconds while the harness runs, in one
+persistent `adb shell` loop. check() then looks at one accelerator's
+samples from one phase and flags them if either:
+
+  - the accelerator's clock stayed more than drop_frac below its highest
+    reading in the phase (throttling, see clock_drops), or
+  - the latency series has a step: a change point where the mean shifts by
+    more than step_frac (see latency_step).
+
+Latency samples carry no timestamps (time_evaluator returns only an array),
+so they are assumed to be evenly spread over the accelerator's run window
+and each one is tagged with the nearest monitor reading.
+
+run_contention.py re-runs a flagged phase after a cooldown (--max_reruns)
+and keeps the invalid sample indices of the last attempt in its results.
+"""
+
+import time
+import threading
+import subprocess
+import logging
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Max of the per-cluster clocks (kHz), so idle little cores don't count as drops
+CPU_FREQ_GLOB = "/sys/devices/system/cpu/cpufreq/policy*/scaling_cur_freq"
+# Adreno GPU clock (Hz)
+GPU_FREQ_PATH = "/sys/class/kgsl/kgsl-3d0/gpuclk"
+DEFAULT_THERMAL_ZONES = ("thermal_zone53",)
+
+
+def step_segment(n):
+    """Default min_segment of latency_step for a series of n samples."""
+    return max(5, n // 4)
+
+
+def latency_step(latencies, min_segment=None, step_frac=0.1):
+    """
+    Single change point of a latency series (least-squares split).
+
+    Returns (index, shift) where samples [index:] differ from [:index] by a
+    relative mean shift `shift` (> 0: later samples slower), or None if there
+    is no split with at least min_segment (default: step_segment) samples on
+    each side whose shift exceeds step_frac.
+    """
+    x = np.asarray(latencies, dtype=np.float64)
+    n = len(x)
+    min_segment = min_segment or step_segment(n)
+    if n < 2 * min_segment:
+        return None
+    csum = np.cumsum(x)
+    csum_sq = np.cumsum(x * x)
+    best_idx, best_cost = None, np.inf
+    for i in range(min_segment, n - min_segment + 1):
+        left_sse = csum_sq[i - 1] - csum[i - 1] ** 2 / i
+        right_sum, right_sq = csum[-1] - csum[i - 1], csum_sq[-1] - csum_sq[i - 1]
+        cost = left_sse + right_sq - right_sum ** 2 / (n - i)
+        if cost < best_cost:
+            best_idx, best_cost = i, cost
+    before, after = np.median(x[:best_idx]), np.median(x[best_idx:])
+    shift = (after - before) / before if before > 0 else 0.0
+    if abs(shift) <= step_frac:
+        return None
+    return best_idx, float(shift)
+
+
+def clock_drops(clocks, drop_frac=0.15, min_run=2):
+    """
+    Indices of readings where the clock stayed more than drop_frac below its
+    peak for at least min_run consecutive readings. Readings before the clock
+    first reaches its peak range (governor ramp-up while the kernel is being
+    launched) are ignored; None entries break a run.
+    """
+    known = [c for c in clocks if c is not None]
+    if not known:
+        return []
+    threshold = max(known) * (1 - drop_frac)
+    first = next(i for i, c in enumerate(clocks) if c is not None and c >= threshold)
+    dropped, run = [], []
+    for i in range(first, len(clocks)):
+        if clocks[i] is not None and clocks[i] < threshold:
+            run.append(i)
+            continue
+        if len(run) >= min_run:
+            dropped.extend(run)
+        run = []
+    if len(run) >= min_run:
+        dropped.extend(run)
+    return dropped
+
+
+class DeviceMonitor:
+    """Polls clocks and temperatures over adb in a background thread."""
+
+    def __init__(self, adb_serial=None, interval=0.5, thermal_zones=DEFAULT_THERMAL_ZONES,
+                 gpu_freq_path=GPU_FREQ_PATH, npu_freq_path=None, drop_frac=0.15, step_frac=0.1,
+                 min_segment=None):
+        """min_segment: of latency_step, None scales it to each series (step_segment)."""
+        self.adb_serial = adb_serial
+        self.interval = interval
+        self.drop_frac = drop_frac
+        self.step_frac = step_frac
+        self.min_segment = min_segment
+        self.paths = {'gpu': gpu_freq_path}
+        if npu_freq_path:
+            self.paths['npu'] = npu_freq_path
+        for zone in thermal_zones:
+            self.paths[zone] = f"/sys/class/thermal/{zone}/temp"
+        self.readings = []
+        self._lock = threading.Lock()
+        self._stopping = False
+        self._proc = None
+        self._reader = None
+        self._loop_pid = None
+
+    def _shell(self, script):
+        """Command running a shell script on the device."""
+        return ["adb"] + (["-s", self.adb_serial] if self.adb_serial else []) + ["shell", script]
+
+    def _command(self):
+        # `read` is a shell builtin, so a reading costs no fork besides sleep; "." ends a reading.
+        # The loop first reports its shell's PID, which stop() kills.
+        script = (f"echo pid $$; while :; do l=cpu; for f in {CPU_FREQ_GLOB}; do read x 2>/dev/null < $f && l=\"$l $x\"; done; "
+                  f"echo \"$l\"; "
+                  + "".join(f"read x 2>/dev/null < {path} && echo \"{name} $x\"; " for name, path in self.paths.items())
+                  + f"echo .; sleep {self.interval}; done")
+        return self._shell(script)
+
+    @staticmethod
+    def _parse(lines, t):
+        """One reading: {'t': host time, 'cpu': kHz, 'gpu': Hz, 'npu': ..., '<zone>': degC}."""
+        reading = {'t': t}
+        for line in lines:
+            name, *values = line.split()
+            values = [float(v) for v in values if v.lstrip("-").isdigit()]
+            if not values:
+                continue
+            if name == 'cpu':
+                reading['cpu'] = max(values)
+            elif name.startswith("thermal_zone"):
+                reading[name] = values[0] / 1000.0
+            else:
+                reading[name] = values[0]
+        return reading
+
+    def _read_loop(self):
+        lines = []
+        for line in self._proc.stdout:
+            if line.startswith("pid "):
+                self._loop_pid = int(line.split()[1])
+                continue
+            if line.strip() != ".":
+                lines.append(line)
+                continue
+            reading = self._parse(lines, time.time())
+            lines = []
+            with self._lock:
+                self.readings.append(reading)
+        if not self._stopping:
+            logger.warning(f"[MON] Sampling loop exited (code {self._proc.poll()}), no more readings")
+
+    def start(self):
+        self._stopping = False
+        self._loop_pid = None
+        self._proc = subprocess.Popen(self._command(), stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+                                      text=True, bufsize=1)
+        self._reader = threading.Thread(target=self._read_loop, daemon=True)
+        self._reader.start()
+        logger.info(f"[MON] Monitoring {', '.join(['cpu'] + list(self.paths))} every {self.interval} s")
+        return self
+
+    def stop(self):
+        self._stopping = True
+        if self._proc is not None:
+            self._proc.terminate()
+            self._proc.wait()
+            self._proc = None
+            # Killing the local adb client does not reliably end the device loop
+            if self._loop_pid is not None:
+                subprocess.run(self._shell(f"kill {self._loop_pid}"),
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        if self._reader is not None:
+            self._reader.join(timeout=5)
+            self._reader = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def window(self, t0, t1):
+        """Readings taken between t0 and t1 (host time)."""
+        with self._lock:
+            return [r for r in self.readings if t0 <= r['t'] <= t1]
+
+    def check(self, phase, accel, window, latencies=None):
+        """
+        Check one accelerator's measurement of a phase.
+
+        window: (t0, t1) host time of the accelerator's run. Returns a report
+        with 'valid', 'reasons', 'invalid' (sample indices), the readings of
+        the window and 'sample_reading' (index of the reading tagging each
+        sample).
+        """
+        t0, t1 = window
+        readings = self.window(t0, t1)
+        n = len(latencies) if latencies is not None else 0
+        sample_times = np.linspace(t0, t1, n) if n else np.zeros(0)
+        reading_times = np.array([r['t'] for r in readings])
+        if len(readings) and n:
+            sample_reading = np.abs(sample_times[:, None] - reading_times[None, :]).argmin(axis=1)
+        else:
+            sample_reading = np.zeros(n, dtype=int)
+
+        reasons, invalid = [], set()
+        dropped = clock_drops([r.get(accel) for r in readings], self.drop_frac)
+        if dropped:
+            clocks = [readings[i][accel] for i in dropped]
+            peak = max(r[accel] for r in readings if r.get(accel) is not None)
+            reasons.append(f"{accel} clock dropped to {min(clocks):g} ({min(clocks) / peak:.0%} of {peak:g})")
+            invalid.update(int(i) for i in np.flatnonzero(np.isin(sample_reading, dropped)))
+        min_segment = self.min_segment or step_segment(n)
+        if n and n < 2 * min_segment:
+            logger.warning(f"[MON] {phase}/{accel}: {n} samples, too few for the latency step check "
+                           f"({min_segment} on each side)")
+        elif n:
+            step = latency_step(latencies, min_segment, self.step_frac)
+            if step is not None:
+                idx, shift = step
+                reasons.append(f"latency step of {shift:+.0%} at sample {idx}/{n}")
+                # The slower side is the contaminated one
+                invalid.update(range(idx, n) if shift > 0 else range(idx))
+
+        report = {
+            'phase': phase,
+            'accel': accel,
+            'valid': not reasons,
+            'reasons': reasons,
+            'invalid': sorted(invalid),
+            'readings': readings,
+            'sample_reading': [int(i) for i in sample_reading],
+        }
+        if reasons:
+            logger.warning(f"[MON] {phase}/{accel}: {'; '.join(reasons)}")
+        return report
+
+
+def run_monitored(monitor, phase, run, max_reruns=1, cooldown=None):
+    """
+    Run a phase, re-running it while the monitor flags its measurement.
+
+    run() executes the phase once and returns (result, measured) where
+    measured is {accel: (latencies or None, (t0, t1))}. Returns the result of
+    the last attempt and the monitor reports of all attempts.
+    """
+    reports = []
+    for attempt in range(max_reruns + 1):
+        result, measured = run()
+        if monitor is None:
+            return result, reports
+        attempt_reports = [dict(monitor.check(phase, accel, window, latencies), attempt=attempt)
+                           for accel, (latencies, window) in measured.items()]
+        reports.extend(attempt_reports)
+        if all(r['valid'] for r in attempt_reports):
+            break
+        if attempt < max_reruns:
+            logger.warning(f"[MON] Re-running {phase} (attempt {attempt + 2}/{max_reruns + 1})")
+            if cooldown is not None:
+                cooldown()
+    return result, reports
@@ -0,0 +1,514 @@
+"""
+Fractional co-location experiments: choose which CPU candidate x CLBlast
+kernel x NPU model (x background scenario) combinations to run, and estimate
+the effect of every factor from the reduced set.
+
+Each combination is one run_contention.py run. A space (plans/colocation_*.json) lists the factors and their levels:
+
+    factors    {"cpu": ["pareto_so_files/...so", ...] or {"glob": "..."},
+                "gpu_kernel": [0, ..., 6], "npu": ["matmul_1x1024x4096", ...],
+                "scenario": {"idle": [], "gpu_copy_8gbps": ["--bg", ...]}}
+    gpu_shape  m,k,n of the CLBlast kernel
+    responses  result metrics to analyze (default: the contended / standalone
+               mean slowdown of each accelerator, see RESPONSES)
+
+Designs:
+  oa   strength-2 orthogonal array (Bose construction, q^2 runs for a prime
+       q): every pair of levels of any two factors appears equally often.
+       A factor with more levels than q has its levels nested in q groups
+       (round robin within a group), one with fewer has symbols folded onto
+       its levels.
+  lhs  Latin hypercube for discrete factors: every level of every factor
+       appears equally often, best of several random draws by the smallest
+       distance between runs (maximin).
+
+`analyze` fits main effects (least squares on the levels, ridge-stabilized
+for levels seen only once or twice) and one interaction degree of freedom per
+factor pair (gamma * effect_a * effect_b), fitted jointly with sum-to-zero
+main effects. Each factor's importance is the share of the response variance lost when it
+is dropped from the model. `refine` predicts every untried combination from
+that model and proposes the ones with the most extreme prediction (the worst
+interference with --goal max, the best co-location with --goal min). Runs
+are sequential: `run` skips combinations that already have a result.
+
+Usage:
+    python experiment_planner.py plan plans/colocation_1x1024x3072.json --design oa -o plan.json
+    python experiment_planner.py run plan.json --out doe/colocation
+    python experiment_planner.py analyze plans/colocation_1x1024x3072.json doe/colocation
+    python experiment_planner.py refine plans/colocation_1x1024x3072.json doe/colocation --runs 12 -o refine.json
+    python experiment_planner.py demo     # host check with a synthetic response
+"""
+
+import os
+import re
+import glob
+import json
+import argparse
+import itertools
+import logging
+
+import numpy as np
+
+from regression_suite import run_combination
+
+logger = logging.getLogger(__name__)
+
+
+def _slowdown(accel):
+    def response(result):
+        standalone, contended = result.get(f"{accel}_stat_standalone"), result.get(f"{accel}_stat")
+        if not standalone or not contended or 'mean' not in standalone or 'mean' not in contended:
+            return None
+        return contended['mean'] / standalone['mean'] - 1
+    return response
+
+
+RESPONSES = {
+    'cpu_slowdown': _slowdown('cpu'),
+    'gpu_slowdown': _slowdown('gpu'),
+    'npu_slowdown': _slowdown('npu'),
+}
+
+
+def load_space(path):
+    """Space JSON with every factor expanded to a list of (label, value) levels."""
+    with open(path) as f:
+        space = json.load(f)
+    factors = {}
+    for name, levels in space['factors'].items():
+        if isinstance(levels, dict) and 'glob' in levels:
+            levels = sorted(glob.glob(levels['glob']))
+        if isinstance(levels, dict):
+            factors[name] = list(levels.items())
+        else:
+            factors[name] = [(level_label(name, value), value) for value in levels]
+        if not factors[name]:
+            raise ValueError(f"Factor '{name}' of {path} has no levels")
+    space['factors'] = factors
+    space.setdefault('responses', list(RESPONSES))
+    return space
+
+
+def level_label(factor, value):
+    """Short label of a level: the candidate of a CPU .so, otherwise the value itself."""
+    if factor == 'cpu':
+        stem = os.path.basename(str(value))
+        match = re.search(r"(cand\d+)", stem)
+        return match.group(1) if match else os.path.splitext(stem)[0]
+    return str(value)
+
+
+def run_args(space, combination):
+    """run_contention.py arguments of one combination ({factor: value})."""
+    args = ["-c", combination['cpu'], "-g", f"{combination['gpu_kernel']},{space['gpu_shape']}", "-n", combination['npu']]
+    return args + space.get('common_args', []) + list(combination.get('scenario', []))
+
+
+def run_key(space, levels):
+    """Result file key of a combination (level indices)."""
+    return "__".join(space['factors'][name][i][0] for name, i in zip(space['factors'], levels))
+
+
+# ---------------------------------------------------------------- designs
+
+def _is_prime(q):
+    return q >= 2 and all(q % d for d in range(2, int(q ** 0.5) + 1))
+
+
+def orthogonal_array(q, num_factors):
+    """Strength-2 OA(q^2, num_factors, q) for a prime q (num_factors <= q + 1)."""
+    if not _is_prime(q) or num_factors > q + 1:
+        raise ValueError(f"Bose construction needs a prime q >= num_factors - 1, got q={q}")
+    i, j = np.divmod(np.arange(q * q), q)
+    columns = [i] + [(j + k * i) % q for k in range(q)]
+    return np.stack(columns[:num_factors], axis=1)
+
+
+def oa_design(level_counts, q=None, blocks=1, seed=0):
+    """
+    Level indices of an orthogonal-array design. q defaults to the smallest
+    prime >= the largest level count up to 7 (larger factors are nested).
+    blocks > 1 stacks OAs with shuffled symbols, so nested levels rotate.
+    """
+    rng = np.random.default_rng(seed)
+    if q is None:
+        q = max(2, min(max(level_counts), 7))
+        while not _is_prime(q) or q + 1 < len(level_counts):
+            q += 1
+    runs = []
+    offsets = [0] * len(level_counts)
+    for block in range(blocks):
+        oa = orthogonal_array(q, len(level_counts))
+        if block:
+            oa = np.stack([rng.permutation(q)[oa[:, f]] for f in range(oa.shape[1])], axis=1)
+        for row in oa:
+            levels = []
+            for f, (symbol, count) in enumerate(zip(row, level_counts)):
+                if count <= q:
+                    levels.append(int(symbol) % count)
+                    continue
+                # Levels symbol, symbol + q, symbol + 2q, ... form the group of this symbol
+                group = list(range(int(symbol), count, q))
+                levels.append(group[offsets[f] % len(group)])
+                offsets[f] += 1
+            runs.append(tuple(levels))
+    return list(dict.fromkeys(runs))
+
+
+def lhs_design(level_counts, runs, seed=0, candidates=50):
+    """Level indices of a discrete Latin hypercube (balanced levels), maximin over random draws."""
+    rng = np.random.default_rng(seed)
+    best, best_score = None, -1
+    for _ in range(candidates):
+        design = np.stack([rng.permutation(np.arange(runs) % count) for count in level_counts], axis=1)
+        # Hamming distance between runs: pairs that share many levels tell little apart
+        distance = (design[:, None, :] != design[None, :, :]).sum(axis=2)
+        np.fill_diagonal(distance, len(level_counts) + 1)
+        score = (distance.min(), -(distance == distance.min()).sum())
+        if best is None or score > best_score:
+            best, best_score = design, score
+    return list(dict.fromkeys(tuple(int(x) for x in row) for row in best))
+
+
+def plan(space, design="oa", runs=None, blocks=1, seed=0):
+    """Plan of a space: [{'key', 'levels': {factor: label}, 'args'}]."""
+    level_counts = [len(levels) for levels in space['factors'].values()]
+    if design == "oa":
+        rows = oa_design(level_counts, blocks=blocks, seed=seed)
+    elif design == "lhs":
+        rows = lhs_design(level_counts, runs or max(level_counts) * 2, seed=seed)
+    elif design == "full":
+        rows = list(itertools.product(*(range(count) for count in level_counts)))
+    else:
+        raise ValueError(f"Unknown design '{design}'")
+    full = int(np.prod(level_counts))
+    logger.info(f"[DOE] {design}: {len(rows)} of {full} combinations ({len(rows) / full:.1%})")
+    return [plan_entry(space, row) for row in rows]
+
+
+def plan_entry(space, row):
+    combination = {name: space['factors'][name][i][1] for name, i in zip(space['factors'], row)}
+    return {'key': run_key(space, row),
+            'levels': {name: space['factors'][name][i][0] for name, i in zip(space['factors'], row)},
+            'args': run_args(space, combination)}
+
+
+def run_plan(plan_entries, out_dir):
+    """Run every planned combination that has no result in out_dir yet; returns the failed keys."""
+    os.makedirs(out_dir, exist_ok=True)
+    todo = [entry for entry in plan_entries if not os.path.exists(os.path.join(out_dir, f"{entry['key']}.json"))]
+    logger.info(f"[DOE] {len(plan_entries) - len(todo)} of {len(plan_entries)} combinations already in {out_dir}")
+    failed = []
+    for i, entry in enumerate(todo, 1):
+        logger.info(f"\n[DOE] [{i}/{len(todo)}] {entry['key']}")
+        if not run_combination(entry['key'], entry['args'], out_dir, label="DOE"):
+            failed.append(entry['key'])
+    return failed
+
+
+# ---------------------------------------------------------------- analysis
+
+def load_observations(space, result_dir):
+    """(level index rows, {response: values}) of the results in result_dir that belong to the space."""
+    labels = {name: {label: i for i, (label, _) in enumerate(levels)} for name, levels in space['factors'].items()}
+    rows, values = [], {name: [] for name in space['responses']}
+    for path in sorted(glob.glob(os.path.join(result_dir, "*.json"))):
+        parts = os.path.basename(path)[:-len(".json")].split("__")
+        if len(parts) != len(labels) or any(p not in labels[f] for p, f in zip(parts, labels)):
+            continue
+        with open(path) as f:
+            result = json.load(f)
+        rows.append(tuple(labels[f][p] for p, f in zip(parts, labels)))
+        for name in space['responses']:
+            values[name].append(RESPONSES[name](result))
+    return rows, values
+
+
+def _one_hot(rows, level_counts):
+    rows = np.asarray(rows)
+    return [np.eye(count)[rows[:, f]] for f, count in enumerate(level_counts)]
+
+
+def _contrasts(count):
+    """Orthonormal basis (count x count-1) of the level effects that sum to zero."""
+    basis, _ = np.linalg.qr(np.concatenate([np.ones((count, 1)), np.eye(count)[:, :-1]], axis=1))
+    return basis[:, 1:]
+
+
+def _fit(columns, y, ridge):
+    """Ridge least squares with an unpenalized intercept; returns (intercept, coefficients, residual SS)."""
+    X = np.concatenate(columns, axis=1) if columns else np.zeros((len(y), 0))
+    mean = y.mean()
+    if X.shape[1] == 0:
+        return mean, np.zeros(0), float(((y - mean) ** 2).sum())
+    Xc = X - X.mean(axis=0)
+    coef = np.linalg.solve(Xc.T @ Xc + ridge * np.eye(X.shape[1]), Xc.T @ (y - mean))
+    intercept = mean - X.mean(axis=0) @ coef
+    residual = y - intercept - X @ coef
+    return intercept, coef, float((residual ** 2).sum())
+
+
+def _fit_interactions(rows, y, level_counts, intercept, effects, pairs, ridge, iterations=100):
+    """
+    Least squares of y = intercept + sum of the main effects + sum over the
+    pairs of gamma * effect_a * effect_b (Levenberg-Marquardt, starting from
+    the additive fit). The effects stay in sum-to-zero coding: gamma is only
+    defined for centered effects, and refitting them with the interaction
+    keeps the many-level factors from absorbing it (a CPU candidate run twice
+    has enough freedom to swallow most of a Tukey term fitted afterwards).
+    Returns (intercept, effects, {pair: gamma}, residual SS).
+    """
+    rows = np.asarray(rows)
+    bases = [_contrasts(count) for count in level_counts]
+    sizes = [basis.shape[1] for basis in bases]
+    one_hot = _one_hot(rows, level_counts)
+    theta = np.concatenate([[intercept]] + [basis.T @ e for basis, e in zip(bases, effects)] + [np.zeros(len(pairs))])
+    penalty = np.concatenate([[0.0], np.full(sum(sizes), ridge), np.zeros(len(pairs))])
+
+    def unpack(theta):
+        coefs = np.split(theta[1:1 + sum(sizes)], np.cumsum(sizes)[:-1])
+        return theta[0], [basis @ c for basis, c in zip(bases, coefs)], dict(zip(pairs, theta[1 + sum(sizes):]))
+
+    def residual(theta):
+        intercept, effects, gammas = unpack(theta)
+        at = [e[rows[:, f]] for f, e in enumerate(effects)]
+        r = y - intercept - sum(at) - sum(g * at[a] * at[b] for (a, b), g in gammas.items())
+        return r, at, gammas
+
+    def objective(theta):
+        r = residual(theta)[0]
+        return float(r @ r + penalty @ theta ** 2)
+
+    damping, current = 1e-3, objective(theta)
+    for _ in range(iterations):
+        _, at, gammas = residual(theta)
+        columns = [np.ones((len(y), 1))]
+        for f, basis in enumerate(bases):
+            slope = np.ones(len(y))
+            for (a, b), g in gammas.items():
+                if f in (a, b):
+                    slope = slope + g * at[b if f == a else a]
+            columns.append((one_hot[f] * slope[:, None]) @ basis)
+        columns += [(at[a] * at[b])[:, None] for a, b in pairs]
+        J = np.concatenate(columns, axis=1)
+        A = J.T @ J + np.diag(penalty)
+        gradient = J.T @ residual(theta)[0] - penalty * theta
+        while damping < 1e8:
+            step = np.linalg.solve(A + damping * np.diag(np.diag(A) + 1e-12), gradient)
+            value = objective(theta + step)
+            if value <= current:
+                break
+            damping *= 5
+        else:
+            break
+        theta, improvement, current = theta + step, current - value, value
+        damping = max(damping / 3, 1e-9)
+        if improvement <= 1e-12 * current:
+            break
+    intercept, effects, gammas = unpack(theta)
+    r = residual(theta)[0]
+    return float(intercept), effects, {pair: float(g) for pair, g in gammas.items()}, float(r @ r)
+
+
+def fit_effects(rows, y, level_counts, ridge=1e-3):
+    """
+    Main effects of every level (centered per factor), each factor's
+    importance (share of the variance lost without it), and the
+    one-degree-of-freedom interaction of every factor pair with its share of
+    the variance (lost when that pair's gamma is dropped from the joint fit).
+    """
+    rows, y = list(rows), np.asarray(y, dtype=np.float64)
+    blocks = _one_hot(rows, level_counts)
+    total_ss = float(((y - y.mean()) ** 2).sum()) or 1e-12
+    intercept, coef, main_ss = _fit(blocks, y, ridge)
+    effects, start = [], 0
+    for count in level_counts:
+        effect = coef[start:start + count]
+        effects.append(effect - effect.mean())
+        start += count
+    intercept = y.mean() - sum(float(np.mean(e[np.asarray(rows)[:, f]])) for f, e in enumerate(effects))
+    importance = []
+    for f in range(len(level_counts)):
+        _, _, ss = _fit(blocks[:f] + blocks[f + 1:], y, ridge)
+        importance.append(max(0.0, (ss - main_ss) / total_ss))
+    all_pairs = list(itertools.combinations(range(len(level_counts)), 2))
+    pairs = [(a, b) for a, b in all_pairs if np.any(effects[a]) and np.any(effects[b])]
+    additive = intercept, effects
+    intercept, effects, gammas, ss = _fit_interactions(rows, y, level_counts, *additive, pairs, ridge)
+    interactions = {pair: (0.0, 0.0) for pair in all_pairs}
+    for pair in pairs:
+        _, _, _, ss_without = _fit_interactions(rows, y, level_counts, *additive, [p for p in pairs if p != pair], ridge)
+        interactions[pair] = (gammas[pair], max(0.0, (ss_without - ss) / total_ss))
+    return {'intercept': float(intercept), 'effects': effects, 'importance': importance,
+            'interactions': interactions, 'r2': 1 - main_ss / total_ss, 'runs': len(y)}
+
+
+def predict(model, rows):
+    rows = np.asarray(rows)
+    prediction = np.full(len(rows), model['intercept'])
+    for f, effect in enumerate(model['effects']):
+        prediction += effect[rows[:, f]]
+    for (a, b), (gamma, _) in model['interactions'].items():
+        prediction += gamma * model['effects'][a][rows[:, a]] * model['effects'][b][rows[:, b]]
+    return prediction
+
+
+def analyze(space, rows, values, top=3):
+    """Fit every response; logs the factor importances, strongest levels and interactions."""
+    names = list(space['factors'])
+    level_counts = [len(levels) for levels in space['factors'].values()]
+    report = {}
+    for response, y in values.items():
+        keep = [i for i, v in enumerate(y) if v is not None]
+        if len(keep) < 3:
+            logger.info(f"[DOE] {response}: {len(keep)} results, nothing to fit")
+            continue
+        model = fit_effects([rows[i] for i in keep], [y[i] for i in keep], level_counts)
+        logger.info(f"\n[DOE] {response}: {model['runs']} runs, mean {model['intercept']:+.1%}, "
+                    f"main effects R^2 {model['r2']:.2f}")
+        entry = {'runs': model['runs'], 'mean': model['intercept'], 'r2': model['r2'], 'factors': {},
+                 'interactions': {}}
+        for f, name in enumerate(names):
+            effect = model['effects'][f]
+            labels = [label for label, _ in space['factors'][name]]
+            order = np.argsort(effect)[::-1]
+            seen = set(r[f] for r in (rows[i] for i in keep))
+            entry['factors'][name] = {'importance': model['importance'][f],
+                                      'effects': {labels[i]: float(effect[i]) for i in range(len(labels)) if i in seen}}
+            ranked = [f"{labels[i]} {effect[i]:+.1%}" for i in order if i in seen]
+            strongest, weakest = ", ".join(ranked[:top]), ", ".join(ranked[::-1][:top])
+            logger.info(f"[DOE]   {name:<12} importance {model['importance'][f]:6.1%}   "
+                        f"highest: {strongest}   lowest: {weakest}")
+        for (a, b), (gamma, share) in sorted(model['interactions'].items(), key=lambda kv: -kv[1][1]):
+            entry['interactions'][f"{names[a]}x{names[b]}"] = {'gamma': gamma, 'share': share}
+            pair = f"{names[a]} x {names[b]}"
+            logger.info(f"[DOE]   {pair:<25} interaction {share:6.1%} of the variance (gamma {gamma:+.2f})")
+        entry['model'] = model
+        report[response] = entry
+    return report
+
+
+def refine(space, rows, values, response, runs, goal="max", seed=0, max_candidates=200000):
+    """Untried combinations with the most extreme predicted response under the fitted model."""
+    level_counts = [len(levels) for levels in space['factors'].values()]
+    keep = [i for i, v in enumerate(values[response]) if v is not None]
+    if len(keep) < 3:
+        raise ValueError(f"Need at least 3 results with {response} to refine")
+    model = fit_effects([rows[i] for i in keep], [values[response][i] for i in keep], level_counts)
+    full = int(np.prod(level_counts))
+    if full <= max_candidates:
+        candidates = list(itertools.product(*(range(count) for count in level_counts)))
+    else:
+        rng = np.random.default_rng(seed)
+        candidates = list({tuple(int(rng.integers(count)) for count in level_counts) for _ in range(max_candidates)})
+    tried = set(rows)
+    candidates = [c for c in candidates if c not in tried]
+    prediction = predict(model, candidates)
+    order = np.argsort(prediction)
+    if goal == "max":
+        order = order[::-1]
+    chosen = [candidates[i] for i in order[:runs]]
+    for row, value in zip(chosen, prediction[order[:runs]]):
+        logger.info(f"[DOE] {run_key(space, row):<48} predicted {response} {value:+.1%}")
+    return [dict(plan_entry(space, row), predicted=float(value)) for row, value in zip(chosen, prediction[order[:runs]])]
+
+
+def demo(design, seed=0):
+    """Synthetic 59 x 7 x 3 space with known effects: compare the estimates of a design with the truth."""
+    rng = np.random.default_rng(seed)
+    level_counts = [59, 7, 3]
+    truth = [rng.normal(0, s, c) for s, c in zip((0.10, 0.05, 0.02), level_counts)]
+    truth = [t - t.mean() for t in truth]
+    gamma = 4.0  # cpu x gpu interaction: heavy CPU candidates suffer more from heavy GPU kernels
+
+    def response(row):
+        cpu, gpu, npu = (t[i] for t, i in zip(truth, row))
+        return 0.2 + cpu + gpu + npu + gamma * cpu * gpu + rng.normal(0, 0.005)
+
+    space = {'factors': {name: [(f"{name}{i}", i) for i in range(c)] for name, c in zip(("cpu", "gpu", "npu"), level_counts)}}
+    if design == "oa":
+        rows = oa_design(level_counts, blocks=2, seed=seed)
+    else:
+        rows = lhs_design(level_counts, 118, seed=seed)
+    y = [response(row) for row in rows]
+    model = fit_effects(rows, y, level_counts)
+    full = int(np.prod(level_counts))
+    logger.info(f"[DOE] demo ({design}): {len(rows)} of {full} combinations ({len(rows) / full:.1%})")
+    for name, est, true in zip(("cpu", "gpu", "npu"), model['effects'], truth):
+        seen = sorted(set(r[("cpu", "gpu", "npu").index(name)] for r in rows))
+        corr = np.corrcoef(est[seen], true[seen])[0, 1]
+        logger.info(f"[DOE]   {name}: importance {model['importance'][('cpu', 'gpu', 'npu').index(name)]:.1%}, "
+                    f"effect correlation with the truth {corr:.3f} ({len(seen)}/{len(true)} levels run)")
+    logger.info(f"[DOE]   cpu x gpu gamma {model['interactions'][(0, 1)][0]:+.2f} (true {gamma:+.2f})")
+    all_rows = list(itertools.product(*(range(c) for c in level_counts)))
+    true_all = np.array([0.2 + sum(t[i] for t, i in zip(truth, row)) + gamma * truth[0][row[0]] * truth[1][row[1]]
+                         for row in all_rows])
+    best_true = set(np.argsort(true_all)[::-1][:20])
+    predicted = predict(model, all_rows)
+    hits = len(best_true & set(np.argsort(predicted)[::-1][:20]))
+    logger.info(f"[DOE]   {hits}/20 of the worst-interference combinations found by the prediction")
+    return model
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Plan, run and analyze fractional co-location experiments.",
+                                     epilog=__doc__[__doc__.index("Usage:"):],
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest="command", required=True)
+    plan_p = sub.add_parser("plan", help="Write the runs of a design")
+    plan_p.add_argument("space")
+    plan_p.add_argument("--design", choices=["oa", "lhs", "full"], default="oa")
+    plan_p.add_argument("--runs", type=int, help="Runs of an lhs design (default: twice the largest level count)")
+    plan_p.add_argument("--blocks", type=int, default=1, help="Stacked orthogonal arrays (oa)")
+    plan_p.add_argument("--seed", type=int, default=0)
+    plan_p.add_argument("-o", "--output", required=True)
+    run_p = sub.add_parser("run", help="Run a plan (combinations with a result in --out are skipped)")
+    run_p.add_argument("plan")
+    run_p.add_argument("--out", required=True)
+    analyze_p = sub.add_parser("analyze", help="Estimate main effects and interactions from the results")
+    analyze_p.add_argument("space")
+    analyze_p.add_argument("results")
+    analyze_p.add_argument("-o", "--output", help="Write the effects as JSON")
+    refine_p = sub.add_parser("refine", help="Plan untried combinations with the most extreme predicted response")
+    refine_p.add_argument("space")
+    refine_p.add_argument("results")
+    refine_p.add_argument("--response", default="cpu_slowdown", choices=list(RESPONSES))
+    refine_p.add_argument("--goal", choices=["max", "min"], default="max",
+                          help="max: worst interference, min: best co-location")
+    refine_p.add_argument("--runs", type=int, default=10)
+    refine_p.add_argument("-o", "--output", required=True)
+    demo_p = sub.add_parser("demo", help="Synthetic space with known effects (host check)")
+    demo_p.add_argument("--design", choices=["oa", "lhs"], default="oa")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='[%(asctime)s.%(msecs)03d] %(message)s', datefmt='%H:%M:%S')
+    if args.command == "demo":
+        demo(args.design)
+    elif args.command == "plan":
+        entries = plan(load_space(args.space), args.design, args.runs, args.blocks, args.seed)
+        with open(args.output, "w") as f:
+            json.dump(entries, f, indent=2)
+        logger.info(f"[DOE] Saved {len(entries)} runs to {args.output}")
+    elif args.command == "run":
+        with open(args.plan) as f:
+            failed = run_plan(json.load(f), args.out)
+        if failed:
+            logger.error(f"[DOE] {len(failed)} runs failed: {', '.join(failed)}")
+    elif args.command == "analyze":
+        space = load_space(args.space)
+        report = analyze(space, *load_observations(space, args.results))
+        if args.output:
+            for entry in report.values():
+                del entry['model']
+            with open(args.output, "w") as f:
+                json.dump(report, f, indent=2)
+    else:
+        space = load_space(args.space)
+        entries = refine(space, *load_observations(space, args.results), args.response, args.runs, args.goal)
+        with open(args.output, "w") as f:
+            json.dump(entries, f, indent=2)
+        logger.info(f"[DOE] Saved {len(entries)} runs to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,282 @@
+"""
+Headless report of run_contention.py results (replaces plot.ipynb).
+
+Reads any number of result files or result directories (result/, a
+regression_suite.py result set, ...). All samples of an accelerator/phase go
+into one NaN-padded matrix with one row per run, so percentiles and CDFs of
+all runs come from single nanpercentile / nanquantile calls.
+
+The report has a summary page and one page per run. The summary shows a
+percentile table and the contended / standalone p50 and p99 slowdowns of
+every accelerator. Each run page shows standalone vs contended CDFs of the
+CPU, GPU and NPU. Runs that only have NPU summary stats (qnn-net-run) get a
+5-point pseudo CDF like the notebook's. The output is HTML (PNG pages
+embedded) or PDF depending on the extension. --csv also writes the
+percentile table.
+
+Usage:
+    python make_report.py result/ -o report.html
+    python make_report.py regression/20251201_101500 -o sweep.pdf --csv sweep.csv
+"""
+
+import io
+import os
+import re
+import csv
+import glob
+import json
+import base64
+import warnings
+import argparse
+import logging
+from pathlib import Path
+
+import numpy as np
+import matplotlib
+matplotlib.use("Agg")
+import matplotlib.pyplot as plt
+from matplotlib.backends.backend_pdf import PdfPages
+
+logger = logging.getLogger(__name__)
+
+ACCELS = ("cpu", "gpu", "npu")
+PHASES = (("standalone", "_standalone"), ("contended", ""))
+PERCENTILES = (50, 90, 99, 99.9)
+# Quantile grid of the CDF curves
+CDF_QS = np.linspace(0.0, 1.0, 201)
+# Files in result directories that are not run_contention.py results
+NON_RESULT = re.compile(r"^(spans_|slo_)|^(comparison|manifest|suite)\.json$")
+
+
+def load_results(paths):
+    """
+    [(label, result)] of all run_contention.py result files under the given files/directories.
+    With several inputs each label starts with its source directory (base/..., new/...) so runs stay apart.
+    """
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            source = os.path.basename(os.path.normpath(os.path.abspath(path)))
+            files += [(source, p) for p in sorted(glob.glob(os.path.join(path, "*.json")))
+                      if not NON_RESULT.search(os.path.basename(p))]
+        else:
+            files.append((os.path.basename(os.path.dirname(os.path.abspath(path))), path))
+    runs = []
+    for source, path in files:
+        with open(path) as f:
+            result = json.load(f)
+        if "cpu_kernel_path" not in result:
+            continue
+        stem = Path(path).stem
+        if "__" not in stem:
+            # Plain result/<timestamp>.json: name the run after what it measured
+            stem = f"{Path(result['cpu_kernel_path']).stem} g{result['gpu_kernel_config']} {' '.join(result.get('bg', []))}".strip()
+        runs.append((f"{source}/{stem}" if len(paths) > 1 else stem, result))
+    return runs
+
+
+def latency_matrix(results, accel, suffix):
+    """NaN-padded (runs x samples) matrix of one series, with monitor-flagged samples removed."""
+    series = []
+    for result in results:
+        latencies = result.get(f"{accel}_latency{suffix}") or []
+        invalid = set(result.get(f"{accel}_invalid{suffix}", []))
+        series.append([x for i, x in enumerate(latencies) if i not in invalid])
+    mat = np.full((len(series), max([len(s) for s in series] + [1])), np.nan)
+    for row, s in zip(mat, series):
+        row[:len(s)] = s
+    return mat
+
+
+def pseudo_quantiles(stat):
+    """Quantiles at CDF_QS from (min, mean -/+ std/2, max), as in plot.ipynb; NaN if there is no stat."""
+    if not stat:
+        return np.full(len(CDF_QS), np.nan)
+    std = stat.get('std', (stat['max'] - stat['min']) / 4)
+    x = np.maximum.accumulate([stat['min'], stat['mean'] - std / 2, stat['mean'], stat['mean'] + std / 2, stat['max']])
+    return np.interp(CDF_QS, [0, 0.25, 0.5, 0.75, 1.0], x)
+
+
+def compute_series(results):
+    """
+    {(accel, phase): {'n', 'percentiles' (runs x P), 'mean', 'quantiles' (Q x runs), 'pseudo' (runs,)}}.
+    Rows without samples fall back to the pseudo CDF of their summary stats.
+    """
+    series = {}
+    for accel, (phase, suffix) in ((a, p) for a in ACCELS for p in PHASES):
+        mat = latency_matrix(results, accel, suffix)
+        n = np.sum(~np.isnan(mat), axis=1)
+        # All-NaN rows (no samples) are expected and filled in below
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", RuntimeWarning)
+            percentiles = np.nanpercentile(mat, PERCENTILES, axis=1).T
+            quantiles = np.nanquantile(mat, CDF_QS, axis=1)
+            mean = np.nanmean(mat, axis=1)
+        pseudo = n == 0
+        for i in np.flatnonzero(pseudo):
+            stat = results[i].get(f"{accel}_stat{suffix}")
+            quantiles[:, i] = pseudo_quantiles(stat)
+            percentiles[i] = np.interp(np.array(PERCENTILES) / 100, CDF_QS, quantiles[:, i])
+            mean[i] = stat['mean'] if stat else np.nan
+        series[(accel, phase)] = {'n': n, 'percentiles': percentiles, 'mean': mean,
+                                  'quantiles': quantiles, 'pseudo': pseudo}
+    return series
+
+
+def percentile_rows(labels, series):
+    rows = []
+    for accel in ACCELS:
+        base, cont = series[(accel, "standalone")], series[(accel, "contended")]
+        with np.errstate(all="ignore"):
+            slowdown = cont['percentiles'] / base['percentiles'] - 1
+        for i, label in enumerate(labels):
+            for phase, s in (("standalone", base), ("contended", cont)):
+                if np.isnan(s['mean'][i]):
+                    continue
+                # samples == 0: percentiles are estimated from the summary stats
+                row = {'run': label, 'accel': accel, 'phase': phase, 'samples': int(s['n'][i]),
+                       'mean_ms': float(s['mean'][i])}
+                row.update({f"p{p:g}_ms": float(v) for p, v in zip(PERCENTILES, s['percentiles'][i])})
+                if phase == "contended":
+                    row['p50_slowdown'] = float(slowdown[i, 0])
+                    row['p99_slowdown'] = float(slowdown[i, PERCENTILES.index(99)])
+                rows.append(row)
+    return rows
+
+
+def summary_figure(labels, series):
+    fig, axes = plt.subplots(1, len(ACCELS), figsize=(6 * len(ACCELS), max(4, 0.25 * len(labels) + 1.5)), dpi=100)
+    y = np.arange(len(labels))
+    for ax, accel in zip(axes, ACCELS):
+        base, cont = series[(accel, "standalone")], series[(accel, "contended")]
+        with np.errstate(all="ignore"):
+            slowdown = cont['percentiles'] / base['percentiles'] - 1
+        ax.barh(y - 0.2, slowdown[:, 0] * 100, height=0.4, label="p50")
+        ax.barh(y + 0.2, slowdown[:, PERCENTILES.index(99)] * 100, height=0.4, label="p99")
+        ax.set_yticks(y)
+        ax.set_yticklabels(labels if accel == ACCELS[0] else [], fontsize=8)
+        ax.invert_yaxis()
+        ax.set_title(f"{accel.upper()} contended vs standalone", fontweight='bold')
+        ax.set_xlabel("Slowdown (%)")
+        ax.grid(True, axis='x', alpha=0.3, linestyle='--')
+        ax.legend()
+    fig.tight_layout()
+    return fig
+
+
+def run_figure(label, i, series):
+    fig, axes = plt.subplots(1, len(ACCELS), figsize=(4 * len(ACCELS), 4), dpi=100)
+    for ax, accel in zip(axes, ACCELS):
+        xmax = 0.0
+        for phase, _ in PHASES:
+            s = series[(accel, phase)]
+            q = s['quantiles'][:, i]
+            if np.all(np.isnan(q)):
+                continue
+            ax.plot(q, CDF_QS, label=phase.capitalize() + (" (stats)" if s['pseudo'][i] else ""),
+                    linewidth=2.5, alpha=0.85, linestyle="--" if s['pseudo'][i] else "-")
+            xmax = max(xmax, np.nanmax(q))
+        ax.set_title(accel.upper(), fontsize=16, fontweight='bold')
+        ax.set_xlabel("Latency (ms)")
+        ax.set_ylabel("CDF")
+        ax.set_xlim(0, xmax * 1.1 if xmax > 0 else 1)
+        ax.set_ylim(-0.02, 1.05)
+        ax.grid(True, alpha=0.3, linestyle='--')
+        ax.spines['top'].set_visible(False)
+        ax.spines['right'].set_visible(False)
+        ax.legend(fontsize=9)
+    fig.suptitle(label, fontsize=11)
+    fig.tight_layout()
+    return fig
+
+
+def render_html(path, labels, series, rows):
+    def png(fig):
+        buf = io.BytesIO()
+        fig.savefig(buf, format="png")
+        plt.close(fig)
+        return base64.b64encode(buf.getvalue()).decode()
+
+    columns = list(rows[0].keys()) if rows else []
+    columns += [c for r in rows for c in r if c not in columns]
+    table = "<table><tr>" + "".join(f"<th>{c}</th>" for c in columns) + "</tr>"
+    for r in rows:
+        cells = []
+        for c in columns:
+            v = r.get(c, "")
+            cells.append(f"{v:+.1%}" if c.endswith("slowdown") and v != "" else f"{v:.3f}" if isinstance(v, float) else str(v))
+        table += "<tr>" + "".join(f"<td>{v}</td>" for v in cells) + "</tr>"
+    table += "</table>"
+
+    parts = ["<html><head><meta charset='utf-8'><title>Contention report</title><style>",
+             "body{font-family:sans-serif} table{border-collapse:collapse;font-size:12px}",
+             "td,th{border:1px solid #ccc;padding:2px 6px;text-align:right} img{max-width:100%}",
+             "</style></head><body>",
+             f"<h1>Contention report ({len(labels)} runs)</h1>",
+             f"<img src='data:image/png;base64,{png(summary_figure(labels, series))}'>",
+             f"<h2>Percentiles (ms)</h2>{table}"]
+    for i, label in enumerate(labels):
+        parts.append(f"<h2>{label}</h2><img src='data:image/png;base64,{png(run_figure(label, i, series))}'>")
+    parts.append("</body></html>")
+    with open(path, "w") as f:
+        f.write("\n".join(parts))
+
+
+def render_pdf(path, labels, series, rows):
+    with PdfPages(path) as pdf:
+        fig = summary_figure(labels, series)
+        pdf.savefig(fig)
+        plt.close(fig)
+        # Percentile table, 40 rows per page (the CSV has all columns)
+        columns = ["run", "accel", "phase", "samples", "mean_ms", "p50_ms", "p99_ms", "p50_slowdown", "p99_slowdown"]
+        for start in range(0, len(rows), 40):
+            chunk = rows[start:start + 40]
+            cells = [[(f"{r[c]:+.1%}" if c.endswith("slowdown") else f"{r[c]:.3f}" if isinstance(r[c], float) else str(r[c]))
+                      if c in r else "" for c in columns] for r in chunk]
+            fig, ax = plt.subplots(figsize=(14, 0.25 * len(chunk) + 1))
+            ax.axis("off")
+            ax.table(cellText=cells, colLabels=columns, loc="center").auto_set_font_size(True)
+            pdf.savefig(fig)
+            plt.close(fig)
+        for i, label in enumerate(labels):
+            fig = run_figure(label, i, series)
+            pdf.savefig(fig)
+            plt.close(fig)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Render a CDF / percentile report of contention results.",
+                                     epilog=__doc__[__doc__.index("Usage:"):],
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("inputs", nargs="+", help="Result files or directories")
+    parser.add_argument("-o", "--output", default="report.html", help="Report path (.html or .pdf)")
+    parser.add_argument("--csv", help="Also write the percentile table to this CSV file")
+    parser.add_argument("--filter", help="Only runs whose label matches this regex")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='[%(asctime)s.%(msecs)03d] %(message)s', datefmt='%H:%M:%S')
+    runs = load_results(args.inputs)
+    if args.filter:
+        runs = [(label, r) for label, r in runs if re.search(args.filter, label)]
+    if not runs:
+        parser.error("No run_contention.py results found")
+    labels = [label for label, _ in runs]
+    series = compute_series([r for _, r in runs])
+    rows = percentile_rows(labels, series)
+
+    if args.csv:
+        columns = list(dict.fromkeys(c for r in rows for c in r))
+        with open(args.csv, "w", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=columns)
+            writer.writeheader()
+            writer.writerows(rows)
+        logger.info(f"Saved percentile table to {args.csv}")
+    if args.output.endswith(".pdf"):
+        render_pdf(args.output, labels, series, rows)
+    else:
+        render_html(args.output, labels, series, rows)
+    logger.info(f"Saved report of {len(runs)} runs to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
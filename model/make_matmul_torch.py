@@ -1,37 +1,125 @@
 import argparse
+import json
+import math
 import torch
 import torch.nn as nn
 import numpy as np
 
 
+# Converter / qnn-net-run flags per I/O data type, written to model_config.env.
+# float32 keeps the original behaviour: 8-bit quantized graph with float I/O.
+# 8-bit QNN activations are unsigned fixed point, so native int8 inputs are raw uint8 bytes
+# quantized with the input encoding pinned in input_encodings.json.
+IO_DTYPES = {
+    "float32": {"converter_flags": "--weights_bitwidth 8 --act_bitwidth 8", "net_run_flags": "", "np_dtype": None},
+    "int8": {"converter_flags": "--weights_bitwidth 8 --act_bitwidth 8 --quantization_overrides ./input_encodings.json",
+             "net_run_flags": "--use_native_input_files", "np_dtype": np.uint8},
+    "fp16": {"converter_flags": "--float_bitwidth 16", "net_run_flags": "--use_native_input_files", "np_dtype": np.float16},
+}
+
+ACTIVATIONS = {
+    "none": None,
+    "relu": nn.ReLU,
+    "gelu": nn.GELU,
+}
+
+
 def parse_args():
     p = argparse.ArgumentParser(description="Create and save a small matmul Torch module and a raw input file.")
     # Positional arguments: allow omission to fall back to sensible defaults
     p.add_argument("M", type=int, nargs="?", default=1, help="Batch size / number of rows")
     p.add_argument("K", type=int, nargs="?", default=16, help="Input features / inner dim")
     p.add_argument("N", type=int, nargs="?", default=16, help="Output features / number of columns")
-    return p.parse_args()
+    p.add_argument("--layers", type=int, default=20, help="Number of Linear layers")
+    p.add_argument("--mode", choices=["sum", "chain"], default="sum",
+                   help="sum: every layer reads the input and outputs are summed; "
+                        "chain: layers feed into each other (K->N, then N->N)")
+    p.add_argument("--activation", choices=list(ACTIVATIONS), default="none", help="Activation after each Linear")
+    p.add_argument("--residual", action="store_true", help="Add a residual connection around each chained layer")
+    p.add_argument("--io_dtype", choices=list(IO_DTYPES), default="float32", help="Data type of the model inputs on the device")
+    p.add_argument("--num_inputs", type=int, default=1, help="Number of input files in the input list")
+    # Automatic depth selection
+    p.add_argument("--auto_depth", action="store_true",
+                   help="Pick --layers so that estimated NPU compute per inference dwarfs the launch overhead")
+    p.add_argument("--overhead_us", type=float, default=500.0, help="Per-inference overhead of qnn-net-run on the NPU")
+    p.add_argument("--overhead_ratio", type=float, default=10.0, help="Target ratio of compute time to overhead")
+    p.add_argument("--npu_tops", type=float, default=20.0, help="Assumed sustained NPU throughput (TOPS)")
+    p.add_argument("--npu_gbps", type=float, default=40.0, help="Assumed NPU weight-streaming bandwidth (GB/s)")
+    p.add_argument("--max_layers", type=int, default=512)
+    args = p.parse_args()
+    if args.residual and args.mode != "chain":
+        p.error("--residual requires --mode chain")
+    return args
+
+
+def estimate_layer_time_us(M, K, N, io_dtype, npu_tops, npu_gbps):
+    """Roofline estimate of one K->N Linear layer on the NPU."""
+    weight_bytes = K * N * (2 if io_dtype == "fp16" else 1)
+    compute_us = 2.0 * M * K * N / (npu_tops * 1e12) * 1e6
+    memory_us = weight_bytes / (npu_gbps * 1e9) * 1e6
+    return max(compute_us, memory_us)
+
+
+def auto_num_layers(M, K, N, args):
+    layer_us = estimate_layer_time_us(M, K, N, args.io_dtype, args.npu_tops, args.npu_gbps)
+    num_layers = math.ceil(args.overhead_ratio * args.overhead_us / layer_us)
+    num_layers = max(1, min(num_layers, args.max_layers))
+    print(f"auto depth: ~{layer_us:.1f} us/layer, {num_layers} layers -> "
+          f"~{num_layers * layer_us:.0f} us compute vs {args.overhead_us:.0f} us overhead")
+    return num_layers
+
+
+def input_encoding(xs, bitwidth=8):
+    """
+    Asymmetric QNN encoding of the calibration inputs (min/max widened to
+    include 0, as the converter's default quantizer does): real = scale * (q + offset).
+    """
+    lo, hi = min(0.0, min(float(x.min()) for x in xs)), max(0.0, max(float(x.max()) for x in xs))
+    levels = 2 ** bitwidth - 1
+    scale = (hi - lo) / levels
+    offset = int(round(lo / scale))
+    return {"bitwidth": bitwidth, "dtype": "int", "is_symmetric": "False",
+            "min": offset * scale, "max": (offset + levels) * scale, "offset": offset, "scale": scale}
+
+
+def quantize(x, encoding):
+    q = np.round(x / encoding["scale"]) - encoding["offset"]
+    return np.clip(q, 0, 2 ** encoding["bitwidth"] - 1).astype(np.uint8)
+
+
+def dequantize(q, encoding):
+    return (encoding["scale"] * (q.astype(np.float32) + encoding["offset"])).astype(np.float32)
 
 
 class MatMulModel(nn.Module):
-    def __init__(self, K: int, N: int):
+    def __init__(self, K: int, N: int, num_layers: int = 20, mode: str = "sum",
+                 activation: str = "none", residual: bool = False):
         super().__init__()
 
         self.K = K
         self.N = N
-        
+        self.mode = mode
+        self.residual = residual
+
+        act = ACTIVATIONS[activation]
         self.layers = nn.ModuleList([
-            nn.Sequential(nn.Linear(K, N, bias=False), 
-                        #   nn.ReLU()
-                          )
-            for _ in range(20)
+            nn.Sequential(nn.Linear(K if (mode == "sum" or i == 0) else N, N, bias=False),
+                          *([act()] if act else []))
+            for i in range(num_layers)
         ])
 
 
     def forward(self, x):
-        out = torch.zeros(x.shape[0], self.N)
+        if self.mode == "sum":
+            out = torch.zeros(x.shape[0], self.N)
+            for layer in self.layers:
+                out += layer(x)
+            return out
+
+        out = x
         for layer in self.layers:
-            out += layer(x)
+            y = layer(out)
+            out = y + out if (self.residual and y.shape == out.shape) else y
         return out
 
 def main():
@@ -40,7 +128,9 @@ def main():
     K = args.K
     N = args.N
 
-    model = MatMulModel(K, N).eval()
+    num_layers = auto_num_layers(M, K, N, args) if args.auto_depth else args.layers
+    model = MatMulModel(K, N, num_layers=num_layers, mode=args.mode,
+                        activation=args.activation, residual=args.residual).eval()
 
     example = torch.randn(M, K)
 
@@ -48,15 +138,48 @@ def main():
     # torch._C._jit_set_profiling_executor(False)
     # torch._C._jit_override_can_fuse_on_cpu(False)
     # torch.jit.optimized_execution(False)
-    
+
     traced = torch.jit.trace(model, example)
     traced.save("matmul.pt")
-    print(f"saved matmul of shape ({M}, {K}) @ ({K}, {N}) to matmul.pt")
+    print(f"saved matmul of shape ({M}, {K}) @ ({K}, {N}) to matmul.pt "
+          f"({num_layers} layers, mode={args.mode}, activation={args.activation}, residual={args.residual})")
+
+    # Float inputs are used for quantization calibration by the converter;
+    # target inputs are written in the device I/O data type.
+    io_cfg = IO_DTYPES[args.io_dtype]
+    xs = [np.random.randn(M, K).astype("float32") for _ in range(args.num_inputs)]
+    if io_cfg["np_dtype"] == np.uint8:
+        encoding = input_encoding(xs)
+        with open("input_encodings.json", "w") as f:
+            json.dump({"activation_encodings": {"x": [encoding]}, "param_encodings": {}}, f, indent=2)
+    calib_list, target_list = [], []
+    for i, x in enumerate(xs):
+        x.tofile(f"input_{i}.raw")
+        calib_list.append(f"./input_{i}.raw")
+        if io_cfg["np_dtype"] is None:
+            target_list.append(f"./input_{i}.raw")
+        else:
+            x_native = quantize(x, encoding) if io_cfg["np_dtype"] == np.uint8 else x.astype(io_cfg["np_dtype"])
+            x_native.tofile(f"target_input_{i}.raw")
+            target_list.append(f"./target_input_{i}.raw")
+            if io_cfg["np_dtype"] == np.uint8:
+                # The device sees the quantized input, so the reference does too
+                x = dequantize(x_native, encoding)
+        # Float reference output, checked once against the device by npu_validate.py
+        with torch.no_grad():
+            model(torch.from_numpy(x)).numpy().astype("float32").tofile(f"expected_output_{i}.raw")
+    print(f"saved {args.num_inputs} input(s), shape (M, K)=({M}, {K}), io_dtype={args.io_dtype}")
 
-    x = np.random.randn(M, K).astype("float32")
-    x.tofile("input_0.raw")
-    print(f"saved input_0.raw, shape (M, K)=({M}, {K})")
+    with open("input_list.txt", "w") as f:
+        f.write("\n".join(calib_list) + "\n")
+    with open("target_input_list.txt", "w") as f:
+        f.write("\n".join(target_list) + "\n")
+    with open("model_config.env", "w") as f:
+        f.write(f'NUM_LAYERS={num_layers}\n')
+        f.write(f'IO_DTYPE={args.io_dtype}\n')
+        f.write(f'CONVERTER_FLAGS="{io_cfg["converter_flags"]}"\n')
+        f.write(f'NET_RUN_FLAGS="{io_cfg["net_run_flags"]}"\n')
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
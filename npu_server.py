@@ -0,0 +1,234 @@
+"""
+Client for the persistent NPU runner (qnn_runner/).
+
+The runner loads libQnnHtp.so and the model once and then accepts
+run/start/stop commands over stdin, streaming one timing line per inference,
+so the NPU can be looped like the CPU and GPU without qnn-net-run startup.
+
+Host check with the fake backend (cmake -DQNN_RUNNER_FAKE_ONLY=ON):
+    python npu_server.py --local qnn_runner/build-host/qnn_runner --fake_us 2000
+"""
+
+import time
+import queue
+import collections
+import argparse
+import subprocess
+import threading
+import logging
+
+import numpy as np
+
+from npu_validate import MATMUL_LAYOUT, model_args
+
+logger = logging.getLogger(__name__)
+
+QNN_RUNNER_PATH = "/data/local/tmp/qnn/qnn_runner"
+
+
+class NpuServer:
+    """Drives one qnn_runner process through its line protocol."""
+
+    def __init__(self, command, label="NPU", ready_timeout=120, command_timeout=600):
+        """command_timeout: longest wait (s) for a run / stop / dump to finish."""
+        self.command = command
+        self.label = label
+        self.ready_timeout = ready_timeout
+        self.command_timeout = command_timeout
+        self.init_ms = None
+        self._proc = None
+        self._reader = None
+        self._stderr_reader = None
+        self._stderr_tail = collections.deque(maxlen=20)
+        self._events = queue.Queue()
+        self._latencies = []
+        self._queue_delays = []
+        self.queue_delays = []
+        self._lock = threading.Lock()
+
+    @classmethod
+    def on_device(cls, run_dir, runner_path=QNN_RUNNER_PATH, context_binary=True, layout=MATMUL_LAYOUT, **kwargs):
+        """Runner in a model directory prepared by qnn_prepare_model.sh (cached context binary if present)."""
+        lib_dir = layout['lib_dir']
+        cmd = (
+            f"cd {run_dir} && LD_LIBRARY_PATH={lib_dir} ADSP_LIBRARY_PATH={lib_dir} {runner_path} "
+            f"--backend {lib_dir}/libQnnHtp.so {model_args(context_binary, layout)} --input_list ./{layout['input_list']}"
+        )
+        return cls(["adb", "shell", cmd], **kwargs)
+
+    @classmethod
+    def local_fake(cls, runner_path, fake_us, fake_init_ms=0, fail_at=None, **kwargs):
+        """Host-built runner with the fake backend (fail_at: index of an inference that fails)."""
+        command = [runner_path, "--fake_us", str(fake_us), "--fake_init_ms", str(fake_init_ms)]
+        if fail_at is not None:
+            command += ["--fake_fail_at", str(fail_at)]
+        return cls(command, **kwargs)
+
+    def _read_loop(self):
+        for line in self._proc.stdout:
+            fields = line.split()
+            if not fields:
+                continue
+            if fields[0] == "T":
+                with self._lock:
+                    self._latencies.append(float(fields[2]) / 1000.0)  # us -> ms
+                    if len(fields) > 3:
+                        self._queue_delays.append(float(fields[3]) / 1000.0)
+            elif fields[0] in ("READY", "DONE", "ERR"):
+                self._events.put((fields[0], " ".join(fields[1:])))
+        self._events.put(("EOF", ""))
+
+    def _stderr_loop(self):
+        # Drain QNN / adb logging so the runner never blocks on a full stderr pipe
+        for line in self._proc.stderr:
+            line = line.rstrip()
+            if line:
+                self._stderr_tail.append(line)
+                logger.debug(f"[{self.label}] runner stderr: {line}")
+
+    def _stderr_text(self):
+        return "\n".join(self._stderr_tail)
+
+    def _wait_event(self, timeout=None):
+        try:
+            kind, payload = self._events.get(timeout=timeout)
+        except queue.Empty:
+            raise RuntimeError(f"[{self.label}] runner did not answer within {timeout:.0f} s, "
+                               f"stderr:\n{self._stderr_text()}") from None
+        if kind == "ERR":
+            raise RuntimeError(f"[{self.label}] runner error: {payload}")
+        if kind == "EOF":
+            raise RuntimeError(f"[{self.label}] runner exited unexpectedly, stderr:\n{self._stderr_text()}")
+        return kind, payload
+
+    def _send(self, line):
+        self._proc.stdin.write(line + "\n")
+        self._proc.stdin.flush()
+
+    def _take_latencies(self):
+        """Return the latencies since the last call; their queueing delays go to self.queue_delays."""
+        with self._lock:
+            latencies, self._latencies = self._latencies, []
+            self.queue_delays, self._queue_delays = self._queue_delays, []
+        return latencies
+
+    def _count(self):
+        with self._lock:
+            return len(self._latencies)
+
+    def open(self):
+        logger.info(f"[{self.label}] Starting persistent runner: {' '.join(self.command)}")
+        self._proc = subprocess.Popen(self.command, stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                                      stderr=subprocess.PIPE, text=True, bufsize=1)
+        self._reader = threading.Thread(target=self._read_loop, daemon=True)
+        self._reader.start()
+        self._stderr_reader = threading.Thread(target=self._stderr_loop, daemon=True)
+        self._stderr_reader.start()
+        kind, payload = self._wait_event(timeout=self.ready_timeout)
+        if kind != "READY":
+            raise RuntimeError(f"[{self.label}] expected READY, got {kind}")
+        self.init_ms = float(payload)
+        logger.info(f"[{self.label}] Runner ready (init {self.init_ms:.1f} ms)")
+        return self
+
+    def run(self, num_inferences, rate=None):
+        """Run a fixed number of inferences and return their latencies (ms)."""
+        if rate:
+            self.start(rate=rate)
+            deadline = time.time() + self.command_timeout
+            try:
+                while self._count() < num_inferences:
+                    # Only ERR or EOF can arrive while looping; _wait_event raises on both
+                    if not self._events.empty():
+                        self._wait_event()
+                    if time.time() > deadline:
+                        raise RuntimeError(f"[{self.label}] only {self._count()}/{num_inferences} inferences "
+                                           f"within {self.command_timeout:.0f} s")
+                    time.sleep(0.01)
+            except RuntimeError:
+                self._abort_loop()
+                raise
+            # The loop keeps going until it sees the stop: drop what it ran past num_inferences
+            latencies = self.stop()[:num_inferences]
+            self.queue_delays = self.queue_delays[:num_inferences]
+            return latencies
+        self._take_latencies()
+        self._send(f"run {num_inferences}")
+        self._wait_event(timeout=self.command_timeout)
+        return self._take_latencies()
+
+    def start(self, duty=1.0, rate=None):
+        """
+        Start looping inferences until stop(), busy for `duty` of the time.
+        rate=(kind, hz) with kind 'fixed' or 'poisson' issues requests open loop instead.
+        """
+        self._take_latencies()
+        if rate:
+            self._send(f"start {rate[0]} {rate[1]}")
+        else:
+            self._send("start" if duty >= 1.0 else f"start {duty}")
+
+    def _abort_loop(self):
+        """Stop a failed loop, so that its DONE does not answer the next command."""
+        if self._proc.poll() is not None:
+            return
+        try:
+            self.stop()
+        except (RuntimeError, OSError):
+            pass
+
+    def stop(self):
+        """Stop the loop and return the latencies (ms) of the looped inferences (queueing delays in self.queue_delays)."""
+        self._send("stop")
+        self._wait_event(timeout=self.command_timeout)
+        return self._take_latencies()
+
+    def dump(self, out_dir, input_path=None):
+        """Run input sample 0 (or the input file input_path) once and write its outputs to out_dir on the device."""
+        self._take_latencies()
+        self._send(f"dump {out_dir} {input_path}" if input_path else f"dump {out_dir}")
+        self._wait_event(timeout=self.command_timeout)
+
+    def close(self):
+        if self._proc is None:
+            return
+        try:
+            self._send("quit")
+            self._proc.wait(timeout=30)
+        except (BrokenPipeError, subprocess.TimeoutExpired):
+            self._proc.kill()
+        self._proc = None
+
+    def __enter__(self):
+        return self.open()
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Exercise the persistent NPU runner.")
+    group = parser.add_mutually_exclusive_group(required=True)
+    group.add_argument("--run_dir", help="Model directory on the device (e.g. /data/local/tmp/qnn/matmul_1x1024x4096)")
+    group.add_argument("--local", help="Path to a host-built runner (fake backend)")
+    parser.add_argument("--fake_us", type=float, default=1000.0)
+    parser.add_argument("-r", "--repeat", type=int, default=100)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='[%(asctime)s.%(msecs)03d] %(message)s', datefmt='%H:%M:%S')
+    if args.local:
+        server = NpuServer.local_fake(args.local, args.fake_us)
+    else:
+        server = NpuServer.on_device(args.run_dir)
+
+    with server:
+        latencies = np.array(server.run(args.repeat))
+        logger.info(f"run {args.repeat}: mean {latencies.mean():.3f} ms, min {latencies.min():.3f} ms, max {latencies.max():.3f} ms")
+        server.start()
+        threading.Event().wait(1.0)
+        looped = server.stop()
+        logger.info(f"looped for 1 s: {len(looped)} inferences")
+
+
+if __name__ == "__main__":
+    main()
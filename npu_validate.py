@@ -0,0 +1,175 @@
+"""
+One-off correctness check of the QNN model on the device.
+
+Benchmark runs discard the NPU outputs (qnn-net-run --keep_num_outputs 0, or
+the persistent runner's reused output buffer), so the output is checked once
+here instead: input sample 0 is run on the device, its float32 output is
+pulled and compared against the torch reference written by
+model/make_matmul_torch.py (expected_output_0.raw). With io_dtype=int8 the
+reference is the output of the dequantized device input.
+
+The QNN graph is 8-bit quantized (or fp16), so the comparison uses cosine
+similarity and relative L2 error instead of an elementwise tolerance.
+
+Usage:
+    python npu_validate.py -n matmul_1x1024x4096
+"""
+
+import os
+import glob
+import shutil
+import argparse
+import subprocess
+import tempfile
+import logging
+
+import numpy as np
+
+from phase_profiler import timed
+
+logger = logging.getLogger(__name__)
+
+QNN_ROOT = "/data/local/tmp/qnn"
+
+# Serialized HTP context written by qnn_prepare_model.sh next to libmatmul_qnn.so
+CONTEXT_BINARY = "matmul_qnn.serialized.bin"
+
+# Files of a model directory prepared by qnn_prepare_model.sh. lib_dir (relative
+# to the model directory) holds qnn-net-run and the backend libraries.
+# workloads.NPU_MODELS describes other model directories the same way.
+MATMUL_LAYOUT = {
+    'model_lib': "libmatmul_qnn.so",
+    'context_binary': CONTEXT_BINARY,
+    'input_list': "input_list_target.txt",
+    'lib_dir': "..",
+}
+
+
+def model_args(context_binary=True, layout=MATMUL_LAYOUT):
+    """
+    Model arguments of qnn-net-run / qnn_runner, evaluated in the device shell:
+    the cached context binary if the model directory has one (no graph
+    preparation at startup), else the model library.
+    """
+    lib_args = f"--model ./{layout['model_lib']}"
+    if not context_binary or not layout.get('context_binary'):
+        return lib_args
+    binary = layout['context_binary']
+    return f"$([ -f ./{binary} ] && echo --retrieve_context ./{binary} || echo {lib_args})"
+
+
+def qnn_net_run_cmd(run_dir, output_dir="./out_htp", extra_flags="", context_binary=True, layout=MATMUL_LAYOUT):
+    """qnn-net-run command line for a model directory prepared by qnn_prepare_model.sh (or another layout)."""
+    lib_dir = layout['lib_dir']
+    return (
+        f"cd {run_dir} && "
+        f"LD_LIBRARY_PATH={lib_dir} ADSP_LIBRARY_PATH={lib_dir} {lib_dir}/qnn-net-run "
+        f"--backend {lib_dir}/libQnnHtp.so {model_args(context_binary, layout)} "
+        f"--input_list ./{layout['input_list']} --output_dir {output_dir} {extra_flags} "
+        "$(cat ./net_run_flags.txt 2>/dev/null)"
+    )
+
+
+def read_model_config(model_dir):
+    """Parse model_config.env written by make_matmul_torch.py."""
+    config = {}
+    with open(os.path.join(model_dir, "model_config.env")) as f:
+        for line in f:
+            key, sep, value = line.strip().partition("=")
+            if sep:
+                config[key] = value.strip('"')
+    return config
+
+
+def compare_outputs(actual, expected):
+    actual = actual.astype(np.float64).ravel()
+    expected = expected.astype(np.float64).ravel()
+    denom = np.linalg.norm(actual) * np.linalg.norm(expected)
+    return {
+        'cosine': float(actual @ expected / denom) if denom > 0 else 0.0,
+        'rel_l2': float(np.linalg.norm(actual - expected) / max(np.linalg.norm(expected), 1e-12)),
+        'max_abs_err': float(np.max(np.abs(actual - expected))),
+    }
+
+
+@timed("pull")
+def _pull_outputs(remote_dir, local_dir, label):
+    result = subprocess.run(["adb", "pull", remote_dir, local_dir],
+                            stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"[{label}] Failed to pull {remote_dir}, stderr:\n{result.stderr}")
+    files = sorted(glob.glob(os.path.join(local_dir, "**", "*.raw"), recursive=True))
+    if not files:
+        raise RuntimeError(f"[{label}] No output tensors found in {remote_dir}")
+    return files
+
+
+def validate_npu_output(run_dir, model_dir, npu_server=None, min_cosine=0.99, max_rel_l2=0.15, label="NPU",
+                        context_binary=True):
+    """
+    Run input sample 0 once on the device and compare it with the host reference.
+
+    Returns the comparison metrics, or None if the model has no usable
+    reference. Raises RuntimeError if the output does not match.
+    """
+    expected_path = os.path.join(model_dir, "expected_output_0.raw")
+    # Models prepared before make_matmul_torch.py wrote these (or never prepared on this host) have no reference
+    for path in (os.path.join(model_dir, "model_config.env"), expected_path):
+        if not os.path.exists(path):
+            logger.warning(f"[{label}] Skipping output validation: {path} not found")
+            return None
+    config = read_model_config(model_dir)
+    encodings = os.path.join(model_dir, "input_encodings.json")
+    if config.get("IO_DTYPE", "float32") == "int8" and not os.path.exists(encodings):
+        # Older int8 models were given random input bytes unrelated to their reference
+        logger.warning(f"[{label}] Skipping output validation: {encodings} not found (regenerate the int8 model)")
+        return None
+
+    remote_out = f"{run_dir}/out_validate"
+    if npu_server is not None:
+        npu_server.dump(remote_out)
+    else:
+        cmd = f"rm -rf {remote_out} && " + qnn_net_run_cmd(run_dir, "./out_validate", "--num_inferences 1",
+                                                           context_binary=context_binary)
+        logger.info(f"[{label}] Validation run: {cmd}")
+        result = subprocess.run(["adb", "shell", cmd], stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+        if result.returncode != 0:
+            raise RuntimeError(f"[{label}] Validation run failed with exit code {result.returncode}, stderr:\n{result.stderr}")
+        remote_out = f"{remote_out}/Result_0"
+
+    local_dir = tempfile.mkdtemp(prefix="npu_validate_")
+    try:
+        files = _pull_outputs(remote_out, local_dir, label)
+        actual = np.fromfile(files[0], dtype=np.float32)
+    finally:
+        shutil.rmtree(local_dir, ignore_errors=True)
+
+    expected = np.fromfile(expected_path, dtype=np.float32)
+    if actual.size != expected.size:
+        raise RuntimeError(f"[{label}] Output has {actual.size} elements, expected {expected.size}")
+
+    metrics = compare_outputs(actual, expected)
+    logger.info(f"[{label}] Output vs reference: cosine {metrics['cosine']:.5f}, "
+                f"rel L2 {metrics['rel_l2']:.4f}, max abs err {metrics['max_abs_err']:.4f}")
+    if metrics['cosine'] < min_cosine or metrics['rel_l2'] > max_rel_l2:
+        raise RuntimeError(f"[{label}] Output mismatch (cosine {metrics['cosine']:.5f} < {min_cosine} "
+                           f"or rel L2 {metrics['rel_l2']:.4f} > {max_rel_l2})")
+    logger.info(f"[{label}] Output verification passed!")
+    return metrics
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check the QNN model output on the device against the torch reference.")
+    parser.add_argument("-n", "--npu_kernel_path", required=True, help="Model directory name (e.g. matmul_1x1024x4096)")
+    parser.add_argument("--model_root", default="model", help="Host directory holding the generated model directories")
+    parser.add_argument("--min_cosine", type=float, default=0.99)
+    parser.add_argument("--max_rel_l2", type=float, default=0.15)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='[%(asctime)s.%(msecs)03d] %(message)s', datefmt='%H:%M:%S')
+    validate_npu_output(f"{QNN_ROOT}/{args.npu_kernel_path}", os.path.join(args.model_root, args.npu_kernel_path),
+                        min_cosine=args.min_cosine, max_rel_l2=args.max_rel_l2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,208 @@
+"""
+Host client of the on-device phase orchestrator (orchestrator/).
+
+The host only plans: a PhasePlan lists the workers, their start offsets and
+stop conditions, the orchestrator launches them on the device with exact
+timing, and one JSON bundle with every worker's output comes back.
+
+Workers speak their usual output formats:
+  - cpu_runner (tvm_stream/cpu_runner.cc) and qnn_runner: "T <i> <us>" lines
+  - clblast_bw_test: "GPU Latency: <ms> ms" lines
+
+Host check with the stub workers of a host build
+(cmake -B orchestrator/build-host -S orchestrator && cmake --build orchestrator/build-host):
+    python orchestrator.py --local orchestrator/build-host/orchestrator
+"""
+
+import os
+import re
+import json
+import time
+import argparse
+import subprocess
+import logging
+
+import numpy as np
+
+from npu_validate import MATMUL_LAYOUT, model_args
+
+logger = logging.getLogger(__name__)
+
+ORCHESTRATOR_DIR = "/data/local/tmp/orchestrator"
+ORCHESTRATOR_PATH = f"{ORCHESTRATOR_DIR}/orchestrator"
+CPU_RUNNER_PATH = f"{ORCHESTRATOR_DIR}/cpu_runner"
+# libtvm_runtime.so / libtvm_ffi.so / libc++_shared.so pushed by build_tvm.sh
+TVM_LIB_DIR = "/data/local/tmp"
+
+
+def _escape(text):
+    return text.replace("\\", "\\\\").replace("\n", "\\n")
+
+
+class PhasePlan:
+    """One phase for the orchestrator: workers with start offsets and stop conditions."""
+
+    def __init__(self, timeout_ms=600000, grace_ms=5000):
+        self.timeout_ms = timeout_ms
+        self.grace_ms = grace_ms
+        self.workers = []
+
+    def add(self, name, command, start_ms=0, stop="exit", ready=None, stdin=None, stop_stdin=None):
+        """
+        ready: prefix of the line the worker prints once started up; such
+        workers are launched before t0 and start_ms is when stdin is written.
+        stop: exit, after:<worker> or duration:<ms>. stop_stdin: text that
+        ends the worker (otherwise its process group gets SIGTERM).
+        """
+        self.workers.append(dict(name=name, command=command, start_ms=int(start_ms), stop=stop,
+                                 ready=ready, stdin=stdin, stop_stdin=stop_stdin))
+        return self
+
+    def text(self):
+        lines = [f"timeout_ms {self.timeout_ms}", f"grace_ms {self.grace_ms}"]
+        for w in self.workers:
+            lines += [f"worker {w['name']}", f"command {w['command']}", f"start_ms {w['start_ms']}", f"stop {w['stop']}"]
+            if w['ready']:
+                lines.append(f"ready {w['ready']}")
+            if w['stdin']:
+                lines.append(f"stdin {_escape(w['stdin'])}")
+            if w['stop_stdin']:
+                lines.append(f"stop_stdin {_escape(w['stop_stdin'])}")
+            lines.append("end")
+        return "\n".join(lines) + "\n"
+
+
+class Orchestrator:
+    """Runs PhasePlans on the device (or with a local orchestrator binary) and returns their bundles."""
+
+    def __init__(self, adb_serial=None, binary=ORCHESTRATOR_PATH, local=False):
+        self.adb_serial = adb_serial
+        self.binary = binary
+        self.local = local
+
+    def _adb(self):
+        return ["adb"] + (["-s", self.adb_serial] if self.adb_serial else [])
+
+    def push(self, local_path, remote_dir=ORCHESTRATOR_DIR):
+        """Copy a file next to the orchestrator (e.g. a kernel library for cpu_runner); returns its device path."""
+        if self.local:
+            return os.path.abspath(local_path)
+        subprocess.run(self._adb() + ["shell", f"mkdir -p {remote_dir}"], check=True, stdout=subprocess.DEVNULL)
+        subprocess.run(self._adb() + ["push", local_path, f"{remote_dir}/"], check=True, stdout=subprocess.DEVNULL)
+        return f"{remote_dir}/{os.path.basename(local_path)}"
+
+    def run(self, plan, label="phase"):
+        """
+        Run one plan and return its bundle. host_t0 is added: t0 on the host
+        clock, back-computed from when the bundle arrived (the device clock is
+        not assumed to match the host's).
+        """
+        logger.info(f"[ORC] {label}: " + ", ".join(
+            f"{w['name']} @{w['start_ms']} ms (stop {w['stop']})" for w in plan.workers))
+        if self.local:
+            result = subprocess.run([self.binary, "-"], input=plan.text(), stdout=subprocess.PIPE,
+                                    stderr=subprocess.PIPE, text=True)
+        else:
+            plan_path = f"{ORCHESTRATOR_DIR}/plan_{label}.txt"
+            subprocess.run(self._adb() + ["shell", f"cat > {plan_path}"], input=plan.text(), text=True, check=True)
+            result = subprocess.run(self._adb() + ["shell", f"{self.binary} {plan_path}"],
+                                    stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+        host_end = time.time()
+        bundle = None
+        for line in result.stdout.splitlines():
+            if line.startswith("{"):
+                bundle = json.loads(line)
+        if bundle is None:
+            raise RuntimeError(f"[ORC] {label}: no result bundle (exit code {result.returncode}), "
+                               f"stderr:\n{result.stderr}")
+        if bundle['timed_out']:
+            logger.warning(f"[ORC] {label}: plan timed out, workers were stopped")
+        bundle['host_t0'] = host_end - bundle['duration_us'] / 1e6
+        bundle['workers'] = {w['name']: w for w in bundle['workers']}
+        logger.info(f"[ORC] {label}: workers ready after {bundle['ready_ms']:.0f} ms, "
+                    f"phase took {bundle['duration_us'] / 1e6:.2f} s")
+        return bundle
+
+
+def worker_window(bundle, name):
+    """Host-time (t0, t1) from a worker's start to its stop (or exit)."""
+    w = bundle['workers'][name]
+    end_us = w['stop_us'] if w['stop_us'] is not None else w['end_us']
+    return bundle['host_t0'] + w['start_us'] / 1e6, bundle['host_t0'] + end_us / 1e6
+
+
+def worker_output(bundle, name):
+    """A worker's output lines printed after its start, as one text."""
+    w = bundle['workers'][name]
+    return "\n".join(text for t_us, text in w['lines'] if t_us >= w['start_us'])
+
+
+def runner_latencies(bundle, name):
+    """Latencies (ms) of the "T <i> <us>" lines of a cpu_runner / qnn_runner worker."""
+    w = bundle['workers'][name]
+    for t_us, text in w['lines']:
+        if text.startswith("ERR"):
+            raise RuntimeError(f"[ORC] worker {name}: {text}")
+    return [float(text.split()[2]) / 1000.0 for t_us, text in w['lines'] if text.startswith("T ")]
+
+
+def clblast_latencies(bundle, name):
+    """Latencies (ms) of the "GPU Latency" lines of a clblast_bw_test worker."""
+    return [float(v) for v in re.findall(r'GPU Latency:\s+([\d.]+)\s+ms', worker_output(bundle, name))]
+
+
+def cpu_runner_command(library_path, m, k, n, entry="matmul", dtype="float32", mode=1, nthreads=8,
+                       runner_path=CPU_RUNNER_PATH):
+    return (f"LD_LIBRARY_PATH={TVM_LIB_DIR} {runner_path} {library_path} {m} {k} {n} "
+            f"--entry {entry} --dtype {dtype} --mode {mode} --nthreads {nthreads}")
+
+
+def qnn_runner_command(run_dir, runner_path, context_binary=True, layout=MATMUL_LAYOUT):
+    """qnn_runner in a model directory prepared by qnn_prepare_model.sh (as NpuServer.on_device)."""
+    lib_dir = layout['lib_dir']
+    return (f"cd {run_dir} && LD_LIBRARY_PATH={lib_dir} ADSP_LIBRARY_PATH={lib_dir} {runner_path} "
+            f"--backend {lib_dir}/libQnnHtp.so {model_args(context_binary, layout)} --input_list ./{layout['input_list']}")
+
+
+def loop_command(command):
+    """Re-run a command until the worker is stopped (SIGTERM to its process group)."""
+    return f"while :; do {command}; done"
+
+
+def log_bundle(bundle, parsers):
+    for name, parse in parsers.items():
+        w = bundle['workers'][name]
+        latencies = parse(bundle, name)
+        stop = f"{w['stop_us'] / 1e3:.1f}" if w['stop_us'] is not None else "-"
+        summary = (f"{len(latencies)} runs, mean {np.mean(latencies):.3f} ms" if latencies else "no runs")
+        logger.info(f"[ORC] {name}: start {w['start_us'] / 1e3:.1f} ms, stop {stop} ms, "
+                    f"end {w['end_us'] / 1e3:.1f} ms, {summary}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a contention phase of stub workers through the orchestrator.")
+    parser.add_argument("--local", metavar="ORCHESTRATOR", help="Host-built orchestrator binary (default: on the device)")
+    parser.add_argument("--serial", help="adb serial of the device")
+    parser.add_argument("--npu_runs", type=int, default=20)
+    parser.add_argument("--start_ms", type=int, default=1000, help="Offset of the measured (npu) worker")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='[%(asctime)s.%(msecs)03d] %(message)s', datefmt='%H:%M:%S')
+    binary = args.local or ORCHESTRATOR_PATH
+    orchestrator = Orchestrator(args.serial, binary=binary, local=bool(args.local))
+    # run1 of run_contention.py: cpu and gpu loop until the npu has finished its runs
+    plan = PhasePlan(timeout_ms=60000)
+    plan.add("cpu", f"{binary} --stub_worker 3000 --init_ms 300", ready="READY", stdin="start\n",
+             stop="after:npu", stop_stdin="stop\nquit\n")
+    plan.add("gpu", loop_command("sleep 0.005; echo 'GPU Latency: 5.0 ms'"),
+             stop="after:npu")
+    plan.add("npu", f"{binary} --stub_worker 2000 --init_ms 500", ready="READY", start_ms=args.start_ms,
+             stdin=f"run {args.npu_runs}\nquit\n")
+    bundle = orchestrator.run(plan, "stub_run1")
+    log_bundle(bundle, {'cpu': runner_latencies, 'gpu': clblast_latencies, 'npu': runner_latencies})
+    npu_t0, npu_t1 = worker_window(bundle, 'npu')
+    logger.info(f"[ORC] npu window on the host clock: {npu_t1 - npu_t0:.3f} s, ended {time.time() - npu_t1:.3f} s ago")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,19 @@
+#!/bin/bash
+
+set -e
+
+BUILD_TYPE=Release
+
+rm -r build-android || true
+
+cmake -GNinja -Bbuild-android \
+  -DCMAKE_TOOLCHAIN_FILE=$ANDROID_NDK_HOME/build/cmake/android.toolchain.cmake \
+  -DANDROID_ABI=arm64-v8a \
+  -DANDROID_PLATFORM=android-30 \
+  -DCMAKE_BUILD_TYPE=$BUILD_TYPE \
+  .
+
+cmake --build build-android
+
+adb shell mkdir -p /data/local/tmp/orchestrator
+adb push ./build-android/orchestrator /data/local/tmp/orchestrator/
@@ -0,0 +1,471 @@
+// On-device phase orchestrator.
+//
+// run_contention.py coordinates a phase from the host: Python threads start
+// adb shell processes and RPC calls after time.sleep offsets, so host
+// scheduling and USB latency decide how the CPU, GPU and NPU workloads
+// overlap. The orchestrator runs on the device instead. It reads one phase
+// plan, launches the worker processes locally at exact offsets, stops them on
+// the plan's conditions and prints a single JSON result bundle with every
+// output line of every worker, timestamped on the device clock.
+//
+// Plan (file, or "-" for stdin), one key per line, a block per worker:
+//
+//   timeout_ms 600000           # optional, stops every worker when exceeded
+//   worker npu                  # block start, worker name
+//   command cd /data/local/tmp/qnn/matmul_1x1024x4096 && ../qnn_runner ...
+//   ready READY                 # optional: launched before t0 and awaited until
+//                               # it prints a line with this prefix (startup cost
+//                               # stays out of the phase)
+//   start_ms 1000               # offset from t0; spawn time, or for a ready
+//                               # worker the time its stdin text is written
+//   stdin run 20\nquit\n        # optional text written to stdin at start (\n escapes)
+//   stop after:gpu              # exit (default): runs until it exits by itself,
+//                               # after:<worker>: stopped when that worker exits,
+//                               # duration:<ms>: stopped this long after start
+//   stop_stdin stop\nquit\n     # optional text that stops it; otherwise SIGTERM
+//   end
+//
+// A stopped worker that has not exited after grace_ms (default 5000) is killed.
+//
+// Bundle (stdout):
+//   {"t0_realtime_ns": ..., "ready_ms": ..., "duration_us": ..., "timed_out": false,
+//    "workers": [{"name": ..., "start_us": ..., "stop_us": ..., "end_us": ...,
+//                 "exit_code": ..., "signal": ..., "lines": [[t_us, "text"], ...]}]}
+// All times are relative to t0 (lines printed while starting up are negative).
+//
+// `orchestrator --stub_worker <us>` is a stand-in worker that speaks the
+// qnn_runner / cpu_runner line protocol (READY, run <n>, start, stop, quit,
+// "T <i> <us>") and busy-waits <us> per run, for host tests.
+
+#include <fcntl.h>
+#include <signal.h>
+#include <sys/types.h>
+#include <sys/wait.h>
+#include <unistd.h>
+
+#include <algorithm>
+#include <atomic>
+#include <chrono>
+#include <condition_variable>
+#include <cstdio>
+#include <cstring>
+#include <ctime>
+#include <fstream>
+#include <iostream>
+#include <memory>
+#include <mutex>
+#include <sstream>
+#include <string>
+#include <thread>
+#include <vector>
+
+namespace {
+
+using Clock = std::chrono::steady_clock;
+
+int64_t Micros(Clock::duration d) { return std::chrono::duration_cast<std::chrono::microseconds>(d).count(); }
+
+struct Worker {
+  std::string name;
+  std::string command;
+  std::string ready;
+  int64_t start_ms = 0;
+  std::string stop = "exit";
+  std::string stdin_text;
+  std::string stop_stdin;
+
+  pid_t pid = -1;
+  int in_fd = -1;
+  int out_fd = -1;
+  std::thread reader;
+  bool started = false;
+  bool stopping = false;
+  bool exited = false;
+  Clock::time_point start_time, stop_time, end_time;
+  int exit_code = -1;
+  int signal = 0;
+
+  std::mutex mu;
+  std::condition_variable cv;
+  bool is_ready = false;
+  bool eof = false;
+  std::vector<std::pair<Clock::time_point, std::string>> lines;
+};
+
+std::string Unescape(const std::string &text) {
+  std::string out;
+  for (size_t i = 0; i < text.size(); i++) {
+    if (text[i] == '\\' && i + 1 < text.size()) {
+      char c = text[++i];
+      out += c == 'n' ? '\n' : c == 't' ? '\t' : c;
+    } else {
+      out += text[i];
+    }
+  }
+  return out;
+}
+
+std::string JsonString(const std::string &text) {
+  std::string out = "\"";
+  for (unsigned char c : text) {
+    if (c == '"' || c == '\\') {
+      out += '\\';
+      out += static_cast<char>(c);
+    } else if (c == '\n') {
+      out += "\\n";
+    } else if (c < 0x20) {
+      char buf[8];
+      snprintf(buf, sizeof(buf), "\\u%04x", c);
+      out += buf;
+    } else {
+      out += static_cast<char>(c);
+    }
+  }
+  return out + "\"";
+}
+
+bool ParsePlan(std::istream &in, std::vector<std::unique_ptr<Worker>> *workers, int64_t *timeout_ms,
+               int64_t *grace_ms) {
+  std::string line;
+  Worker *current = nullptr;
+  while (std::getline(in, line)) {
+    size_t begin = line.find_first_not_of(" \t");
+    if (begin == std::string::npos || line[begin] == '#') continue;
+    line = line.substr(begin);
+    size_t space = line.find(' ');
+    std::string key = line.substr(0, space);
+    std::string value = space == std::string::npos ? "" : line.substr(space + 1);
+    if (key == "worker") {
+      workers->push_back(std::make_unique<Worker>());
+      current = workers->back().get();
+      current->name = value;
+    } else if (key == "end") {
+      current = nullptr;
+    } else if (key == "timeout_ms" && current == nullptr) {
+      *timeout_ms = std::stoll(value);
+    } else if (key == "grace_ms" && current == nullptr) {
+      *grace_ms = std::stoll(value);
+    } else if (current == nullptr) {
+      std::cerr << "Error: '" << key << "' outside a worker block" << std::endl;
+      return false;
+    } else if (key == "command") {
+      current->command = value;
+    } else if (key == "ready") {
+      current->ready = value;
+    } else if (key == "start_ms") {
+      current->start_ms = std::stoll(value);
+    } else if (key == "stop") {
+      current->stop = value;
+    } else if (key == "stdin") {
+      current->stdin_text = Unescape(value);
+    } else if (key == "stop_stdin") {
+      current->stop_stdin = Unescape(value);
+    } else {
+      std::cerr << "Error: unknown plan key '" << key << "'" << std::endl;
+      return false;
+    }
+  }
+  for (auto &w : *workers) {
+    if (w->command.empty()) {
+      std::cerr << "Error: worker " << w->name << " has no command" << std::endl;
+      return false;
+    }
+    if (w->stop != "exit" && w->stop.rfind("after:", 0) != 0 && w->stop.rfind("duration:", 0) != 0) {
+      std::cerr << "Error: worker " << w->name << " has an invalid stop condition '" << w->stop << "'" << std::endl;
+      return false;
+    }
+  }
+  return true;
+}
+
+void ReadLoop(Worker *w) {
+  FILE *f = fdopen(w->out_fd, "r");
+  char *buf = nullptr;
+  size_t cap = 0;
+  ssize_t len;
+  while ((len = getline(&buf, &cap, f)) > 0) {
+    Clock::time_point t = Clock::now();
+    std::string text(buf, len);
+    while (!text.empty() && (text.back() == '\n' || text.back() == '\r')) text.pop_back();
+    std::lock_guard<std::mutex> lock(w->mu);
+    if (!w->ready.empty() && text.rfind(w->ready, 0) == 0) {
+      w->is_ready = true;
+      w->cv.notify_all();
+    }
+    w->lines.emplace_back(t, std::move(text));
+  }
+  free(buf);
+  fclose(f);
+  std::lock_guard<std::mutex> lock(w->mu);
+  w->eof = true;
+  w->cv.notify_all();
+}
+
+bool Spawn(Worker *w) {
+  int in_pipe[2], out_pipe[2];
+  if (pipe(in_pipe) != 0 || pipe(out_pipe) != 0) {
+    perror("pipe");
+    return false;
+  }
+  const char *shell = access("/system/bin/sh", X_OK) == 0 ? "/system/bin/sh" : "/bin/sh";
+  pid_t pid = fork();
+  if (pid < 0) {
+    perror("fork");
+    return false;
+  }
+  if (pid == 0) {
+    // Own process group, so stopping the worker also stops what its shell started
+    setpgid(0, 0);
+    dup2(in_pipe[0], STDIN_FILENO);
+    dup2(out_pipe[1], STDOUT_FILENO);
+    dup2(out_pipe[1], STDERR_FILENO);
+    close(in_pipe[0]);
+    close(in_pipe[1]);
+    close(out_pipe[0]);
+    close(out_pipe[1]);
+    execl(shell, "sh", "-c", w->command.c_str(), static_cast<char *>(nullptr));
+    _exit(127);
+  }
+  setpgid(pid, pid);
+  close(in_pipe[0]);
+  close(out_pipe[1]);
+  w->pid = pid;
+  w->in_fd = in_pipe[1];
+  w->out_fd = out_pipe[0];
+  w->reader = std::thread(ReadLoop, w);
+  return true;
+}
+
+void WriteStdin(Worker *w, const std::string &text) {
+  size_t done = 0;
+  while (done < text.size()) {
+    ssize_t n = write(w->in_fd, text.data() + done, text.size() - done);
+    if (n <= 0) break;
+    done += n;
+  }
+}
+
+void Stop(Worker *w, Clock::time_point now) {
+  w->stopping = true;
+  w->stop_time = now;
+  if (!w->stop_stdin.empty()) {
+    WriteStdin(w, w->stop_stdin);
+  } else {
+    kill(-w->pid, SIGTERM);
+  }
+}
+
+void Reap(Worker *w, Clock::time_point now) {
+  int status;
+  if (w->pid <= 0 || w->exited || waitpid(w->pid, &status, WNOHANG) != w->pid) return;
+  w->exited = true;
+  w->end_time = now;
+  if (WIFEXITED(status)) w->exit_code = WEXITSTATUS(status);
+  if (WIFSIGNALED(status)) w->signal = WTERMSIG(status);
+  // Leftover children of the worker's shell must not outlive the phase
+  kill(-w->pid, SIGKILL);
+}
+
+Worker *Find(std::vector<std::unique_ptr<Worker>> &workers, const std::string &name) {
+  for (auto &w : workers) {
+    if (w->name == name) return w.get();
+  }
+  return nullptr;
+}
+
+int RunPlan(std::vector<std::unique_ptr<Worker>> &workers, int64_t timeout_ms, int64_t grace_ms) {
+  signal(SIGPIPE, SIG_IGN);
+  Clock::time_point origin = Clock::now();
+
+  // Workers with a ready line start up before t0
+  for (auto &w : workers) {
+    if (w->ready.empty()) continue;
+    if (!Spawn(w.get())) return 1;
+  }
+  for (auto &w : workers) {
+    if (w->ready.empty()) continue;
+    std::unique_lock<std::mutex> lock(w->mu);
+    w->cv.wait_for(lock, std::chrono::milliseconds(timeout_ms), [&] { return w->is_ready || w->eof; });
+    if (!w->is_ready) {
+      std::cerr << "Error: worker " << w->name << " did not print '" << w->ready << "'" << std::endl;
+      for (auto &other : workers) {
+        if (other->pid > 0) kill(-other->pid, SIGKILL);
+      }
+      return 1;
+    }
+  }
+
+  Clock::time_point t0 = Clock::now();
+  int64_t t0_realtime_ns = std::chrono::duration_cast<std::chrono::nanoseconds>(
+      std::chrono::system_clock::now().time_since_epoch()).count();
+  Clock::time_point deadline = t0 + std::chrono::milliseconds(timeout_ms);
+  bool timed_out = false;
+
+  while (true) {
+    Clock::time_point now = Clock::now();
+    for (auto &w : workers) {
+      if (!w->started && now >= t0 + std::chrono::milliseconds(w->start_ms)) {
+        if (w->pid < 0 && !Spawn(w.get())) return 1;
+        w->started = true;
+        w->start_time = Clock::now();
+        if (!w->stdin_text.empty()) WriteStdin(w.get(), w->stdin_text);
+      }
+    }
+    now = Clock::now();
+    for (auto &w : workers) Reap(w.get(), now);
+    for (auto &w : workers) {
+      if (!w->started || w->exited) continue;
+      if (w->stopping) {
+        if (now - w->stop_time > std::chrono::milliseconds(grace_ms)) kill(-w->pid, SIGKILL);
+        continue;
+      }
+      bool stop = timed_out;
+      if (w->stop.rfind("after:", 0) == 0) {
+        Worker *other = Find(workers, w->stop.substr(6));
+        stop |= other == nullptr || other->exited;
+      } else if (w->stop.rfind("duration:", 0) == 0) {
+        stop |= now - w->start_time >= std::chrono::milliseconds(std::stoll(w->stop.substr(9)));
+      }
+      if (stop) Stop(w.get(), now);
+    }
+    if (std::all_of(workers.begin(), workers.end(), [](const std::unique_ptr<Worker> &w) { return w->exited; })) {
+      break;
+    }
+    if (!timed_out && now >= deadline) {
+      timed_out = true;
+      std::cerr << "Error: plan timed out after " << timeout_ms << " ms" << std::endl;
+      for (auto &w : workers) {
+        if (w->started && !w->exited && !w->stopping) Stop(w.get(), now);
+        if (!w->started) {
+          // Spawned for its ready line but never started: nothing else would end it
+          if (w->pid > 0) {
+            kill(-w->pid, SIGKILL);
+            int status;
+            waitpid(w->pid, &status, 0);
+            w->signal = SIGKILL;
+          }
+          w->started = true;
+          w->exited = true;
+          w->start_time = w->end_time = now;
+        }
+      }
+    }
+    // Sleep to the next start exactly, otherwise poll exits every millisecond
+    Clock::time_point wake = now + std::chrono::milliseconds(1);
+    for (auto &w : workers) {
+      if (!w->started) wake = std::min(wake, t0 + std::chrono::milliseconds(w->start_ms));
+    }
+    std::this_thread::sleep_until(wake);
+  }
+  Clock::time_point t_end = Clock::now();
+  for (auto &w : workers) {
+    if (w->in_fd >= 0) close(w->in_fd);
+    if (w->reader.joinable()) w->reader.join();
+  }
+
+  std::ostringstream os;
+  os << "{\"t0_realtime_ns\": " << t0_realtime_ns << ", \"ready_ms\": " << Micros(t0 - origin) / 1e3
+     << ", \"duration_us\": " << Micros(t_end - t0) << ", \"timed_out\": " << (timed_out ? "true" : "false")
+     << ", \"workers\": [";
+  for (size_t i = 0; i < workers.size(); i++) {
+    Worker *w = workers[i].get();
+    os << (i ? ", " : "") << "{\"name\": " << JsonString(w->name) << ", \"start_us\": " << Micros(w->start_time - t0)
+       << ", \"stop_us\": ";
+    if (w->stopping) {
+      os << Micros(w->stop_time - t0);
+    } else {
+      os << "null";
+    }
+    os << ", \"end_us\": " << Micros(w->end_time - t0) << ", \"exit_code\": " << w->exit_code
+       << ", \"signal\": " << w->signal << ", \"lines\": [";
+    for (size_t j = 0; j < w->lines.size(); j++) {
+      os << (j ? ", " : "") << "[" << Micros(w->lines[j].first - t0) << ", " << JsonString(w->lines[j].second) << "]";
+    }
+    os << "]}";
+  }
+  os << "]}";
+  std::cout << os.str() << std::endl;
+  return timed_out ? 2 : 0;
+}
+
+// Stand-in worker: busy-waits `us` per run and speaks the runner line protocol.
+int StubWorker(int64_t us, int64_t init_ms) {
+  std::this_thread::sleep_for(std::chrono::milliseconds(init_ms));
+  std::mutex out_mu;
+  std::atomic<bool> stop{false};
+  std::atomic<int64_t> index{0};
+  auto run_once = [&] {
+    Clock::time_point t = Clock::now();
+    while (Clock::now() - t < std::chrono::microseconds(us)) {
+    }
+    std::lock_guard<std::mutex> lock(out_mu);
+    std::cout << "T " << index++ << " " << Micros(Clock::now() - t) << std::endl;
+  };
+  std::cout << "READY " << init_ms << std::endl;
+  std::thread loop;
+  int64_t loop_start = 0;
+  std::string line;
+  while (std::getline(std::cin, line)) {
+    std::istringstream cmd(line);
+    std::string op;
+    cmd >> op;
+    if (op == "run") {
+      int64_t n = 0;
+      cmd >> n;
+      for (int64_t i = 0; i < n; i++) run_once();
+      std::lock_guard<std::mutex> lock(out_mu);
+      std::cout << "DONE " << n << std::endl;
+    } else if (op == "start" && !loop.joinable()) {
+      stop = false;
+      loop_start = index;
+      loop = std::thread([&] {
+        while (!stop) run_once();
+      });
+    } else if (op == "stop" && loop.joinable()) {
+      stop = true;
+      loop.join();
+      std::lock_guard<std::mutex> lock(out_mu);
+      std::cout << "DONE " << index - loop_start << std::endl;
+    } else if (op == "quit") {
+      break;
+    }
+  }
+  if (loop.joinable()) {
+    stop = true;
+    loop.join();
+  }
+  return 0;
+}
+
+}  // namespace
+
+int main(int argc, char *argv[]) {
+  if (argc >= 3 && std::string(argv[1]) == "--stub_worker") {
+    int64_t init_ms = argc >= 5 && std::string(argv[3]) == "--init_ms" ? std::stoll(argv[4]) : 0;
+    return StubWorker(std::stoll(argv[2]), init_ms);
+  }
+  if (argc != 2) {
+    std::cerr << "Usage: " << argv[0] << " <plan file | ->" << std::endl;
+    std::cerr << "       " << argv[0] << " --stub_worker <us> [--init_ms <ms>]" << std::endl;
+    return 1;
+  }
+  std::vector<std::unique_ptr<Worker>> workers;
+  int64_t timeout_ms = 600000;
+  int64_t grace_ms = 5000;
+  bool ok;
+  if (std::string(argv[1]) == "-") {
+    ok = ParsePlan(std::cin, &workers, &timeout_ms, &grace_ms);
+  } else {
+    std::ifstream f(argv[1]);
+    if (!f) {
+      std::cerr << "Error: cannot open plan " << argv[1] << std::endl;
+      return 1;
+    }
+    ok = ParsePlan(f, &workers, &timeout_ms, &grace_ms);
+  }
+  if (!ok || workers.empty()) {
+    if (ok) std::cerr << "Error: plan has no workers" << std::endl;
+    return 1;
+  }
+  return RunPlan(workers, timeout_ms, grace_ms);
+}
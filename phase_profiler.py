@@ -0,0 +1,117 @@
+"""
+Wall-time spans of the harness phases (connect, upload, cooldown, overlap runs, ...).
+
+Code wraps each phase in `with span("name"):`. At the end, the harness logs a
+summary table of the spans and writes them to a JSON file in Chrome trace
+format, which Perfetto (ui.perfetto.dev) or chrome://tracing can open.
+
+Spans may nest and may be opened from worker threads. The summary's
+"unaccounted" row is wall time not covered by any top-level span of the
+main thread.
+"""
+
+import os
+import json
+import time
+import threading
+import functools
+from collections import defaultdict
+from contextlib import contextmanager
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class PhaseProfiler:
+    """Thread-safe recorder of named wall-time spans."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.spans = []
+            self.t0 = time.perf_counter()
+
+    @contextmanager
+    def span(self, name, **attrs):
+        stack = self._local.__dict__.setdefault('stack', [])
+        stack.append(name)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            end = time.perf_counter()
+            stack.pop()
+            with self._lock:
+                self.spans.append({
+                    'name': name,
+                    'start_s': start - self.t0,
+                    'dur_s': end - start,
+                    'thread': threading.current_thread().name,
+                    'parent': stack[-1] if stack else None,
+                    'attrs': attrs,
+                })
+
+    def summary(self):
+        """Per-name rows (count, total/mean/max seconds, share of wall time), longest total first."""
+        wall_s = time.perf_counter() - self.t0
+        with self._lock:
+            spans = list(self.spans)
+        by_name = defaultdict(list)
+        for s in spans:
+            by_name[s['name']].append(s['dur_s'])
+        rows = [{'name': name, 'count': len(durs), 'total_s': sum(durs), 'mean_s': sum(durs) / len(durs),
+                 'max_s': max(durs), 'share': sum(durs) / wall_s if wall_s > 0 else 0.0}
+                for name, durs in by_name.items()]
+        rows.sort(key=lambda r: r['total_s'], reverse=True)
+        covered_s = sum(s['dur_s'] for s in spans if s['parent'] is None and s['thread'] == 'MainThread')
+        return {'wall_s': wall_s, 'unaccounted_s': max(wall_s - covered_s, 0.0), 'phases': rows}
+
+    def log_summary(self):
+        summary = self.summary()
+        lines = [f"{'phase':<24}{'count':>6}{'total s':>10}{'mean s':>10}{'max s':>10}{'share':>8}"]
+        for r in summary['phases']:
+            lines.append(f"{r['name']:<24}{r['count']:>6}{r['total_s']:>10.2f}{r['mean_s']:>10.3f}"
+                         f"{r['max_s']:>10.3f}{r['share']:>8.1%}")
+        lines.append(f"{'unaccounted':<24}{'':>6}{summary['unaccounted_s']:>10.2f}")
+        lines.append(f"{'wall':<24}{'':>6}{summary['wall_s']:>10.2f}")
+        logger.info("Harness time breakdown (spans may nest or overlap across threads):\n" + "\n".join(lines))
+        return summary
+
+    def dump(self, path):
+        """Write the spans as Chrome trace events plus the summary."""
+        with self._lock:
+            spans = list(self.spans)
+        tids = {}
+        events = []
+        for s in spans:
+            events.append({
+                'name': s['name'], 'ph': 'X', 'pid': os.getpid(),
+                'tid': tids.setdefault(s['thread'], len(tids)),
+                'ts': s['start_s'] * 1e6, 'dur': s['dur_s'] * 1e6,
+                'args': dict(s['attrs'], thread=s['thread'], parent=s['parent']),
+            })
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "w") as f:
+            json.dump({'traceEvents': events, 'displayTimeUnit': 'ms', 'summary': self.summary()}, f, indent=2)
+        logger.info(f"Saved harness spans to {path}")
+        return path
+
+
+# Process-wide profiler used by the harness modules
+profiler = PhaseProfiler()
+span = profiler.span
+
+
+def timed(name):
+    """Decorator recording every call of a function as a span."""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
@@ -0,0 +1,237 @@
+"""
+Battery power sampler and per-phase energy accounting.
+
+PowerMonitor reads the fuel gauge's current and voltage (power_supply
+sysfs, uA and uV) in one persistent `adb shell` loop and integrates power
+over:
+
+  - each phase (standalone, run1, run2, run3), and
+  - each accelerator's measurement window inside the phase, giving joules
+    per inference next to the latency stats.
+
+The fuel gauge sees the whole device, so an accelerator's energy is the
+energy of everything running during its window. idle_w (measure_idle, taken
+after the first cooldown) is subtracted for the *dynamic* numbers. Unplug
+the charger (or use adb over Wi-Fi): while charging, the battery current
+does not show the load.
+
+Each line of the loop carries the device uptime. Sample times are mapped to
+host time with the smallest observed (host receive - uptime) offset, so adb
+buffering does not smear them.
+
+Host check without a device, against a fake sysfs directory:
+    python power_monitor.py --fake_sysfs /tmp/fake_sysfs --seconds 2
+"""
+
+import os
+import time
+import argparse
+import subprocess
+import threading
+import logging
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+BATTERY_CURRENT_PATH = "/sys/class/power_supply/battery/current_now"
+BATTERY_VOLTAGE_PATH = "/sys/class/power_supply/battery/voltage_now"
+
+
+def integrate_energy(times, watts, t0, t1):
+    """Trapezoidal energy (J) of a power series over [t0, t1], interpolated at the edges; None without samples."""
+    times, watts = np.asarray(times, dtype=np.float64), np.asarray(watts, dtype=np.float64)
+    if len(times) == 0 or t1 <= t0:
+        return None
+    if len(times) == 1:
+        return float(watts[0] * (t1 - t0))
+    inside = (times > t0) & (times < t1)
+    t = np.concatenate(([t0], times[inside], [t1]))
+    w = np.concatenate(([np.interp(t0, times, watts)], watts[inside], [np.interp(t1, times, watts)]))
+    return float(np.sum((w[1:] + w[:-1]) / 2 * np.diff(t)))
+
+
+class PowerMonitor:
+    """Samples battery current and voltage in a persistent shell and integrates energy over host-time windows."""
+
+    def __init__(self, adb_serial=None, interval=0.02, current_path=BATTERY_CURRENT_PATH,
+                 voltage_path=BATTERY_VOLTAGE_PATH, sysfs_root=None, current_scale=1e-6, voltage_scale=1e-6):
+        """
+        sysfs_root: run the sampling loop on the host against this directory
+        instead of on the device (the paths are taken relative to it).
+        current_scale / voltage_scale: A per current unit and V per voltage
+        unit (power_supply reports uA and uV; some gauges use mA / mV).
+        """
+        self.adb_serial = adb_serial
+        self.interval = interval
+        self.current_path = current_path
+        self.voltage_path = voltage_path
+        self.sysfs_root = sysfs_root
+        self.current_scale = current_scale
+        self.voltage_scale = voltage_scale
+        self.idle_w = None
+        self.samples = []  # (host receive time, device uptime, watts)
+        self._lock = threading.Lock()
+        self._proc = None
+        self._reader = None
+
+    def _command(self):
+        current, voltage = self.current_path, self.voltage_path
+        if self.sysfs_root is not None:
+            current = os.path.join(self.sysfs_root, current.lstrip("/"))
+            voltage = os.path.join(self.sysfs_root, voltage.lstrip("/"))
+        # `read` is a shell builtin, so a sample costs no fork besides sleep
+        script = (f"while :; do read up idle < /proc/uptime; read c < {current}; read v < {voltage}; "
+                  f"echo \"$up $c $v\"; sleep {self.interval}; done")
+        if self.sysfs_root is not None:
+            return ["sh", "-c", script]
+        return ["adb"] + (["-s", self.adb_serial] if self.adb_serial else []) + ["shell", script]
+
+    def _read_loop(self):
+        for line in self._proc.stdout:
+            received = time.time()
+            try:
+                uptime, current, voltage = (float(v) for v in line.split())
+            except ValueError:
+                continue
+            watts = abs(current * self.current_scale) * voltage * self.voltage_scale
+            with self._lock:
+                self.samples.append((received, uptime, watts))
+
+    def start(self):
+        self._proc = subprocess.Popen(self._command(), stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+                                      text=True, bufsize=1)
+        self._reader = threading.Thread(target=self._read_loop, daemon=True)
+        self._reader.start()
+        logger.info(f"[POW] Sampling {self.current_path} and {self.voltage_path} every {self.interval} s"
+                    + (f" (fake sysfs {self.sysfs_root})" if self.sysfs_root else ""))
+        return self
+
+    def stop(self):
+        if self._proc is not None:
+            self._proc.terminate()
+            self._proc.wait()
+            self._proc = None
+        if self.sysfs_root is None:
+            # Killing the local adb client does not reliably end the device loop
+            subprocess.run(["adb"] + (["-s", self.adb_serial] if self.adb_serial else [])
+                           + ["shell", f"pkill -f '{self.current_path}'"],
+                           stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        if self._reader is not None:
+            self._reader.join(timeout=5)
+            self._reader = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def series(self):
+        """(host times, watts) of all samples so far."""
+        with self._lock:
+            samples = np.array(self.samples, dtype=np.float64).reshape(-1, 3)
+        if not len(samples):
+            return samples[:, 0], samples[:, 2]
+        offset = np.min(samples[:, 0] - samples[:, 1])
+        return samples[:, 1] + offset, samples[:, 2]
+
+    def energy(self, t0, t1):
+        """Energy (J) between host times t0 and t1, or None without samples."""
+        times, watts = self.series()
+        return integrate_energy(times, watts, t0, t1)
+
+    def measure_idle(self, seconds=2.0):
+        """Average power of the next `seconds`, used as the idle baseline."""
+        t0 = time.time()
+        time.sleep(seconds)
+        energy = self.energy(t0, time.time())
+        self.idle_w = energy / (time.time() - t0) if energy is not None else None
+        if self.idle_w is None:
+            logger.warning("[POW] No power samples, idle baseline unknown")
+        else:
+            logger.info(f"[POW] Idle: {self.idle_w:.3f} W")
+        return self.idle_w
+
+    def _window_energy(self, window):
+        t0, t1 = window
+        energy = self.energy(t0, t1)
+        row = {'window_s': t1 - t0, 'energy_j': energy,
+               'avg_power_w': energy / (t1 - t0) if energy is not None and t1 > t0 else None,
+               'dynamic_j': None}
+        if energy is not None and self.idle_w is not None:
+            row['dynamic_j'] = energy - self.idle_w * (t1 - t0)
+        return row
+
+    def report(self, phase, window, measured, counts=None):
+        """
+        Energy of a phase and of each accelerator's window in it.
+
+        measured: {accel: (latencies or None, (t0, t1))} as passed to
+        DeviceMonitor.check. counts: {accel: calls} where the latencies are
+        not one per call (time_evaluator samples average several calls,
+        qnn-net-run has none); other accelerators count their latencies.
+        """
+        t0, t1 = window
+        with self._lock:
+            num_samples = sum(1 for s in self.samples if t0 <= s[0] <= t1)
+        report = dict(self._window_energy(window), phase=phase, samples=num_samples, accel={})
+        for accel, (latencies, accel_window) in measured.items():
+            row = self._window_energy(accel_window)
+            inferences = (counts or {}).get(accel) or (len(latencies) if latencies is not None else None)
+            row['inferences'] = inferences
+            row['j_per_inference'] = row['energy_j'] / inferences if inferences and row['energy_j'] is not None else None
+            row['dynamic_j_per_inference'] = (row['dynamic_j'] / inferences
+                                              if inferences and row['dynamic_j'] is not None else None)
+            report['accel'][accel] = row
+        if report['energy_j'] is not None:
+            per_accel = ", ".join(f"{accel} {row['j_per_inference'] * 1e3:.2f} mJ/inference"
+                                  for accel, row in report['accel'].items() if row['j_per_inference'] is not None)
+            logger.info(f"[POW] {phase}: {report['energy_j']:.2f} J over {report['window_s']:.1f} s "
+                        f"({report['avg_power_w']:.2f} W)" + (f"; {per_accel}" if per_accel else ""))
+        return report
+
+
+def write_fake_sysfs(root, current_ua, voltage_uv, current_path=BATTERY_CURRENT_PATH,
+                     voltage_path=BATTERY_VOLTAGE_PATH):
+    """Create (or update) fake current/voltage files under root."""
+    for path, value in ((current_path, current_ua), (voltage_path, voltage_uv)):
+        path = os.path.join(root, path.lstrip("/"))
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path + ".tmp", "w") as f:
+            f.write(f"{int(value)}\n")
+        os.replace(path + ".tmp", path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sample battery power and report energy.")
+    parser.add_argument("--fake_sysfs", help="Sample this fake sysfs directory on the host instead of the device")
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--interval", type=float, default=0.02)
+    parser.add_argument("--current_path", default=BATTERY_CURRENT_PATH)
+    parser.add_argument("--voltage_path", default=BATTERY_VOLTAGE_PATH)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='[%(asctime)s.%(msecs)03d] %(message)s', datefmt='%H:%M:%S')
+    if args.fake_sysfs:
+        # 500 mA at 3.9 V in the first half, 1 A in the second: 1.95 W, then 3.9 W
+        write_fake_sysfs(args.fake_sysfs, -500000, 3900000, args.current_path, args.voltage_path)
+    with PowerMonitor(interval=args.interval, current_path=args.current_path, voltage_path=args.voltage_path,
+                      sysfs_root=args.fake_sysfs) as monitor:
+        t0 = time.time()
+        time.sleep(args.seconds / 2)
+        t_mid = time.time()
+        if args.fake_sysfs:
+            write_fake_sysfs(args.fake_sysfs, -1000000, 3900000, args.current_path, args.voltage_path)
+        time.sleep(args.seconds / 2)
+        t1 = time.time()
+        time.sleep(2 * args.interval)
+    for name, (start, end) in (("first half", (t0, t_mid)), ("second half", (t_mid, t1)), ("total", (t0, t1))):
+        energy = monitor.energy(start, end)
+        logger.info(f"{name}: {energy:.3f} J, {energy / (end - start):.3f} W" if energy is not None
+                    else f"{name}: no samples")
+    logger.info(f"{len(monitor.samples)} samples ({len(monitor.samples) / (t1 - t0):.0f} Hz)")
+
+
+if __name__ == "__main__":
+    main()
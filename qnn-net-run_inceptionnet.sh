@@ -75,6 +75,8 @@ HTP_ARCH="hexagon-v${HTP_VERSION}"
 adb push ${QNN_SDK_ROOT}/lib/${QNN_TARGET_ARCH}/libQnnHtp.so /data/local/tmp/inception_v3
 adb push ${QNN_SDK_ROOT}/lib/${HTP_ARCH}/unsigned/* /data/local/tmp/inception_v3
 adb push ${QNN_SDK_ROOT}/lib/${QNN_TARGET_ARCH}/libQnnHtpV${HTP_VERSION}Stub.so /data/local/tmp/inception_v3
+# qnn_runner --retrieve_context (run_contention.py -n model:inception_v3 --npu_server)
+adb push ${QNN_SDK_ROOT}/lib/${QNN_TARGET_ARCH}/libQnnSystem.so /data/local/tmp/inception_v3
 adb push /tmp/qnn_tmp/output/libInception_v3.serialized.bin /data/local/tmp/inception_v3/Inception_v3.serialized.bin
 
 adb push /tmp/qnn_tmp/model_libs/${QNN_TARGET_ARCH}/libInception_v3.so /data/local/tmp/inception_v3
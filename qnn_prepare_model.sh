@@ -27,6 +27,11 @@ popd
 MODEL_ROOT="$(pwd)/model"
 mkdir -p "$MODEL_ROOT"
 
+# Serialized HTP context binaries, keyed by model hash + Hexagon version + SDK.
+# Size dirs are regenerated on every run, so the cache lives next to them.
+CONTEXT_CACHE="$MODEL_ROOT/context_cache"
+mkdir -p "$CONTEXT_CACHE"
+
 SIZE_ARR=(
   # "257x1024x3072" # clip L14 qkv fuse
   # "257x1024x4096" # clip L14 up projection
@@ -39,6 +44,11 @@ SIZE_ARR=(
   # "257x4096x4096" # large matmul test
 )
 
+# Graph generator options (see model/make_matmul_torch.py --help), e.g.
+#   MODEL_ARGS=(--mode chain --activation relu --residual --auto_depth --num_inputs 4)
+#   MODEL_ARGS=(--layers 64 --io_dtype fp16)
+MODEL_ARGS=(--layers 20 --mode sum)
+
 echo "Preparing matmul QNN models for sizes: ${SIZE_ARR[*]}"
 
 # Keep track of size dirs for pushing later
@@ -60,13 +70,10 @@ for size in "${SIZE_ARR[@]}"; do
   mkdir -p "$MODEL_ROOT/$size_dir"
   pushd "$MODEL_ROOT/$size_dir" >/dev/null
 
-  # make model file and input (raw) file in this size directory
-  python3 "$MODEL_ROOT/make_matmul_torch.py" "$M" "$K" "$N"
-
-  # prepare input_list.txt for qnn-pytorch-converter (single input case)
-  cat > input_list.txt <<EOF
-./input_0.raw
-EOF
+  # make model file, input (raw) files, input_list.txt and model_config.env in this size directory
+  python3 "$MODEL_ROOT/make_matmul_torch.py" "$M" "$K" "$N" "${MODEL_ARGS[@]}"
+  # CONVERTER_FLAGS and NET_RUN_FLAGS depend on the I/O data type
+  source ./model_config.env
 
   # convert to QNN model
   $QNN_SDK_ROOT/bin/x86_64-linux-clang/qnn-pytorch-converter \
@@ -74,8 +81,7 @@ EOF
     --input_dim "x" $M,$K \
     --input_list ./input_list.txt \
     --output_path ./matmul_qnn.cpp \
-    --weights_bitwidth 8 \
-    --act_bitwidth 8
+    $CONVERTER_FLAGS
 
   # generate model libs for target and host (placed inside this size_dir/model_libs)
   # Before running this, make sure ANDROID_NDK_ROOT is included in PATH
@@ -92,8 +98,37 @@ EOF
 
   QNN_MODEL_PATH=$(realpath ./model_libs/$QNN_TARGET_ARCH_AND_OS/libmatmul_qnn.so)
 
+  # Serialize the finalized graph so the device skips HTP graph preparation.
+  # The converter header comments are not part of the hash (they change every run).
+  MODEL_HASH=$( { grep -v '^//' matmul_qnn.cpp; cat matmul_qnn.bin; echo "v${HEXAGON_VERSION} ${QNN_SDK_ROOT##*/}"; } \
+    | sha256sum | cut -c1-16)
+  CONTEXT_BIN="$CONTEXT_CACHE/${MODEL_HASH}_v${HEXAGON_VERSION}.bin"
+  if [[ -f "$CONTEXT_BIN" ]]; then
+    echo "   context binary cached: $CONTEXT_BIN"
+  else
+    cat > htp_context_config.json <<EOF
+{"graphs": [{"graph_names": ["matmul_qnn"], "vtcm_mb": 8}], "devices": [{"htp_arch": "v${HEXAGON_VERSION}"}]}
+EOF
+    cat > htp_context_extensions.json <<EOF
+{"backend_extensions": {"shared_library_path": "${QNN_SDK_ROOT}/lib/${HOST_ARCH}/libQnnHtpNetRunExtensions.so",
+                        "config_file_path": "$(pwd)/htp_context_config.json"}}
+EOF
+    $QNN_SDK_ROOT/bin/${HOST_ARCH}/qnn-context-binary-generator \
+      --backend "${QNN_SDK_ROOT}/lib/${HOST_ARCH}/libQnnHtp.so" \
+      --model "./model_libs/${HOST_ARCH}/libmatmul_qnn.so" \
+      --config_file ./htp_context_extensions.json \
+      --binary_file matmul_qnn.serialized \
+      --output_dir ./context_out
+    mv ./context_out/matmul_qnn.serialized.bin "$CONTEXT_BIN.tmp" && mv "$CONTEXT_BIN.tmp" "$CONTEXT_BIN"
+    rm -rf ./context_out
+  fi
+  # qnn-net-run (--retrieve_context) and qnn_runner load this instead of finalizing libmatmul_qnn.so
+  cp "$CONTEXT_BIN" ./matmul_qnn.serialized.bin
+
   # Create input_list_target and env vars that are specific to this size dir on device
-  echo "${QNN_TARGET_DEST}/${size_dir}/input_0.raw" > input_list_target.txt
+  sed "s|^\./|${QNN_TARGET_DEST}/${size_dir}/|" target_input_list.txt > input_list_target.txt
+  # extra qnn-net-run flags picked up by run_contention.py
+  echo "$NET_RUN_FLAGS" > net_run_flags.txt
   cat > target_env_vars.env <<EOF
 export QNN_INPUT_LIST=${QNN_TARGET_DEST}/${size_dir}/input_list_target.txt
 export QNN_MODEL_PATH=${QNN_TARGET_DEST}/${size_dir}/${QNN_MODEL_PATH##*/}
@@ -125,6 +160,8 @@ adb push "${QNN_SDK_ROOT}/lib/${QNN_TARGET_ARCH_AND_OS}/libQnnCpu.so" "$QNN_TARG
 adb push "${QNN_SDK_ROOT}/lib/${QNN_TARGET_ARCH_AND_OS}/libQnnGpu.so" "$QNN_TARGET_DEST/"
 adb push "${QNN_SDK_ROOT}/lib/${QNN_TARGET_ARCH_AND_OS}/libQnnDsp.so" "$QNN_TARGET_DEST/"
 adb push "${QNN_SDK_ROOT}/lib/${QNN_TARGET_ARCH_AND_OS}/libQnnHtpPrepare.so" "$QNN_TARGET_DEST/"
+# graph/tensor info of context binaries for qnn_runner --retrieve_context
+adb push "${QNN_SDK_ROOT}/lib/${QNN_TARGET_ARCH_AND_OS}/libQnnSystem.so" "$QNN_TARGET_DEST/"
 adb push ${QNN_SDK_ROOT}/lib/${QNN_TARGET_ARCH_AND_OS}/libQnnHtpV${HEXAGON_VERSION}* "$QNN_TARGET_DEST/"
 adb push $QNN_SDK_ROOT/lib/hexagon-v${HEXAGON_VERSION}/unsigned/* "$QNN_TARGET_DEST/"
 
@@ -137,7 +174,7 @@ RUN_DIR="/data/local/tmp/qnn/matmul_${SIZE_ARR[0]}"
 adb shell "cd $RUN_DIR && \
   LD_LIBRARY_PATH=.. ADSP_LIBRARY_PATH=.. \
   ../qnn-net-run --backend ../libQnnHtp.so --model ./libmatmul_qnn.so \
-    --input_list ./input_list_target.txt --profiling_level detailed \
+    --input_list ./input_list_target.txt --profiling_level detailed \$(cat ./net_run_flags.txt) \
     --num_inferences 100 --output_dir ./out_htp"
 
 adb pull $RUN_DIR/out_htp/qnn-profiling-data_0.log ./
@@ -0,0 +1,21 @@
+#!/bin/bash
+
+set -e
+
+BUILD_TYPE=Release
+
+# QNN_SDK_ROOT is set by /opt/qairt/<version>/bin/envsetup.sh
+rm -r build-android || true
+
+cmake -GNinja -Bbuild-android \
+  -DCMAKE_TOOLCHAIN_FILE=$ANDROID_NDK_HOME/build/cmake/android.toolchain.cmake \
+  -DANDROID_ABI=arm64-v8a \
+  -DANDROID_PLATFORM=android-30 \
+  -DQNN_SDK_ROOT=$QNN_SDK_ROOT \
+  -DCMAKE_BUILD_TYPE=$BUILD_TYPE \
+  .
+
+cmake --build build-android
+
+# Next to qnn-net-run, so it runs from a model directory with the same relative paths
+adb push ./build-android/qnn_runner /data/local/tmp/qnn/
@@ -0,0 +1,885 @@
+// Long-lived NPU inference runner.
+//
+// Loads the backend and the model once, then executes inferences on request
+// and streams per-inference timings. Commands are read line by line from stdin:
+//
+//   run <n>   run n inferences, then print "DONE <n>"
+//   start [duty]
+//             run inferences back to back until "stop"; with duty < 1 idle
+//             after each inference so the NPU is busy for that fraction of the time
+//   start fixed|poisson <hz>
+//             open loop: requests arrive at this rate until "stop"; an inference
+//             starts at its arrival or when the previous one ends, whichever is later
+//   stop      stop a running loop, then print "DONE <count>"
+//   dump <d> [<input>]
+//             run input sample 0 (or the given input file) once and write its
+//             outputs as float32 <d>/output_<i>.raw, then print "DONE 1"
+//   quit      release everything and exit
+//
+// Benchmark inferences reuse one output buffer and never write to storage.
+//
+// Every inference prints "T <index> <latency_us>" (open loop: "T <index>
+// <latency_us> <queue_us>", queue_us being the wait from arrival to start). After loading, the runner
+// prints "READY <init_ms>". Errors are reported as "ERR <message>", which ends a
+// run or dump instead of its DONE (a failed loop still answers "stop" with DONE).
+//
+// With --retrieve_context the graph is deserialized from a context binary
+// (qnn-context-binary-generator, see qnn_prepare_model.sh) instead of being
+// composed from --model and finalized, which skips HTP graph preparation.
+//
+// With --fake_us the QNN backend is replaced by a stand-in that busy-waits for
+// the given time, so the protocol can be exercised on the host without an NPU.
+// Its dump echoes the input file as output_0.raw, and --fake_fail_at <i> makes
+// the i-th inference fail (for testing error recovery).
+
+#include <atomic>
+#include <chrono>
+#include <cmath>
+#include <cstdint>
+#include <cstdlib>
+#include <cstring>
+#include <fstream>
+#include <iostream>
+#include <memory>
+#include <mutex>
+#include <random>
+#include <sstream>
+#include <string>
+#include <thread>
+#include <vector>
+
+#include <sys/stat.h>
+
+#ifdef WITH_QNN
+#include <dlfcn.h>
+
+#include "QnnInterface.h"
+#include "QnnTypes.h"
+#include "System/QnnSystemInterface.h"
+#endif
+
+using Clock = std::chrono::steady_clock;
+
+class Backend {
+ public:
+  virtual ~Backend() = default;
+  // Load and prepare the model. Returns false and sets err on failure.
+  virtual bool init(std::string &err) = 0;
+  // Execute one inference on input sample `sample`.
+  virtual bool execute(size_t sample, std::string &err) = 0;
+  virtual size_t num_samples() const = 0;
+  // Run sample 0, or the input file `input` if not empty, and write the outputs
+  // as float32 raw files into `dir`.
+  virtual bool dump(const std::string &dir, const std::string &input, std::string &err) {
+    err = "dump is not supported by this backend";
+    return false;
+  }
+};
+
+// Host stand-in: every inference busy-waits for a fixed time.
+class FakeBackend : public Backend {
+ public:
+  FakeBackend(double inference_us, double init_ms, long fail_at = -1)
+      : inference_us_(inference_us), init_ms_(init_ms), fail_at_(fail_at) {}
+
+  bool init(std::string &err) override {
+    std::this_thread::sleep_for(std::chrono::duration<double, std::milli>(init_ms_));
+    return true;
+  }
+
+  bool execute(size_t sample, std::string &err) override {
+    if (calls_++ == fail_at_) {
+      err = "fake failure of inference " + std::to_string(fail_at_);
+      return false;
+    }
+    Clock::time_point end = Clock::now() + std::chrono::duration_cast<Clock::duration>(
+                                               std::chrono::duration<double, std::micro>(inference_us_));
+    while (Clock::now() < end) {
+    }
+    return true;
+  }
+
+  size_t num_samples() const override { return 1; }
+
+  bool dump(const std::string &dir, const std::string &input, std::string &err) override {
+    if (input.empty()) return Backend::dump(dir, input, err);
+    std::ifstream src(input, std::ios::binary);
+    if (!src) {
+      err = "cannot open input " + input;
+      return false;
+    }
+    if (!execute(0, err)) return false;
+    mkdir(dir.c_str(), 0777);
+    std::string path = dir + "/output_0.raw";
+    std::ofstream dst(path, std::ios::binary);
+    if (!(dst << src.rdbuf())) {
+      err = "cannot write " + path;
+      return false;
+    }
+    return true;
+  }
+
+ private:
+  double inference_us_;
+  double init_ms_;
+  long fail_at_;
+  long calls_ = 0;
+};
+
+#ifdef WITH_QNN
+// Mirrors the structs of the model library generated by qnn-model-lib-generator
+// (SampleApp WrapperUtils/QnnWrapperUtils.hpp).
+typedef struct GraphInfo {
+  Qnn_GraphHandle_t graph;
+  char *graphName;
+  Qnn_Tensor_t *inputTensors;
+  uint32_t numInputTensors;
+  Qnn_Tensor_t *outputTensors;
+  uint32_t numOutputTensors;
+} GraphInfo_t;
+
+typedef struct GraphConfigInfo {
+  char *graphName;
+  const QnnGraph_Config_t **graphConfigs;
+} GraphConfigInfo_t;
+
+typedef int (*ComposeGraphsFn_t)(Qnn_BackendHandle_t, QNN_INTERFACE_VER_TYPE, Qnn_ContextHandle_t,
+                                 const GraphConfigInfo_t **, const uint32_t, GraphInfo_t ***,
+                                 uint32_t *, bool, QnnLog_Callback_t, QnnLog_Level_t);
+typedef int (*FreeGraphsInfoFn_t)(GraphInfo_t ***, uint32_t);
+typedef Qnn_ErrorHandle_t (*QnnInterfaceGetProvidersFn_t)(const QnnInterface_t ***, uint32_t *);
+typedef Qnn_ErrorHandle_t (*QnnSystemInterfaceGetProvidersFn_t)(const QnnSystemInterface_t ***, uint32_t *);
+
+static size_t qnn_dtype_size(Qnn_DataType_t dtype) {
+  switch (dtype) {
+    case QNN_DATATYPE_INT_8:
+    case QNN_DATATYPE_UINT_8:
+    case QNN_DATATYPE_SFIXED_POINT_8:
+    case QNN_DATATYPE_UFIXED_POINT_8:
+    case QNN_DATATYPE_BOOL_8:
+      return 1;
+    case QNN_DATATYPE_INT_16:
+    case QNN_DATATYPE_UINT_16:
+    case QNN_DATATYPE_FLOAT_16:
+    case QNN_DATATYPE_SFIXED_POINT_16:
+    case QNN_DATATYPE_UFIXED_POINT_16:
+      return 2;
+    case QNN_DATATYPE_INT_32:
+    case QNN_DATATYPE_UINT_32:
+    case QNN_DATATYPE_FLOAT_32:
+    case QNN_DATATYPE_SFIXED_POINT_32:
+    case QNN_DATATYPE_UFIXED_POINT_32:
+      return 4;
+    case QNN_DATATYPE_INT_64:
+    case QNN_DATATYPE_UINT_64:
+    case QNN_DATATYPE_FLOAT_64:
+      return 8;
+    default:
+      return 0;
+  }
+}
+
+// Qnn_TensorV2_t extends Qnn_TensorV1_t with the same leading fields,
+// so the v1 view is valid for both versions.
+static size_t qnn_tensor_elems(const Qnn_Tensor_t &t) {
+  size_t elems = 1;
+  for (uint32_t i = 0; i < t.v1.rank; i++) elems *= t.v1.dimensions[i];
+  return elems;
+}
+
+static size_t qnn_tensor_bytes(const Qnn_Tensor_t &t) {
+  return qnn_tensor_elems(t) * qnn_dtype_size(t.v1.dataType);
+}
+
+static float half_to_float(uint16_t h) {
+  uint32_t sign = static_cast<uint32_t>(h & 0x8000) << 16;
+  uint32_t exp = (h >> 10) & 0x1f;
+  uint32_t mant = h & 0x3ff;
+  uint32_t x;
+  if (exp == 0) {
+    x = sign;  // zero (subnormals flushed)
+  } else if (exp == 31) {
+    x = sign | 0x7f800000 | (mant << 13);
+  } else {
+    x = sign | ((exp - 15 + 127) << 23) | (mant << 13);
+  }
+  float f;
+  std::memcpy(&f, &x, sizeof(f));
+  return f;
+}
+
+static uint16_t float_to_half(float f) {
+  uint32_t x;
+  std::memcpy(&x, &f, sizeof(x));
+  uint32_t sign = (x >> 16) & 0x8000;
+  int32_t exp = static_cast<int32_t>((x >> 23) & 0xff) - 127 + 15;
+  uint32_t mant = x & 0x7fffff;
+  if (exp <= 0) return static_cast<uint16_t>(sign);
+  if (exp >= 31) return static_cast<uint16_t>(sign | 0x7c00);
+  return static_cast<uint16_t>(sign | (exp << 10) | (mant >> 13));
+}
+
+// Convert a float32 input file into the tensor's data type (what qnn-net-run
+// does without --use_native_input_files).
+static bool convert_float_input(const std::vector<float> &src, const Qnn_Tensor_t &t,
+                                std::vector<uint8_t> &dst, std::string &err) {
+  dst.resize(qnn_tensor_bytes(t));
+  const Qnn_DataType_t dtype = t.v1.dataType;
+  if (dtype == QNN_DATATYPE_FLOAT_32) {
+    std::memcpy(dst.data(), src.data(), dst.size());
+    return true;
+  }
+  if (dtype == QNN_DATATYPE_FLOAT_16) {
+    uint16_t *out = reinterpret_cast<uint16_t *>(dst.data());
+    for (size_t i = 0; i < src.size(); i++) out[i] = float_to_half(src[i]);
+    return true;
+  }
+  if (dtype == QNN_DATATYPE_UFIXED_POINT_8 || dtype == QNN_DATATYPE_UFIXED_POINT_16) {
+    const Qnn_QuantizeParams_t &q = t.v1.quantizeParams;
+    if (q.quantizationEncoding != QNN_QUANTIZATION_ENCODING_SCALE_OFFSET) {
+      err = "unsupported input quantization encoding";
+      return false;
+    }
+    const float scale = q.scaleOffsetEncoding.scale;
+    const int32_t offset = q.scaleOffsetEncoding.offset;
+    const double qmax = dtype == QNN_DATATYPE_UFIXED_POINT_8 ? 255.0 : 65535.0;
+    for (size_t i = 0; i < src.size(); i++) {
+      double v = std::round(src[i] / scale) - offset;
+      v = v < 0.0 ? 0.0 : (v > qmax ? qmax : v);
+      if (dtype == QNN_DATATYPE_UFIXED_POINT_8) {
+        dst[i] = static_cast<uint8_t>(v);
+      } else {
+        reinterpret_cast<uint16_t *>(dst.data())[i] = static_cast<uint16_t>(v);
+      }
+    }
+    return true;
+  }
+  err = "unsupported input data type for float input files";
+  return false;
+}
+
+// Convert an output tensor to float32 (what qnn-net-run writes by default).
+static bool dequantize_output(const std::vector<uint8_t> &src, const Qnn_Tensor_t &t,
+                              std::vector<float> &dst, std::string &err) {
+  const size_t elems = qnn_tensor_elems(t);
+  dst.resize(elems);
+  const Qnn_DataType_t dtype = t.v1.dataType;
+  if (dtype == QNN_DATATYPE_FLOAT_32) {
+    std::memcpy(dst.data(), src.data(), elems * sizeof(float));
+    return true;
+  }
+  if (dtype == QNN_DATATYPE_FLOAT_16) {
+    const uint16_t *in = reinterpret_cast<const uint16_t *>(src.data());
+    for (size_t i = 0; i < elems; i++) dst[i] = half_to_float(in[i]);
+    return true;
+  }
+  if (dtype == QNN_DATATYPE_UFIXED_POINT_8 || dtype == QNN_DATATYPE_UFIXED_POINT_16) {
+    const Qnn_QuantizeParams_t &q = t.v1.quantizeParams;
+    if (q.quantizationEncoding != QNN_QUANTIZATION_ENCODING_SCALE_OFFSET) {
+      err = "unsupported output quantization encoding";
+      return false;
+    }
+    const float scale = q.scaleOffsetEncoding.scale;
+    const int32_t offset = q.scaleOffsetEncoding.offset;
+    for (size_t i = 0; i < elems; i++) {
+      int32_t v = dtype == QNN_DATATYPE_UFIXED_POINT_8
+                      ? src[i]
+                      : reinterpret_cast<const uint16_t *>(src.data())[i];
+      dst[i] = scale * static_cast<float>(v + offset);
+    }
+    return true;
+  }
+  err = "unsupported output data type";
+  return false;
+}
+
+class QnnBackend : public Backend {
+ public:
+  // context_path: serialized context to retrieve instead of composing model_path
+  QnnBackend(std::string backend_path, std::string model_path, std::string input_list,
+             std::string context_path = "", std::string system_lib_path = "libQnnSystem.so")
+      : backend_path_(std::move(backend_path)),
+        model_path_(std::move(model_path)),
+        input_list_(std::move(input_list)),
+        context_path_(std::move(context_path)),
+        system_lib_path_(std::move(system_lib_path)) {}
+
+  ~QnnBackend() override {
+    if (graphs_info_ && free_graphs_info_) free_graphs_info_(&graphs_info_, num_graphs_);
+    if (context_) qnn_.contextFree(context_, nullptr);
+    if (device_) qnn_.deviceFree(device_);
+    if (backend_) qnn_.backendFree(backend_);
+    // The retrieved graph's tensor descriptions point into the system context
+    if (system_context_) qnn_system_.systemContextFree(system_context_);
+    if (model_lib_) dlclose(model_lib_);
+    if (system_lib_) dlclose(system_lib_);
+    if (backend_lib_) dlclose(backend_lib_);
+  }
+
+  bool init(std::string &err) override {
+    backend_lib_ = dlopen(backend_path_.c_str(), RTLD_NOW | RTLD_LOCAL);
+    if (!backend_lib_) {
+      err = std::string("dlopen backend: ") + dlerror();
+      return false;
+    }
+    auto get_providers = reinterpret_cast<QnnInterfaceGetProvidersFn_t>(
+        dlsym(backend_lib_, "QnnInterface_getProviders"));
+    const QnnInterface_t **providers = nullptr;
+    uint32_t num_providers = 0;
+    if (!get_providers || get_providers(&providers, &num_providers) != QNN_SUCCESS) {
+      err = "failed to get QNN interface providers";
+      return false;
+    }
+    bool found = false;
+    for (uint32_t i = 0; i < num_providers; i++) {
+      if (providers[i]->apiVersion.coreApiVersion.major == QNN_API_VERSION_MAJOR &&
+          providers[i]->apiVersion.coreApiVersion.minor >= QNN_API_VERSION_MINOR) {
+        qnn_ = providers[i]->QNN_INTERFACE_VER_NAME;
+        found = true;
+        break;
+      }
+    }
+    if (!found) {
+      err = "no QNN interface provider with a compatible API version";
+      return false;
+    }
+
+    if (qnn_.backendCreate(nullptr, nullptr, &backend_) != QNN_SUCCESS) {
+      err = "backendCreate failed";
+      return false;
+    }
+    // Device creation is optional for some backends
+    if (qnn_.deviceCreate && qnn_.deviceCreate(nullptr, nullptr, &device_) != QNN_SUCCESS) {
+      device_ = nullptr;
+    }
+    if (!context_path_.empty()) {
+      return retrieve_context(err) && setup_tensors(err);
+    }
+    if (qnn_.contextCreate(backend_, device_, nullptr, &context_) != QNN_SUCCESS) {
+      err = "contextCreate failed";
+      return false;
+    }
+
+    model_lib_ = dlopen(model_path_.c_str(), RTLD_NOW | RTLD_LOCAL);
+    if (!model_lib_) {
+      err = std::string("dlopen model: ") + dlerror();
+      return false;
+    }
+    auto compose = reinterpret_cast<ComposeGraphsFn_t>(dlsym(model_lib_, "QnnModel_composeGraphs"));
+    free_graphs_info_ = reinterpret_cast<FreeGraphsInfoFn_t>(dlsym(model_lib_, "QnnModel_freeGraphsInfo"));
+    if (!compose || !free_graphs_info_) {
+      err = "model library does not export QnnModel_composeGraphs/QnnModel_freeGraphsInfo";
+      return false;
+    }
+    if (compose(backend_, qnn_, context_, nullptr, 0, &graphs_info_, &num_graphs_, false,
+                nullptr, QNN_LOG_LEVEL_ERROR) != 0 || num_graphs_ == 0) {
+      err = "QnnModel_composeGraphs failed";
+      return false;
+    }
+    graph_ = graphs_info_[0];
+    if (qnn_.graphFinalize(graph_->graph, nullptr, nullptr) != QNN_SUCCESS) {
+      err = "graphFinalize failed";
+      return false;
+    }
+    return setup_tensors(err);
+  }
+
+  bool execute(size_t sample, std::string &err) override { return execute_inputs(inputs_[sample], err); }
+
+  size_t num_samples() const override { return inputs_.size(); }
+
+  bool dump(const std::string &dir, const std::string &input, std::string &err) override {
+    if (input.empty()) {
+      if (!execute(0, err)) return false;
+    } else {
+      if (graph_->numInputTensors != 1) {
+        err = "dump with an input file needs a graph with one input";
+        return false;
+      }
+      std::vector<std::vector<uint8_t>> sample(1);
+      if (!load_input(input, graph_->inputTensors[0], sample[0], err)) return false;
+      if (!execute_inputs(sample, err)) return false;
+    }
+    mkdir(dir.c_str(), 0777);
+    for (uint32_t i = 0; i < graph_->numOutputTensors; i++) {
+      std::vector<float> values;
+      if (!dequantize_output(outputs_[i], graph_->outputTensors[i], values, err)) return false;
+      std::string path = dir + "/output_" + std::to_string(i) + ".raw";
+      std::ofstream f(path, std::ios::binary);
+      if (!f) {
+        err = "cannot write " + path;
+        return false;
+      }
+      f.write(reinterpret_cast<const char *>(values.data()), values.size() * sizeof(float));
+    }
+    return true;
+  }
+
+ private:
+  bool execute_inputs(std::vector<std::vector<uint8_t>> &sample, std::string &err) {
+    for (uint32_t i = 0; i < graph_->numInputTensors; i++) {
+      graph_->inputTensors[i].v1.clientBuf.data = sample[i].data();
+    }
+    if (qnn_.graphExecute(graph_->graph, graph_->inputTensors, graph_->numInputTensors,
+                          graph_->outputTensors, graph_->numOutputTensors, nullptr,
+                          nullptr) != QNN_SUCCESS) {
+      err = "graphExecute failed";
+      return false;
+    }
+    return true;
+  }
+
+  // Create the context from a serialized binary and retrieve its graph. The
+  // input/output tensor descriptions are read from the binary with the QNN
+  // System API, since there is no model library to compose them.
+  bool retrieve_context(std::string &err) {
+    std::ifstream f(context_path_, std::ios::binary | std::ios::ate);
+    if (!f) {
+      err = "cannot open context binary " + context_path_;
+      return false;
+    }
+    context_binary_.resize(static_cast<size_t>(f.tellg()));
+    f.seekg(0);
+    f.read(reinterpret_cast<char *>(context_binary_.data()), context_binary_.size());
+
+    system_lib_ = dlopen(system_lib_path_.c_str(), RTLD_NOW | RTLD_LOCAL);
+    if (!system_lib_) {
+      err = std::string("dlopen system library: ") + dlerror();
+      return false;
+    }
+    auto get_providers = reinterpret_cast<QnnSystemInterfaceGetProvidersFn_t>(
+        dlsym(system_lib_, "QnnSystemInterface_getProviders"));
+    const QnnSystemInterface_t **providers = nullptr;
+    uint32_t num_providers = 0;
+    if (!get_providers || get_providers(&providers, &num_providers) != QNN_SUCCESS) {
+      err = "failed to get QNN system interface providers";
+      return false;
+    }
+    bool found = false;
+    for (uint32_t i = 0; i < num_providers; i++) {
+      if (providers[i]->systemApiVersion.major == QNN_SYSTEM_API_VERSION_MAJOR &&
+          providers[i]->systemApiVersion.minor >= QNN_SYSTEM_API_VERSION_MINOR) {
+        qnn_system_ = providers[i]->QNN_SYSTEM_INTERFACE_VER_NAME;
+        found = true;
+        break;
+      }
+    }
+    if (!found) {
+      err = "no QNN system interface provider with a compatible API version";
+      return false;
+    }
+    if (qnn_system_.systemContextCreate(&system_context_) != QNN_SUCCESS) {
+      err = "systemContextCreate failed";
+      return false;
+    }
+    const QnnSystemContext_BinaryInfo_t *info = nullptr;
+    Qnn_ContextBinarySize_t info_size = 0;
+    if (qnn_system_.systemContextGetBinaryInfo(system_context_, context_binary_.data(), context_binary_.size(),
+                                               &info, &info_size) != QNN_SUCCESS || !info) {
+      err = "systemContextGetBinaryInfo failed";
+      return false;
+    }
+    if (!read_graph_info(*info, err)) return false;
+
+    if (qnn_.contextCreateFromBinary(backend_, device_, nullptr, context_binary_.data(), context_binary_.size(),
+                                     &context_, nullptr) != QNN_SUCCESS) {
+      err = "contextCreateFromBinary failed (context binary built for another SDK or Hexagon version?)";
+      return false;
+    }
+    if (qnn_.graphRetrieve(context_, retrieved_graph_.graphName, &retrieved_graph_.graph) != QNN_SUCCESS) {
+      err = std::string("graphRetrieve failed for graph ") + retrieved_graph_.graphName;
+      return false;
+    }
+    graph_ = &retrieved_graph_;
+    return true;
+  }
+
+  bool read_graph_info(const QnnSystemContext_BinaryInfo_t &info, std::string &err) {
+    const QnnSystemContext_GraphInfo_t *graphs = nullptr;
+    uint32_t num_graphs = 0;
+    switch (info.version) {
+      case QNN_SYSTEM_CONTEXT_BINARY_INFO_VERSION_1:
+        graphs = info.contextBinaryInfoV1.graphs;
+        num_graphs = info.contextBinaryInfoV1.numGraphs;
+        break;
+      case QNN_SYSTEM_CONTEXT_BINARY_INFO_VERSION_2:
+        graphs = info.contextBinaryInfoV2.graphs;
+        num_graphs = info.contextBinaryInfoV2.numGraphs;
+        break;
+      case QNN_SYSTEM_CONTEXT_BINARY_INFO_VERSION_3:
+        graphs = info.contextBinaryInfoV3.graphs;
+        num_graphs = info.contextBinaryInfoV3.numGraphs;
+        break;
+      default:
+        err = "unsupported context binary info version";
+        return false;
+    }
+    if (num_graphs == 0) {
+      err = "context binary has no graphs";
+      return false;
+    }
+    switch (graphs[0].version) {
+      case QNN_SYSTEM_CONTEXT_GRAPH_INFO_VERSION_1:
+        copy_graph_info(graphs[0].graphInfoV1);
+        return true;
+      case QNN_SYSTEM_CONTEXT_GRAPH_INFO_VERSION_2:
+        copy_graph_info(graphs[0].graphInfoV2);
+        return true;
+      case QNN_SYSTEM_CONTEXT_GRAPH_INFO_VERSION_3:
+        copy_graph_info(graphs[0].graphInfoV3);
+        return true;
+      default:
+        err = "unsupported context graph info version";
+        return false;
+    }
+  }
+
+  // Own copies of the tensor structs, since setup_tensors binds client buffers to them
+  template <typename GraphInfoT>
+  void copy_graph_info(const GraphInfoT &g) {
+    retrieved_name_ = g.graphName;
+    retrieved_inputs_.assign(g.graphInputs, g.graphInputs + g.numGraphInputs);
+    retrieved_outputs_.assign(g.graphOutputs, g.graphOutputs + g.numGraphOutputs);
+    retrieved_graph_.graph = nullptr;
+    retrieved_graph_.graphName = &retrieved_name_[0];
+    retrieved_graph_.inputTensors = retrieved_inputs_.data();
+    retrieved_graph_.numInputTensors = g.numGraphInputs;
+    retrieved_graph_.outputTensors = retrieved_outputs_.data();
+    retrieved_graph_.numOutputTensors = g.numGraphOutputs;
+  }
+
+  bool setup_tensors(std::string &err) {
+    // One output buffer per tensor, reused by every inference (outputs are never written to storage)
+    outputs_.resize(graph_->numOutputTensors);
+    for (uint32_t i = 0; i < graph_->numOutputTensors; i++) {
+      Qnn_Tensor_t &t = graph_->outputTensors[i];
+      outputs_[i].resize(qnn_tensor_bytes(t));
+      t.v1.memType = QNN_TENSORMEMTYPE_RAW;
+      t.v1.clientBuf.data = outputs_[i].data();
+      t.v1.clientBuf.dataSize = static_cast<uint32_t>(outputs_[i].size());
+    }
+
+    // Each input list line is one sample; tensors on a line are space separated
+    // and may use the "name:=path" form.
+    std::ifstream list(input_list_);
+    if (!list) {
+      err = "cannot open input list " + input_list_;
+      return false;
+    }
+    std::string line;
+    while (std::getline(list, line)) {
+      if (line.empty() || line[0] == '#') continue;
+      std::istringstream fields(line);
+      std::vector<std::vector<uint8_t>> sample;
+      std::string path;
+      while (fields >> path) {
+        size_t sep = path.find(":=");
+        if (sep != std::string::npos) path = path.substr(sep + 2);
+        if (sample.size() >= graph_->numInputTensors) break;
+        const Qnn_Tensor_t &t = graph_->inputTensors[sample.size()];
+        std::vector<uint8_t> buf;
+        if (!load_input(path, t, buf, err)) return false;
+        sample.push_back(std::move(buf));
+      }
+      if (sample.size() != graph_->numInputTensors) {
+        err = "input list line does not match the number of graph inputs: " + line;
+        return false;
+      }
+      inputs_.push_back(std::move(sample));
+    }
+    if (inputs_.empty()) {
+      err = "input list is empty";
+      return false;
+    }
+    for (uint32_t i = 0; i < graph_->numInputTensors; i++) {
+      Qnn_Tensor_t &t = graph_->inputTensors[i];
+      t.v1.memType = QNN_TENSORMEMTYPE_RAW;
+      t.v1.clientBuf.dataSize = static_cast<uint32_t>(inputs_[0][i].size());
+    }
+    return true;
+  }
+
+  static bool load_input(const std::string &path, const Qnn_Tensor_t &t,
+                         std::vector<uint8_t> &buf, std::string &err) {
+    std::ifstream f(path, std::ios::binary | std::ios::ate);
+    if (!f) {
+      err = "cannot open input " + path;
+      return false;
+    }
+    size_t file_bytes = static_cast<size_t>(f.tellg());
+    f.seekg(0);
+    if (file_bytes == qnn_tensor_bytes(t)) {
+      // Native input file
+      buf.resize(file_bytes);
+      f.read(reinterpret_cast<char *>(buf.data()), file_bytes);
+      return true;
+    }
+    if (file_bytes == qnn_tensor_elems(t) * sizeof(float)) {
+      std::vector<float> src(qnn_tensor_elems(t));
+      f.read(reinterpret_cast<char *>(src.data()), file_bytes);
+      return convert_float_input(src, t, buf, err);
+    }
+    err = "size of " + path + " matches neither the native nor the float32 tensor size";
+    return false;
+  }
+
+  std::string backend_path_;
+  std::string model_path_;
+  std::string input_list_;
+  std::string context_path_;
+  std::string system_lib_path_;
+
+  void *backend_lib_ = nullptr;
+  void *model_lib_ = nullptr;
+  void *system_lib_ = nullptr;
+  QNN_INTERFACE_VER_TYPE qnn_ = QNN_INTERFACE_VER_TYPE_INIT;
+  Qnn_BackendHandle_t backend_ = nullptr;
+  Qnn_DeviceHandle_t device_ = nullptr;
+  Qnn_ContextHandle_t context_ = nullptr;
+  GraphInfo_t **graphs_info_ = nullptr;
+  uint32_t num_graphs_ = 0;
+  GraphInfo_t *graph_ = nullptr;
+  FreeGraphsInfoFn_t free_graphs_info_ = nullptr;
+
+  // --retrieve_context
+  QNN_SYSTEM_INTERFACE_VER_TYPE qnn_system_ = QNN_SYSTEM_INTERFACE_VER_TYPE_INIT;
+  QnnSystemContext_Handle_t system_context_ = nullptr;
+  std::vector<uint8_t> context_binary_;
+  GraphInfo_t retrieved_graph_ = {};
+  std::string retrieved_name_;
+  std::vector<Qnn_Tensor_t> retrieved_inputs_;
+  std::vector<Qnn_Tensor_t> retrieved_outputs_;
+
+  std::vector<std::vector<std::vector<uint8_t>>> inputs_;  // [sample][tensor][bytes]
+  std::vector<std::vector<uint8_t>> outputs_;
+};
+#endif  // WITH_QNN
+
+class Runner {
+ public:
+  explicit Runner(Backend &backend) : backend_(backend) {}
+
+  ~Runner() { stop(false); }
+
+  void emit(const std::string &line) {
+    std::lock_guard<std::mutex> lock(out_mu_);
+    std::cout << line << std::endl;
+  }
+
+  bool run_one(double *latency_us = nullptr, double queue_us = -1.0) {
+    std::string err;
+    Clock::time_point t0 = Clock::now();
+    bool ok = backend_.execute(next_index_ % backend_.num_samples(), err);
+    double us = std::chrono::duration<double, std::micro>(Clock::now() - t0).count();
+    if (!ok) {
+      emit("ERR " + err);
+      return false;
+    }
+    std::ostringstream line;
+    line << "T " << next_index_++ << " " << us;
+    if (queue_us >= 0) line << " " << queue_us;
+    emit(line.str());
+    if (latency_us) *latency_us = us;
+    return true;
+  }
+
+  void run(long n) {
+    for (long count = 0; count < n; count++) {
+      if (!run_one()) return;  // ERR already reported
+    }
+    emit("DONE " + std::to_string(n));
+  }
+
+  void start(double duty = 1.0) {
+    looping_ = true;
+    loop_count_ = 0;
+    worker_ = std::thread([this, duty]() {
+      while (looping_) {
+        double us = 0.0;
+        if (!run_one(&us)) break;
+        loop_count_++;
+        if (duty < 1.0) {
+          std::this_thread::sleep_for(std::chrono::duration<double, std::micro>(us * (1.0 - duty) / duty));
+        }
+      }
+    });
+  }
+
+  void start_open_loop(double rate_hz, bool poisson) {
+    looping_ = true;
+    loop_count_ = 0;
+    worker_ = std::thread([this, rate_hz, poisson]() {
+      std::mt19937_64 rng(12345);
+      std::exponential_distribution<double> poisson_gap_s(rate_hz);
+      Clock::time_point arrival = Clock::now();
+      while (looping_) {
+        Clock::time_point now = Clock::now();
+        if (now < arrival) {
+          std::this_thread::sleep_until(arrival);
+          now = Clock::now();
+        }
+        double queue_us = std::chrono::duration<double, std::micro>(now - arrival).count();
+        if (!run_one(nullptr, queue_us)) break;
+        loop_count_++;
+        double gap_s = poisson ? poisson_gap_s(rng) : 1.0 / rate_hz;
+        arrival += std::chrono::duration_cast<Clock::duration>(std::chrono::duration<double>(gap_s));
+      }
+    });
+  }
+
+  void stop(bool report = true) {
+    if (!worker_.joinable()) return;
+    looping_ = false;
+    worker_.join();
+    if (report) emit("DONE " + std::to_string(loop_count_.load()));
+  }
+
+  void dump(const std::string &dir, const std::string &input) {
+    std::string err;
+    if (!backend_.dump(dir, input, err)) {
+      emit("ERR " + err);
+      return;
+    }
+    emit("DONE 1");
+  }
+
+  bool busy() const { return worker_.joinable(); }
+
+ private:
+  Backend &backend_;
+  std::mutex out_mu_;
+  std::atomic<bool> looping_{false};
+  std::atomic<long> loop_count_{0};
+  std::thread worker_;
+  uint64_t next_index_ = 0;
+};
+
+static void usage(const char *prog) {
+  std::cerr << "Usage: " << prog << " --backend <libQnnHtp.so> --model <libmodel.so> --input_list <list>" << std::endl;
+  std::cerr << "       " << prog << " --backend <libQnnHtp.so> --retrieve_context <context.bin> --input_list <list>"
+            << " [--system_lib <libQnnSystem.so>]" << std::endl;
+  std::cerr << "       " << prog << " --fake_us <inference_us> [--fake_init_ms <ms>] [--fake_fail_at <i>]"
+            << std::endl;
+}
+
+int main(int argc, char *argv[]) {
+  std::string backend_path, model_path, input_list, context_path;
+  std::string system_lib_path = "libQnnSystem.so";
+  double fake_us = -1.0;
+  double fake_init_ms = 0.0;
+  long fake_fail_at = -1;
+
+  for (int i = 1; i < argc; i++) {
+    std::string arg = argv[i];
+    if (i + 1 >= argc) {
+      usage(argv[0]);
+      return 1;
+    }
+    std::string value = argv[++i];
+    if (arg == "--backend") {
+      backend_path = value;
+    } else if (arg == "--model") {
+      model_path = value;
+    } else if (arg == "--retrieve_context") {
+      context_path = value;
+    } else if (arg == "--system_lib") {
+      system_lib_path = value;
+    } else if (arg == "--input_list") {
+      input_list = value;
+    } else if (arg == "--fake_us") {
+      fake_us = std::stod(value);
+    } else if (arg == "--fake_init_ms") {
+      fake_init_ms = std::stod(value);
+    } else if (arg == "--fake_fail_at") {
+      fake_fail_at = std::stol(value);
+    } else {
+      usage(argv[0]);
+      return 1;
+    }
+  }
+
+  std::unique_ptr<Backend> backend;
+  if (fake_us >= 0.0) {
+    backend.reset(new FakeBackend(fake_us, fake_init_ms, fake_fail_at));
+  } else {
+#ifdef WITH_QNN
+    if (backend_path.empty() || (model_path.empty() && context_path.empty()) || input_list.empty()) {
+      usage(argv[0]);
+      return 1;
+    }
+    backend.reset(new QnnBackend(backend_path, model_path, input_list, context_path, system_lib_path));
+#else
+    std::cerr << "Error: built without QNN support, only --fake_us is available" << std::endl;
+    return 1;
+#endif
+  }
+
+  Clock::time_point init_start = Clock::now();
+  std::string err;
+  if (!backend->init(err)) {
+    std::cout << "ERR " << err << std::endl;
+    return 1;
+  }
+  Runner runner(*backend);
+  runner.emit("READY " + std::to_string(
+                             std::chrono::duration<double, std::milli>(Clock::now() - init_start).count()));
+
+  std::string line;
+  while (std::getline(std::cin, line)) {
+    std::istringstream fields(line);
+    std::string cmd;
+    fields >> cmd;
+    if (cmd.empty()) continue;
+
+    if (cmd == "quit") {
+      break;
+    } else if (cmd == "stop") {
+      if (runner.busy()) {
+        runner.stop();
+      } else {
+        runner.emit("ERR not running");
+      }
+    } else if (runner.busy()) {
+      runner.emit("ERR busy");
+    } else if (cmd == "run") {
+      long n = 0;
+      if (!(fields >> n) || n <= 0) {
+        runner.emit("ERR run needs a positive count");
+        continue;
+      }
+      runner.run(n);
+    } else if (cmd == "start") {
+      double duty = 1.0;
+      std::string duty_str;
+      if (fields >> duty_str) {
+        if (duty_str == "fixed" || duty_str == "poisson") {
+          double rate_hz = 0.0;
+          if (!(fields >> rate_hz) || rate_hz <= 0.0) {
+            runner.emit("ERR rate must be positive");
+            continue;
+          }
+          runner.start_open_loop(rate_hz, duty_str == "poisson");
+          continue;
+        }
+        duty = std::atof(duty_str.c_str());
+      }
+      if (duty <= 0.0 || duty > 1.0) {
+        runner.emit("ERR duty must be in (0, 1]");
+        continue;
+      }
+      runner.start(duty);
+    } else if (cmd == "dump") {
+      std::string dir, input;
+      if (!(fields >> dir)) {
+        runner.emit("ERR dump needs an output directory");
+        continue;
+      }
+      fields >> input;
+      runner.dump(dir, input);
+    } else {
+      runner.emit("ERR unknown command " + cmd);
+    }
+  }
+  runner.stop(false);
+  return 0;
+}
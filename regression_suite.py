@@ -0,0 +1,274 @@
+"""
+Regression suite: run a fixed set of contention benchmarks and compare them
+against a stored baseline.
+
+A suite (suites/*.json) is the cross product of shapes x kernel variants x
+contention scenarios:
+
+    shapes     CPU shape (pareto_so_files/<shape>_<cpu_candidate>_neon+dotprod.so),
+               GPU shape and NPU model
+    variants   CPU candidate (or {shape: candidate}) and CLBlast kernel index
+               ("base", "ours_gpu4", ...)
+    scenarios  extra run_contention.py arguments ([] = no background load,
+               ["--bg", "gpu_copy:8:1.0:64"], ...)
+
+`run` executes every combination with run_contention.py and stores the
+results as a result set (<out>/<shape>__<variant>__<scenario>.json). Then it
+compares the set against regression/baselines/<suite name> if that exists.
+`compare` does the same comparison offline for any two result sets, and
+`promote` stores a result set as the new baseline.
+
+Per combination and accelerator (contended and standalone), the comparison
+reports the median and p99 slowdown with a bootstrap confidence interval.
+Samples flagged by the device monitor (*_invalid) are dropped. A metric
+fails if its slowdown exceeds the suite threshold and the lower bound of the
+interval is above zero, so noise alone does not fail a run. The exit code
+is 1 if anything failed.
+
+Usage:
+    python regression_suite.py run suites/decode_contention.json
+    python regression_suite.py compare regression/baselines/decode_contention regression/20251201_101500
+    python regression_suite.py promote regression/20251201_101500
+"""
+
+import os
+import sys
+import glob
+import json
+import shutil
+import argparse
+import datetime
+import itertools
+import subprocess
+import tempfile
+import logging
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+REGRESSION_DIR = "regression"
+BASELINE_DIR = os.path.join(REGRESSION_DIR, "baselines")
+
+DEFAULT_THRESHOLDS = {
+    'median_slowdown': 0.05,
+    'p99_slowdown': 0.15,
+    'confidence': 0.95,
+}
+
+
+SUITE_KEYS = ('name', 'shapes', 'variants', 'scenarios')
+
+
+def load_suite(path):
+    with open(path) as f:
+        suite = json.load(f)
+    missing = [key for key in SUITE_KEYS if key not in suite]
+    if missing:
+        kind = "an experiment_planner.py space (plans/)" if 'factors' in suite else "not a regression suite"
+        raise ValueError(f"{path} is {kind}: it has no {', '.join(missing)} (expected {', '.join(SUITE_KEYS)})")
+    suite['thresholds'] = dict(DEFAULT_THRESHOLDS, **suite.get('thresholds', {}))
+    return suite
+
+
+def expand_suite(suite):
+    """All (key, run_contention.py arguments) combinations of a suite."""
+    runs = []
+    for shape, (variant_name, variant), (scenario, scenario_args) in itertools.product(
+            suite['shapes'], suite['variants'].items(), suite['scenarios'].items()):
+        # Candidates are numbered per shape, so a variant may map shapes to candidates
+        candidate = variant['cpu_candidate']
+        if isinstance(candidate, dict):
+            candidate = candidate[shape['shape']]
+        cpu_path = os.path.join(suite.get('cpu_dir', 'pareto_so_files'), f"{shape['shape']}_{candidate}_neon+dotprod.so")
+        args = ["-c", cpu_path, "-g", f"{variant['gpu_kernel']},{shape['gpu_shape']}", "-n", shape['npu']]
+        runs.append((f"{shape['shape']}__{variant_name}__{scenario}",
+                     args + suite.get('common_args', []) + scenario_args))
+    return runs
+
+
+def run_combination(key, args, out_dir, label="REG"):
+    """Run run_contention.py with args and store its result as <out_dir>/<key>.json; False if it failed."""
+    with tempfile.TemporaryDirectory(prefix="reg_") as tmp:
+        cmd = [sys.executable, "run_contention.py"] + args + ["--result_dir", tmp]
+        logger.info(f"[{label}] {' '.join(cmd)}")
+        if subprocess.run(cmd).returncode != 0:
+            logger.error(f"[{label}] {key} failed")
+            return False
+        results = [p for p in glob.glob(os.path.join(tmp, "*.json")) if not os.path.basename(p).startswith("spans_")]
+        if not results:
+            # run_contention.py skips a candidate it cannot load (e.g. a missing .so) without failing
+            logger.error(f"[{label}] {key} wrote no result")
+            return False
+        shutil.copyfile(results[0], os.path.join(out_dir, f"{key}.json"))
+    return True
+
+
+def run_suite(suite_path, out_dir):
+    """Run every combination of a suite into a new result set."""
+    suite = load_suite(suite_path)
+    os.makedirs(out_dir, exist_ok=True)
+    shutil.copyfile(suite_path, os.path.join(out_dir, "suite.json"))
+    runs = expand_suite(suite)
+    failed = []
+    for i, (key, args) in enumerate(runs, 1):
+        logger.info(f"\n[REG] [{i}/{len(runs)}] {key}")
+        if not run_combination(key, args, out_dir):
+            failed.append(key)
+    commit = subprocess.run(["git", "rev-parse", "HEAD"], stdout=subprocess.PIPE, text=True).stdout.strip()
+    with open(os.path.join(out_dir, "manifest.json"), "w") as f:
+        json.dump({'suite': suite['name'], 'created': datetime.datetime.now().isoformat(),
+                   'git_commit': commit, 'failed_runs': failed}, f, indent=2)
+    return failed
+
+
+def load_result_set(result_dir):
+    sets = {}
+    for path in sorted(glob.glob(os.path.join(result_dir, "*__*__*.json"))):
+        with open(path) as f:
+            sets[os.path.basename(path)[:-len(".json")]] = json.load(f)
+    return sets
+
+
+def _valid_samples(result, accel, suffix):
+    latencies = result.get(f"{accel}_latency{suffix}")
+    if not latencies:
+        return None
+    invalid = set(result.get(f"{accel}_invalid{suffix}", []))
+    return np.array([x for i, x in enumerate(latencies) if i not in invalid])
+
+
+def bootstrap_ratio(base, new, stat, confidence=0.95, num_boot=1000, seed=0):
+    """Bootstrap confidence interval of stat(new) / stat(base)."""
+    rng = np.random.default_rng(seed)
+    ratios = [stat(rng.choice(new, len(new))) / stat(rng.choice(base, len(base))) for _ in range(num_boot)]
+    alpha = (1 - confidence) / 2
+    return float(np.quantile(ratios, alpha)), float(np.quantile(ratios, 1 - alpha))
+
+
+def compare_metric(base, new, thresholds):
+    """Slowdowns of one latency series; 'pass' is False for a significant slowdown above threshold."""
+    p99 = lambda x: np.percentile(x, 99)
+    row = {'base_samples': len(base), 'new_samples': len(new), 'pass': True, 'failures': []}
+    for name, stat in (('median', np.median), ('p99', p99)):
+        slowdown = stat(new) / stat(base) - 1
+        low, high = bootstrap_ratio(base, new, stat, thresholds['confidence'])
+        row[f'{name}_base'] = float(stat(base))
+        row[f'{name}_new'] = float(stat(new))
+        row[f'{name}_slowdown'] = float(slowdown)
+        row[f'{name}_ci'] = [low - 1, high - 1]
+        if slowdown > thresholds[f'{name}_slowdown'] and low > 1:
+            row['pass'] = False
+            row['failures'].append(f"{name} {slowdown:+.1%} (CI {low - 1:+.1%}..{high - 1:+.1%})")
+    return row
+
+
+def compare_stats(base_stat, new_stat, thresholds):
+    """Fallback when only summary stats exist (NPU measured with qnn-net-run): mean slowdown, no interval."""
+    slowdown = new_stat['mean'] / base_stat['mean'] - 1
+    row = {'mean_base': base_stat['mean'], 'mean_new': new_stat['mean'], 'mean_slowdown': slowdown,
+           'pass': slowdown <= thresholds['median_slowdown'], 'failures': []}
+    if not row['pass']:
+        row['failures'].append(f"mean {slowdown:+.1%} (summary stats only)")
+    return row
+
+
+def compare_result_sets(base_dir, new_dir, thresholds):
+    """Compare two result sets; returns the rows of every (key, accelerator, phase)."""
+    base_sets, new_sets = load_result_set(base_dir), load_result_set(new_dir)
+    rows = []
+    for key in sorted(set(base_sets) | set(new_sets)):
+        if key not in base_sets or key not in new_sets:
+            missing = "baseline" if key not in base_sets else "new result set"
+            rows.append({'key': key, 'accel': '-', 'phase': '-', 'pass': key not in base_sets,
+                         'failures': [f"missing in {missing}"]})
+            continue
+        base, new = base_sets[key], new_sets[key]
+        for accel, (phase, suffix) in itertools.product(("cpu", "gpu", "npu"),
+                                                        (("contended", ""), ("standalone", "_standalone"))):
+            base_samples, new_samples = _valid_samples(base, accel, suffix), _valid_samples(new, accel, suffix)
+            if base_samples is not None and new_samples is not None and len(base_samples) and len(new_samples):
+                row = compare_metric(base_samples, new_samples, thresholds)
+            elif base.get(f"{accel}_stat{suffix}") and new.get(f"{accel}_stat{suffix}"):
+                row = compare_stats(base[f"{accel}_stat{suffix}"], new[f"{accel}_stat{suffix}"], thresholds)
+            else:
+                continue
+            rows.append(dict(row, key=key, accel=accel, phase=phase))
+    return rows
+
+
+def log_comparison(rows):
+    logger.info(f"{'combination':<48}{'accel':>6}{'phase':>12}{'median':>10}{'p99':>10}  result")
+    for row in rows:
+        median = row.get('median_slowdown', row.get('mean_slowdown'))
+        p99 = row.get('p99_slowdown')
+        logger.info(f"{row['key']:<48}{row['accel']:>6}{row['phase']:>12}"
+                    f"{'' if median is None else f'{median:+.1%}':>10}{'' if p99 is None else f'{p99:+.1%}':>10}  "
+                    f"{'PASS' if row['pass'] else 'FAIL ' + '; '.join(row['failures'])}")
+    failed = [row for row in rows if not row['pass']]
+    logger.info(f"[REG] {len(rows) - len(failed)}/{len(rows)} passed")
+    return not failed
+
+
+def compare(base_dir, new_dir, suite_path=None):
+    """Compare new_dir against base_dir, write comparison.json into new_dir and return True if all passed."""
+    suite = load_suite(suite_path or os.path.join(new_dir, "suite.json"))
+    rows = compare_result_sets(base_dir, new_dir, suite['thresholds'])
+    passed = log_comparison(rows)
+    with open(os.path.join(new_dir, "comparison.json"), "w") as f:
+        json.dump({'baseline': base_dir, 'thresholds': suite['thresholds'], 'passed': passed, 'rows': rows}, f, indent=2)
+    return passed
+
+
+def promote(result_dir):
+    """Store a result set as the baseline of its suite."""
+    with open(os.path.join(result_dir, "suite.json")) as f:
+        name = json.load(f)['name']
+    dest = os.path.join(BASELINE_DIR, name)
+    if os.path.exists(dest):
+        shutil.rmtree(dest)
+    shutil.copytree(result_dir, dest)
+    logger.info(f"[REG] Stored {result_dir} as baseline {dest}")
+    return dest
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a contention regression suite and compare it against a baseline.",
+                                     epilog=__doc__[__doc__.index("Usage:"):],
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest="command", required=True)
+    run_p = sub.add_parser("run", help="Run a suite and compare it against the stored baseline")
+    run_p.add_argument("suite")
+    run_p.add_argument("--out", help="Result set directory (default: regression/<timestamp>)")
+    run_p.add_argument("--baseline", help="Baseline result set (default: regression/baselines/<suite name>)")
+    cmp_p = sub.add_parser("compare", help="Compare two stored result sets offline")
+    cmp_p.add_argument("baseline")
+    cmp_p.add_argument("result_set")
+    cmp_p.add_argument("--suite", help="Suite with the thresholds (default: the result set's suite.json)")
+    promote_p = sub.add_parser("promote", help="Store a result set as the baseline of its suite")
+    promote_p.add_argument("result_set")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='[%(asctime)s.%(msecs)03d] %(message)s', datefmt='%H:%M:%S')
+    if args.command == "promote":
+        promote(args.result_set)
+        return
+    if args.command == "compare":
+        sys.exit(0 if compare(args.baseline, args.result_set, args.suite) else 1)
+
+    try:
+        load_suite(args.suite)
+    except ValueError as err:
+        parser.error(str(err))
+    out_dir = args.out or os.path.join(REGRESSION_DIR, datetime.datetime.now().strftime('%Y%m%d_%H%M%S'))
+    failed_runs = run_suite(args.suite, out_dir)
+    baseline = args.baseline or os.path.join(BASELINE_DIR, load_suite(args.suite)['name'])
+    if not os.path.isdir(baseline):
+        logger.info(f"[REG] No baseline at {baseline}; store this run with: python regression_suite.py promote {out_dir}")
+        sys.exit(1 if failed_runs else 0)
+    passed = compare(baseline, out_dir, args.suite)
+    sys.exit(0 if passed and not failed_runs else 1)
+
+
+if __name__ == "__main__":
+    main()
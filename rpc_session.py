@@ -0,0 +1,309 @@
+"""
+RPC session manager for long unattended sweeps.
+
+SessionManager keeps one tracker session alive across a sweep that may
+outlast its session_timeout:
+
+  - a heartbeat thread pings the session while it is idle, so a drop is found
+    (and the session replaced) between measurements,
+  - a session close to its session_timeout is renewed before the next
+    measurement starts,
+  - run() retries a measurement that failed because the session dropped,
+    after reconnecting. Only that measurement is repeated.
+
+A tracker hands a device to one session at a time, so the old session is
+released before a new one is requested: the on_reconnect callbacks first get
+None and drop every handle (modules, tensors) of the old session, then get the
+new session to re-upload and reallocate. Extra sessions (request_session) are
+renewed the same way through their on_renew callback. Trackers are tried in
+order: with several (--tracker a:9190 b:9190), a pool that has no free device
+falls back to the next one.
+
+Host check against a local tracker and RPC server (the server is killed in
+the middle of the measurements):
+    python rpc_session.py --local
+"""
+
+import os
+import gc
+import sys
+import time
+import signal
+import socket
+import argparse
+import subprocess
+import threading
+import logging
+
+import numpy as np
+import tvm
+from tvm import rpc
+
+logger = logging.getLogger(__name__)
+
+
+def is_session_error(err):
+    """True if an exception means the RPC session is gone (RPC errors, dropped connection, timeout)."""
+    if isinstance(err, (tvm.error.RPCError, ConnectionError, EOFError, socket.timeout, TimeoutError)):
+        return True
+    # TVMError from a remote call carries the RPC endpoint's own markers
+    text = str(err)
+    return any(marker in text for marker in ("RPCCode::", "RPCSession", "RPCEndpoint"))
+
+
+class SessionManager:
+    """One tracker session, replaced on drops and renewed before its session_timeout."""
+
+    def __init__(self, trackers=("127.0.0.1:9190",), key="android64", session_timeout=1800, priority=1,
+                 heartbeat_interval=30.0, renew_margin=600.0, max_retries=3, retry_wait=10.0, connect_timeout=5.0):
+        """
+        trackers: "host:port" of each tracker pool, tried in order.
+        renew_margin: a session with less than this left (s) is replaced before a measurement.
+        max_retries: reconnect-and-retry attempts of one measurement (run()).
+        """
+        self.trackers = [(host, int(port)) for host, port in (t.rsplit(":", 1) for t in trackers)]
+        self.key = key
+        self.session_timeout = session_timeout
+        self.priority = priority
+        self.heartbeat_interval = heartbeat_interval
+        self.renew_margin = renew_margin
+        self.max_retries = max_retries
+        self.retry_wait = retry_wait
+        self.connect_timeout = connect_timeout
+        self.remote = None
+        self.tracker = None
+        self.reconnects = 0
+        self._connected_at = None
+        self._callbacks = []
+        self._extras = []  # sessions handed out by request_session
+        # Held by measurements and heartbeats: an RPC session must not be used from two threads at once
+        self._lock = threading.RLock()
+        self._stop = threading.Event()
+        self._heartbeat = None
+
+    def _connect_tracker(self, host, port):
+        # connect_tracker retries a dead tracker for a minute; find out quickly instead
+        socket.create_connection((host, port), timeout=self.connect_timeout).close()
+        return rpc.connect_tracker(host, port)
+
+    def _request(self):
+        """A session from the first tracker with a free device, else from the first reachable one."""
+        errors, pools = [], []
+        for host, port in self.trackers:
+            try:
+                tracker = self._connect_tracker(host, port)
+                free = tracker.summary()["queue_info"].get(self.key, {}).get("free", 0)
+                pools.append((free == 0, host, port, tracker))
+            except Exception as err:  # noqa: BLE001 - an unreachable tracker just drops out of the pool
+                errors.append(f"{host}:{port}: {err}")
+        # sorted() is stable, so trackers keep their order within "free" and "busy"
+        for busy, host, port, tracker in sorted(pools, key=lambda pool: pool[0]):
+            try:
+                remote = tracker.request(self.key, priority=self.priority, session_timeout=self.session_timeout)
+                logger.info(f"[RPC] Session on {host}:{port} ({self.key}{', waited for a busy pool' if busy else ''})")
+                return tracker, remote
+            except Exception as err:  # noqa: BLE001 - try the next pool
+                errors.append(f"{host}:{port}: {err}")
+        raise RuntimeError("No RPC session from any tracker:\n" + "\n".join(errors))
+
+    def connect(self):
+        """Open the session (first call) and start the heartbeat."""
+        with self._lock:
+            self.tracker, self.remote = self._request()
+            self._connected_at = time.time()
+        if self.heartbeat_interval and self._heartbeat is None:
+            self._heartbeat = threading.Thread(target=self._heartbeat_loop, daemon=True)
+            self._heartbeat.start()
+        return self
+
+    def on_reconnect(self, callback):
+        """
+        callback(None) runs before the session is replaced and must drop every
+        handle of the old session; callback(remote) runs once the new one is up,
+        e.g. to reload modules and reallocate tensors.
+        """
+        self._callbacks.append(callback)
+        return callback
+
+    @staticmethod
+    def _release(callbacks):
+        for callback in callbacks:
+            callback(None)
+        # RPC sessions close when their last handle is freed
+        gc.collect()
+
+    def reconnect(self, reason):
+        """Release the session, request a new one (retrying until a tracker gives one) and run the callbacks."""
+        with self._lock:
+            logger.warning(f"[RPC] Reconnecting ({reason})")
+            self.remote = None
+            self._release(self._callbacks)
+            while True:
+                try:
+                    self.tracker, self.remote = self._request()
+                    break
+                except RuntimeError as err:
+                    if self._stop.is_set():
+                        raise
+                    logger.warning(f"[RPC] {err}; retrying in {self.retry_wait:.0f} s")
+                    time.sleep(self.retry_wait)
+            self._connected_at = time.time()
+            self.reconnects += 1
+            for callback in self._callbacks:
+                callback(self.remote)
+            logger.info(f"[RPC] Reconnected (reconnect {self.reconnects})")
+
+    def request_session(self, purpose, on_renew=None):
+        """
+        An extra session from the tracker of the current one. It is renewed
+        before its session_timeout like the main one (between measurements,
+        see run()): on_renew(None) must drop its handles, then on_renew(remote)
+        gets the new session. Without on_renew it cannot be renewed.
+        """
+        logger.info(f"Requesting another RPC session for {purpose}...")
+        remote = self.tracker.request(self.key, session_timeout=self.session_timeout, priority=self.priority)
+        self._extras.append({'purpose': purpose, 'remote': remote, 'connected_at': time.time(),
+                             'callbacks': [on_renew] if on_renew else []})
+        return remote
+
+    def on_renew(self, remote, callback):
+        """Add a renewal callback (see request_session) to an extra session."""
+        next(extra for extra in self._extras if extra['remote'] is remote)['callbacks'].append(callback)
+        return callback
+
+    def _renew_extras(self):
+        for extra in self._extras:
+            if self.session_timeout - (time.time() - extra['connected_at']) >= self.renew_margin:
+                continue
+            if not extra['callbacks']:
+                logger.warning(f"[RPC] Session for {extra['purpose']} is about to expire and has no on_renew")
+                extra['connected_at'] = time.time()
+                continue
+            logger.info(f"[RPC] Renewing the session for {extra['purpose']}")
+            extra['remote'] = None
+            self._release(extra['callbacks'])
+            extra['remote'] = self.tracker.request(self.key, session_timeout=self.session_timeout,
+                                                   priority=self.priority)
+            extra['connected_at'] = time.time()
+            for callback in extra['callbacks']:
+                callback(extra['remote'])
+
+    def remaining(self):
+        """Seconds until the session_timeout of the current session."""
+        return self.session_timeout - (time.time() - self._connected_at)
+
+    def ping(self):
+        """Cheap round trip on the session; raises if it is gone."""
+        self.remote.upload(bytearray(b"1"), ".heartbeat")
+
+    def _heartbeat_loop(self):
+        while not self._stop.wait(self.heartbeat_interval):
+            # Skip the beat while a measurement holds the session
+            if not self._lock.acquire(blocking=False):
+                continue
+            try:
+                if self.remote is None:
+                    continue
+                try:
+                    self.ping()
+                except Exception as err:  # noqa: BLE001
+                    if not is_session_error(err):
+                        raise
+                    self.reconnect(f"heartbeat failed: {err}")
+            except Exception as err:  # noqa: BLE001 - keep beating, run() reconnects on its own
+                logger.warning(f"[RPC] Heartbeat could not reconnect: {err}")
+            finally:
+                self._lock.release()
+
+    def run(self, label, measure):
+        """
+        Run measure() (which uses self.remote) with the session held. If the
+        session drops during it, reconnect and run it again, up to
+        max_retries times. A session about to reach its session_timeout is
+        renewed first, and so are the extra sessions.
+        """
+        with self._lock:
+            for attempt in range(self.max_retries + 1):
+                if self.remote is None or self.remaining() < self.renew_margin:
+                    self.reconnect("session missing" if self.remote is None else
+                                   f"{self.remaining():.0f} s left of the session_timeout")
+                self._renew_extras()
+                try:
+                    return measure()
+                except Exception as err:  # noqa: BLE001
+                    if not is_session_error(err) or attempt == self.max_retries:
+                        raise
+                    logger.warning(f"[RPC] {label}: session lost ({err}), retry {attempt + 1}/{self.max_retries}")
+                # Reconnect outside the except block: the traceback's frames hold handles of the old session
+                self.reconnect(f"{label} failed")
+
+    def close(self):
+        self._stop.set()
+        if self._heartbeat is not None:
+            self._heartbeat.join(timeout=self.heartbeat_interval + 5)
+            self._heartbeat = None
+        self.remote = None
+        self._extras = []
+
+    def __enter__(self):
+        return self.connect()
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check reconnects against a local tracker and RPC server.")
+    parser.add_argument("--local", action="store_true", required=True,
+                        help="Start a local tracker and RPC server and kill the server mid-run")
+    parser.add_argument("--port", type=int, default=9290, help="Tracker port (the server uses port + 10)")
+    parser.add_argument("--measurements", type=int, default=6)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='[%(asctime)s.%(msecs)03d] %(message)s', datefmt='%H:%M:%S')
+
+    def start_server():
+        return subprocess.Popen([sys.executable, "-m", "tvm.exec.rpc_server", "--tracker", f"127.0.0.1:{args.port}",
+                                 "--key", "android64", "--port", str(args.port + 10), "--port-end", str(args.port + 20)],
+                                stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, start_new_session=True)
+
+    tracker = subprocess.Popen([sys.executable, "-m", "tvm.exec.rpc_tracker", "--host", "127.0.0.1",
+                                "--port", str(args.port), "--port-end", str(args.port + 9)],
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    servers = []
+    try:
+        time.sleep(2)
+        servers.append(start_server())
+        time.sleep(3)
+        session = SessionManager([f"127.0.0.1:{args.port}"], heartbeat_interval=0.5, retry_wait=1.0)
+        tensors = {}
+
+        def allocate(remote):
+            if remote is None:
+                tensors.clear()
+                return
+            tensors['a'] = tvm.runtime.tensor(np.arange(1024, dtype="float32"), remote.cpu())
+        session.on_reconnect(allocate)
+        with session:
+            allocate(session.remote)
+            for i in range(args.measurements):
+                def measure():
+                    if i == args.measurements // 2 and not session.reconnects:
+                        logger.info("Killing the RPC server in the middle of a measurement")
+                        os.killpg(servers[-1].pid, signal.SIGKILL)
+                        servers.append(start_server())
+                        time.sleep(3)
+                    return float(tensors['a'].numpy().sum())
+                logger.info(f"Measurement {i}: {session.run(f'measurement {i}', measure)}")
+            logger.info(f"{session.reconnects} reconnect(s)")
+    finally:
+        for proc in servers:
+            try:
+                os.killpg(proc.pid, signal.SIGKILL)
+            except ProcessLookupError:
+                pass
+        tracker.kill()
+
+
+if __name__ == "__main__":
+    main()
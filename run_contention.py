@@ -26,16 +26,31 @@ import re
 import time
 import subprocess
 import threading
+from contextlib import contextmanager
 from pathlib import Path
 import logging
 
 import numpy as np
 import tvm
-from tvm import rpc
 import argparse
+import hashlib
 import json
 import datetime
 
+from bw_workloads import (GPU_PRECISIONS, GPU_PRIORITIES, CpuStreamWorkload, parse_background_spec, parse_gpu_config,
+                          parse_gpu_tenant)
+from cpu_stream import RUNNER_SRC, CpuStream, build_cpu_runner
+from device_monitor import DeviceMonitor, run_monitored
+from power_monitor import PowerMonitor
+from rpc_session import SessionManager
+from npu_server import QNN_RUNNER_PATH, NpuServer
+from npu_validate import MATMUL_LAYOUT, QNN_ROOT, qnn_net_run_cmd, validate_npu_output
+from orchestrator import (CPU_RUNNER_PATH, Orchestrator, PhasePlan, cpu_runner_command, loop_command,
+                          qnn_runner_command, runner_latencies, worker_output, worker_window)
+from phase_profiler import profiler, span, timed
+from tvm_kernels import MODULE_DIR, build_fill, host_fill_values
+from workloads import NPU_MODELS, TRANSFORMER_BLOCKS, describe_workload, model_library, parse_model_spec
+
 logging.basicConfig(
     level=logging.INFO,
     format='[%(asctime)s.%(msecs)03d] %(message)s',
@@ -48,6 +63,15 @@ logger = logging.getLogger(__name__)
 mode = 0
 nthreads = 1
 
+# Calls averaged into each CPU time_evaluator sample
+CPU_NUMBER = 20
+
+# CPU input dtype -> output (accumulator) dtype
+CPU_DTYPES = {
+    'float32': 'float32',
+    'int8': 'int32',
+}
+
 
 def _adb_cmd(serial=None):
     """Helper function to build adb command with optional serial number."""
@@ -56,6 +80,7 @@ def _adb_cmd(serial=None):
         cmd.extend(["-s", serial])
     return cmd
 
+@timed("cooldown")
 def wait_for_device_cooldown(adb_serial=None, 
                              thermal_zone="thermal_zone53",
                              start_temp=40.0, 
@@ -106,7 +131,137 @@ def wait_for_device_cooldown(adb_serial=None,
     return True
 
 
-def run_cpu_benchmark(remote_mod, r_entry, rdev, ra, rb, rc, config_func, mode, nthreads, repeat=100, number=20):
+def make_cpu_inputs(m, k, n, dtype):
+    """Random host inputs for a CPU matmul of the given input dtype."""
+    if dtype == 'int8':
+        a_np = np.random.randint(-128, 128, size=(m, k)).astype(np.int8)
+        b_np = np.random.randint(-128, 128, size=(k, n)).astype(np.int8)
+    else:
+        a_np = np.random.uniform(size=(m, k)).astype(np.float32)
+        b_np = np.random.uniform(size=(k, n)).astype(np.float32)
+    return a_np, b_np
+
+
+def verify_cpu_output(c_np, a_np, b_np):
+    """Check a CPU matmul output against a NumPy reference (exact for integer accumulation)."""
+    out_dtype = CPU_DTYPES[str(a_np.dtype)]
+    c_ref = np.dot(a_np.astype(out_dtype), b_np.astype(out_dtype))
+    if np.issubdtype(c_ref.dtype, np.integer):
+        np.testing.assert_array_equal(c_np, c_ref)
+    else:
+        np.testing.assert_allclose(c_np, c_ref, rtol=1e-4, atol=1e-4)
+
+
+class CpuTensorCache:
+    """
+    Remote CPU matmul tensors, shared by all candidates with the same shape and dtype.
+
+    data_mode='host': inputs are generated on the host and sent over RPC, and the
+        output is checked against a full host-side matmul.
+    data_mode='device': inputs are generated on the device by the seeded fill
+        kernels in tvm_kernels.py (nothing large crosses RPC), and only sampled
+        output entries are checked against host recomputation of the fill.
+    """
+
+    def __init__(self, remote, data_mode='host', seed=0, num_sample_rows=4, num_sample_cols=64):
+        self.remote = remote
+        self.data_mode = data_mode
+        self.seed = seed
+        self.num_sample_rows = num_sample_rows
+        self.num_sample_cols = num_sample_cols
+        self._entries = {}
+        self._fill_mod = None
+
+    def reset(self, remote):
+        """
+        Switch to a new session (SessionManager.on_reconnect); tensors are
+        reallocated on the next get(). None drops the old session's tensors.
+        """
+        self.remote = remote
+        self._entries = {}
+        self._fill_mod = None
+
+    def _load_fill_module(self):
+        if self._fill_mod is None:
+            os.makedirs(MODULE_DIR, exist_ok=True)
+            lib_path = os.path.join(MODULE_DIR, "fill.so")
+            if not os.path.exists(lib_path):
+                logger.info(f"Building device fill module: {lib_path}")
+                build_fill(lib_path)
+            self.remote.upload(lib_path)
+            self._fill_mod = self.remote.load_module(os.path.basename(lib_path))
+        return self._fill_mod
+
+    def get(self, m, k, n, dtype):
+        """Return (ra, rb, rc, verify) where verify() checks rc after a matmul."""
+        key = (m, k, n, dtype)
+        if key in self._entries:
+            logger.info(f"Reusing remote tensors for {m}x{k}x{n} ({dtype})")
+            return self._entries[key]
+
+        rdev = self.remote.cpu()
+        if self.data_mode == 'device':
+            fill = self._load_fill_module()[f"fill_{dtype}"]
+            a_seed, b_seed = 2 * self.seed, 2 * self.seed + 1
+            ra = tvm.runtime.empty((m, k), dtype, rdev)
+            rb = tvm.runtime.empty((k, n), dtype, rdev)
+            fill(ra, a_seed)
+            fill(rb, b_seed)
+            rc = tvm.runtime.empty((m, n), CPU_DTYPES[dtype], rdev)
+
+            rng = np.random.default_rng(self.seed)
+            rows = np.sort(rng.choice(m, size=min(m, self.num_sample_rows), replace=False))
+            cols = np.sort(rng.choice(n, size=min(n, self.num_sample_cols), replace=False))
+            a_rows = host_fill_values(rows[:, None] * k + np.arange(k)[None, :], dtype, a_seed)
+            b_cols = host_fill_values(np.arange(k)[:, None] * n + cols[None, :], dtype, b_seed)
+
+            def verify():
+                verify_cpu_output(rc.numpy()[np.ix_(rows, cols)], a_rows, b_cols)
+        else:
+            a_np, b_np = make_cpu_inputs(m, k, n, dtype)
+            ra = tvm.runtime.tensor(a_np, rdev)
+            rb = tvm.runtime.tensor(b_np, rdev)
+            rc = tvm.runtime.tensor(np.zeros((m, n), dtype=CPU_DTYPES[dtype]), rdev)
+
+            def verify():
+                verify_cpu_output(rc.numpy(), a_np, b_np)
+
+        self._entries[key] = (ra, rb, rc, verify)
+        return self._entries[key]
+
+    def get_model(self, block):
+        """(rx, rw, ry, verify) of a workloads.TransformerBlock, with the same data modes as get()."""
+        key = ('model', block.name)
+        if key in self._entries:
+            logger.info(f"Reusing remote tensors for model {block.name}")
+            return self._entries[key]
+
+        rdev = self.remote.cpu()
+        x_shape, w_shape = (block.seq, block.hidden), (1, block.weight_size)
+        if self.data_mode == 'device':
+            fill = self._load_fill_module()["fill_float32"]
+            x_seed, w_seed = 2 * self.seed, 2 * self.seed + 1
+            rx = tvm.runtime.empty(x_shape, "float32", rdev)
+            rw = tvm.runtime.empty(w_shape, "float32", rdev)
+            fill(rx, x_seed)
+            fill(rw, w_seed)
+            # Every output depends on all weights, so the host regenerates the full inputs for the reference
+            x_np = host_fill_values(np.arange(block.seq * block.hidden).reshape(x_shape), "float32", x_seed)
+            w_np = host_fill_values(np.arange(block.weight_size).reshape(w_shape), "float32", w_seed)
+        else:
+            x_np, w_np = block.make_inputs(np.random.default_rng(self.seed))
+            rx = tvm.runtime.tensor(x_np, rdev)
+            rw = tvm.runtime.tensor(w_np, rdev)
+        ry = tvm.runtime.empty(x_shape, "float32", rdev)
+
+        def verify():
+            block.verify(ry.numpy(), x_np, w_np)
+
+        self._entries[key] = (rx, rw, ry, verify)
+        return self._entries[key]
+
+
+def run_cpu_benchmark(remote_mod, r_entry, rdev, ra, rb, rc, config_func, mode, nthreads, repeat=100, number=CPU_NUMBER):
     """Run CPU benchmark and return timing statistics."""
     config_func(mode, nthreads)
     time.sleep(0.1)
@@ -126,7 +281,19 @@ def run_cpu_benchmark(remote_mod, r_entry, rdev, ra, rb, rc, config_func, mode,
     logger.info(f"[CPU] Mean: {stats['mean']:.3f} ms, Min: {stats['min']:.3f} ms, Max: {stats['max']:.3f} ms, Std: {stats['std']:.3f} ms")
     return stats, list(latencies)
 
-def run_gpu_benchmark(gpu_config, repeat):
+def run_gpu_benchmark(gpu_config, repeat, pacing=None, queue_delays=None, host_latencies=None,
+                      buffers=None, transfers=None, priority=None, tenants=(), tenant_latencies=None):
+    """
+    Run the CLBlast kernel on the GPU. pacing is passed to clblast_bw_test as
+    its mode (batch / serial / pipeline:<depth>, or fixed:<hz> / poisson:<hz>
+    for open loop). The returned latencies are device times; the host-observed
+    times and queueing delays it reports are appended to host_latencies and
+    queue_delays. buffers selects how A/B/C are shared with the host (copy,
+    alloc_host, use_host, svm); the timed upload/download of the inputs and
+    output is appended to transfers. tenants (kernel_idx,m,k,n[,precision][@priority])
+    run on their own command queues next to the measured one, whose priority
+    hint is priority; their latencies are appended to tenant_latencies[i].
+    """
     
     logger.info(f"[GPU] Running (repeat={repeat})...")
     
@@ -134,25 +301,132 @@ def run_gpu_benchmark(gpu_config, repeat):
     # time.sleep(0.01 * repeat)
     # return {}, []
 
-    kernel_idx, m, k, n = map(int, gpu_config.split(','))
-    cmd = f"/data/local/tmp/clblast_bw_test {kernel_idx} {repeat} {m} {n} {k}"
+    cmd = gpu_command(gpu_config, repeat, pacing, buffers, priority, tenants)
     result = subprocess.run(["adb", "shell", cmd], stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+    latencies = np.array(parse_gpu_output(result.stdout, queue_delays, host_latencies, transfers, tenant_latencies))
+    stats = {
+        'mean': float(np.mean(latencies)),
+        'min': float(np.min(latencies)),
+        'max': float(np.max(latencies)),
+        'std': float(np.std(latencies))
+    }
+    logger.info(f"[GPU] Mean: {stats['mean']:.3f} ms, Min: {stats['min']:.3f} ms, Max: {stats['max']:.3f} ms, Std: {stats['std']:.3f} ms")
+    return stats, list(latencies)
+
+def gpu_command(gpu_config, repeat, pacing=None, buffers=None, priority=None, tenants=()):
+    """clblast_bw_test command line of a kernel config kernel_idx,m,k,n[,precision]."""
+    kernel_idx, m, k, n, precision = parse_gpu_config(gpu_config)
+    cmd = f"/data/local/tmp/clblast_bw_test {kernel_idx} {repeat} {m} {n} {k}"
+    # Positional arguments: a later one needs the ones before it
+    if pacing or buffers or precision != "fp32":
+        cmd += f" {pacing or 'batch'}"
+    if buffers or precision != "fp32":
+        cmd += f" {buffers or 'copy'}"
+    if precision != "fp32":
+        cmd += f" {precision}"
+    if priority:
+        cmd += f" --priority {priority}"
+    for tenant in tenants:
+        cmd += f" --tenant {parse_gpu_tenant(tenant)}"
+    return cmd
+
+def parse_gpu_output(stdout, queue_delays=None, host_latencies=None, transfers=None, tenant_latencies=None):
+    """
+    Device latencies (ms) of clblast_bw_test output; queueing delays, host
+    times and transfers are appended, and tenant latencies to
+    tenant_latencies[tenant index (0 = first --tenant)].
+    """
+    match = re.search(r'Transfer \((\w+)\): upload ([\d.e+-]+) ms \(min ([\d.e+-]+) ms\), '
+                      r'download ([\d.e+-]+) ms \(min ([\d.e+-]+) ms\)', stdout)
+    if match:
+        transfer = {'buffers': match.group(1), 'upload_ms': float(match.group(2)), 'upload_min_ms': float(match.group(3)),
+                    'download_ms': float(match.group(4)), 'download_min_ms': float(match.group(5))}
+        logger.info(f"[GPU] Transfer ({transfer['buffers']}): upload {transfer['upload_ms']:.3f} ms, "
+                    f"download {transfer['download_ms']:.3f} ms")
+        if transfers is not None:
+            transfers.append(transfer)
+    if queue_delays is not None:
+        queue_delays.extend(float(q) for q in re.findall(r'Queue:\s+([\d.e+-]+)\s+ms', stdout))
+    if host_latencies is not None:
+        host_latencies.extend(float(h) for h in re.findall(r'Host:\s+([\d.e+-]+)\s+ms', stdout))
+    if tenant_latencies is not None:
+        for tenant, latency in re.findall(r'Tenant (\d+) latency:\s+([\d.e+-]+)\s+ms', stdout):
+            tenant_latencies.setdefault(int(tenant) - 1, []).append(float(latency))
 
     latencies = []
-    for line in result.stdout.split('\n'):
+    for line in stdout.split('\n'):
         if 'GPU Latency' in line:
             match = re.search(r'GPU Latency:\s+([\d.]+)\s+ms', line)
             if match:
                 latencies.append(float(match.group(1)))
+    return latencies
+
+def latency_stats(latencies):
+    """Mean/min/max/std of a latency list (ms)."""
     latencies = np.array(latencies)
-    stats = {
+    return {
         'mean': float(np.mean(latencies)),
         'min': float(np.min(latencies)),
         'max': float(np.max(latencies)),
         'std': float(np.std(latencies))
     }
+
+
+def tenant_stats(latencies):
+    """latency_stats plus p50/p99 of a GPU tenant (None if it completed no runs)."""
+    if not latencies:
+        return None
+    return dict(latency_stats(latencies), p50=float(np.percentile(latencies, 50)),
+                p99=float(np.percentile(latencies, 99)))
+
+
+def prepare_gpu_model(remote, block):
+    """Load the OpenCL build of a transformer block on its own RPC session and check its output once."""
+    lib_path = model_library(block.name, gpu=True)
+    remote.upload(lib_path)
+    remote_mod = remote.load_module(os.path.basename(lib_path))
+    dev = remote.cl(0)
+    x_np, w_np = block.make_inputs(np.random.default_rng(0))
+    args = [tvm.runtime.tensor(x_np, dev), tvm.runtime.tensor(w_np, dev),
+            tvm.runtime.empty((block.seq, block.hidden), "float32", dev)]
+    remote_mod["block"](*args)
+    block.verify(args[2].numpy(), x_np, w_np)
+    logger.info(f"[GPU] Loaded model {block.name} (output verified)")
+    return {'block': block, 'remote': remote, 'mod': remote_mod, 'dev': dev, 'args': args}
+
+
+def run_gpu_model_benchmark(gpu_model, repeat):
+    """Run a GPU model (prepare_gpu_model) with time_evaluator and return timing statistics."""
+    logger.info(f"[GPU] Running {gpu_model['block'].name} (repeat={repeat})...")
+    time_f = gpu_model['mod'].time_evaluator("block", gpu_model['dev'], number=1, repeat=repeat)
+    latencies = list(np.array(time_f(*gpu_model['args']).results) * 1000.0)
+    stats = latency_stats(latencies)
     logger.info(f"[GPU] Mean: {stats['mean']:.3f} ms, Min: {stats['min']:.3f} ms, Max: {stats['max']:.3f} ms, Std: {stats['std']:.3f} ms")
-    return stats, list(latencies)
+    return stats, latencies
+
+
+def prepare_orchestrator(orchestrator):
+    """Build cpu_runner for the device (rebuilt when its source changes) and push it next to the orchestrator."""
+    with open(RUNNER_SRC, "rb") as f:
+        digest = hashlib.sha1(f.read()).hexdigest()[:8]
+    os.makedirs(MODULE_DIR, exist_ok=True)
+    runner_path = os.path.join(MODULE_DIR, f"cpu_runner_android_{digest}")
+    if not os.path.exists(runner_path):
+        logger.info(f"[ORC] Building cpu_runner: {runner_path}")
+        build_cpu_runner(runner_path)
+    pushed = orchestrator.push(runner_path)
+    subprocess.run(["adb", "shell", f"mv {pushed} {CPU_RUNNER_PATH} && chmod +x {CPU_RUNNER_PATH}"], check=True)
+    return orchestrator
+
+
+def run_npu_server_benchmark(npu_server, num_inferences, label="NPU", rate=None):
+    """Run NPU inferences on the persistent runner (npu_server.py) and return timing statistics."""
+    logger.info(f"[{label}] Running on persistent runner (num_inferences={num_inferences})...")
+    latencies = npu_server.run(num_inferences, rate=rate)
+    stats = latency_stats(latencies)
+    logger.info(f"[{label}] Mean: {stats['mean']:.3f} ms, Min: {stats['min']:.3f} ms, Max: {stats['max']:.3f} ms, Std: {stats['std']:.3f} ms")
+    return stats, latencies
+
 
 def run_npu_benchmark(npu_cmd_template, num_inferences=100, label="NPU"):
     """Run NPU QNN benchmark."""
@@ -168,6 +442,18 @@ def run_npu_benchmark(npu_cmd_template, num_inferences=100, label="NPU"):
     return result.returncode, result.stdout
 
 
+def qnn_execute_window(window, stat, num_inferences):
+    """
+    Host-time window of a qnn-net-run's inferences: the last mean NetRun x
+    num_inferences of its process window, leaving out process start and model
+    load (the whole window if the profile could not be parsed).
+    """
+    t0, t1 = window
+    if not stat or 'mean' not in stat:
+        return window
+    return max(t0, t1 - stat['mean'] * num_inferences / 1e3), t1
+
+
 def pull_and_parse_qnn_profile(run_dir, label="QNN"):
     """Pull QNN profiling log from device and parse latency statistics."""
     # Pull profiling log from device
@@ -175,10 +461,11 @@ def pull_and_parse_qnn_profile(run_dir, label="QNN"):
     log_local_path = "./qnn-profiling-data_0.log"
     
     logger.info(f"[{label}] Pulling profiling log: npu pull {log_remote_path} {log_local_path}")
-    pull_result = subprocess.run(
-        ["adb", "pull", log_remote_path, log_local_path],
-        stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True
-    )
+    with span("pull"):
+        pull_result = subprocess.run(
+            ["adb", "pull", log_remote_path, log_local_path],
+            stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True
+        )
     
     if pull_result.returncode != 0:
         logger.error(f"[{label}] ERROR: Failed to pull profiling log")
@@ -188,10 +475,11 @@ def pull_and_parse_qnn_profile(run_dir, label="QNN"):
     # Run qnn-profile-viewer to parse the log
     qnn_viewer_path = "/opt/qairt/2.40.0.251030/bin/x86_64-linux-clang/qnn-profile-viewer"
     logger.info(f"[{label}] Running qnn-profile-viewer...")
-    viewer_result = subprocess.run(
-        [qnn_viewer_path, "--input_log", log_local_path],
-        stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True
-    )
+    with span("parse"):
+        viewer_result = subprocess.run(
+            [qnn_viewer_path, "--input_log", log_local_path],
+            stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True
+        )
     
     if viewer_result.returncode != 0:
         logger.error(f"[{label}] ERROR: qnn-profile-viewer failed")
@@ -239,189 +527,458 @@ def pull_and_parse_qnn_profile(run_dir, label="QNN"):
     return latency_stats
 
 
+@contextmanager
+def background_load(workloads, phase, container):
+    """Run background bandwidth workloads for the duration of one phase."""
+    for workload in workloads:
+        workload.start()
+    try:
+        yield
+    finally:
+        container[phase] = [workload.stop() for workload in workloads]
+
+
+def parse_rate_spec(spec):
+    """Parse an open-loop arrival spec 'fixed:<hz>' or 'poisson:<hz>' into (kind, hz)."""
+    kind, _, hz = spec.partition(':')
+    if kind not in ("fixed", "poisson") or not hz or float(hz) <= 0:
+        raise ValueError(f"Invalid rate spec '{spec}', expected fixed:<hz> or poisson:<hz>")
+    return kind, float(hz)
+
+
+def npu_run_dir(npu_kernel_path):
+    """Device directory of a model prepared by qnn_prepare_model.sh, or of a model:<name> in NPU_MODELS."""
+    model = parse_model_spec(npu_kernel_path)
+    if model:
+        return NPU_MODELS[model]['run_dir']
+    return f"{QNN_ROOT}/{npu_kernel_path}"
+
+
+def npu_layout(npu_kernel_path):
+    model = parse_model_spec(npu_kernel_path)
+    return NPU_MODELS[model] if model else MATMUL_LAYOUT
+
+
+def log_workload_slowdowns(result):
+    """Standalone vs contended mean latency of the workload in each slot."""
+    for accel, workload in result['workloads'].items():
+        standalone, contended = result.get(f"{accel}_stat_standalone"), result.get(f"{accel}_stat")
+        if not standalone or not contended or 'mean' not in standalone or 'mean' not in contended:
+            continue
+        logger.info(f"[{accel.upper()}] {workload['model']}: standalone {standalone['mean']:.3f} ms, "
+                    f"contended {contended['mean']:.3f} ms ({contended['mean'] / standalone['mean'] - 1:+.1%})")
+
+
+def log_gpu_tenants(result):
+    """Standalone vs contended latency of every GPU tenant (with --gpu_tenant)."""
+    tenants = result.get('gpu_tenants') or {}
+    for spec, standalone in tenants.get('standalone', {}).items():
+        contended = tenants.get('run2', {}).get(spec)
+        if not standalone['latency'] or not contended or not contended['latency']:
+            continue
+        logger.info(f"[GPU] Tenant {spec}: standalone {standalone['stat']['mean']:.3f} ms "
+                    f"(p99 {standalone['stat']['p99']:.3f} ms), contended {contended['stat']['mean']:.3f} ms "
+                    f"(p99 {contended['stat']['p99']:.3f} ms) over {len(contended['latency'])} runs")
+
+
+def log_energy(result):
+    """Standalone vs contended joules per inference of each slot (with --power)."""
+    for accel in ("cpu", "gpu", "npu"):
+        standalone, contended = result.get(f"{accel}_j_per_inference_standalone"), result.get(f"{accel}_j_per_inference")
+        if standalone is None or contended is None:
+            continue
+        logger.info(f"[{accel.upper()}] Energy: standalone {standalone * 1e3:.2f} mJ/inference, "
+                    f"contended {contended * 1e3:.2f} mJ/inference ({contended / standalone - 1:+.1%})")
+
+
 def benchmark_variant(remote, cpu_kernel_path, gpu_kernel_config, npu_kernel_path,
                         CPU_REPEAT_LONG, CPU_REPEAT_SHORT,
                         GPU_REPEAT_LONG, GPU_REPEAT_SHORT,
-                        NPU_REPEAT_LONG, NPU_REPEAT_SHORT):
-    """Benchmark a single variant with fixed 8-core configuration."""
+                        NPU_REPEAT_LONG, NPU_REPEAT_SHORT, background=(), cpu_dtype='float32',
+                        tensor_cache=None, npu_server=None, npu_outputs='discard', cpu_stream=None,
+                        rates=None, gpu_mode='batch', monitor=None, max_reruns=1, npu_context=True,
+                        gpu_model=None, gpu_buffers='copy', power=None, orchestrator=None,
+                        gpu_priority=None, gpu_tenants=()):
+    """Benchmark a single variant with fixed 8-core configuration.
 
-    if not os.path.exists(cpu_kernel_path):
-        logger.error(f"ERROR: .so file not found: {cpu_kernel_path}")
-        return
-    
-    logger.info(f"Running library: {cpu_kernel_path}")
+    background: workloads from bw_workloads that run during every phase
+    (paused during cooldowns).
+    cpu_dtype: input dtype of the CPU kernel ('float32' or 'int8' with int32 output).
+    tensor_cache: CpuTensorCache shared across candidates (a host-data cache is created if None).
+    npu_server: opened NpuServer. The NPU then loops like the CPU and GPU and
+    the waits for qnn-net-run startup are dropped.
+    cpu_stream: CpuStream. Looping CPU phases then run back to back on the
+    device instead of in time_evaluator chunks, without gaps between chunks.
+    rates: {'cpu'|'gpu'|'npu': (kind, hz)} from parse_rate_spec. Those
+    accelerators are driven open loop at the given request rate in every phase
+    and their queueing delays are reported separately from the service times
+    (cpu needs cpu_stream, npu needs npu_server).
+    gpu_mode: submission mode of clblast_bw_test when the GPU is not rate
+    driven: batch (queue all runs), serial, or pipeline:<depth>. Device and
+    host-observed times are both reported.
+    monitor: running DeviceMonitor. Each phase's measured samples are checked
+    for clock drops and latency steps, and a flagged phase is re-run up to
+    max_reruns times; samples still flagged are listed in *_invalid.
+    npu_context: start qnn-net-run from the model directory's cached context
+    binary when it has one (see qnn_prepare_model.sh).
+    cpu_kernel_path may be model:<block> (workloads.TRANSFORMER_BLOCKS), and
+    gpu_model (prepare_gpu_model) replaces the CLBlast kernel with a model.
+    gpu_buffers: how clblast_bw_test shares its inputs and output with the
+    host (see run_gpu_benchmark); the handoff times of the standalone and run2
+    phases are reported in gpu_transfer.
+    gpu_tenants: other GPU streams (kernel_idx,m,k,n[,precision][@priority]),
+    each on its own command queue of clblast_bw_test, running whenever the
+    CLBlast kernel runs; gpu_priority is the priority hint of the measured
+    queue. Their latencies in the standalone and run2 phases are reported in
+    gpu_tenants.
+    power: running PowerMonitor. The energy of every phase and of each
+    accelerator's window is reported in power, with joules per inference as
+    *_j_per_inference (whole-device energy during the accelerator's window).
+    orchestrator: Orchestrator (orchestrator.py) with cpu_runner pushed
+    (prepare_orchestrator). Every phase then runs as one plan on the device:
+    cpu_runner and qnn_runner start up before the phase and are driven
+    through stdin, clblast_bw_test is launched at its offset, and looping
+    workers are stopped when the measured one exits. Worker start/stop/exit
+    offsets are reported in orchestrator. CPU samples are single runs, not
+    time_evaluator means (matmul kernels only; no cpu_stream, rates,
+    npu_server or GPU models).
+    """
 
-    # Extract shape and variant from filename: matmul_MxKxN_variant.so
-    name = Path(cpu_kernel_path).stem
-    shape = re.search(r"(\d+x\d+x\d+)", name)
-    if not shape:
-        logger.error(f"ERROR: Unable to parse shape from filename: {name}")
-        return
-    m, k, n = map(int, shape.group(1).split('x'))
+    cpu_block = TRANSFORMER_BLOCKS.get(parse_model_spec(cpu_kernel_path) or "")
+    if cpu_block is not None:
+        name = cpu_block.name
+        library_path = model_library(name)
+    else:
+        if not os.path.exists(cpu_kernel_path):
+            logger.error(f"ERROR: .so file not found: {cpu_kernel_path}")
+            return
 
-    # Prepare test data
-    a_np = np.random.uniform(size=(m, k)).astype(np.float32)
-    b_np = np.random.uniform(size=(k, n)).astype(np.float32)
+        # Extract shape and variant from filename: matmul_MxKxN_variant.so
+        name = Path(cpu_kernel_path).stem
+        shape = re.search(r"(\d+x\d+x\d+)", name)
+        if not shape:
+            logger.error(f"ERROR: Unable to parse shape from filename: {name}")
+            return
+        m, k, n = map(int, shape.group(1).split('x'))
+        library_path = cpu_kernel_path
+    
+    logger.info(f"Running library: {library_path}")
 
     # Upload and load module
-    remote.upload(cpu_kernel_path)
-    remote_filename = os.path.basename(cpu_kernel_path)
-    remote_mod = remote.load_module(remote_filename)
+    with span("upload", variant=name):
+        remote.upload(library_path)
+    remote_filename = os.path.basename(library_path)
+    with span("load_module", variant=name):
+        remote_mod = remote.load_module(remote_filename)
     config_func = remote.get_function('runtime.config_threadpool')
 
-    # Allocate device tensors
+    # Allocate (or reuse) device tensors
+    if tensor_cache is None:
+        tensor_cache = CpuTensorCache(remote)
     rdev = remote.cpu()
-    ra = tvm.runtime.tensor(a_np, rdev)
-    rb = tvm.runtime.tensor(b_np, rdev)
-    rc = tvm.runtime.tensor(np.zeros((m, n), dtype=np.float32), rdev)
+    with span("alloc", variant=name):
+        if cpu_block is not None:
+            ra, rb, rc, verify_output = tensor_cache.get_model(cpu_block)
+        else:
+            ra, rb, rc, verify_output = tensor_cache.get(m, k, n, cpu_dtype)
 
     # Get entry function
-    r_entry = getattr(remote_mod, "entry_name", "matmul")
+    r_entry = getattr(remote_mod, "entry_name", "block" if cpu_block is not None else "matmul")
     r_f = remote_mod[r_entry]
     
     # NPU command template and run directory
-    RUN_DIR = f"/data/local/tmp/qnn/{npu_kernel_path}"
-    NPU_CMD = (
-        f"cd {RUN_DIR} && "
-        "LD_LIBRARY_PATH=.. ADSP_LIBRARY_PATH=.. ../qnn-net-run --backend ../libQnnHtp.so --model ./libmatmul_qnn.so "
-        "--input_list ./input_list_target.txt --profiling_level client --output_dir ./out_htp"
-    )
+    RUN_DIR = npu_run_dir(npu_kernel_path)
+    # Outputs are discarded by default so storage writes stay out of the measurement
+    # (the profiling log is still written to ./out_htp); correctness is checked once by npu_validate.py
+    npu_flags = "--profiling_level client"
+    if npu_outputs == 'discard':
+        npu_flags += " --keep_num_outputs 0"
+    NPU_CMD = qnn_net_run_cmd(RUN_DIR, "./out_htp", npu_flags, context_binary=npu_context,
+                              layout=npu_layout(npu_kernel_path))
     
+    # Time the other workloads wait for the NPU to start (qnn-net-run reloads the model on every launch)
+    npu_startup_s = 0.0 if npu_server else 4.0
+
     # Warmup and verify
-    config_func(mode, nthreads)
-    time.sleep(0.1)
-    r_f(ra, rb, rc)
-    np.testing.assert_allclose(rc.numpy(), np.dot(a_np, b_np), rtol=1e-4, atol=1e-4)
+    with span("verify", variant=name):
+        config_func(mode, nthreads)
+        time.sleep(0.1)
+        r_f(ra, rb, rc)
+        verify_output()
+
+    rates = rates or {}
+    cpu_rate, gpu_rate, npu_rate = rates.get('cpu'), rates.get('gpu'), rates.get('npu')
+    gpu_pacing = f"{gpu_rate[0]}:{gpu_rate[1]}" if gpu_rate else gpu_mode
 
     DONE = False
 
     cpu_result_container = {}
+    def startup_wait(delay):
+        if delay:
+            with span("startup_wait"):
+                time.sleep(delay)
+
     def delayed_cpu_run(delay, repeat, loop=False):
-        time.sleep(delay)
+        startup_wait(delay)
+        if cpu_stream is not None and (loop or cpu_rate):
+            t0 = time.time()
+            cpu_stream.start(remote_mod, r_entry, ra, rb, rc, mode, nthreads, rate=cpu_rate)
+            # samples are available while the loop is still running
+            cpu_result_container['results'] = cpu_stream.samples
+            while (not DONE) if loop else len(cpu_stream.samples) < repeat:
+                time.sleep(0.1)
+                cpu_stream.poll()
+            results = cpu_stream.stop()
+            cpu_result_container['stats'] = latency_stats(results)
+            cpu_result_container['results'] = results
+            cpu_result_container['queue'] = cpu_stream.queue_delays
+            cpu_result_container['calls'] = len(results)
+            cpu_result_container['window'] = (t0, time.time())
+            logger.info(f"[CPU] Streamed {len(results)} runs, Mean: {cpu_result_container['stats']['mean']:.3f} ms")
+            return
         while True:
+            t0 = time.time()
             stats, results = run_cpu_benchmark(
                 remote_mod, r_entry, rdev, ra, rb, rc, config_func, mode, nthreads,
                 repeat=repeat
             )
             cpu_result_container['stats'] = stats
             cpu_result_container['results'] = results
+            cpu_result_container['calls'] = len(results) * CPU_NUMBER
+            cpu_result_container['window'] = (t0, time.time())
             if not loop or DONE:
                 break
     
+    def gpu_benchmark(repeat, queue_delays, host_latencies, transfers=None, tenant_latencies=None):
+        if gpu_model is not None:
+            return run_gpu_model_benchmark(gpu_model, repeat)
+        return run_gpu_benchmark(gpu_kernel_config, repeat, gpu_pacing, queue_delays, host_latencies,
+                                 gpu_buffers, transfers, gpu_priority, gpu_tenants, tenant_latencies)
+
     gpu_result_container = {}
+    gpu_transfer = {}
+    gpu_tenant_latency = {}
     def delayed_gpu_run(delay, repeat, loop=False):
-        time.sleep(delay)
+        startup_wait(delay)
         while True:
-            stats, results = run_gpu_benchmark(gpu_kernel_config, repeat)
+            queue_delays, host_latencies, transfers, tenant_latencies = [], [], [], {}
+            t0 = time.time()
+            stats, results = gpu_benchmark(repeat, queue_delays, host_latencies, transfers, tenant_latencies)
+            gpu_result_container['window'] = (t0, time.time())
             gpu_result_container['stats'] = stats
             gpu_result_container['results'] = results
+            gpu_result_container['queue'] = queue_delays
+            gpu_result_container['host'] = host_latencies
+            gpu_result_container['transfer'] = transfers
+            gpu_result_container['tenants'] = tenant_latencies
             if not loop or DONE:
                 break
 
     npu_result_container = {}
-    def delayed_npu_run(delay, repeat):
-        time.sleep(delay)
-        returncode, stdout = run_npu_benchmark(NPU_CMD, num_inferences=repeat)
-        npu_result_container['returncode'] = returncode
-        npu_result_container['stdout'] = stdout
+    def delayed_npu_run(delay, repeat, loop=False):
+        startup_wait(delay)
+        t0 = time.time()
+        if npu_server is None:
+            # qnn-net-run doesn't loop due to its long startup time
+            returncode, stdout = run_npu_benchmark(NPU_CMD, num_inferences=repeat)
+            npu_result_container['returncode'] = returncode
+            npu_result_container['stdout'] = stdout
+            npu_result_container['window'] = (t0, time.time())
+            return
+        if loop:
+            npu_server.start(rate=npu_rate)
+            while not DONE:
+                time.sleep(0.01)
+            results = npu_server.stop()
+            stats = latency_stats(results)
+        else:
+            stats, results = run_npu_server_benchmark(npu_server, repeat, rate=npu_rate)
+        npu_result_container['stats'] = stats
+        npu_result_container['results'] = results
+        npu_result_container['queue'] = npu_server.queue_delays
+        npu_result_container['window'] = (t0, time.time())
+
+    with span("bg_prepare", variant=name):
+        for workload in background:
+            workload.prepare()
+    bg_result_container = {}
+
+    orchestrator_phases = {}
+    if orchestrator is not None:
+        if cpu_block is not None:
+            logger.error(f"ERROR: the orchestrator's cpu_runner runs matmul kernels, not {cpu_kernel_path}")
+            return
+        with span("orchestrator_push", variant=name):
+            CPU_WORKER = cpu_runner_command(orchestrator.push(library_path), m, k, n, entry=r_entry,
+                                            dtype=cpu_dtype, mode=mode, nthreads=nthreads)
+        NPU_WORKER = qnn_runner_command(RUN_DIR, QNN_RUNNER_PATH, context_binary=npu_context,
+                                        layout=npu_layout(npu_kernel_path))
+
+    def add_worker(plan, accel, repeat, start_ms=0, stop_after=None):
+        """
+        clblast_bw_test, cpu_runner or qnn_runner worker: `repeat` runs, or
+        back to back until stop_after exits.
+        """
+        if accel == 'gpu':
+            command = gpu_command(gpu_kernel_config, repeat, gpu_pacing, gpu_buffers, gpu_priority, gpu_tenants)
+            if stop_after:
+                return plan.add('gpu', loop_command(command), start_ms, stop=f"after:{stop_after}")
+            return plan.add('gpu', command, start_ms)
+        command = CPU_WORKER if accel == 'cpu' else NPU_WORKER
+        if stop_after:
+            return plan.add(accel, command, start_ms, stop=f"after:{stop_after}", ready="READY",
+                            stdin="start\n", stop_stdin="stop\nquit\n")
+        return plan.add(accel, command, start_ms, ready="READY", stdin=f"run {repeat}\nquit\n")
+
+    def orchestrated(phase, plan):
+        bundle = orchestrator.run(plan, phase)
+        orchestrator_phases[phase] = {
+            'ready_ms': bundle['ready_ms'], 'duration_us': bundle['duration_us'], 'timed_out': bundle['timed_out'],
+            'workers': {worker: {key: w[key] for key in ('start_us', 'stop_us', 'end_us', 'exit_code', 'signal')}
+                        for worker, w in bundle['workers'].items()},
+        }
+        return bundle
+
+    def orchestrated_result(bundle, accel, transfers=None, tenant_latencies=None):
+        """Stats, latencies, queueing delays, host latencies and window of one worker."""
+        queue_delays, host_latencies = [], []
+        if accel == 'gpu':
+            latencies = parse_gpu_output(worker_output(bundle, 'gpu'), queue_delays, host_latencies, transfers,
+                                         tenant_latencies)
+        else:
+            latencies = runner_latencies(bundle, accel)
+        if not latencies:
+            raise RuntimeError(f"[ORC] {accel} worker reported no runs, output:\n{worker_output(bundle, accel)}")
+        stats = latency_stats(latencies)
+        logger.info(f"[{accel.upper()}] Mean: {stats['mean']:.3f} ms, Min: {stats['min']:.3f} ms, "
+                    f"Max: {stats['max']:.3f} ms, Std: {stats['std']:.3f} ms")
+        return stats, latencies, queue_delays, host_latencies, worker_window(bundle, accel)
+
+    REPEAT_SHORT = {'cpu': CPU_REPEAT_SHORT, 'gpu': GPU_REPEAT_SHORT, 'npu': NPU_REPEAT_SHORT}
+    REPEAT_LONG = {'cpu': CPU_REPEAT_LONG, 'gpu': GPU_REPEAT_LONG, 'npu': NPU_REPEAT_LONG}
+
+    def threaded_measure(phase, label, measured, loopers, offset_s):
+        """
+        Run `measured` for its short repeats, offset_s after the loopers have
+        started up, while they run until it finishes. Returns its stat,
+        latency, queue, host latencies and window.
+        """
+        nonlocal DONE
+        DONE = False
+        runs = {'cpu': delayed_cpu_run, 'gpu': delayed_gpu_run, 'npu': delayed_npu_run}
+        containers = {'cpu': cpu_result_container, 'gpu': gpu_result_container, 'npu': npu_result_container}
+        container = containers[measured]
+        container.clear()
+        # The others wait for qnn-net-run to start up when the NPU is one of the loopers
+        delay = npu_startup_s if 'npu' in loopers else 0.0
+        threads = {accel: threading.Thread(target=runs[accel], daemon=False,
+                                           args=(0.0 if accel == 'npu' else delay, REPEAT_LONG[accel], True))
+                   for accel in loopers}
+        for thread in threads.values():
+            thread.start()
+        try:
+            runs[measured](delay + offset_s, REPEAT_SHORT[measured])
+        finally:
+            DONE = True
+            overlapped = {accel: thread.is_alive() for accel, thread in threads.items()}
+            for thread in threads.values():
+                thread.join()
+        for accel, alive in overlapped.items():
+            if not alive:
+                raise RuntimeError(f"{accel.upper()} finished before {measured.upper()} (no overlap). Increase "
+                                   f"{accel.upper()}_REPEAT_LONG or decrease {measured.upper()}_REPEAT_SHORT")
+
+        if measured == 'cpu':
+            phase_calls['cpu'] = container.get('calls')
+        elif measured == 'gpu':
+            gpu_transfer[phase] = container.get('transfer', [])
+            gpu_tenant_latency[phase] = container.get('tenants', {})
+        elif npu_server is None:
+            stat = pull_and_parse_qnn_profile(RUN_DIR)
+            phase_calls['npu'] = NPU_REPEAT_SHORT
+            return stat, None, [], [], qnn_execute_window(container['window'], stat, NPU_REPEAT_SHORT)
+        return (container.get('stats'), container.get('results'), container.get('queue', []),
+                container.get('host', []), container['window'])
+
+    def orchestrated_measure(phase, label, measured, loopers, offset_s):
+        """threaded_measure as one orchestrator plan `label`: the loopers are stopped when `measured` exits."""
+        plan = PhasePlan()
+        for accel in loopers:
+            add_worker(plan, accel, REPEAT_LONG[accel], stop_after=measured)
+        add_worker(plan, measured, REPEAT_SHORT[measured], start_ms=offset_s * 1000)
+        bundle = orchestrated(label, plan)
+        transfers, tenant_latencies = ([], {}) if measured == 'gpu' else (None, None)
+        result = orchestrated_result(bundle, measured, transfers, tenant_latencies)
+        if measured == 'gpu':
+            gpu_transfer[phase], gpu_tenant_latency[phase] = transfers, tenant_latencies
+        return result
+
+    measure = threaded_measure if orchestrator is None else orchestrated_measure
+
+    def run_phase(phase, title, measured, offset_s=1.0, cooldown_after=True):
+        """
+        Measure each accelerator of `measured` ({accel: loopers}) in turn; with
+        a monitor, re-run the phase after a cooldown while its measurement is
+        flagged. Returns {accel: (stat, latency, queue, host latencies)}.
+        """
+        def metered_run():
+            logger.info(f"\n--- {title}{' (orchestrator)' if orchestrator is not None else ''} ---")
+            t0 = time.time()
+            phase_calls.clear()
+            with span(phase, variant=name), background_load(background, phase, bg_result_container):
+                results = {accel: measure(phase, phase if len(measured) == 1 else f"{phase}_{accel}", accel,
+                                          loopers, offset_s)
+                           for accel, loopers in measured.items()}
+            windows = {accel: (result[1], result[4]) for accel, result in results.items()}
+            if power is not None:
+                power_reports[phase] = power.report(phase, (t0, time.time()), windows, counts=dict(phase_calls))
+            return {accel: result[:4] for accel, result in results.items()}, windows
+        result, reports = run_monitored(monitor, phase, metered_run, max_reruns, wait_for_device_cooldown)
+        monitor_reports.extend(reports)
+        if cooldown_after:
+            wait_for_device_cooldown()
+        return result
+    monitor_reports = []
+    power_reports = {}
+    # Calls behind the measured samples of the current phase, where they are not one per sample:
+    # time_evaluator samples average CPU_NUMBER calls, qnn-net-run has no samples
+    phase_calls = {}
 
     wait_for_device_cooldown()
+    if power is not None and power.idle_w is None:
+        with span("power_idle"):
+            power.measure_idle()
 
     # ===== Measure standalone latency for each =====
-    logger.info(f"\n--- Standalone Latency Measurements ---")
-    cpu_stat_standalone, cpu_latency_standalone = run_cpu_benchmark(
-        remote_mod, r_entry, rdev, ra, rb, rc, config_func, mode, nthreads,
-        repeat=CPU_REPEAT_SHORT
-    )
-    gpu_stat_standalone, gpu_latency_standalone = run_gpu_benchmark(gpu_kernel_config, GPU_REPEAT_SHORT)
-
-    cpu_thread = threading.Thread(target=delayed_cpu_run, args=(0.0, CPU_REPEAT_LONG), daemon=False)
-    cpu_thread.start()
-    returncode, stdout = run_npu_benchmark(NPU_CMD, num_inferences=NPU_REPEAT_SHORT)
-    cpu_thread.join()
-    npu_stat_standalone = pull_and_parse_qnn_profile(RUN_DIR)
-    wait_for_device_cooldown()
+    # The CPU keeps running next to the NPU
+    standalone = run_phase('standalone', "Standalone Latency Measurements", {'cpu': (), 'gpu': (), 'npu': ('cpu',)},
+                           offset_s=0.0)
+    cpu_stat_standalone, cpu_latency_standalone, cpu_queue_standalone, _ = standalone['cpu']
+    (gpu_stat_standalone, gpu_latency_standalone, gpu_queue_standalone,
+     gpu_host_latency_standalone) = standalone['gpu']
+    npu_stat_standalone, npu_latency_standalone, npu_queue_standalone, _ = standalone['npu']
 
     # ===== First run: CPU&GPU long, NPU short =====
     # Goal: NPU always overlaps
-    logger.info(f"\n--- Run 1: CPU&GPU long, NPU short ---")
-    
-    
-    DONE = False
-    # CPU & GPU immediately (loop until NPU finishes)
-    cpu_thread = threading.Thread(target=delayed_cpu_run, args=(0.0, CPU_REPEAT_LONG, True), daemon=False)
-    cpu_thread.start()
-    gpu_thread = threading.Thread(target=delayed_gpu_run, args=(0.0, GPU_REPEAT_LONG, True), daemon=False)
-    gpu_thread.start()
-    
-    # NPU with delay
-    npu_thread = threading.Thread(target=delayed_npu_run, args=(1.0, NPU_REPEAT_SHORT), daemon=False)
-    npu_thread.start()
-    npu_thread.join()
-    DONE = True
-
-    if not cpu_thread.is_alive():
-        raise RuntimeError("CPU finished before NPU (no overlap). Increase CPU_REPEAT_LONG or decrease NPU_REPEAT_SHORT")
-    if not gpu_thread.is_alive():
-        raise RuntimeError("GPU finished before NPU (no overlap). Increase GPU_REPEAT_LONG or decrease NPU_REPEAT_SHORT")
-    
-    cpu_thread.join()
-    gpu_thread.join()
-    
-    npu_stat = pull_and_parse_qnn_profile(RUN_DIR)
-    wait_for_device_cooldown()
+    npu_stat, npu_latency, npu_queue, _ = run_phase('run1', "Run 1: CPU&GPU long, NPU short",
+                                                    {'npu': ('cpu', 'gpu')})['npu']
 
     # ===== Second run: CPU&NPU long, GPU short =====
     # Goal: GPU always overlap.
-    logger.info(f"\n--- Run 2: CPU&NPU long, GPU short ---")
-    
-    DONE = False
-    # CPU & NPU immediately (CPU loop until GPU finishes, NPU doesn't loop due to long startup time)
-    cpu_thread = threading.Thread(target=delayed_cpu_run, args=(4.0, CPU_REPEAT_LONG, True), daemon=False)
-    cpu_thread.start()
-    npu_thread = threading.Thread(target=delayed_npu_run, args=(0, NPU_REPEAT_LONG), daemon=False)
-    npu_thread.start()
-    
-    # GPU waits for NPU startup (usually takes a few seconds)
-    gpu_thread = threading.Thread(target=delayed_gpu_run, args=(5.0, GPU_REPEAT_SHORT), daemon=False)
-    gpu_thread.start()
-    gpu_thread.join()
-    DONE = True
-
-    if not cpu_thread.is_alive():
-        raise RuntimeError("CPU finished before GPU (no overlap). Increase CPU_REPEAT_LONG or decrease GPU_REPEAT_SHORT")
-    if not npu_thread.is_alive():
-        raise RuntimeError("NPU finished before GPU (no overlap). Increase NPU_REPEAT_LONG or decrease GPU_REPEAT_SHORT")
-    cpu_thread.join()
-    npu_thread.join()
-    
-    gpu_stat, gpu_latency = gpu_result_container.get('stats'), gpu_result_container.get('results')
-    wait_for_device_cooldown()
-    
+    gpu_stat, gpu_latency, gpu_queue, gpu_host_latency = run_phase('run2', "Run 2: CPU&NPU long, GPU short",
+                                                                   {'gpu': ('cpu', 'npu')})['gpu']
+
     # ====== Third run: GPU&NPU long, CPU short =====
     # Goal: CPU always overlap.
-    logger.info(f"\n--- Run 3: GPU&NPU long, CPU short ---")
+    cpu_stat, cpu_latency, cpu_queue, _ = run_phase('run3', "Run 3: GPU&NPU long, CPU short",
+                                                    {'cpu': ('gpu', 'npu')}, cooldown_after=False)['cpu']
 
-    DONE = False
-    gpu_thread = threading.Thread(target=delayed_gpu_run, args=(4.0, GPU_REPEAT_LONG, True), daemon=False)
-    gpu_thread.start()
-    npu_thread = threading.Thread(target=delayed_npu_run, args=(0, NPU_REPEAT_LONG), daemon=False)
-    npu_thread.start()
-
-    cpu_thread = threading.Thread(target=delayed_cpu_run, args=(5.0, CPU_REPEAT_SHORT), daemon=False)
-    cpu_thread.start()
-    cpu_thread.join()
-    DONE = True
-
-    if not npu_thread.is_alive():
-        raise RuntimeError("NPU finished before CPU (no overlap). Increase NPU_REPEAT_LONG or decrease CPU_REPEAT_SHORT")
-    if not gpu_thread.is_alive():
-        raise RuntimeError("GPU finished before CPU (no overlap). Increase GPU_REPEAT_LONG or decrease CPU_REPEAT_SHORT")
-    npu_thread.join()
-    gpu_thread.join()
-    DONE = True
-
-    cpu_stat, cpu_latency = cpu_result_container.get('stats'), cpu_result_container.get('results')
+    # Samples the monitor still flags after the last attempt of each phase
+    invalid = {}
+    for report in monitor_reports:
+        invalid[(report['phase'], report['accel'])] = report['invalid']
+    def j_per_inference(phase, accel):
+        return power_reports.get(phase, {}).get('accel', {}).get(accel, {}).get('j_per_inference')
     
     # Return results
     return {
@@ -430,64 +987,290 @@ def benchmark_variant(remote, cpu_kernel_path, gpu_kernel_config, npu_kernel_pat
         'gpu_stat': gpu_stat,
         'gpu_latency': gpu_latency,
         'npu_stat': npu_stat,
+        'npu_latency': npu_latency,
         'cpu_stat_standalone': cpu_stat_standalone,
         'cpu_latency_standalone': cpu_latency_standalone,
         'gpu_stat_standalone': gpu_stat_standalone,
         'gpu_latency_standalone': gpu_latency_standalone,
         'npu_stat_standalone': npu_stat_standalone,
+        'npu_latency_standalone': npu_latency_standalone,
+        # Queueing delay (ms) from arrival to start; only non-empty for open-loop (rates) runs
+        'cpu_queue_stat': latency_stats(cpu_queue) if cpu_queue else None,
+        'cpu_queue': cpu_queue,
+        'gpu_queue_stat': latency_stats(gpu_queue) if gpu_queue else None,
+        'gpu_queue': gpu_queue,
+        'npu_queue_stat': latency_stats(npu_queue) if npu_queue else None,
+        'npu_queue': npu_queue,
+        # Host-observed GPU time (enqueue -> completion seen by the host, includes launch overhead)
+        'gpu_host_stat': latency_stats(gpu_host_latency) if gpu_host_latency else None,
+        'gpu_host_latency': gpu_host_latency,
+        'gpu_host_stat_standalone': latency_stats(gpu_host_latency_standalone) if gpu_host_latency_standalone else None,
+        'gpu_host_latency_standalone': gpu_host_latency_standalone,
+        # Host handoff of the GPU inputs/output per phase (clblast_bw_test upload/download times)
+        'gpu_transfer': gpu_transfer,
+        # Latencies of the other GPU streams per phase, by tenant spec
+        'gpu_tenants': {phase: {spec: {'stat': tenant_stats(latencies.get(i, [])), 'latency': latencies.get(i, [])}
+                                for i, spec in enumerate(gpu_tenants)}
+                        for phase, latencies in gpu_tenant_latency.items()},
+        'cpu_queue_standalone': cpu_queue_standalone,
+        'gpu_queue_standalone': gpu_queue_standalone,
+        'npu_queue_standalone': npu_queue_standalone,
+        'background': bg_result_container,
+        # Monitor checks of every phase attempt, and the samples still flagged after the last attempt
+        'monitor': monitor_reports,
+        'cpu_invalid': invalid.get(('run3', 'cpu'), []),
+        'gpu_invalid': invalid.get(('run2', 'gpu'), []),
+        'npu_invalid': invalid.get(('run1', 'npu'), []),
+        'cpu_invalid_standalone': invalid.get(('standalone', 'cpu'), []),
+        'gpu_invalid_standalone': invalid.get(('standalone', 'gpu'), []),
+        'npu_invalid_standalone': invalid.get(('standalone', 'npu'), []),
+        # Energy per phase and accelerator window (power_monitor.py), and joules per inference
+        'power': {'idle_w': power.idle_w, 'phases': power_reports} if power is not None else None,
+        'cpu_j_per_inference': j_per_inference('run3', 'cpu'),
+        'gpu_j_per_inference': j_per_inference('run2', 'gpu'),
+        'npu_j_per_inference': j_per_inference('run1', 'npu'),
+        'cpu_j_per_inference_standalone': j_per_inference('standalone', 'cpu'),
+        'gpu_j_per_inference_standalone': j_per_inference('standalone', 'gpu'),
+        'npu_j_per_inference_standalone': j_per_inference('standalone', 'npu'),
+        # Worker start/stop/exit offsets (us from t0) of every orchestrated plan
+        'orchestrator': orchestrator_phases if orchestrator is not None else None,
     }
 
 
 def main():
     # ========== Configuration ==========
     # RPC configuration
-    tracker_host = "127.0.0.1"
-    tracker_port = 9190
     tracker_key = "android64"
 
     # Parse command-line arguments: require a single .so file path
     parser = argparse.ArgumentParser(description="Run a single matmul .so on remote via RPC and verify correctness.")
-    parser.add_argument("-c", "--cpu_kernel_path", required=True, help="Path to the cpu kernel .so file to run (e.g. matmul_1024x1024x1024_baseline.so)")
-    parser.add_argument("-g", "--gpu_kernel_config", required=True, help="GPU kernel config (kernel_idx,m,k,n)")
-    parser.add_argument("-n", "--npu_kernel_path", required=True, help="Path to the npu kernel file (on device) to run")
+    parser.add_argument("-c", "--cpu_kernel_path", required=True, nargs="+",
+                        help="Path(s) to the cpu kernel .so file(s) to run (e.g. matmul_1024x1024x1024_baseline.so), "
+                             "or model:<block> (workloads.py). Candidates with the same shape share their remote tensors.")
+    parser.add_argument("-g", "--gpu_kernel_config", required=True,
+                        help=f"GPU kernel config (kernel_idx,m,k,n[,precision], precision one of "
+                             f"{', '.join(GPU_PRECISIONS)}; default fp32), or model:<block> (OpenCL build, needs "
+                             f"another RPC server registered with the same key)")
+    parser.add_argument("-n", "--npu_kernel_path", required=True,
+                        help="Path to the npu kernel file (on device) to run, or model:<name> (workloads.NPU_MODELS)")
+    parser.add_argument("--cpu_dtype", choices=list(CPU_DTYPES), default="float32",
+                        help="Input dtype of the cpu kernel (int8 kernels accumulate in int32, see tvm_kernels.py)")
+    parser.add_argument("--data_mode", choices=["host", "device"], default="host",
+                        help="host: send inputs over RPC and verify fully; device: seeded fill on the device "
+                             "and verify sampled output entries")
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the device-side fill (data_mode=device)")
+    parser.add_argument("--npu_server", action="store_true",
+                        help="Run the NPU on the persistent runner (qnn_runner/) instead of launching qnn-net-run per phase")
+    parser.add_argument("--cpu_stream", action="store_true",
+                        help="Loop the CPU kernel on the device (tvm_stream/) instead of in time_evaluator chunks")
+    parser.add_argument("--cpu_rate", type=parse_rate_spec,
+                        help="Drive the CPU open loop at fixed:<hz> or poisson:<hz> (needs --cpu_stream)")
+    parser.add_argument("--gpu_rate", type=parse_rate_spec,
+                        help="Drive the GPU open loop at fixed:<hz> or poisson:<hz>")
+    parser.add_argument("--gpu_mode", default="batch",
+                        help="GPU submission mode: batch (queue all runs, then wait), serial, or pipeline:<depth>")
+    parser.add_argument("--gpu_buffers", choices=["copy", "alloc_host", "use_host", "svm"], default="copy",
+                        help="How clblast_bw_test shares A/B/C with the host: copy (write/read buffer), "
+                             "alloc_host / use_host (mapped host memory) or svm")
+    parser.add_argument("--gpu_tenant", nargs="+", default=[], metavar="CONFIG[@PRIORITY]",
+                        help="Other GPU streams, each on its own command queue next to the measured kernel: "
+                             f"kernel_idx,m,k,n[,precision][@priority], priority one of {', '.join(GPU_PRIORITIES)} "
+                             "(cl_khr_priority_hints, ignored where unsupported)")
+    parser.add_argument("--gpu_priority", choices=GPU_PRIORITIES,
+                        help="Priority hint of the measured GPU queue (default: none)")
+    parser.add_argument("--npu_rate", type=parse_rate_spec,
+                        help="Drive the NPU open loop at fixed:<hz> or poisson:<hz> (needs --npu_server)")
+    parser.add_argument("--npu_no_context", action="store_true",
+                        help="Prepare the graph from libmatmul_qnn.so at every NPU startup even if the model "
+                             "directory has a cached context binary (qnn_prepare_model.sh)")
+    parser.add_argument("--npu_outputs", choices=["discard", "keep"], default="discard",
+                        help="discard: qnn-net-run writes no output tensors during the benchmark; keep: write all of them")
+    parser.add_argument("--skip_npu_validate", action="store_true",
+                        help="Skip the one-off NPU output check against the torch reference (npu_validate.py)")
+    parser.add_argument("--model_root", default="model", help="Host directory holding the generated QNN model directories")
+    parser.add_argument("--monitor", action="store_true",
+                        help="Sample clocks and temperatures during every phase and re-run phases with throttling "
+                             "or latency steps (device_monitor.py)")
+    parser.add_argument("--max_reruns", type=int, default=1, help="Re-runs of a flagged phase (with --monitor)")
+    parser.add_argument("--npu_freq_path", help="sysfs clock file of the NPU to monitor (device specific)")
+    parser.add_argument("--power", action="store_true",
+                        help="Sample battery current/voltage and report energy per phase and J per inference "
+                             "(power_monitor.py; run on battery)")
+    parser.add_argument("--power_interval", type=float, default=0.02, help="Power sampling interval (s)")
+    parser.add_argument("--power_current_path", default="/sys/class/power_supply/battery/current_now")
+    parser.add_argument("--power_voltage_path", default="/sys/class/power_supply/battery/voltage_now")
+    parser.add_argument("--orchestrator", action="store_true",
+                        help="Run every phase as one plan on the device (orchestrator/, cpu_runner and qnn_runner) "
+                             "instead of starting its workloads from host threads")
+    parser.add_argument("--tracker", nargs="+", default=["127.0.0.1:9190"],
+                        help="RPC tracker host:port, or several: a pool without a free device falls back to the next")
+    parser.add_argument("--heartbeat_interval", type=float, default=30.0,
+                        help="Seconds between RPC heartbeats while idle (a dropped session is replaced)")
+    parser.add_argument("--rpc_retries", type=int, default=3,
+                        help="Reconnect-and-retry attempts of a candidate whose RPC session dropped mid-measurement")
+    parser.add_argument("--result_dir", default="result", help="Directory of the result and span files")
     parser.add_argument("--CPU_REPEAT_LONG", type=int, default=100)
     parser.add_argument("--CPU_REPEAT_SHORT", type=int, default=20)
     parser.add_argument("--GPU_REPEAT_LONG", type=int, default=5000)
     parser.add_argument("--GPU_REPEAT_SHORT", type=int, default=100)
     parser.add_argument("--NPU_REPEAT_LONG", type=int, default=500)
     parser.add_argument("--NPU_REPEAT_SHORT", type=int, default=20)
+    parser.add_argument("--bg", action="append", default=[],
+                        help="Background bandwidth workload kind:target_gbps:duty[:size_mb] "
+                             "(cpu_stream or gpu_copy, repeatable). cpu_stream needs a second RPC server "
+                             "registered with the same key.")
 
     args = parser.parse_args()
-    cpu_kernel_path = args.cpu_kernel_path
+    if args.cpu_rate and not args.cpu_stream:
+        parser.error("--cpu_rate needs --cpu_stream")
+    if args.npu_rate and not args.npu_server:
+        parser.error("--npu_rate needs --npu_server")
+    if not re.fullmatch(r"batch|serial|pipeline:[1-9]\d*", args.gpu_mode):
+        parser.error(f"Invalid --gpu_mode '{args.gpu_mode}'")
+    if args.gpu_rate and args.gpu_mode != "batch":
+        parser.error("--gpu_rate and --gpu_mode are exclusive (open loop has its own submission)")
+    cpu_models = [parse_model_spec(path) for path in args.cpu_kernel_path if parse_model_spec(path)]
+    gpu_model_name, npu_model_name = parse_model_spec(args.gpu_kernel_config), parse_model_spec(args.npu_kernel_path)
+    for model in cpu_models + ([gpu_model_name] if gpu_model_name else []):
+        if model not in TRANSFORMER_BLOCKS:
+            parser.error(f"Unknown model '{model}', expected one of {', '.join(TRANSFORMER_BLOCKS)}")
+    if npu_model_name and npu_model_name not in NPU_MODELS:
+        parser.error(f"Unknown NPU model '{npu_model_name}', expected one of {', '.join(NPU_MODELS)}")
+    if cpu_models and args.cpu_dtype != "float32":
+        parser.error("Model workloads are float32 (--cpu_dtype int8 only applies to matmul kernels)")
+    if gpu_model_name and (args.gpu_rate or args.gpu_mode != "batch" or args.gpu_buffers != "copy" or
+                           args.gpu_tenant or args.gpu_priority):
+        parser.error("GPU models run through time_evaluator "
+                     "(no --gpu_rate / --gpu_mode / --gpu_buffers / --gpu_tenant / --gpu_priority)")
+    gpu_precision = None
+    if not gpu_model_name:
+        try:
+            gpu_precision = parse_gpu_config(args.gpu_kernel_config)[4]
+            for tenant in args.gpu_tenant:
+                parse_gpu_tenant(tenant)
+        except ValueError as err:
+            parser.error(str(err))
+    if args.orchestrator and (cpu_models or gpu_model_name or args.cpu_stream or args.npu_server or
+                              args.cpu_rate or args.gpu_rate or args.npu_rate):
+        parser.error("--orchestrator runs matmul kernels on its own workers "
+                     "(no model:<block>, --cpu_stream, --npu_server or rates)")
+    rates = {name: rate for name, rate in
+             (('cpu', args.cpu_rate), ('gpu', args.gpu_rate), ('npu', args.npu_rate)) if rate}
     gpu_kernel_config = args.gpu_kernel_config
     npu_kernel_path = args.npu_kernel_path
 
-    logger.info(f"\nConnecting to RPC tracker at {tracker_host}:{tracker_port}...")
-    tracker = rpc.connect_tracker(tracker_host, tracker_port)
-
-    remote = tracker.request(tracker_key, session_timeout=1800, priority=1)
+    profiler.reset()
+    run_id = datetime.datetime.now().strftime('%Y%m%d_%H%M%S')
+    logger.info(f"\nConnecting to RPC tracker at {', '.join(args.tracker)}...")
+    with span("connect"):
+        # Heartbeats, reconnects and session renewal, so sweeps can outlive a session (rpc_session.py)
+        session = SessionManager(args.tracker, tracker_key, session_timeout=1800, priority=1,
+                                 heartbeat_interval=args.heartbeat_interval, max_retries=args.rpc_retries).connect()
     logger.info("Connected to remote device")
 
+    # session.remote is read each time rather than kept in a local, so a renewal can release the old session
+    with span("setup"):
+        background = [parse_background_spec(spec, lambda: session.request_session("the background CPU workload"))
+                      for spec in args.bg]
+        for workload in background:
+            if isinstance(workload, CpuStreamWorkload):
+                session.on_renew(workload.remote, workload.reload)
+        tensor_cache = CpuTensorCache(session.remote, data_mode=args.data_mode, seed=args.seed)
+        # The GPU model runs concurrently with the CPU kernel, so it needs its own session
+        gpu_model = None
+        if gpu_model_name:
+            gpu_block = TRANSFORMER_BLOCKS[gpu_model_name]
 
-    result = benchmark_variant(remote, cpu_kernel_path, gpu_kernel_config, npu_kernel_path,
-                               args.CPU_REPEAT_LONG, args.CPU_REPEAT_SHORT,
-                               args.GPU_REPEAT_LONG, args.GPU_REPEAT_SHORT,
-                               args.NPU_REPEAT_LONG, args.NPU_REPEAT_SHORT)
-    result_stat = {k: v for k, v in result.items() if 'stat' in k}
-    
-    logger.info(f"\n{'='*60}")
-    logger.info(json.dumps(result_stat, indent=2))
-    
-    result["nthreads"] = nthreads
-    result["cpu_kernel_path"] = cpu_kernel_path
-    result["gpu_kernel_config"] = gpu_kernel_config
-    result["npu_kernel_path"] = npu_kernel_path
-    filename = f"result/{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
-    with open(filename, "w") as f:
-        json.dump(result, f, indent=2)
+            def renew_gpu_model(remote):
+                gpu_model.clear()
+                if remote is not None:
+                    gpu_model.update(prepare_gpu_model(remote, gpu_block))
+            gpu_model = prepare_gpu_model(session.request_session("the GPU model", renew_gpu_model), gpu_block)
+        npu_server = (NpuServer.on_device(npu_run_dir(npu_kernel_path), context_binary=not args.npu_no_context,
+                                          layout=npu_layout(npu_kernel_path)).open()
+                      if args.npu_server else None)
+        cpu_stream = CpuStream(session.remote) if args.cpu_stream else None
+        session.on_reconnect(tensor_cache.reset)
+        if cpu_stream is not None:
+            session.on_reconnect(cpu_stream.reload)
+        monitor = DeviceMonitor(npu_freq_path=args.npu_freq_path).start() if args.monitor else None
+        power = (PowerMonitor(interval=args.power_interval, current_path=args.power_current_path,
+                              voltage_path=args.power_voltage_path).start() if args.power else None)
+        orchestrator = prepare_orchestrator(Orchestrator()) if args.orchestrator else None
+    npu_validation = None
+    if npu_model_name and not args.skip_npu_validate:
+        logger.info(f"[NPU] No reference output for model {npu_model_name}, skipping validation")
+    elif not args.skip_npu_validate:
+        with span("verify_npu"):
+            npu_validation = validate_npu_output(npu_run_dir(npu_kernel_path),
+                                                 os.path.join(args.model_root, npu_kernel_path), npu_server=npu_server,
+                                                 context_binary=not args.npu_no_context)
+
+    for cpu_kernel_path in args.cpu_kernel_path:
+        # A dropped session re-runs only this candidate, on a new session
+        result = session.run(cpu_kernel_path, lambda: benchmark_variant(
+            session.remote, cpu_kernel_path, gpu_kernel_config, npu_kernel_path,
+            args.CPU_REPEAT_LONG, args.CPU_REPEAT_SHORT,
+            args.GPU_REPEAT_LONG, args.GPU_REPEAT_SHORT,
+            args.NPU_REPEAT_LONG, args.NPU_REPEAT_SHORT,
+            background=background, cpu_dtype=args.cpu_dtype,
+            tensor_cache=tensor_cache, npu_server=npu_server,
+            npu_outputs=args.npu_outputs, cpu_stream=cpu_stream, rates=rates,
+            gpu_mode=args.gpu_mode, monitor=monitor, max_reruns=args.max_reruns,
+            npu_context=not args.npu_no_context, gpu_model=gpu_model,
+            gpu_buffers=args.gpu_buffers, power=power, orchestrator=orchestrator,
+            gpu_priority=args.gpu_priority, gpu_tenants=args.gpu_tenant))
+        if result is None:
+            continue
+        result_stat = {k: v for k, v in result.items() if 'stat' in k}
+
+        logger.info(f"\n{'='*60}")
+        logger.info(json.dumps(result_stat, indent=2))
+
+        result["nthreads"] = nthreads
+        result["cpu_dtype"] = args.cpu_dtype
+        result["data_mode"] = args.data_mode
+        result["cpu_kernel_path"] = cpu_kernel_path
+        result["gpu_kernel_config"] = gpu_kernel_config
+        result["npu_kernel_path"] = npu_kernel_path
+        result["npu_server"] = args.npu_server
+        result["npu_context_binary"] = not args.npu_no_context
+        if npu_server is not None:
+            result["npu_init_ms"] = npu_server.init_ms
+        result["npu_outputs"] = args.npu_outputs
+        result["cpu_stream"] = args.cpu_stream
+        result["gpu_mode"] = args.gpu_mode
+        result["gpu_buffers"] = args.gpu_buffers
+        result["gpu_precision"] = gpu_precision
+        result["gpu_priority"] = args.gpu_priority
+        result["orchestrated"] = args.orchestrator
+        result["rpc_reconnects"] = session.reconnects
+        result["monitor_enabled"] = args.monitor
+        result["rates"] = {name: f"{kind}:{hz}" for name, (kind, hz) in rates.items()}
+        result["npu_validation"] = npu_validation
+        result["bg"] = args.bg
+        result["workloads"] = {'cpu': describe_workload(cpu_kernel_path), 'gpu': describe_workload(gpu_kernel_config),
+                               'npu': describe_workload(npu_kernel_path)}
+        log_workload_slowdowns(result)
+        log_gpu_tenants(result)
+        log_energy(result)
+        os.makedirs(args.result_dir, exist_ok=True)
+        filename = f"{args.result_dir}/{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+        with span("save"), open(filename, "w") as f:
+            json.dump(result, f, indent=2)
     
     # Cleanup
-    del remote
+    if monitor is not None:
+        monitor.stop()
+    if power is not None:
+        power.stop()
+    if npu_server is not None:
+        npu_server.close()
+    session.close()
+
+    # Where the run's wall time went (open the span file in ui.perfetto.dev for a timeline)
+    profiler.log_summary()
+    profiler.dump(f"{args.result_dir}/spans_{run_id}.json")
 
 if __name__ == "__main__":
     main()
@@ -20,6 +20,8 @@ WORKSPACE_DIR="$(cd "$(dirname "${BASH_SOURCE[0]}")" && pwd)"
 # ssh -N -R 9090:127.0.0.1:9090 hamburg # server to local
 # # rpc server on device
 # adb -s R3CX80PSDPY shell "cd /data/local/tmp && LD_LIBRARY_PATH=/data/local/tmp /data/local/tmp/tvm_rpc server --tracker=127.0.0.1:9190 --key=android64"
+# # second rpc server, needed for -g model:..., decode_pipeline.py live and --bg cpu_stream:...
+# adb -s R3CX80PSDPY shell "cd /data/local/tmp && LD_LIBRARY_PATH=/data/local/tmp /data/local/tmp/tvm_rpc server --port=9091 --tracker=127.0.0.1:9190 --key=android64"
 ########################################
 
 # allow conda activate command in shell script
@@ -0,0 +1,185 @@
+"""
+Latency-under-load SLO search.
+
+For each CPU matmul shape, find how much work each co-runner can add before
+the CPU kernel's tail latency breaks its SLO. Co-runner intensity is the duty
+cycle (fraction of time the co-runner is busy), found by binary search
+assuming the foreground tail latency grows with the duty cycle.
+
+Co-runner specs:
+    gpu:<kernel_idx,m,k,n[,fp16]>   CLBlast matmul (clblast_bw_test paced mode)
+    npu:<model_dir>                 QNN model on the persistent runner (qnn_runner/)
+    gpu_copy[:size_mb]              OpenCL copy kernel (cl_bw_gen)
+    cpu_stream[:size_mb]            STREAM triad on other CPU cores (needs a second RPC server)
+
+The result is an admission-control table (max duty per shape and co-runner)
+written to result/slo_<timestamp>.json.
+
+Usage:
+    python slo_search.py -c pareto_so_files/1x1024x3072_cand001_neon+dotprod.so --slo_ms 2.0 \\
+        --co_runner gpu:0,1,1024,3072 --co_runner npu:matmul_1x1024x4096
+"""
+
+import os
+import re
+import json
+import argparse
+import datetime
+import logging
+from pathlib import Path
+
+import numpy as np
+from tvm import rpc
+
+from bw_workloads import CpuStreamWorkload, GpuCopyWorkload, GpuMatmulWorkload, NpuWorkload
+from npu_server import NpuServer
+from run_contention import (CPU_DTYPES, CpuTensorCache, background_load, mode, nthreads, npu_run_dir,
+                            run_cpu_benchmark, wait_for_device_cooldown)
+
+logger = logging.getLogger(__name__)
+
+
+def make_co_runner(spec, request_session, npu_servers):
+    """Return (name, factory) where factory(duty) creates the co-runner workload."""
+    kind, _, arg = spec.partition(':')
+    if kind == "gpu":
+        return spec, lambda duty: GpuMatmulWorkload(arg, duty)
+    if kind == "npu":
+        if arg not in npu_servers:
+            npu_servers[arg] = NpuServer.on_device(npu_run_dir(arg)).open()
+        server = npu_servers[arg]
+        return spec, lambda duty: NpuWorkload(server, duty)
+    if kind == "gpu_copy":
+        size_mb = int(arg) if arg else 64
+        return spec, lambda duty: GpuCopyWorkload(0.0, duty, size_mb)
+    if kind == "cpu_stream":
+        size_mb = int(arg) if arg else 64
+        session = request_session()
+        return spec, lambda duty: CpuStreamWorkload(session, 0.0, duty, size_mb)
+    raise ValueError(f"Unknown co-runner spec: {spec}")
+
+
+def search_max_duty(measure, slo_ms, min_duty=0.05, steps=5):
+    """
+    Largest duty cycle in [min_duty, 1] whose foreground tail latency meets the SLO.
+
+    measure(duty) returns the tail latency (ms). Returns (max_duty, trials);
+    max_duty is 0.0 if even min_duty breaks the SLO.
+    """
+    trials = []
+
+    def meets(duty):
+        tail_ms = measure(duty)
+        trials.append({'duty': duty, 'tail_ms': tail_ms, 'meets_slo': tail_ms <= slo_ms})
+        logger.info(f"[SLO] duty {duty:.3f}: tail {tail_ms:.3f} ms ({'ok' if tail_ms <= slo_ms else 'violates'} {slo_ms} ms)")
+        return tail_ms <= slo_ms
+
+    if meets(1.0):
+        return 1.0, trials
+    if not meets(min_duty):
+        return 0.0, trials
+    lo, hi = min_duty, 1.0
+    for _ in range(steps):
+        mid = (lo + hi) / 2
+        if meets(mid):
+            lo = mid
+        else:
+            hi = mid
+    return lo, trials
+
+
+def main():
+    tracker_host = "127.0.0.1"
+    tracker_port = 9190
+    tracker_key = "android64"
+
+    parser = argparse.ArgumentParser(description="Find the max co-runner duty cycle that keeps the CPU tail latency within an SLO.",
+                                     epilog=__doc__[__doc__.index("Usage:"):],
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("-c", "--cpu_kernel_path", required=True, nargs="+", help="CPU kernel .so file(s), one search per shape")
+    parser.add_argument("--co_runner", action="append", required=True,
+                        help="gpu:<kernel_idx,m,k,n>, npu:<model_dir>, gpu_copy[:size_mb] or cpu_stream[:size_mb] (repeatable)")
+    parser.add_argument("--slo_ms", type=float, required=True, help="Latency SLO of the CPU kernel (ms)")
+    parser.add_argument("--percentile", type=float, default=99.0, help="Tail percentile checked against the SLO")
+    parser.add_argument("--cpu_dtype", choices=list(CPU_DTYPES), default="float32")
+    parser.add_argument("--repeat", type=int, default=200, help="CPU runs per measurement (each timed individually)")
+    parser.add_argument("--min_duty", type=float, default=0.05)
+    parser.add_argument("--steps", type=int, default=5, help="Binary search steps per co-runner")
+    args = parser.parse_args()
+
+    tracker = rpc.connect_tracker(tracker_host, tracker_port)
+    remote = tracker.request(tracker_key, session_timeout=1800, priority=1)
+    logger.info("Connected to remote device")
+
+    def request_session():
+        logger.info("Requesting a second RPC session for the cpu_stream co-runner...")
+        return tracker.request(tracker_key, session_timeout=1800, priority=1)
+
+    npu_servers = {}
+    co_runners = [make_co_runner(spec, request_session, npu_servers) for spec in args.co_runner]
+    tensor_cache = CpuTensorCache(remote)
+    config_func = remote.get_function('runtime.config_threadpool')
+
+    table = []
+    for cpu_kernel_path in args.cpu_kernel_path:
+        shape = re.search(r"(\d+x\d+x\d+)", Path(cpu_kernel_path).stem)
+        if not shape:
+            logger.error(f"ERROR: Unable to parse shape from filename: {cpu_kernel_path}")
+            continue
+        m, k, n = map(int, shape.group(1).split('x'))
+
+        remote.upload(cpu_kernel_path)
+        remote_mod = remote.load_module(os.path.basename(cpu_kernel_path))
+        r_entry = getattr(remote_mod, "entry_name", "matmul")
+        rdev = remote.cpu()
+        ra, rb, rc, verify_output = tensor_cache.get(m, k, n, args.cpu_dtype)
+        config_func(mode, nthreads)
+        remote_mod[r_entry](ra, rb, rc)
+        verify_output()
+
+        def measure(workloads=()):
+            wait_for_device_cooldown()
+            bg_result_container = {}
+            with background_load(workloads, 'slo', bg_result_container):
+                _, latencies = run_cpu_benchmark(remote_mod, r_entry, rdev, ra, rb, rc, config_func,
+                                                 mode, nthreads, repeat=args.repeat, number=1)
+            return float(np.percentile(latencies, args.percentile))
+
+        standalone_ms = measure()
+        logger.info(f"[SLO] {shape.group(1)} standalone p{args.percentile:g}: {standalone_ms:.3f} ms")
+        for name, factory in co_runners:
+            if standalone_ms > args.slo_ms:
+                max_duty, trials = 0.0, []
+            else:
+                logger.info(f"\n--- {shape.group(1)} with {name} ---")
+                max_duty, trials = search_max_duty(lambda duty: measure([factory(duty)]), args.slo_ms,
+                                                   args.min_duty, args.steps)
+            tail_at_max = next((t['tail_ms'] for t in reversed(trials) if t['duty'] == max_duty), None)
+            table.append({
+                'shape': shape.group(1),
+                'cpu_kernel_path': cpu_kernel_path,
+                'co_runner': name,
+                'slo_ms': args.slo_ms,
+                'percentile': args.percentile,
+                'standalone_tail_ms': standalone_ms,
+                'max_duty': max_duty,
+                'tail_ms_at_max_duty': tail_at_max,
+                'trials': trials,
+            })
+
+    logger.info(f"\n{'='*60}\nAdmission table (p{args.percentile:g} <= {args.slo_ms} ms):")
+    for row in table:
+        logger.info(f"  {row['shape']:>16}  {row['co_runner']:<28} max duty {row['max_duty']:.3f}")
+    os.makedirs("result", exist_ok=True)
+    filename = f"result/slo_{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+    with open(filename, "w") as f:
+        json.dump({'cpu_dtype': args.cpu_dtype, 'nthreads': nthreads, 'table': table}, f, indent=2)
+    logger.info(f"Saved admission table to {filename}")
+
+    for server in npu_servers.values():
+        server.close()
+    del remote
+
+
+if __name__ == "__main__":
+    main()
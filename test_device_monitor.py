@@ -0,0 +1,58 @@
+"""Host tests of device_monitor.py: the sampling loop runs in a local shell on a fake sysfs."""
+
+import os
+import time
+
+import numpy as np
+
+import device_monitor
+from device_monitor import DeviceMonitor, latency_step
+
+
+def test_latency_step_on_a_short_phase():
+    # 20 samples, as in the 20-repeat phases: 10 at 1 ms, then 10 at 1.5 ms
+    latencies = [1.0] * 10 + [1.5] * 10
+    assert latency_step(latencies) == (10, 0.5)
+    assert latency_step([1.0] * 20) is None
+    # An explicit segment longer than half the series skips the check
+    assert latency_step(latencies, min_segment=20) is None
+
+
+def test_check_flags_a_step_in_a_short_phase():
+    monitor = DeviceMonitor()
+    report = monitor.check("run1", "gpu", (0.0, 1.0), [1.0] * 12 + [2.0] * 8)
+    assert not report['valid']
+    assert report['invalid'] == list(range(12, 20))
+
+
+def write(path, value):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        f.write(f"{value}\n")
+
+
+def test_sampling_loop_and_stop(tmp_path, monkeypatch):
+    for policy, khz in ((0, 1800000), (4, 2400000)):
+        write(tmp_path / f"cpufreq/policy{policy}/scaling_cur_freq", khz)
+    write(tmp_path / "gpuclk", 585000000)
+    monkeypatch.setattr(device_monitor, "CPU_FREQ_GLOB", str(tmp_path / "cpufreq/policy*/scaling_cur_freq"))
+    monitor = DeviceMonitor(interval=0.02, thermal_zones=(), gpu_freq_path=str(tmp_path / "gpuclk"))
+    commands = []
+
+    def local_shell(script):
+        commands.append(script)
+        return ["sh", "-c", script]
+
+    monitor._shell = local_shell
+    monitor.start()
+    time.sleep(0.3)
+    loop_pid = monitor._proc.pid
+    monitor.stop()
+
+    assert len(monitor.readings) >= 3
+    assert monitor.readings[-1]['cpu'] == 2400000
+    assert monitor.readings[-1]['gpu'] == 585000000
+    # stop() kills the loop's own shell, not every process that mentions the sysfs paths
+    assert monitor._loop_pid == loop_pid
+    assert commands[-1] == f"kill {loop_pid}"
+    assert np.all(np.diff([r['t'] for r in monitor.readings]) > 0)
@@ -0,0 +1,21 @@
+"""Host tests of experiment_planner.py on synthetic responses with known effects."""
+
+import pytest
+
+from experiment_planner import demo, oa_design, fit_effects
+
+
+@pytest.mark.parametrize("design", ["oa", "lhs"])
+def test_recovers_the_cpu_gpu_interaction(design):
+    model = demo(design)
+    assert model['interactions'][(0, 1)][0] == pytest.approx(4.0, abs=0.5)
+    assert model['interactions'][(0, 1)][1] > model['interactions'][(1, 2)][1]
+
+
+def test_additive_response_has_no_interaction():
+    rows = oa_design([11, 7, 3], blocks=2)
+    y = [0.01 * a - 0.02 * b + 0.03 * c for a, b, c in rows]
+    model = fit_effects(rows, y, [11, 7, 3])
+    assert model['r2'] == pytest.approx(1.0)
+    for gamma, share in model['interactions'].values():
+        assert share < 1e-6
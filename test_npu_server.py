@@ -0,0 +1,57 @@
+"""Host tests of npu_server.py against qnn_runner's fake backend (cmake -DQNN_RUNNER_FAKE_ONLY=ON)."""
+
+import os
+
+import numpy as np
+import pytest
+
+from npu_server import NpuServer
+
+RUNNER = os.path.join(os.path.dirname(__file__), "qnn_runner", "build-host", "qnn_runner")
+
+pytestmark = pytest.mark.skipif(not os.path.exists(RUNNER), reason=f"{RUNNER} not built")
+
+
+def fake(fail_at=None):
+    return NpuServer.local_fake(RUNNER, 200, fail_at=fail_at, command_timeout=10)
+
+
+def test_run_returns_n_samples():
+    with fake() as server:
+        assert len(server.run(20)) == 20
+        assert len(server.run(7)) == 7
+
+
+def test_rate_run_returns_n_samples():
+    with fake() as server:
+        latencies = server.run(20, rate=("fixed", 2000))
+        assert len(latencies) == 20
+        assert len(server.queue_delays) == 20
+        assert len(server.run(20, rate=("poisson", 2000))) == 20
+
+
+def test_failed_run_leaves_no_stale_done():
+    with fake(fail_at=3) as server:
+        with pytest.raises(RuntimeError, match="fake failure"):
+            server.run(10)
+        # A stale DONE of the failed run would answer this run before its inferences
+        assert len(server.run(10)) == 10
+
+
+def test_failed_loop_recovers():
+    with fake(fail_at=5) as server:
+        with pytest.raises(RuntimeError, match="fake failure"):
+            server.run(50, rate=("fixed", 2000))
+        assert len(server.run(10)) == 10
+        assert len(server.run(10, rate=("fixed", 2000))) == 10
+
+
+def test_dump_echoes_the_input(tmp_path):
+    x = np.arange(12, dtype="float32")
+    x.tofile(tmp_path / "in.raw")
+    with fake() as server:
+        with pytest.raises(RuntimeError, match="cannot open input"):
+            server.dump(str(tmp_path / "out"), str(tmp_path / "missing.raw"))
+        server.dump(str(tmp_path / "out"), str(tmp_path / "in.raw"))
+        assert np.array_equal(np.fromfile(tmp_path / "out" / "output_0.raw", dtype="float32"), x)
+        assert len(server.run(5)) == 5
@@ -0,0 +1,48 @@
+"""Host tests of orchestrator.py with the host-built orchestrator and its stub workers (orchestrator/README.md)."""
+
+import os
+import signal
+import time
+
+import pytest
+
+from orchestrator import Orchestrator, PhasePlan, clblast_latencies, loop_command, runner_latencies, worker_window
+
+BINARY = os.path.join(os.path.dirname(os.path.abspath(__file__)), "orchestrator", "build-host", "orchestrator")
+
+pytestmark = pytest.mark.skipif(not os.path.exists(BINARY), reason=f"{BINARY} not built")
+
+
+def stub(us, init_ms=100):
+    return f"{BINARY} --stub_worker {us} --init_ms {init_ms}"
+
+
+def test_measured_worker_overlaps_the_loopers():
+    # run1 of run_contention.py: cpu and gpu loop until the npu has finished its runs
+    plan = PhasePlan(timeout_ms=20000)
+    plan.add("cpu", stub(3000), ready="READY", stdin="start\n", stop="after:npu", stop_stdin="stop\nquit\n")
+    plan.add("gpu", loop_command("sleep 0.005; echo 'GPU Latency: 5.0 ms'"), stop="after:npu")
+    plan.add("npu", stub(2000), ready="READY", start_ms=200, stdin="run 10\nquit\n")
+    bundle = Orchestrator(binary=BINARY, local=True).run(plan, "run1")
+
+    assert not bundle['timed_out']
+    assert len(runner_latencies(bundle, 'npu')) == 10
+    assert runner_latencies(bundle, 'cpu')
+    assert clblast_latencies(bundle, 'gpu')
+    npu_t0, npu_t1 = worker_window(bundle, 'npu')
+    for looper in ('cpu', 'gpu'):
+        t0, t1 = worker_window(bundle, looper)
+        assert t0 <= npu_t0 and npu_t1 <= t1 + 0.01
+
+
+def test_timeout_kills_ready_workers_that_never_started():
+    plan = PhasePlan(timeout_ms=300, grace_ms=200)
+    plan.add("slow", "sleep 30")
+    plan.add("late", stub(1000), ready="READY", start_ms=60000, stdin="start\n")
+    start = time.time()
+    bundle = Orchestrator(binary=BINARY, local=True).run(plan, "timeout")
+
+    assert time.time() - start < 10
+    assert bundle['timed_out']
+    assert bundle['workers']['slow']['signal'] == signal.SIGTERM
+    assert bundle['workers']['late']['signal'] == signal.SIGKILL
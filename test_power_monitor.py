@@ -0,0 +1,51 @@
+"""Host tests of power_monitor.py against a fake sysfs (no device needed)."""
+
+import time
+
+import pytest
+
+from power_monitor import PowerMonitor, integrate_energy, write_fake_sysfs
+
+
+def test_integrate_energy_interpolates_edges():
+    # 2 W rising to 4 W over 2 s; the window [0.5, 1.5] sees 2.5 .. 3.5 W
+    assert integrate_energy([0.0, 2.0], [2.0, 4.0], 0.5, 1.5) == pytest.approx(3.0)
+    assert integrate_energy([], [], 0.0, 1.0) is None
+
+
+def test_j_per_inference_counts_calls(tmp_path):
+    # 1 A at 4 V: 4 W
+    write_fake_sysfs(tmp_path, -1000000, 4000000)
+    with PowerMonitor(interval=0.01, sysfs_root=str(tmp_path)) as monitor:
+        time.sleep(0.2)
+        t0 = time.time()
+        time.sleep(0.5)
+        t1 = time.time()
+        time.sleep(0.1)
+    energy = 4.0 * (t1 - t0)
+    # 10 time_evaluator samples of 20 calls each on the CPU, one sample per call on the GPU
+    measured = {'cpu': ([1.0] * 10, (t0, t1)), 'gpu': ([1.0] * 50, (t0, t1)), 'npu': (None, (t0, t1))}
+    report = monitor.report("run", (t0, t1), measured, counts={'cpu': 200, 'npu': 25})
+
+    assert report['energy_j'] == pytest.approx(energy, rel=0.05)
+    assert report['accel']['cpu']['inferences'] == 200
+    assert report['accel']['cpu']['j_per_inference'] == pytest.approx(energy / 200, rel=0.05)
+    assert report['accel']['gpu']['inferences'] == 50
+    assert report['accel']['gpu']['j_per_inference'] == pytest.approx(energy / 50, rel=0.05)
+    assert report['accel']['npu']['j_per_inference'] == pytest.approx(energy / 25, rel=0.05)
+
+
+def test_dynamic_energy_subtracts_idle(tmp_path):
+    write_fake_sysfs(tmp_path, -500000, 4000000)
+    with PowerMonitor(interval=0.01, sysfs_root=str(tmp_path)) as monitor:
+        time.sleep(0.1)
+        monitor.measure_idle(0.3)
+        write_fake_sysfs(tmp_path, -1000000, 4000000)
+        time.sleep(0.1)
+        t0 = time.time()
+        time.sleep(0.4)
+        t1 = time.time()
+        time.sleep(0.1)
+    assert monitor.idle_w == pytest.approx(2.0, rel=0.05)
+    report = monitor.report("run", (t0, t1), {'gpu': ([1.0] * 10, (t0, t1))})
+    assert report['accel']['gpu']['dynamic_j_per_inference'] == pytest.approx(2.0 * (t1 - t0) / 10, rel=0.1)
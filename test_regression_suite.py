@@ -0,0 +1,49 @@
+"""Host tests of regression_suite.py (run_contention.py is replaced by a fake subprocess)."""
+
+import os
+import json
+import subprocess
+
+import pytest
+
+import regression_suite
+from regression_suite import expand_suite, load_suite, run_combination
+
+
+def write_json(path, data):
+    with open(path, "w") as f:
+        json.dump(data, f)
+    return str(path)
+
+
+def test_load_suite_rejects_a_planner_space():
+    path = os.path.join(os.path.dirname(__file__), "plans", "colocation_1x1024x3072.json")
+    with pytest.raises(ValueError, match="experiment_planner"):
+        load_suite(path)
+
+
+def test_decode_suite_expands():
+    suite = load_suite(os.path.join(os.path.dirname(__file__), "suites", "decode_contention.json"))
+    runs = expand_suite(suite)
+    assert len(runs) == len(suite['shapes']) * len(suite['variants']) * len(suite['scenarios'])
+    assert all(key.count("__") == 2 for key, _ in runs)
+
+
+def test_run_without_result_is_a_failure(tmp_path, monkeypatch):
+    # run_contention.py exits 0 but writes nothing when it skips a missing .so
+    monkeypatch.setattr(regression_suite.subprocess, "run",
+                        lambda cmd, **kwargs: subprocess.CompletedProcess(cmd, 0))
+    assert run_combination("1x1024x3072__base__idle", ["-c", "missing.so"], str(tmp_path)) is False
+    assert not list(tmp_path.iterdir())
+
+
+def test_run_copies_the_result(tmp_path, monkeypatch):
+    def fake_run(cmd, **kwargs):
+        result_dir = cmd[cmd.index("--result_dir") + 1]
+        write_json(f"{result_dir}/spans_1.json", {})
+        write_json(f"{result_dir}/20260101_000000.json", {'cpu_kernel_path': "x.so"})
+        return subprocess.CompletedProcess(cmd, 0)
+    monkeypatch.setattr(regression_suite.subprocess, "run", fake_run)
+    assert run_combination("k__v__s", [], str(tmp_path))
+    with open(tmp_path / "k__v__s.json") as f:
+        assert json.load(f) == {'cpu_kernel_path': "x.so"}
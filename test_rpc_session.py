@@ -0,0 +1,128 @@
+"""Host tests of rpc_session.py against a fake tracker that holds one session per device."""
+
+import gc
+import socket
+import weakref
+
+import pytest
+
+pytest.importorskip("tvm.rpc")
+
+from rpc_session import SessionManager, is_session_error  # noqa: E402
+
+
+class FakeSession:
+    def __init__(self, serial):
+        self.serial = serial
+
+    def upload(self, data, target):
+        pass
+
+
+class FakeTracker:
+    """
+    A pool of `capacity` devices. A request while every device is held by a
+    live session counts as an overlap: a real tracker would queue it until the
+    holder's session_timeout.
+    """
+
+    def __init__(self, capacity=1):
+        self.capacity = capacity
+        self.sessions = []
+        self.requests = 0
+        self.overlaps = 0
+
+    def live(self):
+        gc.collect()
+        return [s for s in self.sessions if s() is not None]
+
+    def summary(self):
+        return {"queue_info": {"android64": {"free": self.capacity - len(self.live())}}}
+
+    def request(self, key, priority=1, session_timeout=0):
+        self.requests += 1
+        if len(self.live()) >= self.capacity:
+            self.overlaps += 1
+        session = FakeSession(self.requests)
+        self.sessions.append(weakref.ref(session))
+        return session
+
+
+def manager(tracker):
+    session = SessionManager(["fake:9190"], heartbeat_interval=0, session_timeout=1800, renew_margin=600,
+                             retry_wait=0.0)
+    session._connect_tracker = lambda host, port: tracker
+    return session.connect()
+
+
+def expire(session, seconds_left=100):
+    session._connected_at -= session.session_timeout - seconds_left
+
+
+def test_renewal_releases_the_old_session_first():
+    tracker = FakeTracker(capacity=1)
+    session = manager(tracker)
+    # Stands in for CpuTensorCache: holds the session until told to drop it
+    held = {'remote': session.remote}
+    session.on_reconnect(lambda remote: held.update(remote=remote))
+    first = held['remote'].serial
+
+    expire(session)
+    assert session.run("measurement", lambda: held['remote'] is session.remote)
+    assert session.reconnects == 1
+    assert session.remote.serial != first
+    assert tracker.requests == 2
+    assert tracker.overlaps == 0
+
+
+def test_fake_tracker_sees_a_leaked_handle():
+    tracker = FakeTracker(capacity=1)
+    session = manager(tracker)
+    leaked = session.remote  # noqa: F841 - kept alive on purpose
+    expire(session)
+    session.run("measurement", lambda: None)
+    assert tracker.overlaps == 1
+
+
+def test_retry_after_a_drop_does_not_overlap():
+    tracker = FakeTracker(capacity=1)
+    session = manager(tracker)
+    held = {'remote': session.remote}
+    session.on_reconnect(lambda remote: held.update(remote=remote))
+    dropped = []
+
+    def measure():
+        remote = held['remote']  # like benchmark_variant's locals, kept alive by the traceback
+        if not dropped:
+            dropped.append(True)
+            raise ConnectionResetError("dropped")
+        return remote is session.remote
+
+    assert session.run("measurement", measure)
+    assert session.reconnects == 1
+    assert tracker.overlaps == 0
+
+
+def test_extra_sessions_are_renewed():
+    tracker = FakeTracker(capacity=2)
+    session = manager(tracker)
+    held = {}
+    held['remote'] = session.request_session("the background CPU workload", lambda remote: held.update(remote=remote))
+    first = held['remote'].serial
+
+    session._extras[0]['connected_at'] -= 1700
+    session.run("measurement", lambda: None)
+    assert held['remote'].serial != first
+    assert held['remote'] is session._extras[0]['remote']
+    assert tracker.requests == 3
+    assert tracker.overlaps == 0
+
+
+def test_is_session_error():
+    assert is_session_error(ConnectionResetError("reset by peer"))
+    assert is_session_error(EOFError())
+    assert is_session_error(socket.timeout())
+    assert is_session_error(RuntimeError("Check failed: (code == RPCCode::kReturn) is false"))
+    assert not is_session_error(FileNotFoundError("tvm_modules/fill.so"))
+    assert not is_session_error(RuntimeError("Connection of the output buffer failed"))
+    assert not is_session_error(ValueError("bad shape"))
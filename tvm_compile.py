@@ -0,0 +1,202 @@
+"""
+Generate and cross-compile CPU matmul candidates for new shapes.
+
+The pareto_so_files/*.so candidates were built outside this repo. This
+module regenerates candidates for any MxKxN shape: it enumerates tiled
+matmul schedules, builds them in a process pool with the NDK compiler
+(TVM_NDK_CC, see build_tvm.sh) and writes them to tvm_so_files/ with the
+same naming as the prebuilt files (<M>x<K>x<N>_cand<idx>_neon+dotprod.so), so
+run_contention.py and slo_search.py take them like the pareto candidates.
+A manifest <M>x<K>x<N>_candidates.json maps each candidate to its schedule.
+
+Built libraries are cached in tvm_cache/ by (shape, dtype, schedule, target,
+TVM commit, builder source), so rerunning for a shape or adding one to a
+list only compiles what changed.
+
+Usage (the new QNN shape in qnn_prepare_model.sh's SIZE_ARR):
+    export TVM_NDK_CC=...   # see build_tvm.sh
+    python tvm_compile.py 1x1024x4096 -j 16
+"""
+
+import os
+import json
+import shutil
+import hashlib
+import argparse
+import itertools
+import subprocess
+import multiprocessing
+import logging
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import tvm
+from tvm import te, tir
+
+from tvm_kernels import ANDROID_CPU_TARGET, export_module, matmul_compute
+
+logger = logging.getLogger(__name__)
+
+CACHE_DIR = "tvm_cache"
+
+TVM_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "tvm")
+
+# Schedule search space (see matmul_candidates)
+TILE_M = (1, 4, 8)
+TILE_N = (16, 32, 64)
+TILE_K = (16, 64, 256)
+VECTOR_WIDTH = (4, 16)
+
+
+def target_tag(target):
+    """Filename tag of a target, e.g. neon+dotprod for the Android target."""
+    attrs = [a.lstrip("+") for arg in target.split() if arg.startswith("-mattr=")
+             for a in arg[len("-mattr="):].split(",")]
+    return "+".join(attrs) if attrs else target.split()[0]
+
+
+def tvm_commit():
+    """Commit of the tvm submodule, or the installed TVM version if it is not a git checkout."""
+    # An uninitialized submodule has no .git, and git would report this repo's commit
+    if os.path.exists(os.path.join(TVM_DIR, ".git")):
+        result = subprocess.run(["git", "-C", TVM_DIR, "rev-parse", "HEAD"],
+                                stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True)
+        if result.returncode == 0 and result.stdout.strip():
+            return result.stdout.strip()
+    return f"tvm-{tvm.__version__}"
+
+
+def builder_digest():
+    """Hash of the schedule and compute code, so editing them invalidates the cache."""
+    h = hashlib.sha1()
+    for name in ("tvm_compile.py", "tvm_kernels.py"):
+        with open(os.path.join(os.path.dirname(os.path.abspath(__file__)), name), "rb") as f:
+            h.update(f.read())
+    return h.hexdigest()[:8]
+
+
+def matmul_candidates(m, k, n):
+    """Schedule parameters to try for a shape; tiles larger than the dimension are dropped."""
+    candidates = []
+    for tile_m, tile_n, tile_k, vec in itertools.product(TILE_M, TILE_N, TILE_K, VECTOR_WIDTH):
+        if tile_m > m or tile_n > n or tile_k > k or tile_n % vec:
+            continue
+        if tile_m > 1 and m // tile_m < 2:
+            continue
+        candidates.append({'tile_m': tile_m, 'tile_n': tile_n, 'tile_k': tile_k, 'vector_width': vec})
+    return candidates
+
+
+def cache_key(m, k, n, dtype, schedule, target, commit, digest):
+    desc = json.dumps({'shape': [m, k, n], 'dtype': dtype, 'schedule': schedule,
+                       'target': target, 'tvm': commit, 'builder': digest}, sort_keys=True)
+    return hashlib.sha1(desc.encode()).hexdigest()[:16]
+
+
+def schedule_matmul(m, k, n, dtype, schedule):
+    """
+    Tiled matmul: parallel over (M, N) tiles, K split into tile_k chunks and
+    the innermost N loop vectorized. Returns the scheduled IRModule.
+    """
+    func = te.create_prim_func(matmul_compute(m, k, n, dtype)).with_attr("global_symbol", "matmul")
+    sch = tir.Schedule(tvm.IRModule({"matmul": func}))
+    block = sch.get_block("c", func_name="matmul")
+    i, j, r = sch.get_loops(block)
+    i_outer, i_inner = sch.split(i, factors=[None, schedule['tile_m']])
+    j_outer, j_tile = sch.split(j, factors=[None, schedule['tile_n']])
+    j_inner, j_vec = sch.split(j_tile, factors=[None, schedule['vector_width']])
+    r_outer, r_inner = sch.split(r, factors=[None, schedule['tile_k']])
+    sch.reorder(i_outer, j_outer, r_outer, i_inner, r_inner, j_inner, j_vec)
+    sch.parallel(sch.fuse(i_outer, j_outer))
+    init = sch.decompose_reduction(block, r_outer)
+    sch.vectorize(sch.get_loops(init)[-1])
+    sch.vectorize(j_vec)
+    if schedule['tile_m'] > 1:
+        sch.unroll(i_inner)
+    return sch.mod
+
+
+def _compile_candidate(job):
+    """Process pool worker: build one candidate into the cache (atomic rename)."""
+    mod = schedule_matmul(job['m'], job['k'], job['n'], job['dtype'], job['schedule'])
+    lib = tvm.compile(mod, target=tvm.target.Target(job['target']))
+    tmp_path = f"{job['cache_path']}.{os.getpid()}.tmp.so"
+    export_module(lib, tmp_path, job['target'])
+    os.replace(tmp_path, job['cache_path'])
+    return job['cache_path']
+
+
+def compile_shape(m, k, n, out_dir, dtype="float32", target=ANDROID_CPU_TARGET, jobs=None, cache_dir=CACHE_DIR):
+    """
+    Build all schedule candidates of a shape (in parallel, skipping cached
+    ones) and copy them to out_dir. Returns the list of candidate entries
+    that is also written to out_dir/<shape>_candidates.json.
+    """
+    if "android" in target and not os.environ.get("TVM_NDK_CC"):
+        raise RuntimeError("TVM_NDK_CC is not set (see build_tvm.sh)")
+    os.makedirs(cache_dir, exist_ok=True)
+    os.makedirs(out_dir, exist_ok=True)
+    commit, digest = tvm_commit(), builder_digest()
+    shape = f"{m}x{k}x{n}"
+    dtype_tag = "" if dtype == "float32" else f"_{dtype}"
+
+    entries, pending = [], []
+    for idx, schedule in enumerate(matmul_candidates(m, k, n)):
+        key = cache_key(m, k, n, dtype, schedule, target, commit, digest)
+        entry = {
+            'candidate': idx,
+            'schedule': schedule,
+            'cache_key': key,
+            'cache_path': os.path.join(cache_dir, f"{key}.so"),
+            'path': os.path.join(out_dir, f"{shape}_cand{idx:03d}{dtype_tag}_{target_tag(target)}.so"),
+        }
+        entries.append(entry)
+        if not os.path.exists(entry['cache_path']):
+            pending.append(dict(entry, m=m, k=k, n=n, dtype=dtype, target=target))
+
+    logger.info(f"[TVM] {shape} ({dtype}): {len(entries)} candidates, {len(entries) - len(pending)} cached, "
+                f"compiling {len(pending)} (TVM {commit[:12]})")
+    failed = set()
+    if pending:
+        # spawn: TVM's runtime threads do not survive fork
+        with ProcessPoolExecutor(max_workers=jobs, mp_context=multiprocessing.get_context("spawn")) as pool:
+            futures = {pool.submit(_compile_candidate, job): job for job in pending}
+            for done, future in enumerate(as_completed(futures), 1):
+                job = futures[future]
+                try:
+                    future.result()
+                    logger.info(f"[TVM] [{done}/{len(pending)}] cand{job['candidate']:03d} {job['schedule']}")
+                except Exception as e:
+                    failed.add(job['candidate'])
+                    logger.error(f"[TVM] cand{job['candidate']:03d} {job['schedule']} failed: {e}")
+
+    built = [e for e in entries if e['candidate'] not in failed]
+    for entry in built:
+        shutil.copyfile(entry['cache_path'], entry['path'])
+    manifest = {'shape': shape, 'dtype': dtype, 'target': target, 'tvm_commit': commit, 'builder': digest,
+                'candidates': [{key: e[key] for key in ('candidate', 'schedule', 'cache_key', 'path')} for e in built]}
+    with open(os.path.join(out_dir, f"{shape}{dtype_tag}_candidates.json"), "w") as f:
+        json.dump(manifest, f, indent=2)
+    logger.info(f"[TVM] {shape}: {len(built)} candidates in {out_dir}" + (f", {len(failed)} failed" if failed else ""))
+    return built
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate and cross-compile matmul candidates for new shapes.")
+    parser.add_argument("shapes", nargs="+", help="MxKxN shape(s), e.g. 1x1024x4096")
+    parser.add_argument("--dtype", choices=["float32", "int8"], default="float32")
+    parser.add_argument("-o", "--output_dir", default="tvm_so_files",
+                        help="Kept separate from pareto_so_files so prebuilt candidates are not overwritten")
+    parser.add_argument("--target", default=ANDROID_CPU_TARGET)
+    parser.add_argument("-j", "--jobs", type=int, default=os.cpu_count(), help="Parallel compile processes")
+    parser.add_argument("--cache_dir", default=CACHE_DIR)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='[%(asctime)s.%(msecs)03d] %(message)s', datefmt='%H:%M:%S')
+    for shape in args.shapes:
+        m, k, n = map(int, shape.split("x"))
+        compile_shape(m, k, n, args.output_dir, dtype=args.dtype, target=args.target,
+                      jobs=args.jobs, cache_dir=args.cache_dir)
+
+
+if __name__ == "__main__":
+    main()
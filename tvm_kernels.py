@@ -0,0 +1,182 @@
+"""
+TVM kernel builders used by the contention harness.
+Each builder creates a TIR kernel, schedules it for the Android CPU and
+exports a shared library that can be uploaded through RPC.
+
+Usage (int8 CPU candidate matching the 8-bit QNN models):
+    python tvm_kernels.py 1 1024 4096 --dtype int8
+"""
+
+import os
+import argparse
+
+import numpy as np
+import tvm
+from tvm import te, tir
+from tvm.contrib import ndk
+
+
+# Same target the pareto .so files were built for (neon+dotprod)
+ANDROID_CPU_TARGET = "llvm -mtriple=aarch64-linux-android -mattr=+neon,+dotprod"
+
+# Host-side cache directory for helper modules built on demand
+MODULE_DIR = "tvm_modules"
+
+# STREAM triad scalar: c = a + STREAM_SCALAR * b
+STREAM_SCALAR = 3.0
+
+# Constants of the counter-based hash used by the fill kernels
+FILL_INDEX_MUL = 2654435761
+FILL_SEED_MUL = 0x9E3779B9
+FILL_MIX_MUL = 0x045D9F3B
+
+
+def export_android(lib, out_path):
+    """Cross-compile a built module with the NDK compiler (TVM_NDK_CC, see build_tvm.sh)."""
+    lib.export_library(out_path, fcompile=ndk.create_shared)
+    return out_path
+
+
+def export_module(lib, out_path, target):
+    """Export with the NDK for Android targets and with the host compiler otherwise (local RPC tests)."""
+    if "android" in str(target):
+        return export_android(lib, out_path)
+    lib.export_library(out_path)
+    return out_path
+
+
+def build_stream_triad(num_elems, out_path, target=ANDROID_CPU_TARGET, vector_width=16):
+    """
+    Build a STREAM-style triad kernel `stream_triad(a, b, c)`.
+
+    One call reads 2 * num_elems floats and writes num_elems floats, i.e.
+    moves 12 * num_elems bytes of DRAM traffic when the arrays exceed the LLC.
+    """
+    a = te.placeholder((num_elems,), "float32", name="a")
+    b = te.placeholder((num_elems,), "float32", name="b")
+    c = te.compute((num_elems,), lambda i: a[i] + tir.const(STREAM_SCALAR, "float32") * b[i], name="c")
+
+    func = te.create_prim_func([a, b, c]).with_attr("global_symbol", "stream_triad")
+    sch = tir.Schedule(tvm.IRModule({"stream_triad": func}))
+    block = sch.get_block("c", func_name="stream_triad")
+    (i,) = sch.get_loops(block)
+    outer, inner = sch.split(i, factors=[None, vector_width])
+    sch.parallel(outer)
+    sch.vectorize(inner)
+
+    lib = tvm.compile(sch.mod, target=tvm.target.Target(target))
+    return export_module(lib, out_path, target)
+
+
+def _fill_hash(index, seed):
+    """uint32 hash of (flat index, seed); mirrored by host_fill_values."""
+    u32 = lambda v: tir.const(v, "uint32")
+    x = index.astype("uint32") * u32(FILL_INDEX_MUL) + seed.astype("uint32") * u32(FILL_SEED_MUL)
+    x = (x ^ (x >> u32(16))) * u32(FILL_MIX_MUL)
+    x = (x ^ (x >> u32(16))) * u32(FILL_MIX_MUL)
+    return x ^ (x >> u32(16))
+
+
+def _fill_value(x, dtype):
+    if dtype == "int8":
+        return ((x >> tir.const(24, "uint32")).astype("int32") - 128).astype("int8")
+    return (x >> tir.const(8, "uint32")).astype("float32") * tir.const(1.0 / (1 << 24), "float32")
+
+
+def build_fill(out_path, target=ANDROID_CPU_TARGET):
+    """
+    Build `fill_float32(x, seed)` and `fill_int8(x, seed)` for 2-D tensors of any shape.
+
+    Values are a pure function of (flat index, seed), so the host can recompute
+    any element with host_fill_values without transferring the tensor.
+    float32 values are in [0, 1) and int8 values in [-128, 127].
+    """
+    funcs = {}
+    for dtype in ("float32", "int8"):
+        rows, cols = te.var("rows"), te.var("cols")
+        seed = te.var("seed", "int32")
+        x = te.compute((rows, cols), lambda i, j: _fill_value(_fill_hash(i * cols + j, seed), dtype), name="x")
+        name = f"fill_{dtype}"
+        funcs[name] = te.create_prim_func([x, seed]).with_attr("global_symbol", name)
+
+    sch = tir.Schedule(tvm.IRModule(funcs))
+    for name in funcs:
+        i, j = sch.get_loops(sch.get_block("x", func_name=name))
+        sch.parallel(i)
+
+    lib = tvm.compile(sch.mod, target=tvm.target.Target(target))
+    return export_module(lib, out_path, target)
+
+
+def host_fill_values(index, dtype, seed):
+    """NumPy mirror of the device fill kernels for the given flat indices."""
+    x = np.asarray(index).astype(np.uint32)
+    x = x * np.uint32(FILL_INDEX_MUL) + np.uint32((seed * FILL_SEED_MUL) & 0xFFFFFFFF)
+    x = (x ^ (x >> np.uint32(16))) * np.uint32(FILL_MIX_MUL)
+    x = (x ^ (x >> np.uint32(16))) * np.uint32(FILL_MIX_MUL)
+    x = x ^ (x >> np.uint32(16))
+    if dtype == "int8":
+        return ((x >> np.uint32(24)).astype(np.int32) - 128).astype(np.int8)
+    return (x >> np.uint32(8)).astype(np.float32) * np.float32(1.0 / (1 << 24))
+
+
+def matmul_compute(m, k, n, dtype="float32"):
+    """C = A @ B. int8 inputs accumulate in int32 (same data type as the 8-bit QNN models)."""
+    out_dtype = "int32" if dtype == "int8" else dtype
+    a = te.placeholder((m, k), dtype, name="a")
+    b = te.placeholder((k, n), dtype, name="b")
+    r = te.reduce_axis((0, k), name="r")
+    c = te.compute(
+        (m, n),
+        lambda i, j: te.sum(a[i, r].astype(out_dtype) * b[r, j].astype(out_dtype), axis=r),
+        name="c",
+    )
+    return [a, b, c]
+
+
+def build_matmul(m, k, n, out_path, dtype="float32", target=ANDROID_CPU_TARGET, vector_width=16,
+                 gpu_target=None, gpu_threads=64):
+    """
+    Build `matmul(a, b, c)` with a simple parallel + vectorized schedule.
+    The entry name matches the pareto .so files so run_contention.py can load either.
+    With gpu_target (e.g. "opencl -device=adreno") it runs one thread per output
+    element instead, with target as the host.
+    """
+    func = te.create_prim_func(matmul_compute(m, k, n, dtype)).with_attr("global_symbol", "matmul")
+    sch = tir.Schedule(tvm.IRModule({"matmul": func}))
+    block = sch.get_block("c", func_name="matmul")
+    i, j, r = sch.get_loops(block)
+    if gpu_target:
+        bx, tx = sch.split(sch.fuse(i, j), factors=[None, gpu_threads])
+        sch.bind(bx, "blockIdx.x")
+        sch.bind(tx, "threadIdx.x")
+        lib = tvm.compile(sch.mod, target=tvm.target.Target(gpu_target, host=target))
+        return export_module(lib, out_path, target)
+    j_outer, j_inner = sch.split(j, factors=[None, vector_width])
+    sch.reorder(i, j_outer, r, j_inner)
+    sch.parallel(sch.fuse(i, j_outer))
+    init = sch.decompose_reduction(block, r)
+    sch.vectorize(sch.get_loops(init)[-1])
+    sch.vectorize(j_inner)
+
+    lib = tvm.compile(sch.mod, target=tvm.target.Target(target))
+    return export_module(lib, out_path, target)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build a matmul library for the Android CPU.")
+    parser.add_argument("M", type=int)
+    parser.add_argument("K", type=int)
+    parser.add_argument("N", type=int)
+    parser.add_argument("--dtype", choices=["float32", "int8"], default="int8")
+    parser.add_argument("-o", "--output_dir", default="int8_so_files")
+    args = parser.parse_args()
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    out_path = os.path.join(args.output_dir, f"{args.M}x{args.K}x{args.N}_{args.dtype}_neon+dotprod.so")
+    build_matmul(args.M, args.K, args.N, out_path, dtype=args.dtype)
+    print(f"saved {args.dtype} matmul of shape ({args.M}, {args.K}) @ ({args.K}, {args.N}) to {out_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,181 @@
+// Standalone CPU worker for the on-device orchestrator (orchestrator/).
+//
+// Loads a matmul library (the pareto .so files or tvm_kernels.build_matmul) in
+// its own process, without the RPC server, and speaks the qnn_runner line
+// protocol on stdin/stdout:
+//
+//   READY <init ms>       library loaded and tensors allocated
+//   run <n>               run n times, one "T <i> <us>" line each, then "DONE <n>"
+//   start / stop          run back to back until stop, then "DONE <count>"
+//   quit                  exit
+//
+// Usage:
+//   cpu_runner <library.so> <m> <k> <n> [--entry matmul] [--dtype float32|int8]
+//              [--mode 1] [--nthreads 8]
+//
+// --mode / --nthreads are passed to runtime.config_threadpool like the RPC
+// path does (1 = big cores first). Inputs are filled with ones; correctness
+// is checked by run_contention.py over RPC before the timed phases.
+
+#include <dlpack/dlpack.h>
+#include <tvm/ffi/container/tensor.h>
+#include <tvm/ffi/extra/module.h>
+#include <tvm/ffi/function.h>
+#include <tvm/ffi/string.h>
+
+#include <atomic>
+#include <chrono>
+#include <cstdint>
+#include <cstring>
+#include <iostream>
+#include <mutex>
+#include <sstream>
+#include <string>
+#include <thread>
+#include <vector>
+
+namespace {
+
+using tvm::ffi::Function;
+using tvm::ffi::Module;
+using Clock = std::chrono::steady_clock;
+
+struct Matrix {
+  std::vector<uint8_t> data;
+  int64_t shape[2];
+  DLTensor tensor;
+
+  Matrix(int64_t rows, int64_t cols, DLDataType dtype) : shape{rows, cols} {
+    data.resize(rows * cols * dtype.bits / 8);
+    tensor = DLTensor{data.data(), DLDevice{kDLCPU, 0}, 2, dtype, shape, nullptr, 0};
+  }
+};
+
+}  // namespace
+
+int main(int argc, char *argv[]) {
+  if (argc < 5) {
+    std::cerr << "Usage: " << argv[0] << " <library.so> <m> <k> <n> [--entry matmul] [--dtype float32|int8]"
+              << " [--mode 1] [--nthreads 8]" << std::endl;
+    return 1;
+  }
+  std::string entry = "matmul", dtype = "float32";
+  int mode = 1, nthreads = 8;
+  for (int i = 5; i + 1 < argc; i += 2) {
+    std::string key = argv[i];
+    if (key == "--entry") {
+      entry = argv[i + 1];
+    } else if (key == "--dtype") {
+      dtype = argv[i + 1];
+    } else if (key == "--mode") {
+      mode = std::stoi(argv[i + 1]);
+    } else if (key == "--nthreads") {
+      nthreads = std::stoi(argv[i + 1]);
+    } else {
+      std::cerr << "Error: unknown option " << key << std::endl;
+      return 1;
+    }
+  }
+  int64_t m = std::stoll(argv[2]), k = std::stoll(argv[3]), n = std::stoll(argv[4]);
+  DLDataType in_type = dtype == "int8" ? DLDataType{kDLInt, 8, 1} : DLDataType{kDLFloat, 32, 1};
+  DLDataType out_type = dtype == "int8" ? DLDataType{kDLInt, 32, 1} : DLDataType{kDLFloat, 32, 1};
+
+  Clock::time_point t_init = Clock::now();
+  Function func;
+  try {
+    Module mod = Module::LoadFromFile(argv[1]);
+    auto f = mod->GetFunction(entry, true);
+    if (!f.has_value()) {
+      std::cout << "ERR function " << entry << " not found in " << argv[1] << std::endl;
+      return 1;
+    }
+    func = *f;
+  } catch (const std::exception &e) {
+    std::cout << "ERR " << e.what() << std::endl;
+    return 1;
+  }
+  Matrix a(m, k, in_type), b(k, n, in_type), c(m, n, out_type);
+  if (dtype == "int8") {
+    std::memset(a.data.data(), 1, a.data.size());
+    std::memset(b.data.data(), 1, b.data.size());
+  } else {
+    for (Matrix *x : {&a, &b}) {
+      float *p = reinterpret_cast<float *>(x->data.data());
+      std::fill(p, p + x->data.size() / sizeof(float), 1.0f);
+    }
+  }
+
+  DLTensor *ta = &a.tensor, *tb = &b.tensor, *tc = &c.tensor;
+
+  std::mutex out_mu;
+  std::atomic<bool> stop{false};
+  int64_t index = 0;
+  auto run_once = [&] {
+    Clock::time_point t0 = Clock::now();
+    func(ta, tb, tc);
+    double us = std::chrono::duration<double, std::micro>(Clock::now() - t0).count();
+    std::lock_guard<std::mutex> lock(out_mu);
+    std::cout << "T " << index++ << " " << us << std::endl;
+  };
+  // The TVM thread pool is thread local: every command runs on this one worker thread
+  std::mutex cmd_mu;
+  std::vector<std::string> commands;
+  std::atomic<bool> has_command{false};
+  std::thread worker([&] {
+    if (auto config = Function::GetGlobal("runtime.config_threadpool")) {
+      (*config)(mode, nthreads);
+    }
+    func(ta, tb, tc);  // warmup
+    {
+      std::lock_guard<std::mutex> lock(out_mu);
+      std::cout << "READY " << std::chrono::duration<double, std::milli>(Clock::now() - t_init).count() << std::endl;
+    }
+    bool looping = false;
+    int64_t loop_start = 0;
+    while (true) {
+      std::vector<std::string> pending;
+      if (has_command) {
+        std::lock_guard<std::mutex> lock(cmd_mu);
+        pending.swap(commands);
+        has_command = false;
+      }
+      for (const std::string &line : pending) {
+        std::istringstream cmd(line);
+        std::string op;
+        cmd >> op;
+        if (op == "run") {
+          int64_t count = 0;
+          cmd >> count;
+          for (int64_t i = 0; i < count; i++) run_once();
+          std::lock_guard<std::mutex> lock(out_mu);
+          std::cout << "DONE " << count << std::endl;
+        } else if (op == "start") {
+          looping = true;
+          loop_start = index;
+        } else if (op == "stop" && looping) {
+          looping = false;
+          std::lock_guard<std::mutex> lock(out_mu);
+          std::cout << "DONE " << index - loop_start << std::endl;
+        } else if (op == "quit") {
+          return;
+        }
+      }
+      if (looping) {
+        run_once();
+      } else if (!has_command) {
+        std::this_thread::sleep_for(std::chrono::microseconds(100));
+      }
+      if (stop && !has_command) return;
+    }
+  });
+
+  std::string line;
+  while (std::getline(std::cin, line)) {
+    std::lock_guard<std::mutex> lock(cmd_mu);
+    commands.push_back(line);
+    has_command = true;
+  }
+  stop = true;
+  worker.join();
+  return 0;
+}
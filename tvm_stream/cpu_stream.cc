@@ -0,0 +1,182 @@
+// Device-side CPU measurement loop for the TVM RPC server.
+//
+// time_evaluator returns only after repeat * number runs, so looping it from
+// the host leaves a gap with no CPU load between chunks and gives no samples
+// until a chunk finishes. This library is uploaded and loaded like any other
+// module (remote.load_module) and exports:
+//
+//   stream_start(mod, name, a, b, c, mode, nthreads, rate_hz, poisson) -> handle
+//       run mod[name](a, b, c) on a device thread, back to back if rate_hz is 0,
+//       otherwise open loop with fixed-rate or Poisson arrivals
+//   stream_poll(handle) -> "s0:q0,s1:q1,..."
+//       service time and queueing delay (us) of the runs finished since the last poll
+//   stream_stop(handle) -> "s0:q0,s1:q1,..."
+//       stop the loop and return the remaining samples
+//
+// In open-loop mode a run starts at its arrival time, or when the previous run
+// ends if that is later; the difference is its queueing delay.
+//
+// Each call returns immediately, so the host can poll live samples over the
+// same RPC session while the loop keeps the CPU busy.
+
+#include <tvm/ffi/container/tensor.h>
+#include <tvm/ffi/error.h>
+#include <tvm/ffi/extra/module.h>
+#include <tvm/ffi/function.h>
+#include <tvm/ffi/string.h>
+
+#include <atomic>
+#include <chrono>
+#include <cstdint>
+#include <memory>
+#include <mutex>
+#include <random>
+#include <sstream>
+#include <string>
+#include <thread>
+#include <unordered_map>
+#include <vector>
+
+namespace {
+
+using tvm::ffi::Function;
+using tvm::ffi::Module;
+using tvm::ffi::String;
+using Clock = std::chrono::steady_clock;
+
+// Tensors passed over RPC only live for the duration of the call, so keep a
+// copy of the DLTensor header (and its shape); the data stays owned by the host
+// side tensor handle.
+struct TensorArg {
+  DLTensor tensor;
+  std::vector<int64_t> shape;
+  std::vector<int64_t> strides;
+
+  explicit TensorArg(const DLTensor *src) : tensor(*src), shape(src->shape, src->shape + src->ndim) {
+    tensor.shape = shape.data();
+    if (src->strides != nullptr) {
+      strides.assign(src->strides, src->strides + src->ndim);
+      tensor.strides = strides.data();
+    }
+  }
+};
+
+struct Stream {
+  Function func;
+  std::vector<std::unique_ptr<TensorArg>> args;
+  std::thread worker;
+  std::atomic<bool> stop{false};
+  std::mutex mu;
+  std::vector<std::pair<double, double>> pending;  // (service, queue) us
+  std::string error;
+};
+
+std::mutex g_mu;
+std::unordered_map<int64_t, std::unique_ptr<Stream>> g_streams;
+int64_t g_next_handle = 1;
+
+void StreamLoop(Stream *s, int64_t mode, int64_t nthreads, double rate_hz, bool poisson) {
+  // The TVM thread pool is thread local, so configure it on this thread
+  if (auto config = Function::GetGlobal("runtime.config_threadpool")) {
+    (*config)(static_cast<int>(mode), static_cast<int>(nthreads));
+  }
+  DLTensor *a = &s->args[0]->tensor;
+  DLTensor *b = &s->args[1]->tensor;
+  DLTensor *c = &s->args[2]->tensor;
+  std::mt19937_64 rng(12345);
+  std::exponential_distribution<double> poisson_gap_s(rate_hz > 0 ? rate_hz : 1.0);
+  Clock::time_point arrival = Clock::now();
+  try {
+    while (!s->stop.load()) {
+      Clock::time_point t0 = Clock::now();
+      double queue_us = 0.0;
+      if (rate_hz > 0) {
+        if (t0 < arrival) {
+          std::this_thread::sleep_until(arrival);
+          t0 = Clock::now();
+        }
+        queue_us = std::chrono::duration<double, std::micro>(t0 - arrival).count();
+        double gap_s = poisson ? poisson_gap_s(rng) : 1.0 / rate_hz;
+        arrival += std::chrono::duration_cast<Clock::duration>(std::chrono::duration<double>(gap_s));
+      }
+      s->func(a, b, c);
+      double us = std::chrono::duration<double, std::micro>(Clock::now() - t0).count();
+      std::lock_guard<std::mutex> lock(s->mu);
+      s->pending.emplace_back(us, queue_us);
+    }
+  } catch (const std::exception &e) {
+    std::lock_guard<std::mutex> lock(s->mu);
+    s->error = e.what();
+  }
+}
+
+Stream *FindStream(int64_t handle) {
+  std::lock_guard<std::mutex> lock(g_mu);
+  auto it = g_streams.find(handle);
+  if (it == g_streams.end()) {
+    TVM_FFI_THROW(ValueError) << "Unknown stream handle " << handle;
+  }
+  return it->second.get();
+}
+
+String Drain(Stream *s) {
+  std::vector<std::pair<double, double>> samples;
+  std::string error;
+  {
+    std::lock_guard<std::mutex> lock(s->mu);
+    samples.swap(s->pending);
+    error = s->error;
+  }
+  if (!error.empty()) {
+    TVM_FFI_THROW(RuntimeError) << "CPU stream failed: " << error;
+  }
+  std::ostringstream os;
+  os.precision(3);
+  os << std::fixed;
+  for (size_t i = 0; i < samples.size(); i++) {
+    if (i > 0) os << ',';
+    os << samples[i].first << ':' << samples[i].second;
+  }
+  return String(os.str());
+}
+
+int64_t StreamStart(Module mod, String name, DLTensor *a, DLTensor *b, DLTensor *c, int64_t mode,
+                    int64_t nthreads, double rate_hz, bool poisson) {
+  auto func = mod->GetFunction(name, true);
+  if (!func.has_value()) {
+    TVM_FFI_THROW(ValueError) << "Function " << name << " not found in module";
+  }
+  auto s = std::make_unique<Stream>();
+  s->func = *func;
+  for (DLTensor *t : {a, b, c}) s->args.push_back(std::make_unique<TensorArg>(t));
+  s->worker = std::thread(StreamLoop, s.get(), mode, nthreads, rate_hz, poisson);
+
+  std::lock_guard<std::mutex> lock(g_mu);
+  int64_t handle = g_next_handle++;
+  g_streams[handle] = std::move(s);
+  return handle;
+}
+
+String StreamPoll(int64_t handle) { return Drain(FindStream(handle)); }
+
+String StreamStop(int64_t handle) {
+  std::unique_ptr<Stream> s;
+  {
+    std::lock_guard<std::mutex> lock(g_mu);
+    auto it = g_streams.find(handle);
+    if (it == g_streams.end()) {
+      TVM_FFI_THROW(ValueError) << "Unknown stream handle " << handle;
+    }
+    s = std::move(it->second);
+    g_streams.erase(it);
+  }
+  s->stop.store(true);
+  s->worker.join();
+  return Drain(s.get());
+}
+
+}  // namespace
+
+TVM_FFI_DLL_EXPORT_TYPED_FUNC(stream_start, StreamStart);
+TVM_FFI_DLL_EXPORT_TYPED_FUNC(stream_poll, StreamPoll);
+TVM_FFI_DLL_EXPORT_TYPED_FUNC(stream_stop, StreamStop);
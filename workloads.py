@@ -0,0 +1,361 @@
+"""
+Model workloads for the accelerator slots of run_contention.py.
+
+Each slot can also run a full model, named with the "model:" prefix:
+
+  -c model:<block>  TVM transformer block on the CPU (TRANSFORMER_BLOCKS)
+  -g model:<block>  the same block compiled for OpenCL and run on the GPU
+                    through a second RPC session instead of clblast_bw_test
+  -n model:<npu>    a QNN model directory other than the generated matmuls
+                    (NPU_MODELS, e.g. InceptionNet from qnn-net-run_inceptionnet.sh)
+
+A transformer block (pre-norm attention + MLP, shapes of the CLIP and
+InternVL/Qwen models in qnn_prepare_model.sh's SIZE_ARR) is a single
+function `block(x, w, y)`: x is the (seq, hidden) activation, w one flat
+buffer with all weights (and the KV cache of decode blocks) and y the
+output. It therefore plugs into everything that runs a matmul(a, b, c)
+kernel: time_evaluator, CpuStream and CpuTensorCache. Norm scales are
+folded into the following projection, so norms carry no parameters.
+
+Usage (build the libraries ahead of a sweep):
+    export TVM_NDK_CC=...   # see build_tvm.sh
+    python workloads.py clip_l14 internvl_1b_decode --gpu
+"""
+
+import os
+import hashlib
+import argparse
+import logging
+
+import numpy as np
+import tvm
+from tvm import te, tir
+
+from tvm_kernels import ANDROID_CPU_TARGET, MODULE_DIR, export_module
+
+logger = logging.getLogger(__name__)
+
+MODEL_PREFIX = "model:"
+
+ANDROID_GPU_TARGET = "opencl -device=adreno"
+
+# Threads per work group of the GPU blocks
+GPU_THREADS = 64
+
+NORM_EPS = 1e-5
+
+
+def parse_model_spec(spec):
+    """Model name of a "model:<name>" slot argument, or None for a plain kernel/model directory."""
+    return spec[len(MODEL_PREFIX):] if spec.startswith(MODEL_PREFIX) else None
+
+
+class TransformerBlock:
+    """One pre-norm transformer layer with grouped-query attention."""
+
+    def __init__(self, name, seq, hidden, heads, head_dim, ffn, kv_heads=None, gated=False, ctx=None):
+        self.name = name
+        self.seq = seq
+        self.hidden = hidden
+        self.heads = heads
+        self.head_dim = head_dim
+        self.kv_heads = kv_heads or heads
+        self.ffn = ffn
+        # gated: SwiGLU MLP with RMSNorm (LLM); otherwise quick-GELU MLP with LayerNorm (CLIP)
+        self.gated = gated
+        # Decode blocks (ctx given) attend over a KV cache of ctx tokens instead of their own keys
+        self.ctx = ctx or seq
+        self.decode = ctx is not None
+        self.q_dim = heads * head_dim
+        self.kv_dim = self.kv_heads * head_dim
+
+    def weight_layout(self):
+        """[(name, shape)] of the sections of the flat weight buffer, in order."""
+        layout = [('w_qkv', (self.hidden, self.q_dim + 2 * self.kv_dim)),
+                  ('w_o', (self.q_dim, self.hidden))]
+        if self.gated:
+            layout.append(('w_gate', (self.hidden, self.ffn)))
+        layout += [('w_up', (self.hidden, self.ffn)),
+                   ('w_down', (self.ffn, self.hidden))]
+        if self.decode:
+            layout += [('k_cache', (self.kv_heads, self.ctx, self.head_dim)),
+                       ('v_cache', (self.kv_heads, self.ctx, self.head_dim))]
+        return layout
+
+    def offsets(self):
+        offsets, off = {}, 0
+        for name, shape in self.weight_layout():
+            offsets[name] = (off, shape)
+            off += int(np.prod(shape))
+        return offsets, off
+
+    @property
+    def weight_size(self):
+        return self.offsets()[1]
+
+    def gflop(self):
+        """Multiply-adds of the matmuls and attention, as GFLOP."""
+        linear = self.hidden * (self.q_dim + 2 * self.kv_dim) + self.q_dim * self.hidden
+        linear += self.hidden * self.ffn * (3 if self.gated else 2)
+        attention = 2 * self.heads * self.ctx * self.head_dim
+        return 2.0 * self.seq * (linear + attention) / 1e9
+
+    def describe(self):
+        return {'model': self.name, 'kind': 'transformer_block', 'seq': self.seq, 'hidden': self.hidden,
+                'heads': self.heads, 'kv_heads': self.kv_heads, 'head_dim': self.head_dim, 'ffn': self.ffn,
+                'gated': self.gated, 'ctx': self.ctx, 'weights_mb': self.weight_size * 4 / 2**20,
+                'gflop': self.gflop()}
+
+    def compute(self, dtype="float32"):
+        """TE stages of the block; returns [x, w, y]."""
+        seq, hidden, hd, ctx, ffn = self.seq, self.hidden, self.head_dim, self.ctx, self.ffn
+        group = self.heads // self.kv_heads
+        offsets, total = self.offsets()
+        x = te.placeholder((seq, hidden), dtype, name="x")
+        w = te.placeholder((1, total), dtype, name="w")
+
+        def weight(name, *idx):
+            off, shape = offsets[name]
+            flat = idx[0]
+            for i, size in zip(idx[1:], shape[1:]):
+                flat = flat * size + i
+            return w[0, off + flat]
+
+        def norm(inp, name):
+            r = te.reduce_axis((0, hidden), name="r")
+            if self.gated:
+                ms = te.compute((seq,), lambda i: te.sum(inp[i, r] * inp[i, r] / hidden, axis=r), name=f"{name}_ms")
+                return te.compute((seq, hidden), lambda i, j: inp[i, j] * te.rsqrt(ms[i] + NORM_EPS), name=name)
+            mean = te.compute((seq,), lambda i: te.sum(inp[i, r] / hidden, axis=r), name=f"{name}_mean")
+            r2 = te.reduce_axis((0, hidden), name="r")
+            var = te.compute((seq,), lambda i: te.sum((inp[i, r2] - mean[i]) * (inp[i, r2] - mean[i]) / hidden,
+                                                      axis=r2), name=f"{name}_var")
+            return te.compute((seq, hidden), lambda i, j: (inp[i, j] - mean[i]) * te.rsqrt(var[i] + NORM_EPS),
+                              name=name)
+
+        def linear(inp, wname, name):
+            in_dim, out_dim = offsets[wname][1]
+            r = te.reduce_axis((0, in_dim), name="r")
+            return te.compute((seq, out_dim), lambda i, j: te.sum(inp[i, r] * weight(wname, r, j), axis=r), name=name)
+
+        n1 = norm(x, "norm1")
+        qkv = linear(n1, 'w_qkv', "qkv")
+        if self.decode:
+            key = lambda t, kvh, d: weight('k_cache', kvh, t, d)
+            value = lambda t, kvh, d: weight('v_cache', kvh, t, d)
+        else:
+            key = lambda t, kvh, d: qkv[t, self.q_dim + kvh * hd + d]
+            value = lambda t, kvh, d: qkv[t, self.q_dim + self.kv_dim + kvh * hd + d]
+
+        scale = tir.const(1.0 / np.sqrt(hd), dtype)
+        rd = te.reduce_axis((0, hd), name="r")
+        scores = te.compute((self.heads, seq, ctx),
+                            lambda h, i, t: te.sum(qkv[i, h * hd + rd] * key(t, h // group, rd) * scale, axis=rd),
+                            name="scores")
+        rt = te.reduce_axis((0, ctx), name="r")
+        smax = te.compute((self.heads, seq), lambda h, i: te.max(scores[h, i, rt], axis=rt), name="softmax_max")
+        sexp = te.compute((self.heads, seq, ctx), lambda h, i, t: te.exp(scores[h, i, t] - smax[h, i]),
+                          name="softmax_exp")
+        rt2 = te.reduce_axis((0, ctx), name="r")
+        ssum = te.compute((self.heads, seq), lambda h, i: te.sum(sexp[h, i, rt2], axis=rt2), name="softmax_sum")
+        rt3 = te.reduce_axis((0, ctx), name="r")
+        av = te.compute((seq, self.q_dim),
+                        lambda i, c: te.sum(sexp[c // hd, i, rt3] * value(rt3, c // hd // group, c % hd), axis=rt3),
+                        name="av")
+        attn = te.compute((seq, self.q_dim), lambda i, c: av[i, c] / ssum[c // hd, i], name="attn")
+        o = linear(attn, 'w_o', "o_proj")
+        h1 = te.compute((seq, hidden), lambda i, j: x[i, j] + o[i, j], name="residual1")
+
+        n2 = norm(h1, "norm2")
+        up = linear(n2, 'w_up', "up_proj")
+        if self.gated:
+            gate = linear(n2, 'w_gate', "gate_proj")
+            act = te.compute((seq, ffn), lambda i, j: gate[i, j] * te.sigmoid(gate[i, j]) * up[i, j], name="act")
+        else:
+            act = te.compute((seq, ffn), lambda i, j: up[i, j] * te.sigmoid(tir.const(1.702, dtype) * up[i, j]),
+                             name="act")
+        down = linear(act, 'w_down', "down_proj")
+        y = te.compute((seq, hidden), lambda i, j: h1[i, j] + down[i, j], name="y")
+        return [x, w, y]
+
+    def schedule(self, gpu=False, vector_width=16):
+        """
+        CPU: every stage parallel over its outer spatial loops, with the
+        innermost spatial loop vectorized where it divides evenly (matmuls keep
+        the reduction outside the vector loop like tvm_kernels.build_matmul).
+        GPU: every stage is its own kernel with one thread per output element.
+        """
+        func = te.create_prim_func(self.compute()).with_attr("global_symbol", "block")
+        sch = tir.Schedule(tvm.IRModule({"block": func}))
+        for block in sch.get_child_blocks(sch.get_block("root", func_name="block")):
+            loops = sch.get_loops(block)
+            num_spatial = sum(1 for iv in sch.get(block).iter_vars if iv.iter_type == 0)
+            spatial, reduce = loops[:num_spatial], loops[num_spatial:]
+            if gpu:
+                bx, tx = sch.split(sch.fuse(*spatial), factors=[None, GPU_THREADS])
+                sch.bind(bx, "blockIdx.x")
+                sch.bind(tx, "threadIdx.x")
+                continue
+            inner_extent = int(sch.get(spatial[-1]).extent)
+            if not reduce:
+                fused = sch.fuse(*spatial)
+                if int(sch.get(fused).extent) % vector_width == 0:
+                    outer, inner = sch.split(fused, factors=[None, vector_width])
+                    sch.parallel(outer)
+                    sch.vectorize(inner)
+                else:
+                    sch.parallel(fused)
+            elif inner_extent % vector_width == 0:
+                j_outer, j_inner = sch.split(spatial[-1], factors=[None, vector_width])
+                sch.reorder(*spatial[:-1], j_outer, *reduce, j_inner)
+                sch.parallel(sch.fuse(*spatial[:-1], j_outer))
+                init = sch.decompose_reduction(block, reduce[0])
+                sch.vectorize(sch.get_loops(init)[-1])
+                sch.vectorize(j_inner)
+            else:
+                sch.parallel(sch.fuse(*spatial))
+        return sch.mod
+
+    def build(self, out_path, target=ANDROID_CPU_TARGET, gpu_target=None):
+        """Build for the CPU target, or for gpu_target with target as its host."""
+        if gpu_target:
+            build_target = tvm.target.Target(gpu_target, host=target)
+        else:
+            build_target = tvm.target.Target(target)
+        lib = tvm.compile(self.schedule(gpu=bool(gpu_target)), target=build_target)
+        return export_module(lib, out_path, target)
+
+    def make_inputs(self, rng):
+        """Host inputs with unit-variance activations (weights scaled by 1/sqrt(fan-in))."""
+        x = rng.standard_normal((self.seq, self.hidden)).astype(np.float32)
+        offsets, total = self.offsets()
+        w = np.empty((1, total), dtype=np.float32)
+        for name, (off, shape) in offsets.items():
+            scale = 1.0 if name.endswith("_cache") else 1.0 / np.sqrt(shape[0])
+            w[0, off:off + int(np.prod(shape))] = rng.standard_normal(int(np.prod(shape))) * scale
+        return x, w
+
+    def reference(self, x, w):
+        """NumPy forward pass of the block (float64)."""
+        offsets, _ = self.offsets()
+        get = lambda name: w[0, offsets[name][0]:offsets[name][0] + int(np.prod(offsets[name][1]))].reshape(
+            offsets[name][1]).astype(np.float64)
+        hd, group = self.head_dim, self.heads // self.kv_heads
+
+        def norm(v):
+            if self.gated:
+                return v / np.sqrt((v * v).mean(axis=1, keepdims=True) + NORM_EPS)
+            centered = v - v.mean(axis=1, keepdims=True)
+            return centered / np.sqrt((centered * centered).mean(axis=1, keepdims=True) + NORM_EPS)
+
+        x = x.astype(np.float64)
+        qkv = norm(x) @ get('w_qkv')
+        q = qkv[:, :self.q_dim].reshape(self.seq, self.heads, hd).transpose(1, 0, 2)
+        if self.decode:
+            k, v = get('k_cache'), get('v_cache')
+        else:
+            k = qkv[:, self.q_dim:self.q_dim + self.kv_dim].reshape(self.seq, self.kv_heads, hd).transpose(1, 0, 2)
+            v = qkv[:, self.q_dim + self.kv_dim:].reshape(self.seq, self.kv_heads, hd).transpose(1, 0, 2)
+        k, v = np.repeat(k, group, axis=0), np.repeat(v, group, axis=0)
+        scores = q @ k.transpose(0, 2, 1) / np.sqrt(hd)
+        p = np.exp(scores - scores.max(axis=2, keepdims=True))
+        p /= p.sum(axis=2, keepdims=True)
+        attn = (p @ v).transpose(1, 0, 2).reshape(self.seq, self.q_dim)
+        h1 = x + attn @ get('w_o')
+        n2 = norm(h1)
+        up = n2 @ get('w_up')
+        if self.gated:
+            gate = n2 @ get('w_gate')
+            act = gate / (1 + np.exp(-gate)) * up
+        else:
+            act = up / (1 + np.exp(-1.702 * up))
+        return h1 + act @ get('w_down')
+
+    def verify(self, y, x, w):
+        ref = self.reference(x, w)
+        np.testing.assert_allclose(y, ref, rtol=1e-3, atol=1e-3 * float(np.abs(ref).max()))
+
+
+# Layers of the models whose matmuls are listed in qnn_prepare_model.sh / run_contention.sh
+TRANSFORMER_BLOCKS = {block.name: block for block in (
+    # CLIP ViT-L/14 and ViT-B/16 vision encoder layers (qkv fuse 1024x3072 / 768x2304, up 1024x4096 / 768x3072)
+    TransformerBlock("clip_l14", seq=257, hidden=1024, heads=16, head_dim=64, ffn=4096),
+    TransformerBlock("clip_b16", seq=197, hidden=768, heads=12, head_dim=64, ffn=3072),
+    # InternVL3.5-1B (Qwen3-0.6B) and Qwen2-VL-2B decoder layers generating one token (qkv 1024x4096 / 1536x2048)
+    TransformerBlock("internvl_1b_decode", seq=1, hidden=1024, heads=16, kv_heads=8, head_dim=128, ffn=3072,
+                     gated=True, ctx=1024),
+    TransformerBlock("qwen2vl_2b_decode", seq=1, hidden=1536, heads=12, kv_heads=2, head_dim=128, ffn=8960,
+                     gated=True, ctx=1024),
+    # Same layers during prefill of a 257-token prompt
+    TransformerBlock("internvl_1b_prefill", seq=257, hidden=1024, heads=16, kv_heads=8, head_dim=128, ffn=3072,
+                     gated=True),
+)}
+
+
+# QNN model directories on the device besides the ones of qnn_prepare_model.sh.
+# lib_dir holds qnn-net-run and the backend libraries, relative to run_dir.
+NPU_MODELS = {
+    # qnn-net-run_inceptionnet.sh
+    'inception_v3': {
+        'run_dir': "/data/local/tmp/inception_v3",
+        'model_lib': "libInception_v3.so",
+        'context_binary': "Inception_v3.serialized.bin",
+        'input_list': "target_raw_list.txt",
+        'lib_dir': ".",
+    },
+}
+
+
+def describe_workload(spec):
+    """Result entry of one slot argument: the model (if any) and its parameters."""
+    model = parse_model_spec(spec)
+    if model in TRANSFORMER_BLOCKS:
+        return TRANSFORMER_BLOCKS[model].describe()
+    if model in NPU_MODELS:
+        return {'model': model, 'kind': 'qnn', 'run_dir': NPU_MODELS[model]['run_dir']}
+    return {'model': os.path.basename(spec), 'kind': 'matmul', 'kernel': spec}
+
+
+def _source_digest():
+    with open(os.path.abspath(__file__), "rb") as f:
+        return hashlib.sha1(f.read()).hexdigest()[:8]
+
+
+def model_library(name, gpu=False, target=ANDROID_CPU_TARGET):
+    """Library of a transformer block in MODULE_DIR, built on first use (rebuilt when this file changes)."""
+    if name not in TRANSFORMER_BLOCKS:
+        raise ValueError(f"Unknown model '{name}', expected one of {', '.join(TRANSFORMER_BLOCKS)}")
+    os.makedirs(MODULE_DIR, exist_ok=True)
+    device = "opencl" if gpu else "cpu"
+    host = "android" if "android" in target else "host"
+    lib_path = os.path.join(MODULE_DIR, f"block_{name}_{device}_{host}_{_source_digest()}.so")
+    if not os.path.exists(lib_path):
+        logger.info(f"Building {name} ({device}): {lib_path}")
+        TRANSFORMER_BLOCKS[name].build(lib_path, target=target, gpu_target=ANDROID_GPU_TARGET if gpu else None)
+    return lib_path
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the transformer block libraries of the model workloads.")
+    parser.add_argument("models", nargs="*", help=f"Blocks to build (default: all of {', '.join(TRANSFORMER_BLOCKS)})")
+    parser.add_argument("--gpu", action="store_true", help="Also build the OpenCL libraries")
+    parser.add_argument("--list", action="store_true", help="Print the workloads and exit")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='[%(asctime)s.%(msecs)03d] %(message)s', datefmt='%H:%M:%S')
+    if args.list:
+        for block in TRANSFORMER_BLOCKS.values():
+            d = block.describe()
+            logger.info(f"model:{block.name:<22} seq {d['seq']:>4}, ctx {d['ctx']:>4}, "
+                        f"{d['weights_mb']:.0f} MB, {d['gflop']:.2f} GFLOP")
+        for name, layout in NPU_MODELS.items():
+            logger.info(f"model:{name:<22} NPU, {layout['run_dir']}")
+        return
+    for name in args.models or list(TRANSFORMER_BLOCKS):
+        model_library(name)
+        if args.gpu:
+            model_library(name, gpu=True)
+
+
+if __name__ == "__main__":
+    main()